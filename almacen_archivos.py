@@ -0,0 +1,95 @@
+"""
+Almacén de archivos subidos direccionado por contenido
+Los formatos PDF se guardan por su SHA-256: el mismo archivo subido para
+varios reportes ocupa disco una sola vez y un nombre repetido ya no sobrescribe
+(recurso.hash_sha256 se agrega en migraciones/004)
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+
+ALMACEN_CONFIG = {
+    'directorio': os.environ.get('UPLOAD_FOLDER', 'uploads/reportes'),
+    # Bytes leídos del stream por iteración (nunca se carga el archivo completo)
+    'tamano_bloque': int(os.environ.get('UPLOAD_BLOQUE', 1024 * 1024)),
+    # Tamaño máximo aceptado (0 = sin límite)
+    'max_bytes': int(os.environ.get('UPLOAD_MAX_BYTES', 50 * 1024 * 1024)),
+}
+
+PATRON_EXTENSION = re.compile(r'^\.[a-z0-9]{1,8}$')
+
+
+def extension_segura(nombre_original):
+    """Extensión en minúsculas del nombre original ('' si es rara o no tiene)"""
+    extension = os.path.splitext(nombre_original or '')[1].lower()
+    return extension if PATRON_EXTENSION.match(extension) else ''
+
+
+def ruta_contenido(sha256, extension='', directorio=None):
+    """uploads/reportes/ab/cd/abcd....pdf (dos niveles para no llenar un solo directorio)"""
+    directorio = directorio or ALMACEN_CONFIG['directorio']
+    return os.path.join(directorio, sha256[:2], sha256[2:4], f"{sha256}{extension}")
+
+
+def guardar_stream(stream, nombre_original, directorio=None):
+    """
+    Guarda un stream en el almacén calculando el hash mientras se escribe
+
+    - escribe por bloques en un temporal del mismo sistema de archivos
+    - si el contenido ya existe, descarta el temporal (sin disco extra)
+    - si no, lo mueve con os.replace (atómico: nunca se ve un archivo a medias)
+
+    Args:
+        stream: Objeto con read(n) (ej. FileStorage.stream de werkzeug)
+        nombre_original: Nombre del archivo subido (solo se usa la extensión)
+
+    Returns:
+        dict: {ruta, sha256, size_bytes, nuevo}
+    """
+    directorio = directorio or ALMACEN_CONFIG['directorio']
+    tamano_bloque = ALMACEN_CONFIG['tamano_bloque']
+    max_bytes = ALMACEN_CONFIG['max_bytes']
+
+    directorio_tmp = os.path.join(directorio, 'tmp')
+    os.makedirs(directorio_tmp, exist_ok=True)
+
+    sha = hashlib.sha256()
+    size_bytes = 0
+    fd, ruta_tmp = tempfile.mkstemp(dir=directorio_tmp, suffix='.part')
+
+    try:
+        with os.fdopen(fd, 'wb') as destino:
+            while True:
+                bloque = stream.read(tamano_bloque)
+                if not bloque:
+                    break
+                size_bytes += len(bloque)
+                if max_bytes and size_bytes > max_bytes:
+                    raise ValueError(f"El archivo supera el máximo de {max_bytes // (1024 * 1024)} MB")
+                sha.update(bloque)
+                destino.write(bloque)
+            destino.flush()
+            os.fsync(destino.fileno())
+
+        sha256 = sha.hexdigest()
+        ruta = ruta_contenido(sha256, extension_segura(nombre_original), directorio)
+
+        if os.path.exists(ruta):
+            os.unlink(ruta_tmp)
+            nuevo = False
+        else:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            # Dos subidas simultáneas del mismo contenido reemplazan bytes idénticos
+            os.replace(ruta_tmp, ruta)
+            nuevo = True
+
+        return {'ruta': ruta, 'sha256': sha256, 'size_bytes': size_bytes, 'nuevo': nuevo}
+
+    except BaseException:
+        try:
+            os.unlink(ruta_tmp)
+        except OSError:
+            pass
+        raise
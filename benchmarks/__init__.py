@@ -0,0 +1,6 @@
+"""
+Benchmarks reproducibles de ALEJANDRIA
+datos.py siembra una BD MySQL desechable con generadores deterministas;
+ejecutar.py recorre los blueprints con el test client de Flask y guarda
+líneas base JSON para comparar entre commits
+"""
@@ -0,0 +1,452 @@
+"""
+Siembra de la BD de benchmarks
+Generadores deterministas (misma semilla → mismos datos) de reportes,
+grafos de dependencias profundos y anchos, y años de historial de entregas.
+Todo se escribe con INSERT multi-fila por lotes a través de db.get_connection()
+
+Uso:
+    DB_NAME=alejandria_bench python -m benchmarks.datos --reportes 100000
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+import logging
+
+import click
+import mysql.connector
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import DB_CONFIG, get_connection
+from services.reporte_service import ReporteService
+import estadisticas
+import migraciones
+
+logger = logging.getLogger(__name__)
+
+RUTA_ESQUEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'esquema.sql')
+
+PARAMETROS_DEFECTO = {
+    'semilla': 42,
+    'reportes': 100000,
+    # Cadenas lineales largas (árbol profundo)
+    'cadenas': 20,
+    'profundidad': 40,
+    # Reportes con muchos hijos / muchos padres (árbol ancho)
+    'hubs': 5,
+    'ancho': 2000,
+    # Padres aleatorios promedio por reporte (siempre de ids menores: el grafo es un DAG)
+    'densidad': 1.5,
+    # Años de historial y máximo de entregas por reporte
+    'anios': 3,
+    'max_entregas': 60,
+    'tamano_lote': 5000,
+}
+
+TIPOS = [
+    ('Regulatorio', 'REG'),
+    ('Gerencial', 'GER'),
+    ('Operativo', 'OPE'),
+    ('Financiero', 'FIN'),
+    ('Riesgos', 'RSG'),
+    ('Comercial', 'COM'),
+]
+
+CATEGORIAS = [
+    'Cumplimiento', 'Liquidez', 'Cartera', 'Tesorería', 'Contabilidad',
+    'Operaciones', 'Mercadeo', 'Talento Humano', 'Tecnología', 'Auditoría',
+]
+
+AREAS = [
+    'Vicepresidencia Financiera', 'Gerencia de Riesgos', 'Contraloría', 'Tesorería',
+    'Operaciones Bancarias', 'Gerencia Comercial', 'Planeación', 'Jurídica',
+    'Cumplimiento', 'Tecnología', 'Seguridad de la Información', 'Auditoría Interna',
+    'Crédito', 'Cobranza', 'Inversiones', 'Contabilidad', 'Impuestos', 'Nómina',
+    'Servicio al Cliente', 'Canales Digitales',
+]
+
+# Vocabulario de nombres: da trigramas repetidos y distintos para la búsqueda
+TEMAS = [
+    'Cartera', 'Liquidez', 'Captaciones', 'Colocaciones', 'Provisiones', 'Encaje',
+    'Riesgo de mercado', 'Riesgo operativo', 'Lavado de activos', 'Tasas de interés',
+    'Flujo de caja', 'Balance general', 'Estado de resultados', 'Indicadores de gestión',
+    'Quejas y reclamos', 'Transacciones', 'Tarjetas de crédito', 'Libranzas',
+]
+PERIODOS = ['diario', 'semanal', 'mensual', 'trimestral', 'consolidado', 'detallado', 'por sucursal', 'por producto']
+DESTINOS = ['Superfinanciera', 'Junta Directiva', 'Comité de Riesgos', 'Banco de la República', 'DIAN', 'Gerencia']
+
+FRECUENCIAS = [
+    ('DIARIA', 10), ('SEMANAL', 20), ('MENSUAL', 40),
+    ('TRIMESTRAL', 15), ('SEMESTRAL', 5), ('ANUAL', 5), ('ADHOC', 5),
+]
+
+PERIODO_DIAS = {
+    'DIARIA': 1, 'SEMANAL': 7, 'MENSUAL': 30, 'TRIMESTRAL': 91, 'SEMESTRAL': 182, 'ANUAL': 365,
+}
+
+CRITICIDADES = [('CRITICA', 5), ('ALTA', 20), ('MEDIA', 50), ('BAJA', 25)]
+ESTADOS = [('Aprobado', 85), ('Por Validar', 10), ('Inactivo', 5)]
+TIPOS_DEPENDENCIA = ['DATOS', 'CALCULO', 'CONSOLIDACION', 'VALIDACION']
+CRITICIDADES_DEPENDENCIA = ['BAJA', 'MEDIA', 'ALTA']
+
+USUARIOS = 50
+
+SQL_REPORTE = """
+    INSERT INTO reporte (
+        id_reporte, codigo_interno, nombre, proposito, descripcion,
+        tipo_id, categoria_id, area_reportante_id, area_ejecutora_id, area_receptora_id,
+        audiencia, receptor_externo, criticidad, formato_entrega, formato_reporte,
+        creado_por, estado, proxima_ejecucion, ultima_entrega, estado_entrega, created_at
+    ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+"""
+
+SQL_SCHEDULE = "INSERT INTO reporte_schedule (reporte_id, frecuencia, reglas_json) VALUES (%s, %s, %s)"
+
+SQL_DEPENDENCIA = """
+    INSERT INTO reporte_dependencia (
+        reporte_origen_id, reporte_dependiente_id, tipo_dependencia, criticidad, validada, creado_por
+    ) VALUES (%s, %s, %s, %s, TRUE, %s)
+"""
+
+SQL_HISTORIAL = """
+    INSERT INTO historial_entregas (
+        reporte_id, fecha_programada, fecha_real_entrega, estado, minutos_retraso, creado_por, created_at
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def _ponderado(rnd, opciones):
+    valores, pesos = zip(*opciones)
+    return rnd.choices(valores, weights=pesos)[0]
+
+
+# ============================================================================
+# GENERADORES
+# ============================================================================
+
+def generar_reportes(rnd, total, anios, ahora):
+    """
+    Filas de reporte y schedule (ids 1..total, códigos consecutivos por prefijo)
+
+    Yields:
+        tuple: (fila_reporte, fila_schedule, (id, frecuencia, proxima, creado_en))
+    """
+    numeros = {prefijo: 0 for _, prefijo in TIPOS}
+
+    for id_reporte in range(1, total + 1):
+        tipo_id = rnd.randint(1, len(TIPOS))
+        prefijo = TIPOS[tipo_id - 1][1]
+        numeros[prefijo] += 1
+
+        tema = rnd.choice(TEMAS)
+        nombre = f"{tema} {rnd.choice(PERIODOS)} {rnd.choice(DESTINOS)} {id_reporte}"
+        frecuencia = _ponderado(rnd, FRECUENCIAS)
+        creado_en = ahora - timedelta(days=rnd.uniform(1, anios * 365))
+
+        if frecuencia == 'ADHOC':
+            proxima = None
+        else:
+            # ~10% vencidos, el resto repartidos dentro de su periodo
+            periodo = PERIODO_DIAS[frecuencia]
+            if rnd.random() < 0.1:
+                proxima = ahora - timedelta(hours=rnd.uniform(1, 24 * min(periodo, 15)))
+            else:
+                proxima = ahora + timedelta(hours=rnd.uniform(1, 24 * periodo))
+            proxima = proxima.replace(second=0, microsecond=0)
+        estado_entrega = ReporteService.calcular_estado_entrega(proxima, frecuencia) if proxima else None
+
+        externa = rnd.random() < 0.2
+        areas = rnd.sample(range(1, len(AREAS) + 1), 3)
+
+        fila = (
+            id_reporte,
+            f"{prefijo}-{numeros[prefijo]:04d}",
+            nombre,
+            f"Seguimiento de {tema.lower()} para {rnd.choice(DESTINOS)}",
+            f"Reporte {rnd.choice(PERIODOS)} de {tema.lower()} generado a partir de las fuentes del área",
+            tipo_id,
+            rnd.randint(1, len(CATEGORIAS)),
+            areas[0], areas[1], areas[2] if rnd.random() < 0.7 else None,
+            'EXTERNA' if externa else 'INTERNA',
+            rnd.choice(DESTINOS) if externa else None,
+            _ponderado(rnd, CRITICIDADES),
+            rnd.choice(['CORREO', 'CARPETA_COMPARTIDA', 'PORTAL', 'API']),
+            rnd.choice(['PDF', 'EXCEL', 'CSV', 'TABLERO']),
+            rnd.randint(1, USUARIOS),
+            _ponderado(rnd, ESTADOS),
+            proxima,
+            None,
+            estado_entrega,
+            creado_en.replace(microsecond=0),
+        )
+        yield fila, (id_reporte, frecuencia, None), (id_reporte, frecuencia, proxima, creado_en)
+
+
+def generar_dependencias(rnd, total, cadenas, profundidad, hubs, ancho, densidad, ventana=5000):
+    """
+    Aristas padre → hijo siempre de id menor a id mayor (DAG garantizado)
+
+    - cadenas: `cadenas` caminos de `profundidad` saltos (foco: el medio de cada una)
+    - hubs: reportes con `ancho` hijos y reportes con `ancho` padres
+    - aleatorias: ~`densidad` padres por reporte dentro de una ventana de ids
+
+    Returns:
+        (dict {(padre, hijo): (tipo, criticidad)}, dict focos {nombre: [ids]})
+    """
+    aristas = {}
+    focos = {'profundo': [], 'hub_descendente': [], 'hub_ascendente': [], 'aleatorio': []}
+
+    def agregar(padre, hijo):
+        if padre < hijo and (padre, hijo) not in aristas:
+            aristas[(padre, hijo)] = (rnd.choice(TIPOS_DEPENDENCIA), rnd.choice(CRITICIDADES_DEPENDENCIA))
+
+    for _ in range(cadenas):
+        ids = sorted(rnd.sample(range(1, total + 1), min(profundidad + 1, total)))
+        for padre, hijo in zip(ids, ids[1:]):
+            agregar(padre, hijo)
+        focos['profundo'].append(ids[len(ids) // 2])
+
+    margen = max(total // 100, 1)
+    for _ in range(hubs):
+        padre = rnd.randint(1, margen)
+        for hijo in rnd.sample(range(padre + 1, total + 1), min(ancho, total - padre)):
+            agregar(padre, hijo)
+        focos['hub_descendente'].append(padre)
+
+        hijo = rnd.randint(total - margen + 1, total)
+        for padre in rnd.sample(range(1, hijo), min(ancho, hijo - 1)):
+            agregar(padre, hijo)
+        focos['hub_ascendente'].append(hijo)
+
+    entero, fraccion = int(densidad), densidad - int(densidad)
+    for hijo in range(2, total + 1):
+        for _ in range(entero + (rnd.random() < fraccion)):
+            agregar(rnd.randint(max(1, hijo - ventana), hijo - 1), hijo)
+
+    focos['aleatorio'] = rnd.sample(range(1, total + 1), min(50, total))
+    return aristas, focos
+
+
+def generar_historial(rnd, info_reportes, anios, max_entregas, ahora):
+    """
+    Entregas pasadas de cada reporte según su frecuencia (~85% a tiempo)
+
+    Yields:
+        tuple: fila de historial_entregas (created_at = fecha real de entrega)
+    """
+    inicio = ahora - timedelta(days=anios * 365)
+    for id_reporte, frecuencia, proxima, creado_en in info_reportes:
+        if frecuencia == 'ADHOC':
+            fechas = sorted(
+                ahora - timedelta(days=rnd.uniform(1, anios * 365)) for _ in range(rnd.randint(0, 5))
+            )
+        else:
+            periodo = timedelta(days=PERIODO_DIAS[frecuencia])
+            programada = (proxima or ahora) - periodo
+            fechas = []
+            while programada > max(inicio, creado_en) and len(fechas) < max_entregas:
+                fechas.append(programada)
+                programada -= periodo
+            fechas.reverse()
+
+        for fecha_programada in fechas:
+            fecha_programada = fecha_programada.replace(second=0, microsecond=0)
+            if rnd.random() < 0.85:
+                minutos_retraso = 0
+                fecha_real = fecha_programada - timedelta(minutes=rnd.randint(0, 600))
+            else:
+                minutos_retraso = rnd.randint(1, 3 * 24 * 60)
+                fecha_real = fecha_programada + timedelta(minutes=minutos_retraso)
+            yield (
+                id_reporte, fecha_programada, fecha_real,
+                'RETRASADO' if minutos_retraso else 'ENTREGADO', minutos_retraso,
+                rnd.randint(1, USUARIOS), fecha_real,
+            )
+
+
+# ============================================================================
+# ESCRITURA
+# ============================================================================
+
+def validar_bd(forzar=False):
+    """La siembra borra tablas: solo contra una BD cuyo nombre diga 'bench' (salvo --forzar)"""
+    if 'bench' not in DB_CONFIG['database'].lower() and not forzar:
+        raise click.UsageError(
+            f"DB_NAME={DB_CONFIG['database']} no parece una BD de benchmarks "
+            f"(debe contener 'bench'); usar --forzar para sembrarla de todas formas"
+        )
+
+
+def crear_bd():
+    """CREATE DATABASE IF NOT EXISTS con una conexión sin base seleccionada"""
+    config = {clave: valor for clave, valor in DB_CONFIG.items() if clave != 'database'}
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"CREATE DATABASE IF NOT EXISTS `{DB_CONFIG['database']}` "
+            f"CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci"
+        )
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def aplicar_esquema(cursor):
+    with open(RUTA_ESQUEMA, encoding='utf-8') as archivo:
+        lineas = [linea for linea in archivo if not linea.lstrip().startswith('--')]
+    for sentencia in ''.join(lineas).split(';'):
+        if sentencia.strip():
+            cursor.execute(sentencia)
+
+
+def insertar_por_lotes(conn, cursor, sql, filas, tamano_lote):
+    """executemany por bloques (un INSERT multi-fila y un commit por bloque); retorna filas escritas"""
+    total = 0
+    bloque = []
+    for fila in filas:
+        bloque.append(fila)
+        if len(bloque) >= tamano_lote:
+            cursor.executemany(sql, bloque)
+            conn.commit()
+            total += len(bloque)
+            bloque = []
+    if bloque:
+        cursor.executemany(sql, bloque)
+        conn.commit()
+        total += len(bloque)
+    return total
+
+
+def sembrar(**parametros):
+    """
+    Recrea el esquema y lo llena con datos deterministas
+
+    Returns:
+        dict: Filas escritas por tabla y focos del grafo
+    """
+    p = {**PARAMETROS_DEFECTO, **{k: v for k, v in parametros.items() if v is not None}}
+    rnd = random.Random(p['semilla'])
+    # Fecha fija por día: re-sembrar el mismo día da exactamente los mismos datos
+    ahora = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    lote = p['tamano_lote']
+    inicio = time.perf_counter()
+
+    crear_bd()
+    conn = get_connection()
+    cursor = conn.cursor()
+    escritas = {}
+
+    try:
+        aplicar_esquema(cursor)
+        conn.commit()
+        migraciones.aplicar()
+
+        cursor.executemany("INSERT INTO tipo_reporte (id_tipo, nombre, prefijo_codigo) VALUES (%s, %s, %s)",
+                           [(i, nombre, prefijo) for i, (nombre, prefijo) in enumerate(TIPOS, 1)])
+        cursor.executemany("INSERT INTO categoria_reporte (id_categoria, nombre) VALUES (%s, %s)",
+                           list(enumerate(CATEGORIAS, 1)))
+        cursor.executemany("INSERT INTO area (id_area, nombre) VALUES (%s, %s)", list(enumerate(AREAS, 1)))
+        cursor.executemany("INSERT INTO usuario (id_usuario, nombre) VALUES (%s, %s)",
+                           [(i, f"Usuario {i}") for i in range(1, USUARIOS + 1)])
+        cursor.executemany("INSERT INTO config_alertas (frecuencia, horas_antes_alerta) VALUES (%s, %s)",
+                           list(ReporteService.ALERTAS_CONFIG.items()))
+        conn.commit()
+
+        info_reportes = []
+        schedules = []
+
+        def reportes():
+            for fila, schedule, info in generar_reportes(rnd, p['reportes'], p['anios'], ahora):
+                schedules.append(schedule)
+                info_reportes.append(info)
+                yield fila
+
+        escritas['reporte'] = insertar_por_lotes(conn, cursor, SQL_REPORTE, reportes(), lote)
+        escritas['reporte_schedule'] = insertar_por_lotes(conn, cursor, SQL_SCHEDULE, schedules, lote)
+        logger.info(f"📋 {escritas['reporte']} reportes")
+
+        aristas, focos = generar_dependencias(
+            rnd, p['reportes'], p['cadenas'], p['profundidad'], p['hubs'], p['ancho'], p['densidad']
+        )
+        escritas['reporte_dependencia'] = insertar_por_lotes(conn, cursor, SQL_DEPENDENCIA, (
+            (padre, hijo, tipo, criticidad, rnd.randint(1, USUARIOS))
+            for (padre, hijo), (tipo, criticidad) in aristas.items()
+        ), lote)
+        logger.info(f"🔗 {escritas['reporte_dependencia']} dependencias")
+
+        escritas['historial_entregas'] = insertar_por_lotes(conn, cursor, SQL_HISTORIAL, generar_historial(
+            rnd, info_reportes, p['anios'], p['max_entregas'], ahora
+        ), lote)
+        logger.info(f"📦 {escritas['historial_entregas']} entregas en el historial")
+
+        cursor.execute("""
+            UPDATE reporte r
+            JOIN (
+                SELECT reporte_id, MAX(fecha_real_entrega) AS ultima
+                FROM historial_entregas
+                GROUP BY reporte_id
+            ) h ON h.reporte_id = r.id_reporte
+            SET r.ultima_entrega = h.ultima
+        """)
+
+        cursor.executemany("INSERT INTO benchmark_meta (clave, valor) VALUES (%s, %s)", [
+            ('parametros', json.dumps(p)),
+            ('focos', json.dumps(focos)),
+            ('sembrado_en', json.dumps(ahora.isoformat())),
+        ])
+        conn.commit()
+
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    # Contadores del dashboard desde cero (si no, el primer request del benchmark los reconcilia)
+    estadisticas.reconciliar()
+
+    segundos = time.perf_counter() - inicio
+    logger.info(f"✅ BD {DB_CONFIG['database']} sembrada en {segundos:.1f}s")
+    return {'escritas': escritas, 'focos': focos, 'segundos': round(segundos, 1)}
+
+
+def leer_meta():
+    """{clave: valor} de benchmark_meta (parámetros, focos)"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT clave, valor FROM benchmark_meta")
+        return {clave: json.loads(valor) for clave, valor in cursor.fetchall()}
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@click.command()
+@click.option('--semilla', type=int, help='Semilla de los generadores')
+@click.option('--reportes', type=int, help='Cantidad de reportes')
+@click.option('--cadenas', type=int, help='Cadenas de dependencias profundas')
+@click.option('--profundidad', type=int, help='Saltos por cadena')
+@click.option('--hubs', type=int, help='Reportes con muchos hijos (y otros tantos con muchos padres)')
+@click.option('--ancho', type=int, help='Hijos/padres por hub')
+@click.option('--densidad', type=float, help='Padres aleatorios promedio por reporte')
+@click.option('--anios', type=int, help='Años de historial de entregas')
+@click.option('--max-entregas', type=int, help='Máximo de entregas por reporte')
+@click.option('--tamano-lote', type=int, help='Filas por INSERT multi-fila')
+@click.option('--forzar', is_flag=True, help="Sembrar aunque DB_NAME no contenga 'bench'")
+def main(forzar, **parametros):
+    """Recrea y siembra la BD de benchmarks (DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME)"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    validar_bd(forzar)
+    resultado = sembrar(**parametros)
+    click.echo(json.dumps(resultado['escritas'], indent=2))
+
+
+if __name__ == '__main__':
+    main()
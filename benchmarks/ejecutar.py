@@ -0,0 +1,444 @@
+"""
+Runner de benchmarks
+Recorre los blueprints con el test client de Flask contra la BD sembrada
+por benchmarks/datos.py y mide, por escenario, percentiles de latencia y
+consultas SQL / tiempo SQL / filas por request (vía metricas.observar_requests).
+El resultado se guarda como línea base JSON y se compara con otra anterior.
+
+Uso:
+    DB_NAME=alejandria_bench python -m benchmarks.ejecutar
+    DB_NAME=alejandria_bench python -m benchmarks.ejecutar --comparar benchmarks/resultados/base.json
+
+Los escenarios de escritura (crear_reporte, marcar_entregado) corren al final
+y modifican la BD: para comparar dos commits, re-sembrar antes de cada corrida.
+"""
+
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import click
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+
+FORMATO_RESULTADO = 1
+
+DIRECTORIO_RESULTADOS = os.path.join(RAIZ, 'benchmarks', 'resultados')
+
+# Métricas que se comparan entre líneas base: (clave, ¿es determinista?)
+METRICAS_COMPARADAS = (
+    ('p50_ms', False),
+    ('p95_ms', False),
+    ('consultas_media', True),
+    ('filas_media', True),
+)
+
+# Cambios de latencia menores a esto no cuentan como regresión (ruido)
+MINIMO_MS = 1.0
+
+TERMINOS_BUSQUEDA = [
+    'liquidez', 'cartera mensual', 'riesgo operativo', 'REG-00', 'superfinanciera',
+    'flujo de caja', 'provisiones', 'tarjetas', 'junta directiva', 'encaje',
+]
+
+
+# ============================================================================
+# APP Y MEDICIÓN
+# ============================================================================
+
+_ultimo_request = {}
+
+
+def _observar(ruta, metodo, status, duracion, resumen):
+    _ultimo_request.clear()
+    _ultimo_request.update(resumen, ruta=ruta, duracion=duracion)
+
+
+def crear_app(plantillas):
+    """App Flask con los blueprints de la aplicación (la configuración ya está en el entorno)"""
+    from flask import Flask
+    from catalogo import catalogos_bp
+    from dashboard import dashboard_bp
+    from dependencias import dependencias_bp
+    from reports import reportes_bp
+    import metricas
+
+    app = Flask(__name__, template_folder=os.path.abspath(plantillas))
+    app.secret_key = 'benchmarks'
+    for blueprint in (catalogos_bp, dashboard_bp, dependencias_bp, reportes_bp):
+        app.register_blueprint(blueprint)
+    metricas.observar_requests(_observar)
+    return app
+
+
+def percentil(valores, p):
+    """Percentil con interpolación lineal (valores ya ordenados)"""
+    if not valores:
+        return None
+    posicion = (len(valores) - 1) * p / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(valores) - 1)
+    return valores[inferior] + (valores[superior] - valores[inferior]) * (posicion - inferior)
+
+
+def resumir(muestras, primera_ms, errores):
+    duraciones = sorted(m['ms'] for m in muestras)
+    n = len(muestras) or 1
+    resultado = {
+        'iteraciones': len(muestras),
+        'errores': errores,
+        'primera_ms': round(primera_ms, 2),
+        'media_ms': round(sum(duraciones) / n, 2),
+        'max_ms': round(duraciones[-1], 2) if duraciones else None,
+        'consultas_media': round(sum(m['consultas'] for m in muestras) / n, 2),
+        'consultas_max': max((m['consultas'] for m in muestras), default=0),
+        'sql_ms_media': round(sum(m['sql_ms'] for m in muestras) / n, 2),
+        'filas_media': round(sum(m['filas'] for m in muestras) / n, 1),
+    }
+    for p in (50, 90, 95, 99):
+        valor = percentil(duraciones, p)
+        resultado[f'p{p}_ms'] = round(valor, 2) if valor is not None else None
+    return resultado
+
+
+def medir(cliente, escenario, iteraciones, calentamiento):
+    """
+    Corre un escenario: `calentamiento` requests sin registrar (el primero
+    se informa aparte como arranque en frío) y luego `iteraciones` medidos
+    """
+    muestras = []
+    errores = 0
+    primera_ms = None
+
+    for i in range(calentamiento + iteraciones):
+        metodo, url, datos = escenario['request'](i)
+        _ultimo_request.clear()
+
+        inicio = time.perf_counter()
+        if metodo == 'POST':
+            respuesta = cliente.post(url, data=datos)
+        else:
+            respuesta = cliente.get(url)
+        ms = (time.perf_counter() - inicio) * 1000
+
+        if not escenario['exito'](respuesta):
+            errores += 1
+            if errores == 1:
+                click.echo(f"⚠️  {escenario['nombre']}: {metodo} {url} → {respuesta.status_code}", err=True)
+        if metodo == 'POST':
+            # Los flash de cada POST se acumularían en la cookie de sesión
+            with cliente.session_transaction() as sesion:
+                sesion.pop('_flashes', None)
+
+        if primera_ms is None:
+            primera_ms = ms
+        if i < calentamiento:
+            continue
+        muestras.append({
+            'ms': ms,
+            'consultas': _ultimo_request.get('consultas', 0),
+            'sql_ms': _ultimo_request.get('sql_segundos', 0.0) * 1000,
+            'filas': _ultimo_request.get('filas', 0),
+        })
+
+    return resumir(muestras, primera_ms or 0.0, errores)
+
+
+# ============================================================================
+# ESCENARIOS
+# ============================================================================
+
+def _status(*codigos):
+    return lambda respuesta: respuesta.status_code in codigos
+
+
+def _json_exitoso(respuesta):
+    return respuesta.status_code == 200 and (respuesta.get_json(silent=True) or {}).get('success') is True
+
+
+def _creado(respuesta):
+    # Éxito redirige al catálogo; un error de validación vuelve al formulario
+    return respuesta.status_code == 302 and respuesta.headers.get('Location', '').endswith('/catalogos')
+
+
+def _ciclo(valores):
+    return lambda i: valores[i % len(valores)]
+
+
+def cursor_pagina(cliente, pagina):
+    """Cursor keyset de la página `pagina` de /api/catalogos (recorriendo las anteriores, sin medir)"""
+    cursor = ''
+    for _ in range(pagina - 1):
+        datos = cliente.get(f'/api/catalogos?cursor={cursor}').get_json(silent=True) or {}
+        cursor = datos.get('siguiente_cursor')
+        if not cursor:
+            return ''
+    return cursor
+
+
+def datos_formulario(rnd, ids_aprobados):
+    """Formulario de crear_reporte con 0-5 dependencias preliminares"""
+    dependencias = [
+        {'id_reporte': id_padre, 'tipo_dependencia': 'DATOS', 'criticidad': 'MEDIA'}
+        for id_padre in rnd.sample(ids_aprobados, min(rnd.randint(0, 5), len(ids_aprobados)))
+    ]
+    return {
+        'nombre': f"Benchmark {rnd.randint(1, 10 ** 9)}",
+        'descripcion': 'Reporte creado por benchmarks/ejecutar.py',
+        'proposito': 'Medición',
+        'tipo_id': str(rnd.randint(1, 6)),
+        'categoria_id': str(rnd.randint(1, 10)),
+        'area_reportante_id': str(rnd.randint(1, 20)),
+        'area_ejecutora_id': str(rnd.randint(1, 20)),
+        'audiencia': 'interna',
+        'criticidad': rnd.choice(['ALTA', 'MEDIA', 'BAJA']),
+        'frecuencia': rnd.choice(['diaria', 'semanal', 'mensual', 'trimestral']),
+        'dependencias': json.dumps(dependencias),
+    }
+
+
+def ids_muestra(cantidad, semilla, condicion):
+    """Ids de reporte al azar (reproducibles por semilla) que cumplen `condicion`"""
+    from db import get_connection
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT id_reporte FROM reporte
+            WHERE {condicion}
+            ORDER BY RAND(%s)
+            LIMIT %s
+        """, (semilla, cantidad))
+        return [fila[0] for fila in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def construir_escenarios(cliente, focos, semilla, total, motores):
+    """
+    Escenarios en orden de ejecución (lectura primero, escritura al final)
+
+    Cada escenario: {'nombre', 'request': i → (metodo, url, datos), 'exito': respuesta → bool}
+    """
+    rnd = random.Random(semilla)
+    escenarios = [
+        {'nombre': 'dashboard', 'request': lambda i: ('GET', '/dashboard', None), 'exito': _status(200)},
+        {'nombre': 'catalogos', 'request': lambda i: ('GET', '/catalogos', None), 'exito': _status(200)},
+        {'nombre': 'api_catalogos', 'request': lambda i: ('GET', '/api/catalogos', None), 'exito': _status(200)},
+        {
+            'nombre': 'api_catalogos_filtrado',
+            'request': lambda i: ('GET', '/api/catalogos?entrega=RETRASADO&criticidad=ALTA', None),
+            'exito': _status(200),
+        },
+        {
+            'nombre': 'api_catalogos_busqueda',
+            'request': lambda i: ('GET', f'/api/catalogos?q={TERMINOS_BUSQUEDA[i % len(TERMINOS_BUSQUEDA)]}', None),
+            'exito': _status(200),
+        },
+    ]
+
+    cursor_20 = cursor_pagina(cliente, 20)
+    escenarios.append({
+        'nombre': 'api_catalogos_pagina_20',
+        'request': lambda i: ('GET', f'/api/catalogos?cursor={cursor_20}', None),
+        'exito': _status(200),
+    })
+
+    for motor in motores:
+        for tipo_foco in ('profundo', 'hub_descendente', 'hub_ascendente', 'aleatorio'):
+            ids = _ciclo(focos.get(tipo_foco) or [1])
+            escenarios.append({
+                'nombre': f'arbol_{motor}_{tipo_foco}',
+                'request': lambda i, ids=ids, motor=motor: (
+                    'GET', f'/api/dependencias/arbol/{ids(i)}?motor={motor}', None
+                ),
+                'exito': _status(200),
+            })
+
+    for tipo_foco in ('profundo', 'hub_descendente'):
+        ids = _ciclo(focos.get(tipo_foco) or [1])
+        escenarios.append({
+            'nombre': f'impacto_{tipo_foco}',
+            'request': lambda i, ids=ids: ('GET', f'/api/dependencias/impacto?ids={ids(i)}&limite=100', None),
+            'exito': _status(200),
+        })
+
+    escenarios.append({
+        'nombre': 'demoras',
+        'request': lambda i: ('GET', '/api/dependencias/demoras?limite=100', None),
+        'exito': _status(200),
+    })
+
+    escenarios.append({
+        'nombre': 'buscar',
+        'request': lambda i: ('GET', f'/api/dependencias/buscar?q={TERMINOS_BUSQUEDA[i % len(TERMINOS_BUSQUEDA)]}', None),
+        'exito': _status(200),
+    })
+
+    aprobados = ids_muestra(500, semilla, "estado = 'Aprobado'") or list(range(1, min(total, 500) + 1))
+    escenarios.append({
+        'nombre': 'crear_reporte',
+        'request': lambda i: ('POST', '/crear_reporte', datos_formulario(rnd, aprobados)),
+        'exito': _creado,
+    })
+
+    programados = _ciclo(ids_muestra(5000, semilla, "proxima_ejecucion IS NOT NULL") or [1])
+    escenarios.append({
+        'nombre': 'marcar_entregado',
+        'request': lambda i: ('POST', f'/reporte/{programados(i)}/marcar_entregado', None),
+        'exito': _json_exitoso,
+    })
+    return escenarios
+
+
+# ============================================================================
+# LÍNEAS BASE
+# ============================================================================
+
+def _git(*args):
+    try:
+        salida = subprocess.run(['git', *args], cwd=RAIZ, capture_output=True, text=True, timeout=10)
+        return salida.stdout.strip() if salida.returncode == 0 else None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def comparar(base, actual, tolerancia):
+    """
+    Compara dos resultados escenario por escenario
+
+    - latencias: regresión si sube más de `tolerancia` % y más de MINIMO_MS
+    - consultas y filas (deterministas con la misma siembra): regresión si suben
+
+    Returns:
+        (filas [(escenario, metrica, antes, despues, cambio_pct, regresion)], regresiones)
+    """
+    filas = []
+    regresiones = 0
+    for nombre, actuales in actual['escenarios'].items():
+        anteriores = base['escenarios'].get(nombre)
+        if not anteriores:
+            continue
+        for metrica, determinista in METRICAS_COMPARADAS:
+            antes, despues = anteriores.get(metrica), actuales.get(metrica)
+            if antes is None or despues is None:
+                continue
+            cambio = (despues - antes) / antes * 100 if antes else (0.0 if despues == antes else float('inf'))
+            if determinista:
+                regresion = despues > antes
+            else:
+                regresion = cambio > tolerancia and despues - antes > MINIMO_MS
+            regresiones += regresion
+            filas.append((nombre, metrica, antes, despues, cambio, regresion))
+    return filas, regresiones
+
+
+def imprimir_resultados(resultado):
+    click.echo(f"{'escenario':<34}{'n':>5}{'p50':>10}{'p95':>10}{'p99':>10}{'frío':>10}{'consultas':>11}{'sql ms':>9}{'err':>5}")
+    for nombre, r in resultado['escenarios'].items():
+        click.echo(
+            f"{nombre:<34}{r['iteraciones']:>5}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+            f"{r['primera_ms']:>10.1f}{r['consultas_media']:>11.1f}{r['sql_ms_media']:>9.1f}{r['errores']:>5}"
+        )
+
+
+def imprimir_comparacion(filas, base):
+    click.echo(f"\nComparación con {base.get('commit') or '?'} ({base.get('fecha')})")
+    for nombre, metrica, antes, despues, cambio, regresion in filas:
+        marca = '❌' if regresion else ('✅' if despues < antes else '  ')
+        click.echo(f"{marca} {nombre:<34}{metrica:<17}{antes:>10.1f} → {despues:>10.1f}  ({cambio:+.1f}%)")
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+@click.command()
+@click.option('--iteraciones', default=30, show_default=True, type=click.IntRange(min=1), help='Requests medidos por escenario')
+@click.option('--calentamiento', default=3, show_default=True, type=click.IntRange(min=0), help='Requests previos sin medir')
+@click.option('--semilla', default=42, show_default=True, help='Semilla de ids y formularios')
+@click.option('--solo', multiple=True, help='Correr solo escenarios que empiecen con este prefijo')
+@click.option('--motor', 'motores', multiple=True, help='Motores del árbol (default: todos)')
+@click.option('--con-cache', is_flag=True, help='Medir con la caché HTTP activa (default: desactivada)')
+@click.option('--plantillas', default='templates', show_default=True, help='Directorio de plantillas Jinja')
+@click.option('--salida', type=click.Path(dir_okay=False), help='Archivo JSON de resultados')
+@click.option('--comparar', 'archivo_base', type=click.Path(exists=True, dir_okay=False),
+              help='Línea base JSON con la que comparar')
+@click.option('--tolerancia', default=10.0, show_default=True, help='% de aumento de latencia tolerado')
+def main(iteraciones, calentamiento, semilla, solo, motores, con_cache, plantillas, salida, archivo_base, tolerancia):
+    """Corre los benchmarks y guarda/compara la línea base (BD de DB_NAME sembrada con benchmarks.datos)"""
+    # Los módulos leen su configuración al importarse
+    os.environ['CACHE_HTTP_ACTIVO'] = '1' if con_cache else '0'
+    os.environ.setdefault('PLANIFICADOR_ACTIVO', '0')
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+    from db import DB_CONFIG
+    from dependencias import MOTORES_ARBOL
+    from benchmarks.datos import leer_meta
+
+    app = crear_app(plantillas)
+    meta = leer_meta()
+    siembra = meta.get('parametros', {})
+    motores = motores or MOTORES_ARBOL
+
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['user_id'] = 1
+
+    escenarios = construir_escenarios(cliente, meta.get('focos', {}), semilla, siembra.get('reportes', 0), motores)
+    if solo:
+        escenarios = [e for e in escenarios if e['nombre'].startswith(tuple(solo))]
+
+    resultado = {
+        'formato': FORMATO_RESULTADO,
+        'commit': _git('rev-parse', '--short', 'HEAD'),
+        'cambios_sin_commit': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'entorno': {'python': sys.version.split()[0], 'bd': DB_CONFIG['database']},
+        'parametros': {
+            'siembra': siembra,
+            'iteraciones': iteraciones,
+            'calentamiento': calentamiento,
+            'semilla': semilla,
+            'con_cache': con_cache,
+        },
+        'escenarios': {},
+    }
+
+    for escenario in escenarios:
+        click.echo(f"▶ {escenario['nombre']}", err=True)
+        resultado['escenarios'][escenario['nombre']] = medir(cliente, escenario, iteraciones, calentamiento)
+
+    imprimir_resultados(resultado)
+
+    if not salida:
+        os.makedirs(DIRECTORIO_RESULTADOS, exist_ok=True)
+        salida = os.path.join(
+            DIRECTORIO_RESULTADOS,
+            f"{resultado['commit'] or 'sin_commit'}-{datetime.now():%Y%m%d-%H%M%S}.json"
+        )
+    with open(salida, 'w', encoding='utf-8') as archivo:
+        json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+    click.echo(f"\n💾 Resultados en {salida}")
+
+    if archivo_base:
+        with open(archivo_base, encoding='utf-8') as archivo:
+            base = json.load(archivo)
+        if base.get('parametros', {}).get('siembra') != siembra:
+            click.echo("⚠️  La línea base usó otra siembra: consultas y filas no son comparables", err=True)
+        filas, regresiones = comparar(base, resultado, tolerancia)
+        imprimir_comparacion(filas, base)
+        if regresiones:
+            click.echo(f"\n❌ {regresiones} regresión(es)", err=True)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
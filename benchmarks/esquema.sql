@@ -0,0 +1,150 @@
+-- ============================================================================
+-- Esquema de la base de benchmarks
+-- Réplica de las tablas que leen y escriben los blueprints, con los tipos,
+-- ENUMs e índices que asume el código. Solo para la BD desechable de
+-- benchmarks/datos.py: después de este archivo se aplican migraciones/*.sql
+-- (tablas propias de la app, columnas e índices agregados después).
+-- ============================================================================
+
+DROP TABLE IF EXISTS schema_migracion;
+DROP TABLE IF EXISTS benchmark_meta;
+DROP TABLE IF EXISTS bitacora_evento;
+DROP TABLE IF EXISTS historial_entregas;
+DROP TABLE IF EXISTS reporte_recurso;
+DROP TABLE IF EXISTS recurso;
+DROP TABLE IF EXISTS reporte_dependencia;
+DROP TABLE IF EXISTS reporte_schedule;
+DROP TABLE IF EXISTS reporte;
+DROP TABLE IF EXISTS config_alertas;
+DROP TABLE IF EXISTS usuario;
+DROP TABLE IF EXISTS area;
+DROP TABLE IF EXISTS categoria_reporte;
+DROP TABLE IF EXISTS tipo_reporte;
+DROP TABLE IF EXISTS estadistica_resumen;
+DROP TABLE IF EXISTS version_datos;
+DROP TABLE IF EXISTS secuencia_codigo;
+
+CREATE TABLE tipo_reporte (
+    id_tipo INT AUTO_INCREMENT PRIMARY KEY,
+    nombre VARCHAR(100) NOT NULL,
+    prefijo_codigo VARCHAR(20) NOT NULL
+) ENGINE=InnoDB;
+
+CREATE TABLE categoria_reporte (
+    id_categoria INT AUTO_INCREMENT PRIMARY KEY,
+    nombre VARCHAR(100) NOT NULL
+) ENGINE=InnoDB;
+
+CREATE TABLE area (
+    id_area INT AUTO_INCREMENT PRIMARY KEY,
+    nombre VARCHAR(150) NOT NULL
+) ENGINE=InnoDB;
+
+CREATE TABLE usuario (
+    id_usuario INT AUTO_INCREMENT PRIMARY KEY,
+    nombre VARCHAR(150) NOT NULL
+) ENGINE=InnoDB;
+
+CREATE TABLE config_alertas (
+    frecuencia VARCHAR(20) NOT NULL PRIMARY KEY,
+    horas_antes_alerta INT NULL
+) ENGINE=InnoDB;
+
+CREATE TABLE reporte (
+    id_reporte INT AUTO_INCREMENT PRIMARY KEY,
+    codigo_interno VARCHAR(30) NOT NULL,
+    nombre VARCHAR(255) NOT NULL,
+    proposito TEXT NULL,
+    descripcion TEXT NULL,
+    consideraciones TEXT NULL,
+    tipo_id INT NOT NULL,
+    categoria_id INT NULL,
+    area_reportante_id INT NULL,
+    area_ejecutora_id INT NULL,
+    area_receptora_id INT NULL,
+    audiencia ENUM('INTERNA', 'EXTERNA') NOT NULL DEFAULT 'INTERNA',
+    receptor_externo VARCHAR(255) NULL,
+    criticidad ENUM('CRITICA', 'ALTA', 'MEDIA', 'BAJA') NOT NULL DEFAULT 'MEDIA',
+    formato_entrega ENUM('CORREO', 'CARPETA_COMPARTIDA', 'PORTAL', 'API') NOT NULL DEFAULT 'CORREO',
+    formato_reporte ENUM('PDF', 'EXCEL', 'CSV', 'TABLERO') NOT NULL DEFAULT 'PDF',
+    ruta_entrega VARCHAR(500) NULL,
+    creado_por INT NULL,
+    modificado_por INT NULL,
+    estado ENUM('Por Validar', 'Aprobado', 'Inactivo') NOT NULL DEFAULT 'Por Validar',
+    proxima_ejecucion DATETIME NULL,
+    ultima_entrega DATETIME NULL,
+    estado_entrega ENUM('EN_TIEMPO', 'PROXIMO_VENCER', 'RETRASADO', 'ENTREGADO') NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uk_reporte_codigo (codigo_interno),
+    KEY idx_reporte_estado (estado),
+    KEY idx_reporte_created (created_at)
+) ENGINE=InnoDB;
+
+CREATE TABLE reporte_schedule (
+    id_schedule INT AUTO_INCREMENT PRIMARY KEY,
+    reporte_id INT NOT NULL,
+    frecuencia VARCHAR(20) NULL,
+    reglas_json TEXT NULL,
+    KEY idx_schedule_reporte (reporte_id)
+) ENGINE=InnoDB;
+
+CREATE TABLE reporte_dependencia (
+    id_dependencia INT AUTO_INCREMENT PRIMARY KEY,
+    reporte_origen_id INT NOT NULL,
+    reporte_dependiente_id INT NOT NULL,
+    tipo_dependencia VARCHAR(30) NOT NULL DEFAULT 'DATOS',
+    criticidad ENUM('CRITICA', 'ALTA', 'MEDIA', 'BAJA') NOT NULL DEFAULT 'MEDIA',
+    observaciones TEXT NULL,
+    validada BOOLEAN NOT NULL DEFAULT FALSE,
+    creado_por INT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uk_dependencia (reporte_origen_id, reporte_dependiente_id),
+    KEY idx_dependencia_hijo (reporte_dependiente_id)
+) ENGINE=InnoDB;
+
+CREATE TABLE recurso (
+    id_recurso INT AUTO_INCREMENT PRIMARY KEY,
+    tipo VARCHAR(20) NOT NULL,
+    nombre VARCHAR(255) NULL,
+    url VARCHAR(500) NULL,
+    ruta_servidor VARCHAR(500) NULL,
+    size_bytes BIGINT NULL,
+    creado_por INT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
+CREATE TABLE reporte_recurso (
+    reporte_id INT NOT NULL,
+    recurso_id INT NOT NULL,
+    PRIMARY KEY (reporte_id, recurso_id)
+) ENGINE=InnoDB;
+
+CREATE TABLE historial_entregas (
+    id_historial BIGINT AUTO_INCREMENT PRIMARY KEY,
+    reporte_id INT NOT NULL,
+    fecha_programada DATETIME NULL,
+    fecha_real_entrega DATETIME NOT NULL,
+    estado VARCHAR(20) NOT NULL,
+    minutos_retraso INT NOT NULL DEFAULT 0,
+    creado_por INT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_historial_reporte (reporte_id, created_at)
+) ENGINE=InnoDB;
+
+CREATE TABLE bitacora_evento (
+    id_evento BIGINT AUTO_INCREMENT PRIMARY KEY,
+    entidad VARCHAR(30) NOT NULL,
+    entidad_id INT NULL,
+    accion VARCHAR(30) NOT NULL,
+    descripcion TEXT NULL,
+    realizado_por INT NULL,
+    metadata JSON NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
+-- Parámetros de la siembra y reportes de interés (cadena profunda, hubs) para el runner
+CREATE TABLE benchmark_meta (
+    clave VARCHAR(64) NOT NULL PRIMARY KEY,
+    valor JSON NOT NULL
+) ENGINE=InnoDB;
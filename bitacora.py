@@ -0,0 +1,173 @@
+"""
+Escritor asíncrono de la bitácora (bitacora_evento)
+Cola acotada en memoria + hilo escritor que inserta por lotes multi-fila
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+import logging
+
+from db import get_connection
+
+logger = logging.getLogger(__name__)
+
+BITACORA_CONFIG = {
+    # Eventos máximos en cola antes de aplicar backpressure
+    'capacidad': int(os.environ.get('BITACORA_CAPACIDAD', 10000)),
+    # Filas por INSERT multi-fila
+    'tamano_lote': int(os.environ.get('BITACORA_LOTE', 200)),
+    # Segundos máximos que un evento espera antes de escribirse
+    'intervalo': float(os.environ.get('BITACORA_INTERVALO', 1.0)),
+    # Segundos que registrar() espera con la cola llena antes de descartar
+    'espera_encolar': float(os.environ.get('BITACORA_ESPERA', 0.05)),
+    # Reintentos por lote antes de descartarlo
+    'reintentos': int(os.environ.get('BITACORA_REINTENTOS', 3)),
+}
+
+SQL_INSERT_BITACORA = """
+    INSERT INTO bitacora_evento
+    (entidad, entidad_id, accion, descripcion, realizado_por, metadata)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+
+class EscritorBitacora:
+    """
+    Hilo escritor de la bitácora
+
+    - registrar() encola sin tocar la base de datos
+    - el hilo vacía la cola cuando junta `tamano_lote` eventos o pasa `intervalo`
+    - con la cola llena espera `espera_encolar` y luego descarta (backpressure)
+    - detener() vacía lo pendiente (registrado en atexit)
+    """
+
+    def __init__(self, capacidad=10000, tamano_lote=200, intervalo=1.0, espera_encolar=0.05, reintentos=3):
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self.espera_encolar = espera_encolar
+        self.reintentos = reintentos
+
+        self._cola = queue.Queue(maxsize=capacidad)
+        self._detener = threading.Event()
+        self._hilo = None
+        self._lock = threading.Lock()
+
+        self.contadores = {
+            'encolados': 0,
+            'escritos': 0,
+            'descartados': 0,
+            'reintentos': 0,
+            'lotes': 0,
+            'lotes_fallidos': 0,
+        }
+
+    def _contar(self, nombre, cantidad=1):
+        with self._lock:
+            self.contadores[nombre] += cantidad
+
+    def iniciar(self):
+        with self._lock:
+            if self._hilo and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._ciclo, name='bitacora-writer', daemon=True)
+            self._hilo.start()
+
+    def registrar(self, fila):
+        """Encola una fila (entidad, entidad_id, accion, descripcion, usuario, metadata_json)"""
+        self.iniciar()
+        try:
+            self._cola.put(fila, timeout=self.espera_encolar)
+            self._contar('encolados')
+            return True
+        except queue.Full:
+            self._contar('descartados')
+            logger.warning("Bitácora: cola llena, evento descartado")
+            return False
+
+    def _tomar_lote(self):
+        """Espera el primer evento y junta hasta tamano_lote o hasta que venza el intervalo"""
+        try:
+            lote = [self._cola.get(timeout=self.intervalo)]
+        except queue.Empty:
+            return []
+
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.tamano_lote:
+            restante = limite - time.monotonic()
+            try:
+                lote.append(self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _escribir(self, lote):
+        """INSERT multi-fila con reintentos; si se agotan, el lote se descarta"""
+        for intento in range(self.reintentos + 1):
+            conn = None
+            try:
+                conn = get_connection()
+                cursor = conn.cursor()
+                cursor.executemany(SQL_INSERT_BITACORA, lote)
+                conn.commit()
+                cursor.close()
+                self._contar('escritos', len(lote))
+                self._contar('lotes')
+                return True
+            except Exception as e:
+                if conn:
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        pass
+                if intento < self.reintentos:
+                    self._contar('reintentos')
+                    time.sleep(min(0.1 * 2 ** intento, 2))
+                else:
+                    logger.error(f"Bitácora: lote de {len(lote)} eventos descartado: {e}")
+            finally:
+                if conn:
+                    conn.close()
+
+        self._contar('lotes_fallidos')
+        self._contar('descartados', len(lote))
+        return False
+
+    def _ciclo(self):
+        while not self._detener.is_set() or not self._cola.empty():
+            lote = self._tomar_lote()
+            if lote:
+                self._escribir(lote)
+
+    def vaciar(self):
+        """Escribe de inmediato todo lo que hay en cola (en el hilo que llama)"""
+        while True:
+            lote = []
+            try:
+                while len(lote) < self.tamano_lote:
+                    lote.append(self._cola.get_nowait())
+            except queue.Empty:
+                pass
+            if not lote:
+                return
+            self._escribir(lote)
+
+    def detener(self, timeout=10):
+        """Detiene el hilo después de escribir lo pendiente"""
+        self._detener.set()
+        if self._hilo and self._hilo.is_alive():
+            self._hilo.join(timeout)
+        self.vaciar()
+
+    def estadisticas(self):
+        with self._lock:
+            stats = dict(self.contadores)
+        stats['en_cola'] = self._cola.qsize()
+        return stats
+
+
+escritor_bitacora = EscritorBitacora(**BITACORA_CONFIG)
+atexit.register(escritor_bitacora.detener)
@@ -0,0 +1,266 @@
+"""
+Índice de búsqueda en memoria (trigramas)
+Búsqueda por código, nombre, tipo y descripción sin LIKE '%term%' en la BD
+"""
+
+import os
+import random
+import threading
+import time
+import unicodedata
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Recarga completa periódica (cambios hechos por otros procesos)
+BUSQUEDA_TTL_SEGUNDOS = int(os.environ.get('BUSQUEDA_TTL_SEGUNDOS', 300))
+
+CAMPOS_INDEXADOS = ('codigo_interno', 'nombre', 'tipo', 'descripcion')
+
+# Puntaje de una coincidencia según campo y posición
+PESOS = {
+    'codigo_exacto': 100,
+    'codigo_prefijo': 50,
+    'nombre_prefijo': 20,
+    'palabra_prefijo': 10,
+    'codigo_interno': 8,
+    'nombre': 5,
+    'tipo': 3,
+    'descripcion': 1,
+}
+
+# Columnas de SQL_REPORTES_BUSQUEDA en orden (filas de cursor normal o dictionary=True)
+COLUMNAS_BUSQUEDA = ('id_reporte', 'codigo_interno', 'nombre', 'descripcion', 'audiencia', 'estado', 'tipo')
+
+SQL_REPORTES_BUSQUEDA = """
+    SELECT
+        r.id_reporte,
+        r.codigo_interno,
+        r.nombre,
+        r.descripcion,
+        r.audiencia,
+        r.estado,
+        tr.nombre as tipo
+    FROM reporte r
+    LEFT JOIN tipo_reporte tr ON r.tipo_id = tr.id_tipo
+"""
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes (equivalente a la collation *_ci de MySQL)"""
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto).lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def trigramas(texto):
+    """Trigramas del texto con un espacio inicial, para que ' ab' marque inicio de palabra"""
+    texto = f" {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def trigramas_consulta(termino):
+    """Trigramas que contiene cualquier texto con el término (vacío si tiene menos de 3 caracteres)"""
+    return {termino[i:i + 3] for i in range(len(termino) - 2)}
+
+
+class IndiceBusqueda:
+    """
+    Índice invertido de trigramas sobre los reportes
+
+    documentos[id] = {campo: valor original, ..., '_norm': {campo: normalizado}}
+    postings[trigrama] = {id, ...}
+    carga (al azar en cada carga) + version (cada cambio) identifican el
+    contenido de este proceso (claves de la caché HTTP, ver generacion())
+    """
+
+    def __init__(self):
+        self.documentos = {}
+        self.postings = {}
+        self.carga = None
+        self.version = 0
+        self.cargado_en = None
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # CARGA Y ACTUALIZACIÓN
+    # ------------------------------------------------------------------
+
+    def cargar(self, cursor):
+        inicio = time.perf_counter()
+        cursor.execute(SQL_REPORTES_BUSQUEDA)
+        filas = cursor.fetchall()
+
+        with self._lock:
+            self.documentos = {}
+            self.postings = {}
+            for row in filas:
+                self._agregar(self._fila_documento(row))
+            self.carga = f"{random.getrandbits(32):08x}"
+            self.version += 1
+            self.cargado_en = time.monotonic()
+
+        logger.info(f"Índice de búsqueda cargado: {len(filas)} reportes, "
+                    f"{len(self.postings)} trigramas en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+    def vencido(self):
+        return self.cargado_en is None or time.monotonic() - self.cargado_en > BUSQUEDA_TTL_SEGUNDOS
+
+    def recargar_reporte(self, cursor, id_reporte):
+        """Re-indexa un reporte (creación / aprobación)"""
+        cursor.execute(SQL_REPORTES_BUSQUEDA + " WHERE r.id_reporte = %s", (id_reporte,))
+        row = cursor.fetchone()
+        with self._lock:
+            self._quitar(id_reporte)
+            if row:
+                self._agregar(self._fila_documento(row))
+            self.version += 1
+
+    @staticmethod
+    def _fila_documento(row):
+        """Documento desde una fila por nombre de columna (tupla o dict, según el cursor del llamador)"""
+        if not isinstance(row, dict):
+            row = dict(zip(COLUMNAS_BUSQUEDA, row))
+        doc = {
+            'id': row['id_reporte'],
+            'codigo_interno': row['codigo_interno'],
+            'nombre': row['nombre'],
+            'descripcion': row['descripcion'],
+            'audiencia': row['audiencia'],
+            'estado': row['estado'],
+            'tipo': row['tipo'],
+        }
+        doc['_norm'] = {campo: normalizar(doc[campo]) for campo in CAMPOS_INDEXADOS}
+        return doc
+
+    def _agregar(self, doc):
+        self.documentos[doc['id']] = doc
+        for campo in CAMPOS_INDEXADOS:
+            for trigrama in trigramas(doc['_norm'][campo]):
+                self.postings.setdefault(trigrama, set()).add(doc['id'])
+
+    def _quitar(self, id_reporte):
+        doc = self.documentos.pop(id_reporte, None)
+        if not doc:
+            return
+        for campo in CAMPOS_INDEXADOS:
+            for trigrama in trigramas(doc['_norm'][campo]):
+                ids = self.postings.get(trigrama)
+                if ids:
+                    ids.discard(id_reporte)
+                    if not ids:
+                        del self.postings[trigrama]
+
+    # ------------------------------------------------------------------
+    # CONSULTA
+    # ------------------------------------------------------------------
+
+    def reportes(self, estado=None):
+        """Documentos (sin campos normalizados) ordenados por código, opcionalmente filtrados por estado"""
+        with self._lock:
+            docs = [doc for doc in self.documentos.values() if not estado or doc['estado'] == estado]
+        docs.sort(key=lambda doc: doc['codigo_interno'] or '')
+        return [{k: v for k, v in doc.items() if k != '_norm'} for doc in docs]
+
+    def buscar(self, termino, campos=CAMPOS_INDEXADOS, estado=None, limite=20):
+        """
+        Busca reportes que contengan el término en alguno de los campos
+        (subcadena en cualquier posición, como LIKE '%termino%')
+
+        Los trigramas solo preseleccionan candidatos; un término de 1-2
+        caracteres no tiene trigramas y se compara contra todos los documentos.
+
+        Returns:
+            list: [(puntaje, documento), ...] de mayor a menor puntaje y luego por código
+        """
+        termino = normalizar(termino).strip()
+        if not termino:
+            return []
+
+        with self._lock:
+            consulta = trigramas_consulta(termino)
+            if consulta:
+                # Intersección empezando por el trigrama menos frecuente
+                listas = sorted((self.postings.get(t, set()) for t in consulta), key=len)
+                if not listas[0]:
+                    return []
+                candidatos = set(listas[0])
+                for ids in listas[1:]:
+                    candidatos &= ids
+                    if not candidatos:
+                        return []
+            else:
+                candidatos = self.documentos.keys()
+
+            resultados = []
+            for id_reporte in candidatos:
+                doc = self.documentos[id_reporte]
+                if estado and doc['estado'] != estado:
+                    continue
+                puntaje = self._puntaje(doc['_norm'], termino, campos)
+                if puntaje:
+                    resultados.append((puntaje, doc))
+
+        resultados.sort(key=lambda r: (-r[0], r[1]['codigo_interno'] or ''))
+        return resultados[:limite] if limite else resultados
+
+    @staticmethod
+    def _puntaje(norm, termino, campos):
+        """Verifica la coincidencia real (los trigramas solo filtran) y la pondera"""
+        puntaje = 0
+        codigo = norm['codigo_interno']
+
+        if 'codigo_interno' in campos and termino in codigo:
+            puntaje += PESOS['codigo_interno']
+            if codigo == termino:
+                puntaje += PESOS['codigo_exacto']
+            elif codigo.startswith(termino):
+                puntaje += PESOS['codigo_prefijo']
+
+        if 'nombre' in campos and termino in norm['nombre']:
+            puntaje += PESOS['nombre']
+            if norm['nombre'].startswith(termino):
+                puntaje += PESOS['nombre_prefijo']
+            elif f" {termino}" in norm['nombre']:
+                puntaje += PESOS['palabra_prefijo']
+
+        for campo in ('tipo', 'descripcion'):
+            if campo in campos and termino in norm[campo]:
+                puntaje += PESOS[campo]
+
+        return puntaje
+
+
+_indice = IndiceBusqueda()
+_carga_lock = threading.Lock()
+
+
+def obtener_indice(cursor):
+    """Índice global del proceso; se carga en el primer uso y se recarga al vencer el TTL"""
+    if _indice.vencido():
+        with _carga_lock:
+            if _indice.vencido():
+                _indice.cargar(cursor)
+    return _indice
+
+
+def generacion():
+    """Estado del índice de este proceso, para la clave de la caché HTTP de las búsquedas"""
+    return f"{_indice.carga}.{_indice.version}"
+
+
+def notificar_reporte(conn, id_reporte):
+    """Re-indexa un reporte creado o aprobado si el índice ya está cargado"""
+    if _indice.vencido():
+        return
+    cursor = conn.cursor()
+    try:
+        _indice.recargar_reporte(cursor, id_reporte)
+    finally:
+        cursor.close()
+
+
+def invalidar_indice():
+    """Fuerza la recarga completa en el próximo uso (después de cargas masivas)"""
+    _indice.cargado_en = None
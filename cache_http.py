@@ -0,0 +1,242 @@
+"""
+Caché de respuestas HTTP con ETag
+Las vistas de solo lectura (catálogo, detalle, árbol de dependencias) se
+validan contra una versión de datos barata (tabla version_datos) y se sirven
+desde un LRU en memoria o con 304 Not Modified
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+import logging
+
+from flask import request, session, g, make_response
+
+from db import get_connection, get_request_connection
+
+logger = logging.getLogger(__name__)
+
+CACHE_HTTP_CONFIG = {
+    'activo': os.environ.get('CACHE_HTTP_ACTIVO', '1') == '1',
+    # Respuestas guardadas (LRU)
+    'max_entradas': int(os.environ.get('CACHE_HTTP_ENTRADAS', 512)),
+    'max_bytes': int(os.environ.get('CACHE_HTTP_MAX_BYTES', 32 * 1024 * 1024)),
+    # Segundos que se reutiliza la versión leída de la BD (cambios de otros procesos)
+    'verificar': float(os.environ.get('CACHE_HTTP_VERIFICAR_SEGUNDOS', 2)),
+}
+
+CLAVE_VERSION = 'reportes'
+
+
+# ============================================================================
+# VERSIÓN DE DATOS
+# ============================================================================
+
+class VersionDatos:
+    """
+    Versión de los datos de reportes
+
+    La fuente es la fila version_datos('reportes') (migraciones/005), incrementada
+    después del commit de cada escritura. Se relee como máximo cada `verificar`
+    segundos; invalidar() obliga a releerla (marcar_cambio() de este proceso).
+    """
+
+    def __init__(self, verificar=2):
+        self.verificar = verificar
+        self._version = None
+        self._leida_en = 0.0
+        self._lock = threading.Lock()
+
+    def actual(self):
+        if self._version is not None and time.monotonic() - self._leida_en < self.verificar:
+            return self._version
+
+        conn = get_request_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT version FROM version_datos WHERE clave = %s", (CLAVE_VERSION,))
+            fila = cursor.fetchone()
+        finally:
+            cursor.close()
+            conn.close()
+
+        with self._lock:
+            self._version = int(fila[0]) if fila else 0
+            self._leida_en = time.monotonic()
+            return self._version
+
+    def invalidar(self):
+        with self._lock:
+            self._leida_en = 0.0
+
+
+version_datos = VersionDatos(CACHE_HTTP_CONFIG['verificar'])
+
+
+def marcar_cambio():
+    """
+    Llamar después del commit de una escritura: incrementa la versión en una
+    transacción corta propia y obliga a este proceso a releerla
+
+    Fuera de la transacción del que escribe, la fila version_datos('reportes')
+    queda bloqueada solo durante este UPDATE y no hasta el commit de cada
+    escritura (los escritores no se serializan en ella). Si el incremento
+    falla el cambio ya está confirmado: se registra y una respuesta en caché
+    queda vieja hasta el próximo cambio.
+
+    Returns:
+        int | None: la versión resultante (LAST_INSERT_ID), None si falló
+    """
+    conn = cursor = None
+    version = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO version_datos (clave, version) VALUES (%s, LAST_INSERT_ID(1))
+            ON DUPLICATE KEY UPDATE version = LAST_INSERT_ID(version + 1)
+        """, (CLAVE_VERSION,))
+        version = cursor.lastrowid
+        conn.commit()
+    except Exception as e:
+        logger.warning(f"⚠️  Caché HTTP: no se pudo incrementar la versión de datos: {e}")
+        version = None
+    finally:
+        if cursor is not None:
+            cursor.close()
+        if conn is not None:
+            conn.close()
+    version_datos.invalidar()
+    return version
+
+
+# ============================================================================
+# LRU DE RESPUESTAS
+# ============================================================================
+
+class CacheRespuestas:
+    """LRU clave → (version, etag, cuerpo, mimetype) acotado por entradas y bytes"""
+
+    def __init__(self, max_entradas=512, max_bytes=32 * 1024 * 1024):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._datos = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.contadores = {
+            'aciertos': 0,
+            'no_modificados': 0,
+            'fallos': 0,
+            'desalojos': 0,
+        }
+
+    def obtener(self, clave, version):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None or entrada[0] != version:
+                self.contadores['fallos'] += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.contadores['aciertos'] += 1
+            return entrada
+
+    def guardar(self, clave, entrada):
+        tamano = len(entrada[2])
+        if tamano > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._datos.pop(clave, None)
+            if anterior:
+                self._bytes -= len(anterior[2])
+            self._datos[clave] = entrada
+            self._bytes += tamano
+            while len(self._datos) > self.max_entradas or self._bytes > self.max_bytes:
+                _, desalojada = self._datos.popitem(last=False)
+                self._bytes -= len(desalojada[2])
+                self.contadores['desalojos'] += 1
+
+    def contar(self, nombre):
+        with self._lock:
+            self.contadores[nombre] += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self._bytes = 0
+
+    def estadisticas(self):
+        with self._lock:
+            return {**self.contadores, 'entradas': len(self._datos), 'bytes': self._bytes}
+
+
+cache_respuestas = CacheRespuestas(CACHE_HTTP_CONFIG['max_entradas'], CACHE_HTTP_CONFIG['max_bytes'])
+
+
+def no_cachear():
+    """Marca la respuesta actual como no cacheable (ej. página de error con status 200)"""
+    g.no_cachear = True
+
+
+def cachear(ttl=None, generacion=None):
+    """
+    Decorador de vistas GET cacheables
+
+    La clave es ruta + argumentos + usuario; la versión es la de version_datos
+    más, si se indica `ttl`, un tramo de tiempo (para vistas con "faltan 3h").
+    generacion: función con el estado de la estructura en memoria de la que
+    sale la respuesta (grafo, índice de búsqueda). version_datos cambia en
+    todos los procesos a la vez, pero cada uno ve la escritura de otro recién
+    al recargar su estructura: sin la generación en la versión, una respuesta
+    calculada con la estructura vieja quedaría guardada como vigente.
+    El ETag se deriva de clave y versión, así que un 304 no necesita la entrada del LRU.
+    No se cachea si hay mensajes flash pendientes ni si la vista llamó no_cachear().
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            if not CACHE_HTTP_CONFIG['activo'] or request.method != 'GET' or session.get('_flashes'):
+                return vista(*args, **kwargs)
+
+            try:
+                version = str(version_datos.actual())
+            except Exception as e:
+                logger.warning(f"Caché HTTP: no se pudo leer la versión de datos: {e}")
+                return vista(*args, **kwargs)
+            if ttl:
+                version += f".{int(time.time() // ttl)}"
+            if generacion:
+                version += f".{generacion()}"
+
+            clave = (
+                request.path,
+                tuple(sorted(request.args.items(multi=True))),
+                session.get('user_id'),
+            )
+            etag = hashlib.sha1(repr((clave, version)).encode()).hexdigest()[:20]
+
+            if etag in request.if_none_match:
+                cache_respuestas.contar('no_modificados')
+                respuesta = make_response('', 304)
+                respuesta.set_etag(etag)
+                respuesta.headers['Cache-Control'] = 'no-cache'
+                return respuesta
+
+            entrada = cache_respuestas.obtener(clave, version)
+            if entrada:
+                respuesta = make_response(entrada[2])
+                respuesta.mimetype = entrada[3]
+            else:
+                respuesta = make_response(vista(*args, **kwargs))
+                if respuesta.status_code != 200 or respuesta.direct_passthrough or g.pop('no_cachear', False):
+                    return respuesta
+                cache_respuestas.guardar(clave, (version, etag, respuesta.get_data(), respuesta.mimetype))
+
+            respuesta.set_etag(etag)
+            # El navegador guarda la respuesta pero revalida siempre (If-None-Match → 304)
+            respuesta.headers['Cache-Control'] = 'no-cache'
+            return respuesta
+        return envoltura
+    return decorador
@@ -0,0 +1,182 @@
+"""
+Calendario Laboral Colombia 🇨🇴
+Festivos de cualquier año (Ley Emiliani + fechas basadas en Pascua)
+y días laborales precalculados para consultas O(1) / O(log n)
+"""
+
+from array import array
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+import threading
+
+
+# Festivos que no se trasladan
+FESTIVOS_FIJOS = [
+    (1, 1, 'Año Nuevo'),
+    (5, 1, 'Día del Trabajo'),
+    (7, 20, 'Día de la Independencia'),
+    (8, 7, 'Batalla de Boyacá'),
+    (12, 8, 'Inmaculada Concepción'),
+    (12, 25, 'Navidad'),
+]
+
+# Festivos trasladables al lunes siguiente (Ley 51 de 1983 - Ley Emiliani)
+FESTIVOS_EMILIANI = [
+    (1, 6, 'Reyes Magos'),
+    (3, 19, 'San José'),
+    (6, 29, 'San Pedro y San Pablo'),
+    (8, 15, 'Asunción'),
+    (10, 12, 'Día de la Raza'),
+    (11, 1, 'Todos los Santos'),
+    (11, 11, 'Independencia de Cartagena'),
+]
+
+# Festivos relativos al Domingo de Pascua (días de diferencia, ¿se traslada al lunes?)
+FESTIVOS_PASCUA = [
+    (-3, False, 'Jueves Santo'),
+    (-2, False, 'Viernes Santo'),
+    (39, True, 'Ascensión'),
+    (60, True, 'Corpus Christi'),
+    (68, True, 'Sagrado Corazón'),
+]
+
+
+def domingo_pascua(anio):
+    """Domingo de Pascua (algoritmo anónimo gregoriano)"""
+    a = anio % 19
+    b, c = divmod(anio, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(anio, mes, dia + 1)
+
+
+def trasladar_a_lunes(fecha):
+    """Ley Emiliani: si no cae en lunes, pasa al lunes siguiente"""
+    return fecha + timedelta(days=(7 - fecha.weekday()) % 7)
+
+
+@lru_cache(maxsize=None)
+def festivos_colombia(anio):
+    """
+    Festivos de Colombia para un año
+
+    Returns:
+        dict: {date: nombre} ordenado por fecha
+    """
+    festivos = {}
+
+    def agregar(fecha, nombre):
+        # Dos festivos pueden caer el mismo lunes (ej. 30/06/2025)
+        festivos[fecha] = f"{festivos[fecha]} / {nombre}" if fecha in festivos else nombre
+
+    for mes, dia, nombre in FESTIVOS_FIJOS:
+        agregar(date(anio, mes, dia), nombre)
+
+    for mes, dia, nombre in FESTIVOS_EMILIANI:
+        agregar(trasladar_a_lunes(date(anio, mes, dia)), nombre)
+
+    pascua = domingo_pascua(anio)
+    for offset, se_traslada, nombre in FESTIVOS_PASCUA:
+        fecha = pascua + timedelta(days=offset)
+        if se_traslada:
+            fecha = trasladar_a_lunes(fecha)
+        agregar(fecha, nombre)
+
+    return dict(sorted(festivos.items()))
+
+
+class CalendarioLaboral:
+    """
+    Días laborales (lun-vie, no festivo) precalculados por rango de años
+
+    - dia_laboral: bytearray indexado por ordinal - ordinal_base → O(1)
+    - laborales: array ordenado de ordinales laborales → siguiente con bisect O(log n)
+
+    El rango se amplía automáticamente cuando se consulta una fecha fuera de él.
+    """
+
+    def __init__(self, anio_inicio=None, anio_fin=None):
+        hoy = date.today()
+        self._lock = threading.Lock()
+        self._construir(anio_inicio or hoy.year - 1, anio_fin or hoy.year + 5)
+
+    def _construir(self, anio_inicio, anio_fin):
+        ordinal_base = date(anio_inicio, 1, 1).toordinal()
+        ordinal_fin = date(anio_fin, 12, 31).toordinal()
+
+        festivos = set()
+        for anio in range(anio_inicio, anio_fin + 1):
+            festivos.update(f.toordinal() for f in festivos_colombia(anio))
+
+        dia_laboral = bytearray(ordinal_fin - ordinal_base + 1)
+        laborales = array('l')
+        for ordinal in range(ordinal_base, ordinal_fin + 1):
+            # date.fromordinal(1) es lunes → (ordinal - 1) % 7 == weekday()
+            if (ordinal - 1) % 7 < 5 and ordinal not in festivos:
+                dia_laboral[ordinal - ordinal_base] = 1
+                laborales.append(ordinal)
+
+        # Publicar de una vez (los lectores nunca ven un estado parcial)
+        self._estado = (anio_inicio, anio_fin, ordinal_base, dia_laboral, laborales)
+
+    def _asegurar_rango(self, ordinal):
+        anio_inicio, anio_fin, ordinal_base, dia_laboral, laborales = self._estado
+        if ordinal_base <= ordinal < ordinal_base + len(dia_laboral) and laborales[-1] > ordinal:
+            return self._estado
+
+        anio = date.fromordinal(ordinal).year
+        with self._lock:
+            anio_inicio, anio_fin = self._estado[0], self._estado[1]
+            if anio < anio_inicio or anio >= anio_fin:
+                self._construir(min(anio_inicio, anio), max(anio_fin, anio + 1))
+        return self._estado
+
+    def es_dia_laboral(self, fecha):
+        """Verifica si es día laboral (lun-vie, no festivo)"""
+        ordinal = fecha.toordinal()
+        _, _, ordinal_base, dia_laboral, _ = self._asegurar_rango(ordinal)
+        return dia_laboral[ordinal - ordinal_base] == 1
+
+    def siguiente_dia_laboral(self, fecha):
+        """Obtiene el siguiente día laboral (la misma fecha si ya lo es), conservando la hora"""
+        ordinal = fecha.toordinal()
+        _, _, _, _, laborales = self._asegurar_rango(ordinal)
+        siguiente = laborales[bisect_left(laborales, ordinal)]
+        return fecha + timedelta(days=siguiente - ordinal)
+
+    def laborales_desde(self, fecha):
+        """Días laborales (date) desde `fecha` inclusive, en orden y sin fin (amplía el rango al agotarlo)"""
+        ordinal = fecha.toordinal()
+        while True:
+            _, _, _, _, laborales = self._asegurar_rango(ordinal)
+            for siguiente in laborales[bisect_left(laborales, ordinal):]:
+                yield date.fromordinal(siguiente)
+            ordinal = laborales[-1] + 1
+
+    def es_festivo(self, fecha):
+        if isinstance(fecha, datetime):
+            fecha = fecha.date()
+        return fecha in festivos_colombia(fecha.year)
+
+
+# Calendario compartido por todas las rutas de programación
+calendario = CalendarioLaboral()
+
+
+def es_dia_laboral(fecha):
+    return calendario.es_dia_laboral(fecha)
+
+
+def siguiente_dia_laboral(fecha):
+    return calendario.siguiente_dia_laboral(fecha)
+
+
+def laborales_desde(fecha):
+    return calendario.laborales_desde(fecha)
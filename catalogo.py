@@ -3,230 +3,492 @@ Routes de Catálogo de Reportes
 Muestra todos los reportes con próxima ejecución calculada
 """
 
-from flask import Blueprint, render_template, request, flash, redirect
+from flask import Blueprint, render_template, request, flash, redirect, jsonify
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from db import get_connection
+from db import get_request_connection, init_app
+from busqueda import obtener_indice
+import busqueda
+import datos_referencia
+import cache_http
 from datetime import datetime
+import base64
+import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 catalogos_bp = Blueprint('catalogos', __name__)
+catalogos_bp.record_once(lambda state: init_app(state.app))
 
-@catalogos_bp.route('/catalogos')
-def index():
+# Badges de presentación
+ESTADO_BADGES = {
+    'RETRASADO': {'color': 'red', 'icon': 'exclamation-triangle', 'text': 'Retrasado'},
+    'PROXIMO_VENCER': {'color': 'yellow', 'icon': 'clock', 'text': 'Próximo a vencer'},
+    'EN_TIEMPO': {'color': 'green', 'icon': 'check-circle', 'text': 'En tiempo'},
+    'ENTREGADO': {'color': 'blue', 'icon': 'check-double', 'text': 'Entregado'},
+    'SIN_PROGRAMAR': {'color': 'gray', 'icon': 'calendar-times', 'text': 'Sin programar'}
+}
+
+CRITICIDAD_BADGES = {
+    'CRITICA': {'color': 'red', 'text': 'Crítica'},
+    'ALTA': {'color': 'orange', 'text': 'Alta'},
+    'MEDIA': {'color': 'yellow', 'text': 'Media'},
+    'BAJA': {'color': 'green', 'text': 'Baja'}
+}
+
+
+def adjuntar_recursos(cursor, reportes):
     """
-    Catálogo de reportes con próxima ejecución y estado calculados
+    Adjunta tiene_gitlab / tiene_pdf / gitlab_url a cada reporte
+    con una sola consulta para todo el conjunto (evita N+1)
     """
+    for reporte in reportes:
+        reporte['tiene_gitlab'] = False
+        reporte['tiene_pdf'] = False
+        reporte['gitlab_url'] = None
     
-    try:
-        # Parámetros de búsqueda/filtro
-        filtro_busqueda = request.args.get('q', '').strip()
-        filtro_estado = request.args.get('estado', '')
-        filtro_criticidad = request.args.get('criticidad', '')
-        
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Query principal usando la vista optimizada
-        query = """
-            SELECT 
-                r.id_reporte,
-                r.codigo_interno,
-                r.nombre,
-                r.proposito,
-                r.descripcion,
-                r.criticidad,
-                r.audiencia,
-                r.formato_entrega,
-                r.formato_reporte,
-                r.ruta_entrega,
-                r.estado,
-                r.estado_entrega,
-                r.proxima_ejecucion,
-                r.ultima_entrega,
-                r.created_at,
-                
-                t.nombre as tipo_nombre,
-                t.prefijo_codigo,
-                c.nombre as categoria_nombre,
-                a1.nombre as area_reportante_nombre,
-                a2.nombre as area_ejecutora_nombre,
-                a3.nombre as area_receptora_nombre,
-                
-                s.frecuencia,
-                s.reglas_json,
-                
-                ca.horas_antes_alerta,
-                
-                -- Cálculo de horas hasta vencimiento
-                TIMESTAMPDIFF(HOUR, NOW(), r.proxima_ejecucion) as horas_hasta_vencimiento,
-                
-                -- Estado calculado
-                CASE 
-                    WHEN r.proxima_ejecucion IS NULL THEN 'SIN_PROGRAMAR'
-                    WHEN NOW() > r.proxima_ejecucion THEN 'RETRASADO'
-                    WHEN TIMESTAMPDIFF(HOUR, NOW(), r.proxima_ejecucion) <= COALESCE(ca.horas_antes_alerta, 24) THEN 'PROXIMO_VENCER'
-                    ELSE 'EN_TIEMPO'
-                END as estado_calculado
-                
-            FROM reporte r
-            LEFT JOIN tipo_reporte t ON r.tipo_id = t.id_tipo
-            LEFT JOIN categoria_reporte c ON r.categoria_id = c.id_categoria
-            LEFT JOIN area a1 ON r.area_reportante_id = a1.id_area
-            LEFT JOIN area a2 ON r.area_ejecutora_id = a2.id_area
-            LEFT JOIN area a3 ON r.area_receptora_id = a3.id_area
-            LEFT JOIN reporte_schedule s ON r.id_reporte = s.reporte_id
-            LEFT JOIN config_alertas ca ON s.frecuencia = ca.frecuencia
-            WHERE 1=1
-        """
+    if not reportes:
+        return reportes
+    
+    por_id = {reporte['id_reporte']: reporte for reporte in reportes}
+    placeholders = ','.join(['%s'] * len(por_id))
+    
+    cursor.execute(f"""
+        SELECT rr.reporte_id, r.tipo, r.url
+        FROM reporte_recurso rr
+        JOIN recurso r ON rr.recurso_id = r.id_recurso
+        WHERE rr.reporte_id IN ({placeholders})
+        ORDER BY rr.reporte_id, r.id_recurso
+    """, list(por_id))
+    
+    for rec in cursor.fetchall():
+        reporte = por_id[rec['reporte_id']]
+        if rec['tipo'] == 'GITLAB':
+            reporte['tiene_gitlab'] = True
+            if reporte['gitlab_url'] is None:
+                reporte['gitlab_url'] = rec['url']
+        elif rec['tipo'] == 'PDF':
+            reporte['tiene_pdf'] = True
+    
+    return reportes
+
+
+# ============================================================================
+# PAGINACIÓN KEYSET
+# ============================================================================
+
+CATALOGO_PAGE_SIZE = 50
+CATALOGO_PAGE_SIZE_MAX = 200
+
+# Máximo de ids de la búsqueda que viajan en el IN; con más coincidencias se filtra con LIKE
+CATALOGO_BUSQUEDA_MAX_IDS = int(os.environ.get('CATALOGO_BUSQUEDA_MAX_IDS', 1000))
+
+# Valor de r.orden_proxima para los reportes sin proxima_ejecucion (migraciones/001)
+FECHA_MINIMA = datetime(1000, 1, 1)
+
+# created_at que la migración 001 asignó a las filas que lo tenían en NULL
+CREADO_MINIMO = datetime(1970, 1, 1, 0, 0, 1)
+
+CATALOGO_SELECT = """
+    SELECT 
+        r.id_reporte,
+        r.codigo_interno,
+        r.nombre,
+        r.proposito,
+        r.descripcion,
+        r.criticidad,
+        r.audiencia,
+        r.formato_entrega,
+        r.formato_reporte,
+        r.ruta_entrega,
+        r.estado,
+        r.estado_entrega,
+        r.proxima_ejecucion,
+        r.ultima_entrega,
+        r.created_at,
         
-        params = []
+        t.nombre as tipo_nombre,
+        t.prefijo_codigo,
+        c.nombre as categoria_nombre,
+        a1.nombre as area_reportante_nombre,
+        a2.nombre as area_ejecutora_nombre,
+        a3.nombre as area_receptora_nombre,
         
-        # Filtro de búsqueda
-        if filtro_busqueda:
-            query += " AND (r.nombre LIKE %s OR r.codigo_interno LIKE %s OR t.nombre LIKE %s)"
-            busqueda_param = f"%{filtro_busqueda}%"
-            params.extend([busqueda_param, busqueda_param, busqueda_param])
+        s.frecuencia,
+        s.reglas_json,
         
-        # Filtro de estado
-        if filtro_estado:
-            query += " AND r.estado = %s"
-            params.append(filtro_estado)
+        -- Cálculo de horas hasta vencimiento
+        TIMESTAMPDIFF(HOUR, NOW(), r.proxima_ejecucion) as horas_hasta_vencimiento,
         
-        # Filtro de criticidad
-        if filtro_criticidad:
-            query += " AND r.criticidad = %s"
-            params.append(filtro_criticidad)
+        -- Estado de entrega almacenado (lo mantiene al día planificador.py)
+        IF(r.proxima_ejecucion IS NULL, 'SIN_PROGRAMAR', COALESCE(r.estado_entrega, 'EN_TIEMPO')) as estado_calculado,
         
-        # Ordenar por estado y próxima ejecución
-        query += """ 
-            ORDER BY 
-                CASE r.estado_entrega
-                    WHEN 'RETRASADO' THEN 1
-                    WHEN 'PROXIMO_VENCER' THEN 2
-                    WHEN 'EN_TIEMPO' THEN 3
-                    WHEN 'ENTREGADO' THEN 4
-                    ELSE 5
-                END,
-                r.proxima_ejecucion ASC,
-                r.created_at DESC
+        -- Llaves de ordenamiento (keyset): columnas generadas con índice idx_reporte_catalogo
+        r.orden_prioridad,
+        r.orden_proxima
+"""
+
+CATALOGO_FROM = """
+    FROM reporte r
+    LEFT JOIN tipo_reporte t ON r.tipo_id = t.id_tipo
+    LEFT JOIN categoria_reporte c ON r.categoria_id = c.id_categoria
+    LEFT JOIN area a1 ON r.area_reportante_id = a1.id_area
+    LEFT JOIN area a2 ON r.area_ejecutora_id = a2.id_area
+    LEFT JOIN area a3 ON r.area_receptora_id = a3.id_area
+    LEFT JOIN reporte_schedule s ON r.id_reporte = s.reporte_id
+    WHERE 1=1
+"""
+
+
+def codificar_cursor(reporte, total_estimado):
+    """Codifica la posición del último reporte de la página en un token opaco"""
+    datos = [
+        reporte['orden_prioridad'],
+        (reporte['orden_proxima'] or FECHA_MINIMA).isoformat(),
+        (reporte['created_at'] or CREADO_MINIMO).isoformat(),
+        reporte['id_reporte'],
+        total_estimado
+    ]
+    return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(token):
+    """Decodifica un cursor; retorna None si es inválido"""
+    try:
+        relleno = '=' * (-len(token) % 4)
+        prioridad, proxima, creado, id_reporte, total = json.loads(base64.urlsafe_b64decode(token + relleno))
+        return {
+            'prioridad': int(prioridad),
+            'proxima': datetime.fromisoformat(proxima),
+            # Cursores emitidos antes de que created_at fuera NOT NULL pueden traer None
+            'creado': datetime.fromisoformat(creado) if creado else CREADO_MINIMO,
+            'id_reporte': int(id_reporte),
+            'total_estimado': total
+        }
+    except Exception:
+        return None
+
+
+def leer_limite(valor):
+    """Tamaño de página acotado a CATALOGO_PAGE_SIZE_MAX"""
+    try:
+        limite = int(valor)
+    except (TypeError, ValueError):
+        return CATALOGO_PAGE_SIZE
+    return max(1, min(limite, CATALOGO_PAGE_SIZE_MAX))
+
+
+def escapar_like(texto):
+    """Escapa los comodines de LIKE para buscar el texto literal"""
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def construir_filtros(filtro_busqueda, filtro_estado, filtro_criticidad, indice=None, filtro_entrega=None):
+    """Construye el WHERE adicional y sus parámetros para los filtros del catálogo"""
+    condiciones = ""
+    params = []
+    
+    # Filtro de búsqueda: el índice de trigramas resuelve los ids; un término
+    # muy común (más de CATALOGO_BUSQUEDA_MAX_IDS coincidencias) se filtra con
+    # LIKE en la BD para no enviar un IN sin límite
+    if filtro_busqueda:
+        ids = [doc['id'] for _, doc in indice.buscar(
+            filtro_busqueda, campos=('codigo_interno', 'nombre', 'tipo'), limite=CATALOGO_BUSQUEDA_MAX_IDS + 1
+        )]
+        if len(ids) > CATALOGO_BUSQUEDA_MAX_IDS:
+            condiciones += " AND (r.nombre LIKE %s OR r.codigo_interno LIKE %s OR t.nombre LIKE %s)"
+            patron = f"%{escapar_like(filtro_busqueda)}%"
+            params.extend([patron, patron, patron])
+        elif ids:
+            condiciones += f" AND r.id_reporte IN ({','.join(['%s'] * len(ids))})"
+            params.extend(ids)
+        else:
+            condiciones += " AND 1=0"
+    
+    # Filtro de estado
+    if filtro_estado:
+        condiciones += " AND r.estado = %s"
+        params.append(filtro_estado)
+    
+    # Filtro de criticidad
+    if filtro_criticidad:
+        condiciones += " AND r.criticidad = %s"
+        params.append(filtro_criticidad)
+    
+    # Filtro de estado de entrega (columna almacenada, índice idx_reporte_entrega)
+    if filtro_entrega == 'SIN_PROGRAMAR':
+        condiciones += " AND r.proxima_ejecucion IS NULL"
+    elif filtro_entrega:
+        condiciones += " AND r.estado_entrega = %s AND r.proxima_ejecucion IS NOT NULL"
+        params.append(filtro_entrega)
+    
+    return condiciones, params
+
+
+def consultar_pagina(cursor, filtros, params_filtros, posicion=None, limite=CATALOGO_PAGE_SIZE):
+    """
+    Obtiene una página del catálogo usando paginación keyset
+    
+    El orden es: prioridad de estado_entrega ASC, proxima_ejecucion ASC,
+    created_at DESC y id_reporte DESC como desempate. Las cuatro llaves son
+    columnas NOT NULL del índice idx_reporte_catalogo (mismas direcciones),
+    así que MySQL lee la página en orden de índice sin filesort y la
+    siguiente arranca justo después de `posicion`, sin OFFSET.
+    
+    Returns:
+        tuple: (reportes de la página, hay_mas)
+    """
+    query = CATALOGO_SELECT + CATALOGO_FROM + filtros
+    params = list(params_filtros)
+    
+    if posicion:
+        query += """
+            AND (
+                r.orden_prioridad > %s
+                OR (r.orden_prioridad = %s AND (
+                    r.orden_proxima > %s
+                    OR (r.orden_proxima = %s AND (
+                        r.created_at < %s
+                        OR (r.created_at = %s AND r.id_reporte < %s)
+                    ))
+                ))
+            )
         """
+        params.extend([
+            posicion['prioridad'], posicion['prioridad'],
+            posicion['proxima'], posicion['proxima'],
+            posicion['creado'], posicion['creado'], posicion['id_reporte']
+        ])
+    
+    query += """
+        ORDER BY
+            r.orden_prioridad ASC,
+            r.orden_proxima ASC,
+            r.created_at DESC,
+            r.id_reporte DESC
+        LIMIT %s
+    """
+    params.append(limite + 1)
+    
+    cursor.execute(query, params)
+    reportes = cursor.fetchall()
+    
+    hay_mas = len(reportes) > limite
+    return reportes[:limite], hay_mas
+
+
+def contar_reportes(cursor, filtros, params_filtros):
+    """Total de reportes que cumplen los filtros (solo se calcula en la primera página)"""
+    cursor.execute(f"SELECT COUNT(*) as total {CATALOGO_FROM} {filtros}", params_filtros)
+    return cursor.fetchone()['total']
+
+
+def decorar_reporte(reporte):
+    """Agrega los campos de presentación (fechas formateadas, tiempo restante, badges)"""
+    # Formatear próxima ejecución
+    if reporte['proxima_ejecucion']:
+        reporte['proxima_ejecucion_formatted'] = reporte['proxima_ejecucion'].strftime('%d/%m/%Y %H:%M')
         
-        print(f"📋 Ejecutando query de catálogo...")
-        print(f"   Búsqueda: {filtro_busqueda or 'ninguna'}")
-        print(f"   Estado: {filtro_estado or 'todos'}")
-        print(f"   Criticidad: {filtro_criticidad or 'todas'}")
-        
-        cursor.execute(query, params)
-        reportes = cursor.fetchall()
+        # Calcular tiempo restante en formato legible
+        horas = reporte['horas_hasta_vencimiento']
+        if horas is not None:
+            if horas < 0:
+                dias_retraso = abs(horas) // 24
+                horas_retraso = abs(horas) % 24
+                if dias_retraso > 0:
+                    reporte['tiempo_restante'] = f"{int(dias_retraso)}d {int(horas_retraso)}h de retraso"
+                else:
+                    reporte['tiempo_restante'] = f"{int(abs(horas))}h de retraso"
+            elif horas < 24:
+                reporte['tiempo_restante'] = f"{int(horas)}h restantes"
+            else:
+                dias = horas // 24
+                horas_restantes = int(horas % 24)
+                reporte['tiempo_restante'] = f"{int(dias)}d {horas_restantes}h"
+        else:
+            reporte['tiempo_restante'] = 'N/A'
+    else:
+        reporte['proxima_ejecucion_formatted'] = 'No programado'
+        reporte['tiempo_restante'] = 'N/A'
+    
+    # Formatear última entrega
+    if reporte['ultima_entrega']:
+        reporte['ultima_entrega_formatted'] = reporte['ultima_entrega'].strftime('%d/%m/%Y %H:%M')
+    else:
+        reporte['ultima_entrega_formatted'] = 'Nunca'
+    
+    # Badge de estado
+    estado_calc = reporte.get('estado_calculado', 'SIN_PROGRAMAR')
+    reporte['badge_estado'] = ESTADO_BADGES.get(estado_calc, ESTADO_BADGES['SIN_PROGRAMAR'])
+    
+    # Badge de criticidad
+    reporte['badge_criticidad'] = CRITICIDAD_BADGES.get(reporte['criticidad'], CRITICIDAD_BADGES['MEDIA'])
+    
+    return reporte
+
+
+def cargar_pagina_catalogo(cursor, args):
+    """
+    Lee filtros, cursor y límite de los argumentos del request y carga la página
+    
+    Returns:
+        dict: reportes, filtros aplicados, siguiente_cursor, total_estimado, limite
+    """
+    filtro_busqueda = args.get('q', '').strip()
+    filtro_estado = args.get('estado', '')
+    filtro_criticidad = args.get('criticidad', '')
+    filtro_entrega = args.get('entrega', '')
+    limite = leer_limite(args.get('limite'))
+    posicion = decodificar_cursor(args.get('cursor', ''))
+    
+    indice = obtener_indice(cursor) if filtro_busqueda else None
+    filtros, params_filtros = construir_filtros(
+        filtro_busqueda, filtro_estado, filtro_criticidad, indice, filtro_entrega
+    )
+    
+    logger.debug(
+        f"📋 Catálogo: búsqueda {filtro_busqueda or 'ninguna'}, estado {filtro_estado or 'todos'}, "
+        f"criticidad {filtro_criticidad or 'todas'}, entrega {filtro_entrega or 'todas'}"
+    )
+    
+    reportes, hay_mas = consultar_pagina(cursor, filtros, params_filtros, posicion, limite)
+    
+    # El total se calcula una vez y viaja dentro del cursor
+    if posicion and posicion['total_estimado'] is not None:
+        total_estimado = posicion['total_estimado']
+    elif not hay_mas and not posicion:
+        total_estimado = len(reportes)
+    else:
+        total_estimado = contar_reportes(cursor, filtros, params_filtros)
+    
+    logger.debug(f"✓ Página con {len(reportes)} reportes (total estimado: {total_estimado})")
+    
+    # Recursos de todos los reportes de la página en una sola consulta
+    adjuntar_recursos(cursor, reportes)
+    
+    return {
+        'reportes': reportes,
+        'filtro_busqueda': filtro_busqueda,
+        'filtro_estado': filtro_estado,
+        'filtro_criticidad': filtro_criticidad,
+        'filtro_entrega': filtro_entrega,
+        'siguiente_cursor': codificar_cursor(reportes[-1], total_estimado) if hay_mas else None,
+        'total_estimado': total_estimado,
+        'limite': limite
+    }
+
+
+def generacion_busqueda():
+    """Solo las búsquedas (?q=) salen del índice en memoria"""
+    return busqueda.generacion() if request.args.get('q', '').strip() else None
+
+
+@catalogos_bp.route('/catalogos')
+@cache_http.cachear(ttl=60, generacion=generacion_busqueda)
+def index():
+    """
+    Catálogo de reportes con próxima ejecución y estado calculados
+    Paginado con cursor keyset (?cursor=...&limite=...)
+    """
+    
+    try:
+        conn = get_request_connection()
+        cursor = conn.cursor(dictionary=True)
         
-        print(f"✓ Encontrados {len(reportes)} reportes")
+        pagina = cargar_pagina_catalogo(cursor, request.args)
         
         # Procesar cada reporte
-        for reporte in reportes:
-            # Verificar recursos
-            cursor.execute("""
-                SELECT r.tipo, r.url, r.nombre 
-                FROM reporte_recurso rr
-                JOIN recurso r ON rr.recurso_id = r.id_recurso
-                WHERE rr.reporte_id = %s
-            """, (reporte['id_reporte'],))
-            recursos = cursor.fetchall()
-            
-            reporte['tiene_gitlab'] = any(rec['tipo'] == 'GITLAB' for rec in recursos)
-            reporte['tiene_pdf'] = any(rec['tipo'] == 'PDF' for rec in recursos)
-            reporte['gitlab_url'] = next((rec['url'] for rec in recursos if rec['tipo'] == 'GITLAB'), None)
-            
-            # Formatear próxima ejecución
-            if reporte['proxima_ejecucion']:
-                reporte['proxima_ejecucion_formatted'] = reporte['proxima_ejecucion'].strftime('%d/%m/%Y %H:%M')
-                
-                # Calcular tiempo restante en formato legible
-                horas = reporte['horas_hasta_vencimiento']
-                if horas is not None:
-                    if horas < 0:
-                        dias_retraso = abs(horas) // 24
-                        horas_retraso = abs(horas) % 24
-                        if dias_retraso > 0:
-                            reporte['tiempo_restante'] = f"{int(dias_retraso)}d {int(horas_retraso)}h de retraso"
-                        else:
-                            reporte['tiempo_restante'] = f"{int(abs(horas))}h de retraso"
-                    elif horas < 24:
-                        reporte['tiempo_restante'] = f"{int(horas)}h restantes"
-                    else:
-                        dias = horas // 24
-                        horas_restantes = int(horas % 24)
-                        reporte['tiempo_restante'] = f"{int(dias)}d {horas_restantes}h"
-                else:
-                    reporte['tiempo_restante'] = 'N/A'
-            else:
-                reporte['proxima_ejecucion_formatted'] = 'No programado'
-                reporte['tiempo_restante'] = 'N/A'
-            
-            # Formatear última entrega
-            if reporte['ultima_entrega']:
-                reporte['ultima_entrega_formatted'] = reporte['ultima_entrega'].strftime('%d/%m/%Y %H:%M')
-            else:
-                reporte['ultima_entrega_formatted'] = 'Nunca'
-            
-            # Badge de estado
-            estado_badges = {
-                'RETRASADO': {'color': 'red', 'icon': 'exclamation-triangle', 'text': 'Retrasado'},
-                'PROXIMO_VENCER': {'color': 'yellow', 'icon': 'clock', 'text': 'Próximo a vencer'},
-                'EN_TIEMPO': {'color': 'green', 'icon': 'check-circle', 'text': 'En tiempo'},
-                'ENTREGADO': {'color': 'blue', 'icon': 'check-double', 'text': 'Entregado'},
-                'SIN_PROGRAMAR': {'color': 'gray', 'icon': 'calendar-times', 'text': 'Sin programar'}
-            }
-            
-            estado_calc = reporte.get('estado_calculado', 'SIN_PROGRAMAR')
-            reporte['badge_estado'] = estado_badges.get(estado_calc, estado_badges['SIN_PROGRAMAR'])
-            
-            # Badge de criticidad
-            criticidad_badges = {
-                'CRITICA': {'color': 'red', 'text': 'Crítica'},
-                'ALTA': {'color': 'orange', 'text': 'Alta'},
-                'MEDIA': {'color': 'yellow', 'text': 'Media'},
-                'BAJA': {'color': 'green', 'text': 'Baja'}
-            }
-            reporte['badge_criticidad'] = criticidad_badges.get(reporte['criticidad'], criticidad_badges['MEDIA'])
+        for reporte in pagina['reportes']:
+            decorar_reporte(reporte)
         
-        # Obtener filtros disponibles para los dropdowns
-        cursor.execute("SELECT DISTINCT estado FROM reporte ORDER BY estado")
-        estados_disponibles = [row['estado'] for row in cursor.fetchall()]
+        # Obtener filtros disponibles para los dropdowns (caché de referencia)
+        estados_disponibles = datos_referencia.estados_reporte()
         
         criticidades_disponibles = ['CRITICA', 'ALTA', 'MEDIA', 'BAJA']
         
         cursor.close()
         conn.close()
         
-        print(f"✅ Catálogo cargado exitosamente con {len(reportes)} reportes")
+        logger.debug(f"✅ Catálogo cargado con {len(pagina['reportes'])} reportes")
         
         return render_template(
             'catalogos.html',
-            reportes=reportes,
             estados_disponibles=estados_disponibles,
             criticidades_disponibles=criticidades_disponibles,
-            filtro_busqueda=filtro_busqueda,
-            filtro_estado=filtro_estado,
-            filtro_criticidad=filtro_criticidad
+            **pagina
         )
         
     except Exception as e:
-        print(f"❌ ERROR en catálogo: {type(e).__name__}: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ ERROR en catálogo: {type(e).__name__}: {str(e)}")
         
         flash(f"❌ Error al cargar catálogo: {str(e)}", "error")
+        cache_http.no_cachear()
         return render_template('catalogos.html', reportes=[], estados_disponibles=[], criticidades_disponibles=[])
 
 
+@catalogos_bp.route('/api/catalogos')
+@cache_http.cachear(ttl=60, generacion=generacion_busqueda)
+def api_catalogos():
+    """
+    Variante JSON ligera del catálogo (misma paginación keyset)
+    
+    Retorna:
+    {
+        "reportes": [...],
+        "siguiente_cursor": str | null,
+        "total_estimado": int,
+        "limite": int
+    }
+    """
+    try:
+        conn = get_request_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        pagina = cargar_pagina_catalogo(cursor, request.args)
+        
+        cursor.close()
+        conn.close()
+        
+        reportes = [{
+            'id': r['id_reporte'],
+            'codigo_interno': r['codigo_interno'],
+            'nombre': r['nombre'],
+            'tipo': r['tipo_nombre'],
+            'criticidad': r['criticidad'],
+            'estado': r['estado'],
+            'estado_entrega': r['estado_entrega'],
+            'estado_calculado': r['estado_calculado'],
+            'frecuencia': r['frecuencia'],
+            'proxima_ejecucion': r['proxima_ejecucion'].isoformat() if r['proxima_ejecucion'] else None,
+            'ultima_entrega': r['ultima_entrega'].isoformat() if r['ultima_entrega'] else None,
+            'horas_hasta_vencimiento': r['horas_hasta_vencimiento'],
+            'tiene_gitlab': r['tiene_gitlab'],
+            'tiene_pdf': r['tiene_pdf'],
+            'gitlab_url': r['gitlab_url']
+        } for r in pagina['reportes']]
+        
+        return jsonify({
+            'reportes': reportes,
+            'siguiente_cursor': pagina['siguiente_cursor'],
+            'total_estimado': pagina['total_estimado'],
+            'limite': pagina['limite']
+        })
+        
+    except Exception as e:
+        logger.error(f"❌ ERROR en API de catálogo: {type(e).__name__}: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
 @catalogos_bp.route('/reporte/<int:reporte_id>')
+@cache_http.cachear(ttl=60)
 def ver_detalle(reporte_id):
     """Vista de detalle de un reporte"""
     
     try:
-        conn = get_connection()
+        conn = get_request_connection()
         cursor = conn.cursor(dictionary=True)
         
         # Obtener reporte completo
@@ -278,6 +540,6 @@ def ver_detalle(reporte_id):
         return render_template('reporte_detalle.html', reporte=reporte, historial=historial)
         
     except Exception as e:
-        print(f"❌ ERROR al ver detalle: {str(e)}")
+        logger.error(f"❌ ERROR al ver detalle: {str(e)}")
         flash(f"❌ Error: {str(e)}", "error")
         return redirect('/catalogos')
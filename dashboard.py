@@ -1,26 +1,27 @@
 from flask import Blueprint, render_template
-from db import get_connection
+from db import get_request_connection, init_app
+import estadisticas
 
 dashboard_bp = Blueprint('dashboard', __name__)
+dashboard_bp.record_once(lambda state: init_app(state.app))
 
 @dashboard_bp.route('/')
 @dashboard_bp.route('/dashboard')
 def index():
     """Dashboard principal con estadísticas"""
     
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+    # Estadísticas generales (contadores materializados, O(1))
+    contadores = estadisticas.leer()
+    por_criticidad = estadisticas.agrupados(contadores, 'criticidad')
+    stats = {
+        'total_reportes': contadores.get('total', 0),
+        'alta_criticidad': por_criticidad.get('ALTA', 0),
+        'media_criticidad': por_criticidad.get('MEDIA', 0),
+        'baja_criticidad': por_criticidad.get('BAJA', 0)
+    }
     
-    # Estadísticas generales
-    cursor.execute("""
-        SELECT 
-            COUNT(*) as total_reportes,
-            SUM(CASE WHEN criticidad = 'ALTA' THEN 1 ELSE 0 END) as alta_criticidad,
-            SUM(CASE WHEN criticidad = 'MEDIA' THEN 1 ELSE 0 END) as media_criticidad,
-            SUM(CASE WHEN criticidad = 'BAJA' THEN 1 ELSE 0 END) as baja_criticidad
-        FROM reporte
-    """)
-    stats = cursor.fetchone()
+    conn = get_request_connection()
+    cursor = conn.cursor(dictionary=True)
     
     # Últimos reportes creados - COLUMNA CORREGIDA
     cursor.execute("""
@@ -38,20 +39,20 @@ def index():
     """)
     ultimos_reportes = cursor.fetchall()
     
-    # Reportes por frecuencia
-    cursor.execute("""
-        SELECT 
-            s.frecuencia,
-            COUNT(s.reporte_id) as cantidad
-        FROM reporte_schedule s
-        GROUP BY s.frecuencia
-        ORDER BY cantidad DESC
-    """)
-    reportes_por_frecuencia = cursor.fetchall()
-    
     cursor.close()
     conn.close()
     
+    # Reportes por frecuencia
+    reportes_por_frecuencia = sorted(
+        (
+            {'frecuencia': frecuencia, 'cantidad': cantidad}
+            for frecuencia, cantidad in estadisticas.agrupados(contadores, 'frecuencia').items()
+            if cantidad
+        ),
+        key=lambda f: f['cantidad'],
+        reverse=True
+    )
+    
     return render_template(
         'dashboard.html',
         stats=stats,
@@ -0,0 +1,155 @@
+"""
+Caché de datos de referencia
+Tipos, categorías, áreas y dominios ENUM: casi nunca cambian,
+se sirven desde memoria con TTL e invalidación explícita
+"""
+
+import os
+import re
+import threading
+import time
+
+from db import get_request_connection
+
+REFERENCIA_TTL_SEGUNDOS = int(os.environ.get('REFERENCIA_TTL_SEGUNDOS', 600))
+
+# Valores de un ENUM: 'valor' con comillas escapadas como ''
+PATRON_VALOR_ENUM = re.compile(r"'((?:[^']|'')*)'")
+
+
+class CacheReferencia:
+    """Caché clave → valor con vencimiento por TTL"""
+
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self._datos = {}
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave, cargador):
+        """Retorna el valor en caché o lo carga con cargador() si no existe o venció"""
+        ahora = time.monotonic()
+        entrada = self._datos.get(clave)
+        if entrada and entrada[0] > ahora:
+            self.aciertos += 1
+            return entrada[1]
+
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada and entrada[0] > time.monotonic():
+                return entrada[1]
+            self.fallos += 1
+            valor = cargador()
+            self._datos[clave] = (time.monotonic() + self.ttl, valor)
+            return valor
+
+    def invalidar(self, clave=None):
+        """Invalida una clave o toda la caché"""
+        with self._lock:
+            if clave is None:
+                self._datos.clear()
+            else:
+                self._datos.pop(clave, None)
+
+
+cache_referencia = CacheReferencia(REFERENCIA_TTL_SEGUNDOS)
+
+
+def _consultar(query, params=()):
+    conn = get_request_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def parsear_enum(column_type):
+    """enum('A','B','C') → ['A', 'B', 'C']"""
+    return [valor.replace("''", "'") for valor in PATRON_VALOR_ENUM.findall(column_type or '')]
+
+
+# ============================================================================
+# CATÁLOGOS
+# ============================================================================
+
+def tipos_reporte():
+    return cache_referencia.obtener('tipos', lambda: _consultar(
+        "SELECT id_tipo, nombre, prefijo_codigo FROM tipo_reporte ORDER BY nombre"
+    ))
+
+
+def prefijo_tipo(tipo_id):
+    """Prefijo de código del tipo (None si el tipo no existe)"""
+    for tipo in tipos_reporte():
+        if tipo['id_tipo'] == tipo_id:
+            return tipo['prefijo_codigo']
+    # Tipo desconocido: puede ser nuevo, refrescar una vez
+    cache_referencia.invalidar('tipos')
+    for tipo in tipos_reporte():
+        if tipo['id_tipo'] == tipo_id:
+            return tipo['prefijo_codigo']
+    raise ValueError(f"Tipo de reporte {tipo_id} no encontrado")
+
+
+def categorias():
+    return cache_referencia.obtener('categorias', lambda: _consultar(
+        "SELECT id_categoria, nombre FROM categoria_reporte ORDER BY nombre"
+    ))
+
+
+def areas():
+    return cache_referencia.obtener('areas', lambda: _consultar(
+        "SELECT id_area, nombre FROM area ORDER BY nombre"
+    ))
+
+
+def horas_alerta():
+    """Horas antes del vencimiento en que un reporte pasa a PROXIMO_VENCER, por frecuencia (config_alertas)"""
+    return cache_referencia.obtener('horas_alerta', lambda: {
+        fila['frecuencia']: fila['horas_antes_alerta']
+        for fila in _consultar("SELECT frecuencia, horas_antes_alerta FROM config_alertas")
+        if fila['horas_antes_alerta'] is not None
+    })
+
+
+def dominios_enum(tabla):
+    """
+    Dominios de todas las columnas ENUM de una tabla en una sola consulta
+
+    Returns:
+        dict: {columna: [valores]}
+    """
+    def cargar():
+        filas = _consultar("""
+            SELECT COLUMN_NAME as columna, COLUMN_TYPE as tipo
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = %s
+            AND DATA_TYPE = 'enum'
+        """, (tabla,))
+        return {fila['columna']: parsear_enum(fila['tipo']) for fila in filas}
+
+    return cache_referencia.obtener(f'enum:{tabla}', cargar)
+
+
+def valores_enum(tabla, columna):
+    return dominios_enum(tabla).get(columna, [])
+
+
+def estados_reporte():
+    """Estados posibles de reporte: dominio del ENUM o, si la columna no es ENUM, los valores presentes"""
+    valores = valores_enum('reporte', 'estado')
+    if valores:
+        return sorted(valores)
+    return cache_referencia.obtener('estados', lambda: [
+        fila['estado'] for fila in _consultar("SELECT DISTINCT estado FROM reporte ORDER BY estado")
+    ])
+
+
+def invalidar_referencias(clave=None):
+    """Invalidación explícita (después de editar tipos, categorías, áreas o el esquema)"""
+    cache_referencia.invalidar(clave)
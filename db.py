@@ -0,0 +1,347 @@
+"""
+Conexión a Base de Datos - Pool de conexiones MySQL
+Maneja el pool compartido, la conexión por request y las métricas de checkout
+"""
+
+import os
+import threading
+import time
+import queue
+
+import mysql.connector
+from flask import g, has_app_context
+
+import metricas
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+DB_CONFIG = {
+    'host': os.environ.get('DB_HOST', 'localhost'),
+    'port': int(os.environ.get('DB_PORT', 3306)),
+    'user': os.environ.get('DB_USER', 'root'),
+    'password': os.environ.get('DB_PASSWORD', ''),
+    'database': os.environ.get('DB_NAME', 'alejandria'),
+    'charset': 'utf8mb4',
+    'autocommit': False,
+}
+
+POOL_CONFIG = {
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+    # Segundos de vida máxima de una conexión antes de reciclarla
+    'recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    # Segundos máximos esperando una conexión libre
+    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    # Verificar con ping las conexiones que llevan más de N segundos inactivas
+    'ping_after': int(os.environ.get('DB_POOL_PING_AFTER', 30)),
+}
+
+
+class PoolAgotadoError(Exception):
+    """No hubo conexión libre dentro del tiempo de espera configurado"""
+
+
+# ============================================================================
+# POOL DE CONEXIONES
+# ============================================================================
+
+class CursorInstrumentado:
+    """
+    Cursor que mide cada viaje al servidor (ver metricas.py)
+    y lo cuenta en conexion.round_trips
+    """
+
+    def __init__(self, cursor, conexion):
+        self._cursor = cursor
+        self._conexion = conexion
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def _medir(self, viajes, funcion, *args):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args)
+        finally:
+            self._conexion.round_trips += viajes
+            metricas.registrar_consulta(time.perf_counter() - inicio, consultas=viajes)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        return self._medir(1, lambda: self._cursor.execute(operation, params, *args, **kwargs))
+
+    def executemany(self, operation, seq_params):
+        seq_params = list(seq_params)
+        # mysql-connector junta un INSERT ... VALUES en una sola sentencia multi-fila;
+        # cualquier otra sentencia se ejecuta una vez por fila
+        if operation.lstrip()[:6].upper() == 'INSERT':
+            viajes = 1 if seq_params else 0
+        else:
+            viajes = len(seq_params)
+        return self._medir(viajes, self._cursor.executemany, operation, seq_params)
+
+    def fetchone(self):
+        fila = self._cursor.fetchone()
+        if fila is not None:
+            metricas.registrar_filas(1)
+        return fila
+
+    def fetchmany(self, *args, **kwargs):
+        filas = self._cursor.fetchmany(*args, **kwargs)
+        metricas.registrar_filas(len(filas))
+        return filas
+
+    def fetchall(self):
+        filas = self._cursor.fetchall()
+        metricas.registrar_filas(len(filas))
+        return filas
+
+
+class ConexionPool:
+    """
+    Conexión del pool: delega todo en la conexión MySQL real,
+    pero close() la devuelve al pool en vez de cerrarla.
+    round_trips cuenta sentencias, commits y rollbacks enviados al servidor.
+    """
+
+    def __init__(self, pool, raw, creada_en):
+        self._pool = pool
+        self._raw = raw
+        self._creada_en = creada_en
+        self._cerrada = False
+        self.round_trips = 0
+
+    def __getattr__(self, nombre):
+        return getattr(self._raw, nombre)
+
+    def cursor(self, *args, **kwargs):
+        return CursorInstrumentado(self._raw.cursor(*args, **kwargs), self)
+
+    def _medir(self, funcion):
+        inicio = time.perf_counter()
+        try:
+            return funcion()
+        finally:
+            self.round_trips += 1
+            metricas.registrar_consulta(time.perf_counter() - inicio)
+
+    def commit(self):
+        return self._medir(self._raw.commit)
+
+    def rollback(self):
+        return self._medir(self._raw.rollback)
+
+    def close(self):
+        if self._cerrada:
+            return
+        self._cerrada = True
+        self._pool._devolver(self._raw, self._creada_en)
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones MySQL con:
+    - Tamaño máximo configurable
+    - Health check (ping) de conexiones inactivas
+    - Reciclado de conexiones después de N segundos
+    - Timeout y métricas de checkout
+    """
+
+    def __init__(self, config, pool_size=10, recycle=1800, timeout=10, ping_after=30):
+        self.config = config
+        self.pool_size = pool_size
+        self.recycle = recycle
+        self.timeout = timeout
+        self.ping_after = ping_after
+
+        self._libres = queue.LifoQueue()
+        self._creadas = 0
+        self._lock = threading.Lock()
+
+        self.metricas = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'creadas': 0,
+            'recicladas': 0,
+            'descartadas': 0,
+            'espera_total_ms': 0.0,
+            'espera_max_ms': 0.0,
+        }
+
+    def _crear(self):
+        raw = mysql.connector.connect(**self.config)
+        with self._lock:
+            self.metricas['creadas'] += 1
+        return raw, time.monotonic()
+
+    def _descartar(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._creadas -= 1
+            self.metricas['descartadas'] += 1
+
+    def _es_valida(self, raw, creada_en, devuelta_en):
+        """Recicla conexiones viejas y hace ping a las que llevan tiempo inactivas"""
+        ahora = time.monotonic()
+        if self.recycle and ahora - creada_en > self.recycle:
+            with self._lock:
+                self.metricas['recicladas'] += 1
+            return False
+        if ahora - devuelta_en > self.ping_after:
+            try:
+                raw.ping(reconnect=False)
+            except Exception:
+                return False
+        return True
+
+    def obtener(self):
+        """Obtiene una conexión del pool, esperando como máximo `timeout` segundos"""
+        inicio = time.monotonic()
+        limite = inicio + self.timeout
+
+        try:
+            while True:
+                try:
+                    raw, creada_en, devuelta_en = self._libres.get_nowait()
+                    if self._es_valida(raw, creada_en, devuelta_en):
+                        return ConexionPool(self, raw, creada_en)
+                    self._descartar(raw)
+                    continue
+                except queue.Empty:
+                    pass
+
+                with self._lock:
+                    puede_crear = self._creadas < self.pool_size
+                    if puede_crear:
+                        self._creadas += 1
+
+                if puede_crear:
+                    try:
+                        raw, creada_en = self._crear()
+                    except Exception:
+                        with self._lock:
+                            self._creadas -= 1
+                        raise
+                    return ConexionPool(self, raw, creada_en)
+
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    with self._lock:
+                        self.metricas['timeouts'] += 1
+                    raise PoolAgotadoError(
+                        f"Sin conexiones libres después de {self.timeout}s (pool_size={self.pool_size})"
+                    )
+
+                try:
+                    raw, creada_en, devuelta_en = self._libres.get(timeout=restante)
+                except queue.Empty:
+                    continue
+                if self._es_valida(raw, creada_en, devuelta_en):
+                    return ConexionPool(self, raw, creada_en)
+                self._descartar(raw)
+        finally:
+            espera_ms = (time.monotonic() - inicio) * 1000
+            metricas.registrar_espera_conexion(espera_ms / 1000)
+            with self._lock:
+                self.metricas['checkouts'] += 1
+                self.metricas['espera_total_ms'] += espera_ms
+                self.metricas['espera_max_ms'] = max(self.metricas['espera_max_ms'], espera_ms)
+
+    def _devolver(self, raw, creada_en):
+        """Regresa la conexión al pool, deshaciendo cualquier transacción abierta"""
+        try:
+            if raw.in_transaction:
+                raw.rollback()
+        except Exception:
+            self._descartar(raw)
+            return
+        self._libres.put((raw, creada_en, time.monotonic()))
+
+    def estadisticas(self):
+        """Snapshot de métricas del pool"""
+        with self._lock:
+            stats = dict(self.metricas)
+            stats['pool_size'] = self.pool_size
+            stats['abiertas'] = self._creadas
+        stats['libres'] = self._libres.qsize()
+        stats['en_uso'] = stats['abiertas'] - stats['libres']
+        stats['espera_promedio_ms'] = (
+            stats['espera_total_ms'] / stats['checkouts'] if stats['checkouts'] else 0.0
+        )
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Pool global del proceso (se crea en el primer uso)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolConexiones(DB_CONFIG, **POOL_CONFIG)
+    return _pool
+
+
+def get_connection():
+    """
+    Obtiene una conexión del pool.
+    Llamar a conn.close() la devuelve al pool.
+    """
+    return get_pool().obtener()
+
+
+# ============================================================================
+# CONEXIÓN POR REQUEST
+# ============================================================================
+
+class ConexionRequest:
+    """
+    Conexión compartida durante todo el request.
+    close() no hace nada: la conexión se libera en el teardown de la app.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+    def close(self):
+        pass
+
+
+def get_request_connection():
+    """
+    Obtiene la conexión compartida del request actual.
+    Blueprints y ReporteService la reutilizan para evitar un handshake por consulta.
+    Fuera de un contexto de Flask (scripts, CLI) devuelve una conexión normal del pool.
+    """
+    if not has_app_context():
+        return get_connection()
+
+    if 'db_conn' not in g:
+        g.db_conn = ConexionRequest(get_connection())
+    return g.db_conn
+
+
+def liberar_conexion_request(exception=None):
+    """Devuelve al pool la conexión del request (registrado como teardown)"""
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        conn._conn.close()
+
+
+def init_app(app):
+    """Registra el teardown de la conexión por request y la instrumentación SQL (idempotente)"""
+    if 'alejandria_db' in app.extensions:
+        return
+    app.extensions['alejandria_db'] = get_pool
+    app.teardown_appcontext(liberar_conexion_request)
+    metricas.init_app(app)
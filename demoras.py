@@ -0,0 +1,302 @@
+"""
+Propagación de demoras sobre el grafo de dependencias
+Proyecta cuándo estará listo cada reporte (próxima ejecución + retraso
+actual o previsto por su historial) y lo propaga a los dependientes en una
+sola pasada lineal en orden topológico, con la ruta crítica de cada uno
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+import logging
+
+from grafo_dependencias import obtener_grafo
+
+logger = logging.getLogger(__name__)
+
+DEMORAS_CONFIG = {
+    # Recarga completa de programación e historial (cambios de otros procesos)
+    'ttl': int(os.environ.get('DEMORAS_TTL_SEGUNDOS', 300)),
+    # Segundos que se reutiliza una proyección sin cambios (los vencidos se corren con el reloj)
+    'recalculo': int(os.environ.get('DEMORAS_RECALCULO_SEGUNDOS', 60)),
+    # Días de historial_entregas para el retraso previsto
+    'ventana_dias': int(os.environ.get('DEMORAS_VENTANA_DIAS', 180)),
+    # Peso de cada entrega nueva en el retraso previsto (promedio exponencial)
+    'alfa': float(os.environ.get('DEMORAS_ALFA', 0.3)),
+    # Minutos que tarda un dependiente desde que recibe el último insumo
+    'minutos_proceso': int(os.environ.get('DEMORAS_MINUTOS_PROCESO', 0)),
+    # Retraso proyectado a partir del cual se considera que se incumple la próxima ejecución
+    'tolerancia_minutos': int(os.environ.get('DEMORAS_TOLERANCIA_MINUTOS', 15)),
+}
+
+SQL_PROGRAMACION = """
+    SELECT id_reporte, proxima_ejecucion
+    FROM reporte
+"""
+
+SQL_RETRASO_HISTORICO = """
+    SELECT reporte_id, AVG(minutos_retraso)
+    FROM historial_entregas
+    WHERE fecha_programada >= %s
+    GROUP BY reporte_id
+"""
+
+
+class MotorDemoras:
+    """
+    Proyección de demoras
+
+    proximas[id]   = próxima ejecución (None: sin programar / ADHOC)
+    previsto[id]   = retraso previsto en minutos (promedio del historial, luego exponencial)
+    proyeccion[id] = (listo_previsto, via, origen): via es el padre que fija la
+                     fecha (None si la fija el propio reporte) y origen el
+                     primer reporte de la ruta crítica
+    """
+
+    def __init__(self, ttl=300, recalculo=60, ventana_dias=180, alfa=0.3,
+                 minutos_proceso=0, tolerancia_minutos=15):
+        self.ttl = ttl
+        self.recalculo = recalculo
+        self.ventana_dias = ventana_dias
+        self.alfa = alfa
+        self.proceso = timedelta(minutes=minutos_proceso)
+        self.tolerancia = timedelta(minutes=tolerancia_minutos)
+
+        self.proximas = {}
+        self.previsto = {}
+        self.proyeccion = {}
+        self.cargado_en = None
+        self.calculado_en = None
+        self._version_grafo = None
+        self._sucio = True
+        self._lock = threading.RLock()
+
+        self.contadores = {
+            'cargas': 0,
+            'calculos': 0,
+            'entregas_notificadas': 0,
+            'ultimo_calculo_ms': 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # DATOS
+    # ------------------------------------------------------------------
+
+    def cargar(self, cursor):
+        """Programación de todos los reportes y retraso promedio del historial (2 consultas)"""
+        cursor.execute(SQL_PROGRAMACION)
+        proximas = {id_reporte: proxima for id_reporte, proxima in cursor.fetchall()}
+
+        cursor.execute(SQL_RETRASO_HISTORICO, (datetime.now() - timedelta(days=self.ventana_dias),))
+        previsto = {id_reporte: float(promedio or 0) for id_reporte, promedio in cursor.fetchall()}
+
+        with self._lock:
+            self.proximas = proximas
+            self.previsto = previsto
+            self.cargado_en = time.monotonic()
+            self._sucio = True
+            self.contadores['cargas'] += 1
+
+    def vencido(self):
+        return self.cargado_en is None or time.monotonic() - self.cargado_en > self.ttl
+
+    def programar(self, id_reporte, proxima_ejecucion):
+        """Próxima ejecución nueva (creación) sin entrega"""
+        with self._lock:
+            self.proximas[id_reporte] = proxima_ejecucion
+            self._sucio = True
+
+    def registrar_entrega(self, id_reporte, minutos_retraso, proxima_ejecucion):
+        """Entrega: avanza la próxima ejecución y ajusta el retraso previsto"""
+        with self._lock:
+            anterior = self.previsto.get(id_reporte)
+            self.previsto[id_reporte] = (
+                float(minutos_retraso) if anterior is None
+                else anterior * (1 - self.alfa) + minutos_retraso * self.alfa
+            )
+            self.proximas[id_reporte] = proxima_ejecucion
+            self._sucio = True
+            self.contadores['entregas_notificadas'] += 1
+
+    # ------------------------------------------------------------------
+    # PROPAGACIÓN
+    # ------------------------------------------------------------------
+
+    def listo_propio(self, id_reporte, ahora):
+        """
+        Cuándo estaría listo el reporte por sí solo
+        Vencido sin entregar: no antes de ahora (retraso real, sigue creciendo)
+        """
+        proxima = self.proximas.get(id_reporte)
+        if not proxima:
+            return None
+        listo = proxima + timedelta(minutes=self.previsto.get(id_reporte, 0.0))
+        if proxima < ahora:
+            return max(listo, ahora)
+        return listo
+
+    def calcular(self, grafo, ahora=None):
+        """
+        Una pasada en orden topológico, O(reportes + dependencias)
+
+        listo(r) = max(listo_propio(r), listo(p) + minutos_proceso por cada padre p)
+        Solo cuenta un padre cuya próxima ejecución cae antes que la del hijo
+        (si cae después, el hijo usa la entrega anterior del padre).
+        """
+        ahora = ahora or datetime.now()
+        inicio = time.perf_counter()
+        proyeccion = {}
+
+        with self._lock, grafo._lock:
+            for nodo in grafo.orden_topologico():
+                listo, via = self.listo_propio(nodo, ahora), None
+                proxima = self.proximas.get(nodo)
+
+                for id_padre in grafo.padres.get(nodo, ()):
+                    if (id_padre, nodo) in grafo.aristas_ciclicas:
+                        continue
+                    listo_padre = proyeccion.get(id_padre, (None,))[0]
+                    if listo_padre is None:
+                        continue
+                    proxima_padre = self.proximas.get(id_padre)
+                    if proxima and proxima_padre and proxima_padre > proxima:
+                        continue
+                    candidato = listo_padre + self.proceso
+                    if listo is None or candidato > listo:
+                        listo, via = candidato, id_padre
+
+                origen = nodo if via is None else proyeccion[via][2]
+                proyeccion[nodo] = (listo, via, origen)
+
+            self.proyeccion = proyeccion
+            self.calculado_en = ahora
+            self._version_grafo = grafo.version
+            self._sucio = False
+
+        ms = (time.perf_counter() - inicio) * 1000
+        self.contadores['calculos'] += 1
+        self.contadores['ultimo_calculo_ms'] = round(ms, 1)
+        logger.debug(f"Demoras proyectadas para {len(proyeccion)} reportes en {ms:.1f} ms")
+        return proyeccion
+
+    def actualizar(self, grafo):
+        """Recalcula si hubo entregas, cambió el grafo o la proyección tiene más de `recalculo` segundos"""
+        with self._lock:
+            if (
+                self._sucio
+                or self._version_grafo != grafo.version
+                or self.calculado_en is None
+                or (datetime.now() - self.calculado_en).total_seconds() > self.recalculo
+            ):
+                self.calcular(grafo)
+
+    # ------------------------------------------------------------------
+    # CONSULTAS
+    # ------------------------------------------------------------------
+
+    def retraso_minutos(self, id_reporte):
+        """Minutos entre la próxima ejecución y la fecha en que estará listo (None sin programación)"""
+        proxima = self.proximas.get(id_reporte)
+        listo = self.proyeccion.get(id_reporte, (None,))[0]
+        if not proxima or listo is None:
+            return None
+        return int((listo - proxima).total_seconds() // 60)
+
+    def incumple(self, id_reporte):
+        proxima = self.proximas.get(id_reporte)
+        listo = self.proyeccion.get(id_reporte, (None,))[0]
+        return bool(proxima and listo and listo - proxima > self.tolerancia)
+
+    def ruta_critica(self, id_reporte):
+        """Reportes desde el origen de la demora hasta id_reporte (siguiendo `via`)"""
+        ruta = []
+        nodo = id_reporte
+        while nodo is not None and nodo in self.proyeccion:
+            ruta.append(nodo)
+            nodo = self.proyeccion[nodo][1]
+        return list(reversed(ruta))
+
+    def detalle(self, grafo, id_reporte, con_ruta=True):
+        listo, via, origen = self.proyeccion.get(id_reporte, (None, None, id_reporte))
+        proxima = self.proximas.get(id_reporte)
+        reporte = grafo.reportes.get(id_reporte) or {}
+        resultado = {
+            'id': id_reporte,
+            'codigo_interno': reporte.get('codigo_interno'),
+            'nombre': reporte.get('nombre'),
+            'proxima_ejecucion': proxima.isoformat() if proxima else None,
+            'listo_previsto': listo.isoformat() if listo else None,
+            'retraso_previsto_min': self.retraso_minutos(id_reporte),
+            'incumple': self.incumple(id_reporte),
+            'causa': 'PROPIA' if via is None else 'HEREDADA',
+            'via': via,
+            'origen': {'id': origen, 'codigo_interno': (grafo.reportes.get(origen) or {}).get('codigo_interno')},
+        }
+        if con_ruta:
+            ruta = self.ruta_critica(id_reporte)
+            resultado['ruta_critica'] = [
+                {
+                    'id': nodo,
+                    'codigo_interno': codigo,
+                    'retraso_previsto_min': self.retraso_minutos(nodo),
+                    'listo_previsto': self.proyeccion[nodo][0].isoformat() if self.proyeccion[nodo][0] else None,
+                }
+                for nodo, codigo in zip(ruta, grafo.codigos(ruta))
+            ]
+        return resultado
+
+    def en_riesgo(self, grafo, incluir_propias=False):
+        """
+        Reportes que incumplirán su próxima ejecución, del mayor retraso al menor
+        (por defecto solo los que heredan la demora de una dependencia)
+        """
+        with self._lock:
+            ids = [
+                id_reporte for id_reporte, (_, via, _) in self.proyeccion.items()
+                if (incluir_propias or via is not None) and self.incumple(id_reporte)
+            ]
+            ids.sort(key=lambda id_reporte: -self.retraso_minutos(id_reporte))
+            return ids
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                **self.contadores,
+                'reportes': len(self.proyeccion),
+                'calculado_en': self.calculado_en.isoformat() if self.calculado_en else None,
+            }
+
+
+motor_demoras = MotorDemoras(**DEMORAS_CONFIG)
+_carga_lock = threading.Lock()
+
+
+def obtener_motor(cursor):
+    """Motor global del proceso con la proyección al día (carga en el primer uso y al vencer el TTL)"""
+    grafo = obtener_grafo(cursor)
+    if motor_demoras.vencido():
+        with _carga_lock:
+            if motor_demoras.vencido():
+                motor_demoras.cargar(cursor)
+    motor_demoras.actualizar(grafo)
+    return motor_demoras, grafo
+
+
+def notificar_programacion(id_reporte, proxima_ejecucion):
+    """Reporte nuevo o reprogramado (si el motor ya está cargado)"""
+    if not motor_demoras.vencido():
+        motor_demoras.programar(id_reporte, proxima_ejecucion)
+
+
+def notificar_entregas(entregas):
+    """Entregas recién confirmadas: [(id_reporte, minutos_retraso, proxima_ejecucion), ...]"""
+    if motor_demoras.vencido():
+        return
+    for id_reporte, minutos_retraso, proxima in entregas:
+        motor_demoras.registrar_entrega(id_reporte, minutos_retraso, proxima)
+
+
+def invalidar_demoras():
+    """Recarga completa en el próximo uso (importaciones, recálculo masivo)"""
+    motor_demoras.cargado_en = None
@@ -5,14 +5,36 @@
 # Permite visualizar: padres -> padres de padres -> ... -> reporte foco -> hijos -> hijos de hijos -> ...
 
 from flask import Blueprint, render_template, jsonify, request
-from db import get_connection
+from db import get_request_connection, init_app
+from grafo_dependencias import (
+    obtener_grafo, notificar_dependencia, validar_dependencia, bloquear_dependencias, liberar_dependencias
+)
+import grafo_dependencias
+from busqueda import obtener_indice
+from demoras import obtener_motor
+import cache_http
 import logging
+import os
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
+# Logging (nivel y muestreo en metricas.configurar_logging)
 logger = logging.getLogger(__name__)
 
 dependencias_bp = Blueprint('dependencias', __name__)
+dependencias_bp.record_once(lambda state: init_app(state.app))
+
+# Motor de recorrido del árbol: 'memoria' (índice en memoria), 'bfs' (una consulta por nivel) o 'cte' (WITH RECURSIVE)
+MOTORES_ARBOL = ('memoria', 'bfs', 'cte')
+MOTOR_ARBOL = os.environ.get('DEPENDENCIAS_MOTOR', 'memoria')
+
+# Reportes origen aceptados por llamada al análisis de impacto
+IMPACTO_MAX_ORIGENES = 500
+
+# Dependientes en riesgo devueltos por defecto en /api/dependencias/demoras
+DEMORAS_LIMITE_DEFECTO = 200
+
+# Valores aceptados al registrar una dependencia (también en la importación masiva)
+TIPOS_DEPENDENCIA = ['DATOS', 'CALCULO', 'CONSOLIDACION', 'VALIDACION']
+CRITICIDADES_DEPENDENCIA = ['BAJA', 'MEDIA', 'ALTA']
 
 # ============================================================================
 # RUTA PRINCIPAL - RENDERIZA LA VISTA
@@ -23,30 +45,25 @@ dependencias_bp = Blueprint('dependencias', __name__)
 def index():
     """Renderiza la página principal de dependencias"""
     try:
-        conn = get_connection()
+        conn = get_request_connection()
         cursor = conn.cursor()
         
-        # Obtener lista de reportes para el selector
-        cursor.execute("""
-            SELECT id_reporte, codigo_interno, nombre, descripcion, audiencia
-            FROM reporte
-            WHERE estado = 'Aprobado'
-            ORDER BY codigo_interno
-        """)
+        # Lista de reportes para el selector (desde el índice en memoria)
+        indice = obtener_indice(cursor)
+        
+        cursor.close()
+        conn.close()
         
         reportes = []
-        for row in cursor.fetchall():
+        for doc in indice.reportes(estado='Aprobado'):
             reportes.append({
-                'id': row[0],
-                'codigo_interno': row[1],
-                'nombre': row[2],
-                'descripcion': row[3],
-                'audiencia': row[4]
+                'id': doc['id'],
+                'codigo_interno': doc['codigo_interno'],
+                'nombre': doc['nombre'],
+                'descripcion': doc['descripcion'],
+                'audiencia': doc['audiencia']
             })
         
-        cursor.close()
-        conn.close()
-        
         return render_template('dependencias.html', reportes=reportes)
         
     except Exception as e:
@@ -59,6 +76,7 @@ def index():
 # ============================================================================
 
 @dependencias_bp.route('/api/dependencias/arbol/<int:id_reporte>')
+@cache_http.cachear(generacion=grafo_dependencias.generacion)
 def obtener_arbol_dependencias(id_reporte):
     """
     Obtiene el árbol completo de dependencias para un reporte focal
@@ -71,24 +89,42 @@ def obtener_arbol_dependencias(id_reporte):
     }
     """
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # 1. Obtener información del reporte focal
-        foco = obtener_info_reporte(cursor, id_reporte)
-        
-        if not foco:
-            return jsonify({"error": "Reporte no encontrado"}), 404
+        # ?motor= permite comparar motores sin reiniciar (benchmarks)
+        motor = request.args.get('motor', MOTOR_ARBOL)
+        if motor not in MOTORES_ARBOL:
+            return jsonify({"error": f"Motor inválido. Debe ser: {', '.join(MOTORES_ARBOL)}"}), 400
         
-        # 2. Construir niveles hacia arriba (upstream - dependencias)
-        niveles_upstream = construir_niveles_upstream(cursor, id_reporte)
+        conn = get_request_connection()
+        cursor = conn.cursor()
         
-        # 3. Construir niveles hacia abajo (downstream - afectaciones)
-        niveles_downstream = construir_niveles_downstream(cursor, id_reporte)
+        if motor == 'memoria':
+            # Índice en memoria (solo consulta la BD en la primera carga o al vencer el TTL)
+            grafo = obtener_grafo(cursor)
+            foco = grafo.info_reporte(id_reporte)
+            if foco:
+                niveles_upstream = grafo.niveles_upstream(id_reporte)
+                niveles_downstream = grafo.niveles_downstream(id_reporte)
+        else:
+            # 1. Obtener información del reporte focal
+            foco = obtener_info_reporte(cursor, id_reporte)
+            
+            if foco and motor == 'cte':
+                # 2-3. Una consulta recursiva por dirección
+                niveles_upstream = construir_niveles_cte(cursor, id_reporte, 'upstream')
+                niveles_downstream = construir_niveles_cte(cursor, id_reporte, 'downstream')
+            elif foco:
+                # 2. Construir niveles hacia arriba (upstream - dependencias)
+                niveles_upstream = construir_niveles_upstream(cursor, id_reporte)
+                
+                # 3. Construir niveles hacia abajo (downstream - afectaciones)
+                niveles_downstream = construir_niveles_downstream(cursor, id_reporte)
         
         cursor.close()
         conn.close()
         
+        if not foco:
+            return jsonify({"error": "Reporte no encontrado"}), 404
+        
         resultado = {
             "foco": foco,
             "niveles_upstream": niveles_upstream,
@@ -97,7 +133,7 @@ def obtener_arbol_dependencias(id_reporte):
             "total_downstream": sum(len(nivel) for nivel in niveles_downstream)
         }
         
-        logger.info(f"Árbol generado para reporte {id_reporte}: {len(niveles_upstream)} niveles upstream, {len(niveles_downstream)} niveles downstream")
+        logger.info(f"Árbol generado para reporte {id_reporte} (motor {motor}): {len(niveles_upstream)} niveles upstream, {len(niveles_downstream)} niveles downstream")
         
         return jsonify(resultado)
         
@@ -307,53 +343,273 @@ def obtener_hijos_directos(cursor, ids_padres, ids_excluir):
     return hijos
 
 
+# ============================================================================
+# MOTOR CTE - UN SOLO ROUND-TRIP POR DIRECCIÓN (MySQL 8)
+# ============================================================================
+
+# Columnas según la dirección: upstream sube por reporte_origen_id, downstream baja por reporte_dependiente_id
+DIRECCIONES_CTE = {
+    'upstream': ('reporte_origen_id', 'reporte_dependiente_id'),
+    'downstream': ('reporte_dependiente_id', 'reporte_origen_id'),
+}
+
+QUERY_NIVELES_CTE = """
+    WITH RECURSIVE alcance (id_reporte, nivel) AS (
+        SELECT %s, 0
+        
+        -- UNION DISTINCT sobre (id, nivel): cada reporte aparece a lo sumo una
+        -- vez por nivel, así que las filas quedan acotadas por reportes × niveles
+        -- (sin guardar la ruta; los ciclos terminan en el límite de nivel)
+        UNION DISTINCT
+        
+        SELECT dr.{vecino}, a.nivel + 1
+        FROM alcance a
+        INNER JOIN reporte_dependencia dr ON dr.{actual} = a.id_reporte
+        INNER JOIN reporte r ON dr.{vecino} = r.id_reporte
+        WHERE a.nivel < %s
+        AND r.estado = 'Aprobado'
+    ),
+    niveles AS (
+        -- Nivel BFS = distancia mínima al reporte inicial
+        SELECT id_reporte, MIN(nivel) as nivel
+        FROM alcance
+        GROUP BY id_reporte
+    )
+    SELECT DISTINCT
+        n.nivel,
+        r.id_reporte,
+        r.codigo_interno,
+        r.nombre,
+        r.descripcion,
+        r.audiencia,
+        r.estado,
+        tr.nombre as tipo,
+        dr.tipo_dependencia,
+        dr.criticidad
+    FROM niveles n
+    INNER JOIN reporte_dependencia dr ON dr.{vecino} = n.id_reporte
+    INNER JOIN niveles np ON dr.{actual} = np.id_reporte AND np.nivel = n.nivel - 1
+    INNER JOIN reporte r ON n.id_reporte = r.id_reporte
+    LEFT JOIN tipo_reporte tr ON r.tipo_id = tr.id_tipo
+    WHERE n.nivel > 0
+    ORDER BY n.nivel, dr.criticidad DESC, r.codigo_interno
+"""
+
+
+def construir_niveles_cte(cursor, id_reporte_inicial, direccion, max_niveles=10):
+    """
+    Construye los niveles de una dirección con una sola consulta WITH RECURSIVE
+    
+    Cada reporte queda en el nivel de su distancia mínima al inicial y solo se
+    listan las aristas que vienen del nivel anterior, igual que el BFS de
+    construir_niveles_upstream / construir_niveles_downstream.
+    """
+    vecino, actual = DIRECCIONES_CTE[direccion]
+    query = QUERY_NIVELES_CTE.format(vecino=vecino, actual=actual)
+    cursor.execute(query, (id_reporte_inicial, max_niveles))
+    
+    niveles = []
+    for row in cursor.fetchall():
+        nivel = row[0]
+        while len(niveles) < nivel:
+            niveles.append([])
+        niveles[nivel - 1].append({
+            'id': row[1],
+            'codigo_interno': row[2],
+            'nombre': row[3],
+            'descripcion': row[4],
+            'audiencia': row[5],
+            'estado': row[6],
+            'tipo': row[7],
+            'tipo_dependencia': row[8],
+            'criticidad': row[9]
+        })
+    
+    if direccion == 'upstream':
+        # Invertir para que el nivel más lejano esté primero (visual)
+        return list(reversed(niveles))
+    return niveles
+
+
+# ============================================================================
+# API - ANÁLISIS DE IMPACTO
+# ============================================================================
+
+def leer_origenes():
+    """Ids origen desde ?ids=1,2&id=3 (GET) o {"ids": [...]} (POST)"""
+    if request.method == 'POST':
+        valores = (request.get_json(silent=True) or {}).get('ids') or []
+        if not isinstance(valores, list):
+            raise ValueError("'ids' debe ser una lista")
+    else:
+        valores = [v for param in request.args.getlist('ids') for v in param.split(',')]
+        valores += request.args.getlist('id')
+
+    try:
+        origenes = list(dict.fromkeys(int(str(v).strip()) for v in valores if str(v).strip()))
+    except ValueError:
+        raise ValueError("Los ids de reporte deben ser numéricos")
+    if not origenes:
+        raise ValueError("Indique al menos un reporte origen (ids)")
+    if len(origenes) > IMPACTO_MAX_ORIGENES:
+        raise ValueError(f"Máximo {IMPACTO_MAX_ORIGENES} reportes origen por llamada")
+    return origenes
+
+
+@dependencias_bp.route('/api/dependencias/impacto', methods=['GET', 'POST'])
+@cache_http.cachear(generacion=grafo_dependencias.generacion)
+def analizar_impacto():
+    """
+    Reportes afectados transitivamente si se retrasan uno o varios reportes origen
+    (sin límite de niveles; índice de alcance en memoria)
+    
+    Parámetros: ids (lista), min_impacto (0-1, opcional), limite (opcional)
+    
+    Retorna:
+    {
+        "origenes": [{"id", "codigo_interno"}, ...],
+        "no_encontrados": [id, ...],
+        "total_afectados": int,
+        "afectados": [{"id", "codigo_interno", ..., "impacto", "distancia", "via", "origenes"}, ...],
+        "motor": "indice" | "recorrido"
+    }
+    """
+    try:
+        origenes = leer_origenes()
+        parametros = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
+        min_impacto = float(parametros.get('min_impacto') or 0)
+        limite = int(parametros['limite']) if parametros.get('limite') else None
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        conn = get_request_connection()
+        cursor = conn.cursor()
+        grafo = obtener_grafo(cursor)
+        cursor.close()
+        conn.close()
+        
+        encontrados = [id_reporte for id_reporte in origenes if grafo.info_reporte(id_reporte)]
+        afectados, motor = grafo.impacto(encontrados)
+        if min_impacto:
+            afectados = [r for r in afectados if r['impacto'] >= min_impacto]
+        total = len(afectados)
+        
+        logger.info(f"Impacto de {len(encontrados)} reporte(s): {total} afectados (motor {motor})")
+        
+        return jsonify({
+            "origenes": [
+                {'id': id_reporte, 'codigo_interno': codigo}
+                for id_reporte, codigo in zip(encontrados, grafo.codigos(encontrados))
+            ],
+            "no_encontrados": [id_reporte for id_reporte in origenes if id_reporte not in encontrados],
+            "total_afectados": total,
+            "afectados": afectados[:limite] if limite else afectados,
+            "motor": motor
+        })
+        
+    except Exception as e:
+        logger.error(f"Error en análisis de impacto: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+# ============================================================================
+# API - PROPAGACIÓN DE DEMORAS
+# ============================================================================
+
+@dependencias_bp.route('/api/dependencias/demoras')
+def listar_demoras():
+    """
+    Dependientes que incumplirán su próxima ejecución por la demora (real o
+    prevista por su historial) de algún reporte aguas arriba, del mayor
+    retraso al menor, con la ruta crítica de cada uno
+    
+    Parámetros: limite (opcional), incluir_propias=1 (también los que se
+    retrasan por sí mismos)
+    
+    Sin caché HTTP: la proyección avanza con el reloj aunque no haya escrituras
+    """
+    try:
+        limite = int(request.args.get('limite') or DEMORAS_LIMITE_DEFECTO)
+    except ValueError:
+        return jsonify({"error": "limite debe ser numérico"}), 400
+    incluir_propias = request.args.get('incluir_propias') in ('1', 'true')
+    
+    try:
+        conn = get_request_connection()
+        cursor = conn.cursor()
+        motor, grafo = obtener_motor(cursor)
+        cursor.close()
+        conn.close()
+        
+        en_riesgo = motor.en_riesgo(grafo, incluir_propias)
+        
+        return jsonify({
+            "calculado_en": motor.calculado_en.isoformat(),
+            "tolerancia_minutos": int(motor.tolerancia.total_seconds() // 60),
+            "total": len(en_riesgo),
+            "reportes": [motor.detalle(grafo, id_reporte) for id_reporte in en_riesgo[:limite]]
+        })
+        
+    except Exception as e:
+        logger.error(f"Error al proyectar demoras: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@dependencias_bp.route('/api/dependencias/demoras/<int:id_reporte>')
+def obtener_demora(id_reporte):
+    """Fecha en que estará listo un reporte y la ruta crítica que la fija"""
+    try:
+        conn = get_request_connection()
+        cursor = conn.cursor()
+        motor, grafo = obtener_motor(cursor)
+        cursor.close()
+        conn.close()
+        
+        if not grafo.info_reporte(id_reporte):
+            return jsonify({"error": "Reporte no encontrado"}), 404
+        
+        return jsonify(motor.detalle(grafo, id_reporte))
+        
+    except Exception as e:
+        logger.error(f"Error al proyectar demora de {id_reporte}: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
 # ============================================================================
 # API - BÚSQUEDA Y FILTROS
 # ============================================================================
 
 @dependencias_bp.route('/api/dependencias/buscar')
 def buscar_reportes():
-    """Busca reportes por código o nombre para cambiar el foco"""
+    """Busca reportes por código, nombre, tipo o descripción para cambiar el foco (ordenados por relevancia)"""
     try:
         termino = request.args.get('q', '').strip()
         
         if len(termino) < 2:
             return jsonify([])
         
-        conn = get_connection()
+        conn = get_request_connection()
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT 
-                id_reporte,
-                codigo_interno,
-                nombre,
-                descripcion,
-                audiencia
-            FROM reporte
-            WHERE estado = 'Aprobado'
-            AND (
-                LOWER(codigo_interno) LIKE LOWER(%s)
-                OR LOWER(nombre) LIKE LOWER(%s)
-            )
-            ORDER BY codigo_interno
-            LIMIT 20
-        """, (f'%{termino}%', f'%{termino}%'))
+        # Índice de trigramas en memoria (código, nombre, tipo y descripción)
+        indice = obtener_indice(cursor)
+        
+        cursor.close()
+        conn.close()
         
         resultados = []
-        for row in cursor.fetchall():
+        for puntaje, doc in indice.buscar(termino, estado='Aprobado', limite=20):
             resultados.append({
-                'id': row[0],
-                'codigo_interno': row[1],
-                'nombre': row[2],
-                'descripcion': row[3],
-                'audiencia': row[4],
-                'label': f"{row[1]} - {row[2]}"
+                'id': doc['id'],
+                'codigo_interno': doc['codigo_interno'],
+                'nombre': doc['nombre'],
+                'descripcion': doc['descripcion'],
+                'audiencia': doc['audiencia'],
+                'label': f"{doc['codigo_interno']} - {doc['nombre']}",
+                'puntaje': puntaje
             })
         
-        cursor.close()
-        conn.close()
-        
         return jsonify(resultados)
         
     except Exception as e:
@@ -397,71 +653,95 @@ def crear_dependencia():
         if not all([id_padre, id_hijo, tipo_dep, criticidad]):
             return jsonify({"error": "Faltan campos obligatorios"}), 400
         
+        try:
+            id_padre, id_hijo = int(id_padre), int(id_hijo)
+        except (TypeError, ValueError):
+            return jsonify({"error": "Los ids de reporte deben ser numéricos"}), 400
+        
         # Validar que no sea el mismo reporte
         if id_padre == id_hijo:
             return jsonify({"error": "Un reporte no puede depender de sí mismo"}), 400
         
         # Validar tipos
-        tipos_validos = ['DATOS', 'CALCULO', 'CONSOLIDACION', 'VALIDACION']
-        if tipo_dep not in tipos_validos:
-            return jsonify({"error": f"Tipo de dependencia inválido. Debe ser: {', '.join(tipos_validos)}"}), 400
+        if tipo_dep not in TIPOS_DEPENDENCIA:
+            return jsonify({"error": f"Tipo de dependencia inválido. Debe ser: {', '.join(TIPOS_DEPENDENCIA)}"}), 400
         
-        criticidades_validas = ['BAJA', 'MEDIA', 'ALTA']
-        if criticidad not in criticidades_validas:
-            return jsonify({"error": f"Criticidad inválida. Debe ser: {', '.join(criticidades_validas)}"}), 400
+        if criticidad not in CRITICIDADES_DEPENDENCIA:
+            return jsonify({"error": f"Criticidad inválida. Debe ser: {', '.join(CRITICIDADES_DEPENDENCIA)}"}), 400
         
-        conn = get_connection()
+        conn = get_request_connection()
         cursor = conn.cursor()
         
-        # Verificar que ambos reportes existen y están activos
-        cursor.execute("""
-            SELECT id_reporte, codigo_interno, nombre, estado 
-            FROM reporte 
-            WHERE id_reporte IN (%s, %s)
-        """, (id_padre, id_hijo))
-        
-        reportes = cursor.fetchall()
-        
-        if len(reportes) != 2:
+        # Altas serializadas entre procesos: existencia, duplicado, ciclo e
+        # INSERT se verifican con el candado tomado, contra datos confirmados
+        if not bloquear_dependencias(cursor):
             cursor.close()
             conn.close()
-            return jsonify({"error": "Uno o ambos reportes no existen"}), 404
-        
-        # Verificar que están activos
-        for r in reportes:
-            if r[3] != 'Aprobado':
-                cursor.close()
-                conn.close()
-                return jsonify({"error": f"El reporte {r[1]} no está aprobado"}), 400
-        
-        # Verificar si ya existe esta dependencia
-        cursor.execute("""
-            SELECT id_dependencia 
-            FROM reporte_dependencia
-            WHERE reporte_origen_id  = %s AND reporte_dependiente_id= %s
-        """, (id_padre, id_hijo))
-        
-        if cursor.fetchone():
+            return jsonify({"error": "Otra dependencia se está registrando, intente de nuevo"}), 503
+        
+        try:
+            # Descarta la lectura consistente abierta antes del candado (REPEATABLE READ)
+            conn.rollback()
+            
+            # Verificar que ambos reportes existen y están activos
+            cursor.execute("""
+                SELECT id_reporte, codigo_interno, nombre, estado 
+                FROM reporte 
+                WHERE id_reporte IN (%s, %s)
+            """, (id_padre, id_hijo))
+            
+            reportes = cursor.fetchall()
+            
+            if len(reportes) != 2:
+                return jsonify({"error": "Uno o ambos reportes no existen"}), 404
+            
+            # Verificar que están activos
+            for r in reportes:
+                if r[3] != 'Aprobado':
+                    return jsonify({"error": f"El reporte {r[1]} no está aprobado"}), 400
+            
+            # Verificar si ya existe esta dependencia
+            cursor.execute("""
+                SELECT id_dependencia 
+                FROM reporte_dependencia
+                WHERE reporte_origen_id  = %s AND reporte_dependiente_id= %s
+            """, (id_padre, id_hijo))
+            
+            if cursor.fetchone():
+                return jsonify({"error": "Esta dependencia ya existe"}), 409
+            
+            # Verificar que no cierre un ciclo (grafo sincronizado con la BD dentro del candado)
+            ciclo = validar_dependencia(cursor, id_padre, id_hijo)
+            if ciclo:
+                camino = ' → '.join(r['codigo_interno'] for r in ciclo)
+                logger.info(f"Dependencia rechazada por ciclo: {camino}")
+                return jsonify({
+                    "error": f"La dependencia crearía un ciclo: {camino}",
+                    "ciclo": ciclo
+                }), 409
+            
+            # Crear la dependencia
+            usuario_actual = 1  # temporal hasta login real
+
+            cursor.execute("""
+                INSERT INTO reporte_dependencia
+                (reporte_origen_id, reporte_dependiente_id, tipo_dependencia, criticidad, observaciones, creado_por)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, (id_padre, id_hijo, tipo_dep, criticidad, observaciones, usuario_actual))
+            
+            id_dependencia = cursor.lastrowid
+            
+            conn.commit()
+            
+            # Todavía con el candado: la próxima alta en este proceso ya ve la arista
+            notificar_dependencia(id_padre, id_hijo, tipo_dep, criticidad)
+            # Después de notificar: la nueva versión nunca se calcula con el grafo viejo
+            cache_http.marcar_cambio()
+        
+        finally:
+            liberar_dependencias(cursor)
             cursor.close()
             conn.close()
-            return jsonify({"error": "Esta dependencia ya existe"}), 409
-        
-        # Crear la dependencia
-        usuario_actual = 1  # temporal hasta login real
-
-        cursor.execute("""
-            INSERT INTO reporte_dependencia
-            (reporte_origen_id, reporte_dependiente_id, tipo_dependencia, criticidad, observaciones, creado_por)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (id_padre, id_hijo, tipo_dep, criticidad, observaciones, usuario_actual))
-
-
-        
-        id_dependencia = cursor.lastrowid
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
         
         logger.info(f"Dependencia creada: ID {id_dependencia} - Padre: {id_padre} → Hijo: {id_hijo}")
         
@@ -0,0 +1,185 @@
+"""
+Estadísticas materializadas del dashboard
+Contadores en la tabla estadistica_resumen, ajustados en la misma transacción
+que crea, aprueba o entrega un reporte, y reconciliados periódicamente
+
+Cada contador está repartido en ESTADISTICAS_SHARDS filas (clave, shard): cada
+transacción suma en un shard al azar, así dos escritores concurrentes casi
+nunca esperan por el mismo candado; leer() suma los shards
+"""
+
+import os
+import random
+import threading
+import time
+import logging
+
+from db import get_connection, get_request_connection
+
+logger = logging.getLogger(__name__)
+
+# Cada cuánto se recalculan todos los contadores desde cero
+ESTADISTICAS_RECONCILIAR_SEGUNDOS = int(os.environ.get('ESTADISTICAS_RECONCILIAR_SEGUNDOS', 3600))
+
+# Filas por contador (shards); la tabla se crea en migraciones/003
+ESTADISTICAS_SHARDS = int(os.environ.get('ESTADISTICAS_SHARDS', 16))
+
+CLAVE_RECONCILIADO = '_reconciliado_en'
+
+SQL_AJUSTAR = """
+    INSERT INTO estadistica_resumen (clave, shard, valor)
+    VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE valor = valor + VALUES(valor)
+"""
+
+SQL_FIJAR = """
+    INSERT INTO estadistica_resumen (clave, shard, valor)
+    VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE valor = VALUES(valor)
+"""
+
+_reconciliar_lock = threading.Lock()
+
+
+def deltas_reporte(criticidad=None, frecuencia=None, estado=None, estado_entrega=None, signo=1):
+    """Deltas de contadores para un reporte que entra (+1) o sale (-1) del conjunto"""
+    deltas = {'total': signo}
+    if criticidad:
+        deltas[f'criticidad:{criticidad}'] = signo
+    if frecuencia:
+        deltas[f'frecuencia:{frecuencia}'] = signo
+    if estado:
+        deltas[f'estado:{estado}'] = signo
+    if estado_entrega:
+        deltas[f'estado_entrega:{estado_entrega}'] = signo
+    return deltas
+
+
+def ajustar(cursor, deltas):
+    """
+    Aplica los deltas en la transacción del que llama (un solo INSERT multi-fila)
+    Todas las claves van al mismo shard al azar, en orden de clave (sin interbloqueos
+    entre escritores que caen en el mismo shard)
+
+    Args:
+        cursor: Cursor de la conexión cuya transacción incluye el cambio
+        deltas: {clave: delta}
+    """
+    shard = random.randrange(ESTADISTICAS_SHARDS)
+    filas = [(clave, shard, delta) for clave, delta in sorted(deltas.items()) if delta]
+    if not filas:
+        return
+    cursor.executemany(SQL_AJUSTAR, filas)
+
+
+def cambio_estado(cursor, campo, anterior, nuevo):
+    """Mueve un reporte de un valor a otro en un contador (ej. estado_entrega EN_TIEMPO → ENTREGADO)"""
+    if anterior == nuevo:
+        return
+    deltas = {}
+    if anterior:
+        deltas[f'{campo}:{anterior}'] = -1
+    if nuevo:
+        deltas[f'{campo}:{nuevo}'] = 1
+    ajustar(cursor, deltas)
+
+
+def contar(cursor):
+    """Contadores exactos con un conteo completo de reporte y reporte_schedule"""
+    contadores = {}
+
+    cursor.execute("""
+        SELECT criticidad, estado, estado_entrega, COUNT(*)
+        FROM reporte
+        GROUP BY criticidad, estado, estado_entrega
+    """)
+    for criticidad, estado, estado_entrega, cantidad in cursor.fetchall():
+        for clave, signo in deltas_reporte(criticidad, None, estado, estado_entrega).items():
+            contadores[clave] = contadores.get(clave, 0) + cantidad * signo
+
+    cursor.execute("""
+        SELECT frecuencia, COUNT(reporte_id)
+        FROM reporte_schedule
+        GROUP BY frecuencia
+    """)
+    for frecuencia, cantidad in cursor.fetchall():
+        if frecuencia:
+            contadores[f'frecuencia:{frecuencia}'] = cantidad
+
+    return contadores
+
+
+def reconciliar():
+    """
+    Recalcula todos los contadores con un conteo completo, en una sola transacción
+
+    1. Bloquea las filas de estadistica_resumen (FOR UPDATE): los ajustes
+       concurrentes esperan a este commit y se suman sobre el valor nuevo
+    2. Cuenta (la lectura ve todo lo confirmado hasta el bloqueo)
+    3. Fija el conteo en el shard 0 y deja los demás shards en 0 (sin DELETE:
+       las filas de todos los shards quedan creadas para los ajustes)
+
+    Returns:
+        dict: Contadores reconciliados
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT clave FROM estadistica_resumen FOR UPDATE")
+        contadores = {clave: 0 for clave, in cursor.fetchall()}
+        contadores.update(contar(cursor))
+        contadores[CLAVE_RECONCILIADO] = int(time.time())
+
+        filas = []
+        for clave, valor in sorted(contadores.items()):
+            filas.append((clave, 0, valor))
+            if clave != CLAVE_RECONCILIADO:
+                filas.extend((clave, shard, 0) for shard in range(1, ESTADISTICAS_SHARDS))
+        cursor.executemany(SQL_FIJAR, filas)
+        conn.commit()
+
+        logger.info(f"Estadísticas reconciliadas: {contadores.get('total', 0)} reportes")
+        return contadores
+
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def leer():
+    """
+    Lee todos los contadores (una consulta que suma los shards de cada clave)
+    Reconcilia primero si nunca se hizo o si venció el intervalo
+    """
+    conn = get_request_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT clave, SUM(valor) FROM estadistica_resumen GROUP BY clave")
+        contadores = {clave: int(valor) for clave, valor in cursor.fetchall()}
+    finally:
+        cursor.close()
+        conn.close()
+
+    reconciliado_en = contadores.get(CLAVE_RECONCILIADO, 0)
+    if time.time() - reconciliado_en > ESTADISTICAS_RECONCILIAR_SEGUNDOS:
+        # Solo un hilo reconcilia; los demás usan los contadores actuales
+        if _reconciliar_lock.acquire(blocking=reconciliado_en == 0):
+            try:
+                contadores = reconciliar()
+            finally:
+                _reconciliar_lock.release()
+
+    return contadores
+
+
+def agrupados(contadores, prefijo):
+    """{'frecuencia:DIARIA': 3, ...} → {'DIARIA': 3, ...}"""
+    return {
+        clave.split(':', 1)[1]: valor
+        for clave, valor in contadores.items()
+        if clave.startswith(f'{prefijo}:')
+    }
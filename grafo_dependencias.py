@@ -0,0 +1,823 @@
+"""
+Índice en memoria del grafo de dependencias
+Lista de adyacencia de reporte_dependencia + metadatos de reportes,
+cargado una vez por proceso y actualizado en cada cambio del grafo.
+Mantiene además un orden topológico incremental (Pearce-Kelly) que
+rechaza las dependencias que cerrarían un ciclo
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Recarga completa periódica como red de seguridad (cambios hechos por otros procesos)
+GRAFO_TTL_SEGUNDOS = int(os.environ.get('GRAFO_TTL_SEGUNDOS', 300))
+
+# Orden del ENUM criticidad (ORDER BY dr.criticidad DESC usa el índice del ENUM)
+ORDEN_CRITICIDAD = {'BAJA': 1, 'MEDIA': 2, 'ALTA': 3}
+
+# Memoria máxima del índice de alcance; si el cierre transitivo no cabe, se recorre el grafo
+ALCANCE_MAX_BYTES = int(os.environ.get('ALCANCE_MAX_MB', 256)) * 1024 * 1024
+
+# AUTO_INCREMENT se asigna al insertar y no al confirmar: un id menor que la
+# marca de agua puede aparecer después (transacción más lenta). Esos huecos se
+# releen por id durante GRAFO_HUECOS_SEGUNDOS (luego se dan por descartados:
+# rollback o ids reservados de más por un INSERT ... SELECT)
+GRAFO_HUECOS_SEGUNDOS = int(os.environ.get('GRAFO_HUECOS_SEGUNDOS', 120))
+HUECOS_MAX = 1000
+
+# Altas de dependencias serializadas entre procesos (validación + INSERT bajo el mismo candado)
+NOMBRE_LOCK_DEPENDENCIAS = 'alejandria_dependencias'
+ESPERA_LOCK_DEPENDENCIAS = int(os.environ.get('DEPENDENCIAS_ESPERA_LOCK_SEGUNDOS', 10))
+
+# Peso de una dependencia en el análisis de impacto: tipo × criticidad
+PESO_TIPO_DEPENDENCIA = {'DATOS': 1.0, 'CALCULO': 0.9, 'CONSOLIDACION': 0.8, 'VALIDACION': 0.5}
+PESO_CRITICIDAD = {'ALTA': 1.0, 'MEDIA': 0.6, 'BAJA': 0.3}
+
+SQL_REPORTES = """
+    SELECT
+        r.id_reporte,
+        r.codigo_interno,
+        r.nombre,
+        r.descripcion,
+        r.audiencia,
+        r.estado,
+        tr.nombre as tipo,
+        rs.frecuencia,
+        r.receptor_externo
+    FROM reporte r
+    LEFT JOIN tipo_reporte tr ON r.tipo_id = tr.id_tipo
+    LEFT JOIN reporte_schedule rs ON r.id_reporte = rs.reporte_id
+"""
+
+SQL_DEPENDENCIAS = """
+    SELECT id_dependencia, reporte_origen_id, reporte_dependiente_id, tipo_dependencia, criticidad
+    FROM reporte_dependencia
+"""
+
+
+def peso_arista(aristas):
+    """Peso de padre → hijo: la más fuerte de sus dependencias (tipo × criticidad)"""
+    return max(
+        (PESO_TIPO_DEPENDENCIA.get(tipo, 0.5) * PESO_CRITICIDAD.get(criticidad, 0.6) for tipo, criticidad in aristas),
+        default=0.0
+    )
+
+
+def bits_encendidos(mascara):
+    """Posiciones de los bits en 1 (vía bin(): recorre la máscara una sola vez en C)"""
+    binario = bin(mascara)[:1:-1]
+    posicion = binario.find('1')
+    while posicion != -1:
+        yield posicion
+        posicion = binario.find('1', posicion + 1)
+
+
+class IndiceAlcance:
+    """
+    Cierre transitivo hacia abajo como bitsets (int de Python)
+
+    descendientes[id] tiene encendido el bit ranura[x] de cada reporte x
+    alcanzable desde id. Las ranuras son estables (el orden topológico cambia
+    con cada reordenamiento): se asignan recorriendo el orden al revés, así los
+    descendientes de un reporte caen en bits más bajos que el suyo.
+    Se usa siempre bajo el lock del grafo.
+    """
+
+    def __init__(self, max_bytes=ALCANCE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.ranura = {}
+        self.ids = []
+        self.descendientes = {}
+        self.bytes = 0
+        self.construido = False
+        self.desbordado = False
+        self.contadores = {
+            'construcciones': 0,
+            'actualizaciones': 0,
+            'invalidaciones': 0,
+        }
+
+    def _asignar_ranura(self, id_reporte):
+        if id_reporte not in self.ranura:
+            self.ranura[id_reporte] = len(self.ids)
+            self.ids.append(id_reporte)
+
+    def _liberar(self):
+        self.ranura, self.ids, self.descendientes, self.bytes = {}, [], {}, 0
+        self.construido = False
+
+    def construir(self, grafo):
+        """Una pasada en orden topológico inverso: desc(n) = ∪ (hijo ∪ desc(hijo))"""
+        self._liberar()
+        self.desbordado = False
+        self.contadores['construcciones'] += 1
+
+        for nodo in reversed(grafo.orden_topologico()):
+            self._asignar_ranura(nodo)
+            bits = 0
+            for id_hijo in grafo.hijos.get(nodo, ()):
+                if (nodo, id_hijo) not in grafo.aristas_ciclicas:
+                    bits |= self.descendientes.get(id_hijo, 0) | (1 << self.ranura[id_hijo])
+            if bits:
+                self.descendientes[nodo] = bits
+                self.bytes += (bits.bit_length() + 7) // 8
+                if self.bytes > self.max_bytes:
+                    self._desbordar()
+                    return
+        self.construido = True
+
+    def _desbordar(self):
+        logger.warning(
+            f"⚠️  Índice de alcance supera {self.max_bytes // (1024 * 1024)} MB "
+            f"(ALCANCE_MAX_MB): el impacto se calcula recorriendo el grafo"
+        )
+        self._liberar()
+        self.desbordado = True
+
+    def agregar(self, grafo, id_padre, id_hijo):
+        """
+        Arista nueva padre → hijo: el padre y sus ancestros ganan hijo ∪ desc(hijo)
+        Se deja de subir por un ancestro que ya los tenía (sus ancestros también)
+        """
+        if not self.construido:
+            return
+        self._asignar_ranura(id_padre)
+        self._asignar_ranura(id_hijo)
+        nuevos = self.descendientes.get(id_hijo, 0) | (1 << self.ranura[id_hijo])
+        self.contadores['actualizaciones'] += 1
+
+        pila, vistos = [id_padre], {id_padre}
+        while pila:
+            nodo = pila.pop()
+            actual = self.descendientes.get(nodo, 0)
+            combinado = actual | nuevos
+            if combinado == actual:
+                continue
+            self.descendientes[nodo] = combinado
+            self.bytes += (combinado.bit_length() - actual.bit_length() + 7) // 8
+            for id_abuelo in grafo.padres.get(nodo, ()):
+                if id_abuelo not in vistos and (id_abuelo, nodo) not in grafo.aristas_ciclicas:
+                    vistos.add(id_abuelo)
+                    pila.append(id_abuelo)
+
+        if self.bytes > self.max_bytes:
+            self._desbordar()
+
+    def invalidar(self, reintentar=False):
+        """
+        Quitar aristas no es incremental: se reconstruye en la próxima consulta
+        (si ya se desbordó, solo se reintenta con reintentar=True, en la recarga completa)
+        """
+        if self.construido:
+            self.contadores['invalidaciones'] += 1
+        self._liberar()
+        if reintentar:
+            self.desbordado = False
+
+    def alcanzables(self, origenes):
+        """Ids alcanzables desde cualquiera de los orígenes (None si el índice no está disponible)"""
+        if not self.construido:
+            return None
+        mascara = 0
+        for id_origen in origenes:
+            mascara |= self.descendientes.get(id_origen, 0)
+        return [self.ids[bit] for bit in bits_encendidos(mascara)]
+
+    def alcanza(self, id_origen, id_reporte):
+        ranura = self.ranura.get(id_reporte)
+        return ranura is not None and bool(self.descendientes.get(id_origen, 0) >> ranura & 1)
+
+    def estadisticas(self):
+        return {
+            **self.contadores,
+            'construido': self.construido,
+            'desbordado': self.desbordado,
+            'reportes': len(self.ids),
+            'bytes': self.bytes,
+        }
+
+
+class GrafoDependencias:
+    """
+    Grafo de dependencias en memoria
+
+    padres[id] = {id_padre: {(tipo_dependencia, criticidad), ...}}
+    hijos[id]  = {id_hijo: {(tipo_dependencia, criticidad), ...}}
+    orden[id]  = posición topológica (todo padre va antes que sus hijos)
+
+    aristas_ciclicas: (padre, hijo) que ya cerraban un ciclo en la BD
+    (datos previos a la validación); quedan fuera del orden y de su invariante.
+    version aumenta con cada cambio (para cachés derivadas del orden).
+    ultima_dependencia: mayor id_dependencia leído (marca de agua de sincronizar_aristas).
+    carga (al azar en cada carga) + version identifican el contenido de este
+    proceso (claves de la caché HTTP, ver generacion()).
+    """
+
+    def __init__(self):
+        self.reportes = {}
+        self.padres = {}
+        self.hijos = {}
+        self.orden = {}
+        self.aristas_ciclicas = set()
+        self.version = 0
+        self.carga = None
+        self.cargado_en = None
+        self.ultima_dependencia = 0
+        self._huecos = {}
+        self._siguiente_posicion = 0
+        self._profundidades = (None, {})
+        self.alcance = IndiceAlcance()
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # CARGA Y ACTUALIZACIÓN
+    # ------------------------------------------------------------------
+
+    def cargar(self, cursor):
+        """Carga completa del grafo (2 consultas)"""
+        inicio = time.perf_counter()
+
+        cursor.execute(SQL_REPORTES)
+        reportes = {row[0]: self._fila_reporte(row) for row in cursor.fetchall()}
+
+        cursor.execute(SQL_DEPENDENCIAS)
+        padres, hijos, ids = {}, {}, []
+        for id_dependencia, origen, dependiente, tipo_dep, criticidad in cursor.fetchall():
+            padres.setdefault(dependiente, {}).setdefault(origen, set()).add((tipo_dep, criticidad))
+            hijos.setdefault(origen, {}).setdefault(dependiente, set()).add((tipo_dep, criticidad))
+            ids.append(id_dependencia)
+
+        orden, ciclicas = self._ordenar(set(reportes) | set(padres) | set(hijos), padres, hijos)
+
+        with self._lock:
+            self.reportes = reportes
+            self.padres = padres
+            self.hijos = hijos
+            self.orden = orden
+            self.aristas_ciclicas = ciclicas
+            self._siguiente_posicion = len(orden)
+            self.ultima_dependencia = 0
+            self._huecos = {}
+            self._registrar_ids(ids)
+            self.carga = f"{random.getrandbits(32):08x}"
+            self.version += 1
+            self.alcance.invalidar(reintentar=True)
+            self.cargado_en = time.monotonic()
+
+        logger.info(
+            f"Grafo de dependencias cargado: {len(reportes)} reportes, "
+            f"{sum(len(p) for p in padres.values())} aristas en {(time.perf_counter() - inicio) * 1000:.1f} ms"
+        )
+        if ciclicas:
+            logger.warning(
+                f"⚠️  {len(ciclicas)} dependencia(s) cierran ciclos existentes en la BD "
+                f"(excluidas del orden topológico): {sorted(ciclicas)[:10]}"
+            )
+
+    @staticmethod
+    def _ordenar(nodos, padres, hijos):
+        """
+        Orden topológico completo (Kahn, O(V + E))
+
+        Si queda trabado por un ciclo ya existente, lo rompe en el reporte
+        pendiente de menor id y aparta las aristas que llegan a él desde
+        reportes aún sin ordenar.
+
+        Returns:
+            (dict orden {id: posición}, set aristas_ciclicas)
+        """
+        grado = {nodo: len(padres.get(nodo, ())) for nodo in nodos}
+        pendientes = deque(sorted(nodo for nodo, g in grado.items() if g == 0))
+        candidatos = iter(sorted(nodos))
+        orden, ciclicas = {}, set()
+
+        while len(orden) < len(grado):
+            if not pendientes:
+                trabado = next(nodo for nodo in candidatos if nodo not in orden)
+                for id_padre in padres.get(trabado, ()):
+                    if id_padre not in orden:
+                        ciclicas.add((id_padre, trabado))
+                grado[trabado] = 0
+                pendientes.append(trabado)
+
+            nodo = pendientes.popleft()
+            orden[nodo] = len(orden)
+            for id_hijo in hijos.get(nodo, ()):
+                if (nodo, id_hijo) in ciclicas:
+                    continue
+                grado[id_hijo] -= 1
+                if grado[id_hijo] == 0:
+                    pendientes.append(id_hijo)
+
+        return orden, ciclicas
+
+    def vencido(self):
+        return self.cargado_en is None or time.monotonic() - self.cargado_en > GRAFO_TTL_SEGUNDOS
+
+    def agregar_dependencia(self, id_padre, id_hijo, tipo_dependencia, criticidad):
+        """
+        Registra una arista nueva (llamar después del commit)
+
+        Returns:
+            list | None: El ciclo si la arista (ya guardada) cierra uno
+        """
+        arista = (tipo_dependencia, criticidad)
+        with self._lock:
+            self.padres.setdefault(id_hijo, {}).setdefault(id_padre, set()).add(arista)
+            self.hijos.setdefault(id_padre, {}).setdefault(id_hijo, set()).add(arista)
+            ciclo = self._reordenar(id_padre, id_hijo)
+            if not ciclo:
+                self.alcance.agregar(self, id_padre, id_hijo)
+            return ciclo
+
+    def sincronizar_aristas(self, cursor):
+        """
+        Aplica las aristas creadas por otros procesos desde la última lectura:
+        solo filas con id_dependencia mayor que la marca de agua, más los huecos
+        recientes (una consulta por clave primaria, sin releer la tabla)
+
+        Las bajas no se ven aquí (la app no borra dependencias): las recoge la
+        recarga completa al vencer GRAFO_TTL_SEGUNDOS
+
+        Returns:
+            int: Aristas nuevas aplicadas
+        """
+        with self._lock:
+            desde = self.ultima_dependencia
+            huecos = sorted(self._huecos)
+
+        sql = SQL_DEPENDENCIAS + " WHERE id_dependencia > %s"
+        if huecos:
+            sql += f" OR id_dependencia IN ({','.join(['%s'] * len(huecos))})"
+        cursor.execute(sql, [desde] + huecos)
+        filas = cursor.fetchall()
+
+        nuevas = 0
+        with self._lock:
+            for _, origen, dependiente, tipo_dep, criticidad in filas:
+                # Ya aplicada (notificar_dependencia / recargar_reporte de este proceso)
+                if (tipo_dep, criticidad) in self.padres.get(dependiente, {}).get(origen, ()):
+                    continue
+                nuevas += 1
+                ciclo = self.agregar_dependencia(origen, dependiente, tipo_dep, criticidad)
+                if ciclo:
+                    logger.warning(f"⚠️  La dependencia {origen} → {dependiente} de la BD cierra un ciclo: {ciclo}")
+            self._registrar_ids([fila[0] for fila in filas])
+        return nuevas
+
+    def _registrar_ids(self, ids):
+        """
+        Avanza la marca de agua con los ids leídos; los ids intermedios sin fila
+        quedan como huecos a releer (los HUECOS_MAX más recientes, hasta que vencen)
+        """
+        ahora = time.monotonic()
+        for id_dependencia in ids:
+            self._huecos.pop(id_dependencia, None)
+
+        ultima = max(ids, default=0)
+        if ultima > self.ultima_dependencia:
+            vistos = set(ids)
+            for id_dependencia in range(max(self.ultima_dependencia, ultima - HUECOS_MAX) + 1, ultima):
+                if id_dependencia not in vistos:
+                    self._huecos[id_dependencia] = ahora
+            self.ultima_dependencia = ultima
+
+        for id_dependencia, visto_en in list(self._huecos.items()):
+            if ahora - visto_en > GRAFO_HUECOS_SEGUNDOS:
+                del self._huecos[id_dependencia]
+        if len(self._huecos) > HUECOS_MAX:
+            for id_dependencia in sorted(self._huecos)[:len(self._huecos) - HUECOS_MAX]:
+                del self._huecos[id_dependencia]
+
+    def recargar_reporte(self, cursor, id_reporte):
+        """Refresca metadatos y aristas de un reporte (creación / aprobación)"""
+        cursor.execute(SQL_REPORTES + " WHERE r.id_reporte = %s", (id_reporte,))
+        row = cursor.fetchone()
+
+        cursor.execute(SQL_DEPENDENCIAS + " WHERE reporte_origen_id = %s OR reporte_dependiente_id = %s",
+                       (id_reporte, id_reporte))
+        aristas = cursor.fetchall()
+
+        with self._lock:
+            if row is None:
+                self.reportes.pop(id_reporte, None)
+            else:
+                self.reportes[id_reporte] = self._fila_reporte(row)
+
+            anteriores = {(otro, id_reporte) for otro in self.padres.get(id_reporte, {})}
+            anteriores |= {(id_reporte, otro) for otro in self.hijos.get(id_reporte, {})}
+
+            for otro in self.padres.pop(id_reporte, {}):
+                self.hijos.get(otro, {}).pop(id_reporte, None)
+                self.aristas_ciclicas.discard((otro, id_reporte))
+            for otro in self.hijos.pop(id_reporte, {}):
+                self.padres.get(otro, {}).pop(id_reporte, None)
+                self.aristas_ciclicas.discard((id_reporte, otro))
+
+            # Un reporte nuevo va al final del orden: sus padres ya están antes (O(1) por arista)
+            self._ubicar(id_reporte)
+            for _, origen, dependiente, tipo_dep, criticidad in aristas:
+                arista = (tipo_dep, criticidad)
+                self.padres.setdefault(dependiente, {}).setdefault(origen, set()).add(arista)
+                self.hijos.setdefault(origen, {}).setdefault(dependiente, set()).add(arista)
+                ciclo = self._reordenar(origen, dependiente)
+                if ciclo:
+                    logger.warning(f"⚠️  La dependencia {origen} → {dependiente} de la BD cierra un ciclo: {ciclo}")
+            self.version += 1
+
+            # Solo se agregaron aristas (caso normal: reporte recién creado) → índice incremental
+            actuales = {(origen, dependiente) for _, origen, dependiente, _, _ in aristas}
+            if anteriores <= actuales:
+                for origen, dependiente in actuales - anteriores - self.aristas_ciclicas:
+                    self.alcance.agregar(self, origen, dependiente)
+            else:
+                self.alcance.invalidar()
+
+    @staticmethod
+    def _fila_reporte(row):
+        return {
+            'id': row[0],
+            'codigo_interno': row[1],
+            'nombre': row[2],
+            'descripcion': row[3],
+            'audiencia': row[4],
+            'estado': row[5],
+            'tipo': row[6],
+            'frecuencia': row[7],
+            'receptor_externo': row[8]
+        }
+
+    # ------------------------------------------------------------------
+    # ORDEN TOPOLÓGICO INCREMENTAL (Pearce-Kelly)
+    # ------------------------------------------------------------------
+
+    def _ubicar(self, id_reporte):
+        """Reporte sin posición (nuevo): al final del orden"""
+        if id_reporte not in self.orden:
+            self.orden[id_reporte] = self._siguiente_posicion
+            self._siguiente_posicion += 1
+
+    def _recorrer(self, inicio, direccion, dentro, objetivo=None):
+        """
+        DFS desde `inicio` por `direccion` ('hijos' o 'padres') visitando solo
+        reportes cuya posición cumple dentro(posicion), sin aristas cíclicas
+
+        Returns:
+            (dict previo {id: id anterior}, list camino inicio → objetivo | None)
+        """
+        adyacencia = getattr(self, direccion)
+        previo = {inicio: None}
+        pila = [inicio]
+        while pila:
+            nodo = pila.pop()
+            for vecino in adyacencia.get(nodo, ()):
+                if vecino in previo or not dentro(self.orden[vecino]):
+                    continue
+                arista = (nodo, vecino) if direccion == 'hijos' else (vecino, nodo)
+                if arista in self.aristas_ciclicas:
+                    continue
+                previo[vecino] = nodo
+                if vecino == objetivo:
+                    camino = [vecino]
+                    while previo[camino[-1]] is not None:
+                        camino.append(previo[camino[-1]])
+                    return previo, list(reversed(camino))
+                pila.append(vecino)
+        return previo, None
+
+    def _buscar_ciclo(self, id_padre, id_hijo):
+        """
+        Camino hijo → ... → padre dentro de la región afectada, o None
+
+        Solo hay que mirar reportes entre orden[hijo] y orden[padre]:
+        fuera de ese intervalo ningún camino puede volver al padre.
+        """
+        if id_padre == id_hijo:
+            return [id_hijo]
+        if id_padre not in self.orden or id_hijo not in self.orden:
+            return None
+        superior = self.orden[id_padre]
+        if superior < self.orden[id_hijo]:
+            return None
+        return self._recorrer(id_hijo, 'hijos', lambda posicion: posicion <= superior, id_padre)[1]
+
+    def _reordenar(self, id_padre, id_hijo):
+        """
+        Restablece el orden después de agregar padre → hijo
+        tocando solo la región afectada [orden[hijo], orden[padre]]
+
+        Returns:
+            list | None: Ciclo [padre, hijo, ..., padre] si la arista cierra uno
+            (queda en aristas_ciclicas)
+        """
+        self._ubicar(id_padre)
+        self._ubicar(id_hijo)
+        self.version += 1
+
+        inferior, superior = self.orden[id_hijo], self.orden[id_padre]
+        if superior < inferior:
+            return None
+
+        adelante, camino = self._recorrer(id_hijo, 'hijos', lambda posicion: posicion <= superior, id_padre)
+        if camino or id_padre == id_hijo:
+            self.aristas_ciclicas.add((id_padre, id_hijo))
+            return [id_padre] + (camino or [id_hijo])
+        atras, _ = self._recorrer(id_padre, 'padres', lambda posicion: posicion >= inferior)
+
+        # Los ancestros del padre pasan antes que los descendientes del hijo,
+        # reutilizando las mismas posiciones (el resto del orden no cambia)
+        movidos = sorted(atras, key=self.orden.get) + sorted(adelante, key=self.orden.get)
+        posiciones = sorted(self.orden[nodo] for nodo in movidos)
+        for nodo, posicion in zip(movidos, posiciones):
+            self.orden[nodo] = posicion
+        return None
+
+    def camino_ciclo(self, id_padre, id_hijo):
+        """
+        Validación previa al INSERT de padre → hijo
+
+        Returns:
+            list | None: [padre, hijo, ..., padre] si la dependencia cerraría un ciclo
+        """
+        with self._lock:
+            camino = self._buscar_ciclo(id_padre, id_hijo)
+            return [id_padre] + camino if camino else None
+
+    def orden_topologico(self):
+        """Ids de reportes con cada padre antes que sus hijos"""
+        with self._lock:
+            return sorted(self.orden, key=self.orden.get)
+
+    def profundidades(self):
+        """
+        Nivel de cada reporte: longitud de la cadena de dependencias más larga que llega a él
+        (0 = sin padres). Una sola pasada sobre el orden, cacheada hasta el próximo cambio
+        """
+        with self._lock:
+            version, profundidades = self._profundidades
+            if version == self.version:
+                return profundidades
+
+            profundidades = {}
+            for nodo in sorted(self.orden, key=self.orden.get):
+                profundidades[nodo] = max(
+                    (profundidades[id_padre] + 1 for id_padre in self.padres.get(nodo, ())
+                     if (id_padre, nodo) not in self.aristas_ciclicas and id_padre in profundidades),
+                    default=0
+                )
+            self._profundidades = (self.version, profundidades)
+            return profundidades
+
+    def codigos(self, ids):
+        """Códigos internos para mensajes (ej. un ciclo REG-0001 → GER-0002 → REG-0001)"""
+        with self._lock:
+            return [(self.reportes.get(id_reporte) or {}).get('codigo_interno') or str(id_reporte) for id_reporte in ids]
+
+    # ------------------------------------------------------------------
+    # ANÁLISIS DE IMPACTO
+    # ------------------------------------------------------------------
+
+    def _alcanzables_recorriendo(self, origenes):
+        """Alternativa sin índice: recorrido hacia abajo, O(afectados + sus aristas)"""
+        vistos = set(origenes)
+        pila = list(origenes)
+        while pila:
+            nodo = pila.pop()
+            for id_hijo in self.hijos.get(nodo, ()):
+                if id_hijo not in vistos and (nodo, id_hijo) not in self.aristas_ciclicas:
+                    vistos.add(id_hijo)
+                    pila.append(id_hijo)
+        return list(vistos - set(origenes))
+
+    def impacto(self, origenes):
+        """
+        Todos los reportes afectados transitivamente por los orígenes
+
+        El conjunto sale del índice de alcance (OR de bitsets); luego una pasada
+        en orden topológico sobre ese subgrafo calcula para cada afectado:
+        - impacto: el camino más fuerte desde un origen (producto de peso_arista, 0-1]
+        - distancia: saltos del camino más corto
+        - via: padre por el que llega el camino más fuerte
+
+        Returns:
+            (list afectados ordenados por impacto, str 'indice' | 'recorrido')
+        """
+        with self._lock:
+            origenes = [id_origen for id_origen in dict.fromkeys(origenes) if id_origen in self.orden]
+            if not self.alcance.construido and not self.alcance.desbordado:
+                self.alcance.construir(self)
+
+            afectados = self.alcance.alcanzables(origenes)
+            motor = 'indice'
+            if afectados is None:
+                afectados = self._alcanzables_recorriendo(origenes)
+                motor = 'recorrido'
+
+            conjunto = set(afectados)
+            impacto = {id_origen: 1.0 for id_origen in origenes}
+            distancia = {id_origen: 0 for id_origen in origenes}
+            alcanzado_por = {id_origen: {id_origen} for id_origen in origenes}
+            resultado = []
+
+            for nodo in sorted(conjunto - set(origenes), key=self.orden.get):
+                mejor, via, saltos, fuentes = 0.0, None, None, set()
+                for id_padre, aristas in self.padres.get(nodo, {}).items():
+                    if id_padre not in impacto or (id_padre, nodo) in self.aristas_ciclicas:
+                        continue
+                    valor = impacto[id_padre] * peso_arista(aristas)
+                    if via is None or valor > mejor:
+                        mejor, via = valor, id_padre
+                    saltos = distancia[id_padre] + 1 if saltos is None else min(saltos, distancia[id_padre] + 1)
+                    fuentes |= alcanzado_por[id_padre]
+
+                impacto[nodo], distancia[nodo], alcanzado_por[nodo] = mejor, saltos, fuentes
+                reporte = self.reportes.get(nodo) or {}
+                resultado.append({
+                    'id': nodo,
+                    'codigo_interno': reporte.get('codigo_interno'),
+                    'nombre': reporte.get('nombre'),
+                    'estado': reporte.get('estado'),
+                    'tipo': reporte.get('tipo'),
+                    'frecuencia': reporte.get('frecuencia'),
+                    'impacto': round(mejor, 4),
+                    'distancia': saltos,
+                    'via': via,
+                    'origenes': sorted(fuentes),
+                })
+
+        resultado.sort(key=lambda r: (-r['impacto'], r['distancia'], r['codigo_interno'] or ''))
+        return resultado, motor
+
+    # ------------------------------------------------------------------
+    # CONSULTAS
+    # ------------------------------------------------------------------
+
+    def info_reporte(self, id_reporte):
+        """Equivalente en memoria de dependencias.obtener_info_reporte"""
+        with self._lock:
+            reporte = self.reportes.get(id_reporte)
+            if not reporte:
+                return None
+            return {
+                'id': reporte['id'],
+                'codigo_interno': reporte['codigo_interno'],
+                'nombre': reporte['nombre'],
+                'descripcion': reporte['descripcion'],
+                'audiencia': reporte['audiencia'],
+                'estado': reporte['estado'],
+                'tipo': reporte['tipo'],
+                'frecuencia': reporte['frecuencia'],
+                'receptor_externo': reporte['receptor_externo'],
+                'num_dependencias': sum(len(a) for a in self.padres.get(id_reporte, {}).values()),
+                'num_afectaciones': sum(len(a) for a in self.hijos.get(id_reporte, {}).values())
+            }
+
+    def niveles_upstream(self, id_reporte_inicial, max_niveles=10):
+        """Niveles de padres, el más lejano primero (igual que construir_niveles_upstream)"""
+        return list(reversed(self._niveles('padres', id_reporte_inicial, max_niveles)))
+
+    def niveles_downstream(self, id_reporte_inicial, max_niveles=10):
+        """Niveles de hijos, el más cercano primero (igual que construir_niveles_downstream)"""
+        return self._niveles('hijos', id_reporte_inicial, max_niveles)
+
+    def _niveles(self, direccion, id_reporte_inicial, max_niveles):
+        """BFS por niveles sobre la lista de adyacencia, solo reportes aprobados"""
+        niveles = []
+        ids_procesados = {id_reporte_inicial}  # Evitar ciclos
+        ids_nivel_actual = {id_reporte_inicial}
+
+        with self._lock:
+            adyacencia = getattr(self, direccion)
+            for nivel in range(max_niveles):
+                if not ids_nivel_actual:
+                    break
+
+                filas = set()
+                for id_actual in ids_nivel_actual:
+                    for vecino, aristas in adyacencia.get(id_actual, {}).items():
+                        if vecino in ids_procesados:
+                            continue
+                        reporte = self.reportes.get(vecino)
+                        if not reporte or reporte['estado'] != 'Aprobado':
+                            continue
+                        for tipo_dep, criticidad in aristas:
+                            filas.add((vecino, tipo_dep, criticidad))
+
+                if not filas:
+                    break
+
+                ordenadas = sorted(
+                    filas,
+                    key=lambda f: (-ORDEN_CRITICIDAD.get(f[2], 0), self.reportes[f[0]]['codigo_interno'] or '')
+                )
+                niveles.append([self._nodo(vecino, tipo_dep, criticidad) for vecino, tipo_dep, criticidad in ordenadas])
+
+                ids_nivel_actual = {f[0] for f in filas}
+                ids_procesados.update(ids_nivel_actual)
+
+        return niveles
+
+    def _nodo(self, id_reporte, tipo_dependencia, criticidad):
+        reporte = self.reportes[id_reporte]
+        return {
+            'id': reporte['id'],
+            'codigo_interno': reporte['codigo_interno'],
+            'nombre': reporte['nombre'],
+            'descripcion': reporte['descripcion'],
+            'audiencia': reporte['audiencia'],
+            'estado': reporte['estado'],
+            'tipo': reporte['tipo'],
+            'tipo_dependencia': tipo_dependencia,
+            'criticidad': criticidad
+        }
+
+
+_grafo = GrafoDependencias()
+_carga_lock = threading.Lock()
+
+
+def obtener_grafo(cursor):
+    """Grafo global del proceso; se carga en el primer uso y se recarga al vencer el TTL"""
+    if _grafo.vencido():
+        with _carga_lock:
+            if _grafo.vencido():
+                _grafo.cargar(cursor)
+    return _grafo
+
+
+def generacion():
+    """Estado del grafo de este proceso, para la clave de la caché HTTP de las vistas que lo usan"""
+    return f"{_grafo.carga}.{_grafo.version}"
+
+
+def bloquear_dependencias(cursor):
+    """
+    Toma el candado de altas de dependencias (GET_LOCK de sesión, compartido
+    por todos los procesos); True si se obtuvo dentro de la espera
+    Liberarlo siempre con liberar_dependencias (la conexión vuelve al pool)
+    """
+    cursor.execute("SELECT GET_LOCK(%s, %s)", (NOMBRE_LOCK_DEPENDENCIAS, ESPERA_LOCK_DEPENDENCIAS))
+    return cursor.fetchone()[0] == 1
+
+
+def liberar_dependencias(cursor):
+    cursor.execute("SELECT RELEASE_LOCK(%s)", (NOMBRE_LOCK_DEPENDENCIAS,))
+    cursor.fetchone()
+
+
+def validar_dependencia(cursor, id_padre, id_hijo):
+    """
+    Ciclo que cerraría la dependencia padre → hijo (None si es válida)
+
+    Llamar con el candado de bloquear_dependencias tomado: el grafo del
+    proceso puede tener hasta GRAFO_TTL_SEGUNDOS de atraso, así que primero
+    se sincronizan las aristas de la BD y recién entonces se verifica
+
+    Returns:
+        list | None: [{'id', 'codigo_interno'}, ...] desde el padre hasta volver a él
+    """
+    grafo = obtener_grafo(cursor)
+    grafo.sincronizar_aristas(cursor)
+    ciclo = grafo.camino_ciclo(id_padre, id_hijo)
+    if not ciclo:
+        return None
+    return [
+        {'id': id_reporte, 'codigo_interno': codigo}
+        for id_reporte, codigo in zip(ciclo, grafo.codigos(ciclo))
+    ]
+
+
+def notificar_dependencia(id_padre, id_hijo, tipo_dependencia, criticidad):
+    """Aplica una dependencia recién creada al grafo si ya está cargado"""
+    if not _grafo.vencido():
+        ciclo = _grafo.agregar_dependencia(id_padre, id_hijo, tipo_dependencia, criticidad)
+        if ciclo:
+            # Solo posible con aristas escritas en la BD fuera de crear_dependencia
+            logger.error(f"❌ La dependencia {id_padre} → {id_hijo} cerró un ciclo: {' → '.join(_grafo.codigos(ciclo))}")
+
+
+def notificar_reporte(conn, id_reporte):
+    """Refresca un reporte creado o aprobado en el grafo si ya está cargado"""
+    if _grafo.vencido():
+        return
+    cursor = conn.cursor()
+    try:
+        _grafo.recargar_reporte(cursor, id_reporte)
+    finally:
+        cursor.close()
+
+
+def estadisticas_alcance():
+    with _grafo._lock:
+        return _grafo.alcance.estadisticas()
+
+
+def invalidar_grafo():
+    """Fuerza la recarga completa en el próximo uso (después de cargas masivas)"""
+    _grafo.cargado_en = None
@@ -0,0 +1,509 @@
+"""
+Importación masiva de reportes desde CSV o NDJSON
+Lee el archivo en streaming, valida cada fila contra los datos de referencia
+en caché y escribe por lotes (una transacción por lote)
+"""
+
+import codecs
+import csv
+import json
+import os
+import time
+import logging
+
+from db import get_connection
+from services.reporte_service import ReporteService
+from bitacora import SQL_INSERT_BITACORA
+from dependencias import TIPOS_DEPENDENCIA, CRITICIDADES_DEPENDENCIA
+import busqueda
+import cache_http
+import datos_referencia
+import estadisticas
+import grafo_dependencias
+import planificador
+import demoras
+
+logger = logging.getLogger(__name__)
+
+IMPORTACION_LOTE = int(os.environ.get('IMPORTACION_LOTE', 500))
+
+FORMATOS = {
+    '.csv': 'csv',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.json': 'ndjson',
+}
+
+# Columnas del ENUM de reporte que se validan contra su dominio (si la columna es ENUM)
+COLUMNAS_ENUM = ('audiencia', 'criticidad', 'formato_entrega', 'formato_reporte')
+
+SQL_INSERT_REPORTE = """
+    INSERT INTO reporte (
+        codigo_interno, nombre, proposito, descripcion, consideraciones,
+        tipo_id, categoria_id,
+        area_reportante_id, area_ejecutora_id, area_receptora_id,
+        audiencia, receptor_externo,
+        criticidad, formato_entrega, formato_reporte,
+        ruta_entrega, creado_por, estado,
+        proxima_ejecucion, estado_entrega
+    ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+"""
+
+SQL_INSERT_SCHEDULE = """
+    INSERT INTO reporte_schedule (reporte_id, frecuencia, reglas_json)
+    VALUES (%s, %s, %s)
+"""
+
+SQL_INSERT_DEPENDENCIA = """
+    INSERT INTO reporte_dependencia (
+        reporte_origen_id, reporte_dependiente_id, tipo_dependencia,
+        criticidad, observaciones, validada, creado_por
+    ) VALUES (%s, %s, %s, %s, %s, FALSE, %s)
+"""
+
+
+def detectar_formato(nombre_archivo, formato=None):
+    """'csv' o 'ndjson' según el parámetro explícito o la extensión del archivo"""
+    if formato:
+        formato = formato.lower()
+        if formato not in ('csv', 'ndjson'):
+            raise ValueError(f"Formato no soportado: {formato}")
+        return formato
+    extension = os.path.splitext(nombre_archivo or '')[1].lower()
+    if extension not in FORMATOS:
+        raise ValueError("No se reconoce el formato: use .csv, .ndjson o indique formato")
+    return FORMATOS[extension]
+
+
+def leer_filas(stream, formato):
+    """
+    Genera (numero_linea, fila, error) sin cargar el archivo completo
+
+    Args:
+        stream: Archivo binario (FileStorage.stream, open(..., 'rb'))
+        formato: 'csv' o 'ndjson'
+    """
+    texto = codecs.getreader('utf-8-sig')(stream)
+
+    if formato == 'csv':
+        lector = csv.DictReader(texto)
+        for fila in lector:
+            yield lector.line_num, fila, None
+        return
+
+    for numero, linea in enumerate(texto, start=1):
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            fila = json.loads(linea)
+        except ValueError as e:
+            yield numero, None, f"JSON inválido: {e}"
+            continue
+        if not isinstance(fila, dict):
+            yield numero, None, "Cada línea debe ser un objeto JSON"
+            continue
+        yield numero, fila, None
+
+
+# ============================================================================
+# VALIDACIÓN
+# ============================================================================
+
+class Referencias:
+    """Foto de los datos de referencia (caché) indexada por id y por nombre"""
+
+    def __init__(self):
+        self.tipos = self._indexar(datos_referencia.tipos_reporte(), 'id_tipo')
+        self.categorias = self._indexar(datos_referencia.categorias(), 'id_categoria')
+        self.areas = self._indexar(datos_referencia.areas(), 'id_area')
+        self.enums = {columna: set(datos_referencia.valores_enum('reporte', columna)) for columna in COLUMNAS_ENUM}
+        self.frecuencias = set(ReporteService.MAPA_FRECUENCIA.values()) | {'ADHOC'}
+
+    @staticmethod
+    def _indexar(filas, campo_id):
+        indice = {}
+        for fila in filas:
+            indice[str(fila[campo_id])] = fila
+            indice[busqueda.normalizar(fila['nombre'])] = fila
+        return indice
+
+    @staticmethod
+    def resolver(indice, fila, campo, campo_id, errores, obligatorio=False):
+        """Busca `<campo>_id` o `<campo>` (nombre) en el índice; retorna la fila de referencia o None"""
+        valor = texto(fila.get(campo_id)) or texto(fila.get(campo))
+        if not valor:
+            if obligatorio:
+                errores.append(f"{campo} es obligatorio")
+            return None
+        encontrado = indice.get(valor) or indice.get(busqueda.normalizar(valor))
+        if not encontrado:
+            errores.append(f"{campo} '{valor}' no existe")
+        return encontrado
+
+
+def texto(valor):
+    """Valor de celda como texto sin espacios (None si está vacío)"""
+    if valor is None:
+        return None
+    valor = str(valor).strip()
+    return valor or None
+
+
+def parsear_dependencias(valor):
+    """
+    Dependencias de una fila: lista (NDJSON) o 'RS-0001;RS-0002' (CSV)
+    Cada una es un código, un id o un dict {codigo|id_reporte, tipo_dependencia, criticidad, observaciones}
+    """
+    if not valor:
+        return []
+    if isinstance(valor, str):
+        valor = [parte for parte in valor.replace(',', ';').split(';') if parte.strip()]
+    if not isinstance(valor, list):
+        valor = [valor]
+
+    dependencias = []
+    for dep in valor:
+        if not isinstance(dep, dict):
+            dep = {'referencia': dep}
+        referencia = texto(dep.get('referencia') or dep.get('codigo') or dep.get('codigo_interno') or dep.get('id_reporte'))
+        dependencias.append({
+            'referencia': referencia,
+            'tipo_dependencia': (texto(dep.get('tipo_dependencia')) or 'DATOS').upper(),
+            'criticidad': (texto(dep.get('criticidad')) or 'MEDIA').upper(),
+            'observaciones': dep.get('observaciones'),
+        })
+    return dependencias
+
+
+def validar_fila(fila, refs):
+    """
+    Valida y normaliza una fila
+
+    Returns:
+        tuple: (datos, errores) - datos es None si hay errores
+    """
+    errores = []
+
+    nombre = texto(fila.get('nombre'))
+    if not nombre:
+        errores.append("nombre es obligatorio")
+
+    tipo = refs.resolver(refs.tipos, fila, 'tipo', 'tipo_id', errores, obligatorio=True)
+    if tipo and not tipo.get('prefijo_codigo'):
+        errores.append(f"El tipo {tipo['nombre']} no tiene prefijo configurado")
+    categoria = refs.resolver(refs.categorias, fila, 'categoria', 'categoria_id', errores)
+    area_reportante = refs.resolver(refs.areas, fila, 'area_reportante', 'area_reportante_id', errores, obligatorio=True)
+    area_ejecutora = refs.resolver(refs.areas, fila, 'area_ejecutora', 'area_ejecutora_id', errores, obligatorio=True)
+    area_receptora = refs.resolver(refs.areas, fila, 'area_receptora', 'area_receptora_id', errores)
+
+    valores = {
+        'audiencia': (texto(fila.get('audiencia')) or 'interna').upper(),
+        'criticidad': texto(fila.get('criticidad')) or 'MEDIA',
+        'formato_entrega': texto(fila.get('formato_entrega')) or 'CORREO',
+        'formato_reporte': texto(fila.get('formato_reporte')) or 'PDF',
+    }
+    for columna, valor in valores.items():
+        dominio = refs.enums.get(columna)
+        if dominio and valor not in dominio:
+            errores.append(f"{columna} '{valor}' no es válido ({', '.join(sorted(dominio))})")
+
+    frecuencia_texto = texto(fila.get('frecuencia')) or 'ADHOC'
+    frecuencia = ReporteService.MAPA_FRECUENCIA.get(frecuencia_texto.lower(), frecuencia_texto.upper())
+    if frecuencia not in refs.frecuencias:
+        errores.append(f"frecuencia '{frecuencia_texto}' no es válida")
+
+    reglas_json = fila.get('reglas_json')
+    if isinstance(reglas_json, (list, dict)):
+        reglas_json = json.dumps(reglas_json)
+    else:
+        reglas_json = texto(reglas_json)
+        if reglas_json:
+            try:
+                json.loads(reglas_json)
+            except ValueError:
+                errores.append("reglas_json no es JSON válido")
+
+    dependencias = parsear_dependencias(fila.get('dependencias'))
+    if any(not dep['referencia'] for dep in dependencias):
+        errores.append("dependencias contiene una referencia vacía")
+    # Mismos valores que exige crear_dependencia: un valor inválido es error
+    # de esta fila y no hace fallar el INSERT del lote completo
+    for dep in dependencias:
+        if dep['tipo_dependencia'] not in TIPOS_DEPENDENCIA:
+            errores.append(
+                f"tipo_dependencia '{dep['tipo_dependencia']}' de {dep['referencia']} no es válido "
+                f"({', '.join(TIPOS_DEPENDENCIA)})"
+            )
+        if dep['criticidad'] not in CRITICIDADES_DEPENDENCIA:
+            errores.append(
+                f"criticidad '{dep['criticidad']}' de {dep['referencia']} no es válida "
+                f"({', '.join(CRITICIDADES_DEPENDENCIA)})"
+            )
+
+    if errores:
+        return None, errores
+
+    return {
+        'nombre': nombre,
+        'proposito': texto(fila.get('proposito')),
+        'descripcion': texto(fila.get('descripcion')),
+        'consideraciones': texto(fila.get('consideraciones')),
+        'tipo_id': tipo['id_tipo'],
+        'prefijo': tipo['prefijo_codigo'],
+        'categoria_id': categoria['id_categoria'] if categoria else None,
+        'area_reportante_id': area_reportante['id_area'],
+        'area_ejecutora_id': area_ejecutora['id_area'],
+        'area_receptora_id': area_receptora['id_area'] if area_receptora else None,
+        'receptor_externo': texto(fila.get('receptor_externo')),
+        'ruta_entrega': texto(fila.get('ruta_entrega')),
+        'frecuencia': frecuencia,
+        'reglas_json': reglas_json,
+        'dependencias': dependencias,
+        **valores,
+    }, None
+
+
+# ============================================================================
+# ESCRITURA POR LOTES
+# ============================================================================
+
+def resolver_dependencias(cursor, lote, errores, creados=frozenset()):
+    """
+    Traduce códigos / ids de dependencias a id_reporte con una consulta por lote
+    Las filas con dependencias inexistentes pasan a errores y salen del lote
+
+    Solo se admiten reportes que existían antes de la importación: los códigos
+    se asignan al escribir, así que un archivo no puede conocer los de sus
+    propias filas. Una referencia a un reporte creado por esta misma
+    importación (`creados`, ids de lotes anteriores ya confirmados) se
+    rechaza igual que una inexistente, sin depender del tamaño de lote.
+    """
+    referencias = {dep['referencia'] for _, datos in lote for dep in datos['dependencias']}
+    if not referencias:
+        return lote
+
+    ids = [int(ref) for ref in referencias if ref.isdigit()]
+    codigos = [ref for ref in referencias if not ref.isdigit()]
+    condiciones, params = [], []
+    if codigos:
+        condiciones.append(f"codigo_interno IN ({','.join(['%s'] * len(codigos))})")
+        params.extend(codigos)
+    if ids:
+        condiciones.append(f"id_reporte IN ({','.join(['%s'] * len(ids))})")
+        params.extend(ids)
+
+    cursor.execute(f"SELECT id_reporte, codigo_interno FROM reporte WHERE {' OR '.join(condiciones)}", params)
+    encontrados, importados = {}, set()
+    for id_reporte, codigo in cursor.fetchall():
+        if id_reporte in creados:
+            importados.update((str(id_reporte), codigo))
+            continue
+        encontrados[str(id_reporte)] = id_reporte
+        encontrados[codigo] = id_reporte
+
+    validas = []
+    for numero, datos in lote:
+        referencias_fila = [dep['referencia'] for dep in datos['dependencias']]
+        propias = [ref for ref in referencias_fila if ref in importados]
+        faltantes = [ref for ref in referencias_fila if ref not in encontrados and ref not in importados]
+        mensajes = []
+        if faltantes:
+            mensajes.append(f"Dependencia inexistente: {', '.join(faltantes)}")
+        if propias:
+            mensajes.append(
+                f"Dependencia creada en esta misma importación: {', '.join(propias)} "
+                "(regístrela después de importar)"
+            )
+        if mensajes:
+            errores.append({'fila': numero, 'errores': mensajes})
+            continue
+        for dep in datos['dependencias']:
+            dep['id_padre'] = encontrados[dep['referencia']]
+        validas.append((numero, datos))
+    return validas
+
+
+def escribir_lote(conn, lote, creado_por, resultado, creados):
+    """
+    Inserta un lote en una transacción:
+    contador de códigos por prefijo, reportes, schedules, dependencias,
+    contadores del dashboard y bitácora (cada uno un INSERT multi-fila)
+
+    Si algo falla se deshace el lote completo y todas sus filas se reportan con el error.
+    creados: ids de reportes de esta importación (se agregan los del lote al confirmar)
+    """
+    cursor = conn.cursor()
+    try:
+        lote = resolver_dependencias(cursor, lote, resultado['errores'], creados)
+        if not lote:
+            conn.rollback()
+            return
+
+        # Rango de códigos por prefijo (mismo contador que generar_codigo_interno)
+        por_prefijo = {}
+        for _, datos in lote:
+            por_prefijo.setdefault(datos['prefijo'], []).append(datos)
+        for prefijo, filas in por_prefijo.items():
+            ultimo = ReporteService.reservar_numeros(cursor, prefijo, len(filas))
+            for numero, datos in enumerate(filas, start=ultimo - len(filas) + 1):
+                datos['codigo_interno'] = f"{prefijo}-{numero:04d}"
+
+        deltas = {}
+        filas_reporte = []
+        for _, datos in lote:
+            proxima, estado_entrega = None, None
+            try:
+                proxima = ReporteService.calcular_proxima_ejecucion(datos['frecuencia'], datos['reglas_json'])
+                if proxima:
+                    estado_entrega = ReporteService.calcular_estado_entrega(proxima, datos['frecuencia'])
+            except Exception as e:
+                logger.warning(f"Importación {datos['codigo_interno']}: no se calculó la próxima ejecución: {e}")
+
+            filas_reporte.append((
+                datos['codigo_interno'], datos['nombre'], datos['proposito'], datos['descripcion'],
+                datos['consideraciones'], datos['tipo_id'], datos['categoria_id'],
+                datos['area_reportante_id'], datos['area_ejecutora_id'], datos['area_receptora_id'],
+                datos['audiencia'], datos['receptor_externo'],
+                datos['criticidad'], datos['formato_entrega'], datos['formato_reporte'],
+                datos['ruta_entrega'], creado_por, 'Por Validar',
+                proxima, estado_entrega
+            ))
+            for clave, delta in estadisticas.deltas_reporte(
+                datos['criticidad'], datos['frecuencia'], 'Por Validar', estado_entrega
+            ).items():
+                deltas[clave] = deltas.get(clave, 0) + delta
+
+        cursor.executemany(SQL_INSERT_REPORTE, filas_reporte)
+
+        # Ids asignados (no se asume que el autoincremento del INSERT multi-fila sea contiguo)
+        codigos = [datos['codigo_interno'] for _, datos in lote]
+        cursor.execute(
+            f"SELECT codigo_interno, id_reporte FROM reporte WHERE codigo_interno IN ({','.join(['%s'] * len(codigos))})",
+            codigos
+        )
+        ids = dict(cursor.fetchall())
+
+        cursor.executemany(SQL_INSERT_SCHEDULE, [
+            (ids[datos['codigo_interno']], datos['frecuencia'], datos['reglas_json'])
+            for _, datos in lote
+        ])
+
+        filas_dependencia = [
+            (dep['id_padre'], ids[datos['codigo_interno']], dep['tipo_dependencia'],
+             dep['criticidad'], dep['observaciones'], creado_por)
+            for _, datos in lote
+            for dep in datos['dependencias']
+        ]
+        if filas_dependencia:
+            cursor.executemany(SQL_INSERT_DEPENDENCIA, filas_dependencia)
+
+        estadisticas.ajustar(cursor, deltas)
+
+        cursor.executemany(SQL_INSERT_BITACORA, [
+            ('REPORTE', ids[datos['codigo_interno']], 'CREAR',
+             f"Reporte {datos['codigo_interno']} importado: {datos['nombre']}",
+             creado_por,
+             json.dumps({'codigo': datos['codigo_interno'], 'importacion': True,
+                         'dependencias_preliminares': len(datos['dependencias'])}))
+            for _, datos in lote
+        ])
+
+        conn.commit()
+        # Índice y grafo se recargan antes de anunciar la versión nueva: una
+        # vista cacheada con esa versión no puede salir de la estructura vieja
+        busqueda.invalidar_indice()
+        grafo_dependencias.invalidar_grafo()
+        cache_http.marcar_cambio()
+
+        creados.update(ids.values())
+        resultado['creadas'] += len(lote)
+        resultado['dependencias'] += len(filas_dependencia)
+        resultado['lotes'] += 1
+
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Importación: lote de {len(lote)} filas deshecho: {e}")
+        for numero, _ in lote:
+            resultado['errores'].append({'fila': numero, 'errores': [f"Lote no insertado: {e}"]})
+    finally:
+        cursor.close()
+
+
+def importar_reportes(stream, formato, creado_por=1, tamano_lote=None, validar_solo=False):
+    """
+    Importa reportes desde un archivo CSV o NDJSON
+
+    Columnas: nombre, tipo_id|tipo, area_reportante_id|area_reportante,
+    area_ejecutora_id|area_ejecutora (obligatorias) y opcionalmente proposito,
+    descripcion, consideraciones, categoria_id|categoria, area_receptora_id|area_receptora,
+    audiencia, receptor_externo, criticidad, formato_entrega, formato_reporte,
+    ruta_entrega, frecuencia, reglas_json, dependencias (códigos o ids de reportes
+    que existían antes de la importación; ver resolver_dependencias)
+
+    Memoria constante: solo se retiene el lote en curso y la lista de errores.
+
+    Args:
+        stream: Archivo binario
+        formato: 'csv' o 'ndjson'
+        creado_por: Usuario que figura como creador
+        tamano_lote: Filas por transacción
+        validar_solo: Solo validar, sin escribir
+
+    Returns:
+        dict: {procesadas, validas, creadas, dependencias, lotes, errores: [{fila, errores}], segundos}
+    """
+    inicio = time.perf_counter()
+    tamano_lote = max(1, tamano_lote or IMPORTACION_LOTE)
+    refs = Referencias()
+
+    resultado = {
+        'procesadas': 0,
+        'validas': 0,
+        'creadas': 0,
+        'dependencias': 0,
+        'lotes': 0,
+        'errores': [],
+    }
+
+    conn = None if validar_solo else get_connection()
+    lote = []
+    creados = set()
+    try:
+        for numero, fila, error in leer_filas(stream, formato):
+            resultado['procesadas'] += 1
+            if error:
+                resultado['errores'].append({'fila': numero, 'errores': [error]})
+                continue
+
+            datos, errores = validar_fila(fila, refs)
+            if errores:
+                resultado['errores'].append({'fila': numero, 'errores': errores})
+                continue
+
+            resultado['validas'] += 1
+            if validar_solo:
+                continue
+
+            lote.append((numero, datos))
+            if len(lote) >= tamano_lote:
+                escribir_lote(conn, lote, creado_por, resultado, creados)
+                lote = []
+
+        if lote:
+            escribir_lote(conn, lote, creado_por, resultado, creados)
+    finally:
+        if conn:
+            conn.close()
+
+    if resultado['creadas']:
+        # Muchos cambios de una vez: recarga completa en el próximo uso
+        planificador.invalidar_planificador()
+        demoras.invalidar_demoras()
+
+    resultado['segundos'] = round(time.perf_counter() - inicio, 3)
+    logger.info(
+        f"Importación: {resultado['creadas']}/{resultado['procesadas']} reportes creados, "
+        f"{len(resultado['errores'])} filas con error en {resultado['segundos']} s"
+    )
+    return resultado
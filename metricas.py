@@ -0,0 +1,298 @@
+"""
+Instrumentación por request y métricas Prometheus
+Cada consulta SQL (ver db.CursorInstrumentado) suma al request en curso:
+consultas, tiempo SQL, filas leídas y espera por conexión. Al terminar el
+request se registran en histogramas por ruta, expuestos en /metrics
+"""
+
+import os
+import random
+import threading
+import time
+import logging
+
+from flask import g, request, has_request_context
+
+logger = logging.getLogger(__name__)
+
+METRICAS_CONFIG = {
+    # Consultas por request a partir de las cuales se advierte (detecta N+1)
+    'presupuesto_consultas': int(os.environ.get('SQL_PRESUPUESTO_CONSULTAS', 25)),
+    # Nivel de log y fracción de mensajes DEBUG/INFO que se emiten (WARNING+ siempre)
+    'nivel_log': os.environ.get('LOG_LEVEL', 'INFO').upper(),
+    'muestreo_log': float(os.environ.get('LOG_MUESTREO', 1.0)),
+}
+
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+BUCKETS_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_FILAS = (1, 10, 100, 1000, 10000, 100000)
+
+RUTA_FONDO = '(fondo)'
+
+# funcion(ruta, metodo, status, duracion, resumen) al terminar cada request (ej. benchmarks/)
+_observadores = []
+
+
+# ============================================================================
+# HISTOGRAMAS Y CONTADORES
+# ============================================================================
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ''
+    partes = []
+    for nombre, valor in etiquetas:
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        partes.append(f'{nombre}="{valor}"')
+    return '{' + ','.join(partes) + '}'
+
+
+class Histograma:
+    """Histograma Prometheus con una serie por combinación de etiquetas"""
+
+    def __init__(self, nombre, ayuda, buckets, etiquetas=('ruta',)):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = tuple(buckets)
+        self.etiquetas = etiquetas
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *valores_etiquetas):
+        with self._lock:
+            serie = self._series.get(valores_etiquetas)
+            if serie is None:
+                serie = self._series[valores_etiquetas] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exportar(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            series = {clave: (list(b), s, c) for clave, (b, s, c) in self._series.items()}
+        for valores, (buckets, suma, cantidad) in sorted(series.items()):
+            base = list(zip(self.etiquetas, valores))
+            for limite, acumulado in zip(self.buckets, buckets):
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(base + [('le', limite)])} {acumulado}")
+            lineas.append(f"{self.nombre}_bucket{_etiquetas(base + [('le', '+Inf')])} {cantidad}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(base)} {suma}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(base)} {cantidad}")
+        return lineas
+
+
+class Contador:
+    """Contador Prometheus con etiquetas"""
+
+    def __init__(self, nombre, ayuda, etiquetas=('ruta',)):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, *valores_etiquetas, cantidad=1):
+        with self._lock:
+            self._series[valores_etiquetas] = self._series.get(valores_etiquetas, 0) + cantidad
+
+    def exportar(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            series = dict(self._series)
+        for valores, total in sorted(series.items()):
+            lineas.append(f"{self.nombre}{_etiquetas(list(zip(self.etiquetas, valores)))} {total}")
+        return lineas
+
+
+CONSULTAS_POR_REQUEST = Histograma(
+    'alejandria_request_consultas_sql', 'Consultas SQL por request', BUCKETS_CONSULTAS)
+SQL_POR_REQUEST = Histograma(
+    'alejandria_request_sql_segundos', 'Tiempo SQL acumulado por request', BUCKETS_SEGUNDOS)
+FILAS_POR_REQUEST = Histograma(
+    'alejandria_request_filas_leidas', 'Filas leídas de la BD por request', BUCKETS_FILAS)
+ESPERA_CONEXION = Histograma(
+    'alejandria_conexion_espera_segundos', 'Espera por una conexión del pool', BUCKETS_SEGUNDOS)
+DURACION_REQUEST = Histograma(
+    'alejandria_request_duracion_segundos', 'Duración total del request', BUCKETS_SEGUNDOS)
+
+REQUESTS = Contador(
+    'alejandria_requests_total', 'Requests atendidos', ('ruta', 'metodo', 'status'))
+PRESUPUESTO_EXCEDIDO = Contador(
+    'alejandria_request_presupuesto_excedido_total', 'Requests que superaron el presupuesto de consultas')
+CONSULTAS_FONDO = Contador(
+    'alejandria_sql_consultas_fondo_total', 'Consultas SQL fuera de un request (hilos, CLI)', ())
+SQL_FONDO = Contador(
+    'alejandria_sql_segundos_fondo_total', 'Tiempo SQL fuera de un request (hilos, CLI)', ())
+
+METRICAS = (
+    CONSULTAS_POR_REQUEST, SQL_POR_REQUEST, FILAS_POR_REQUEST, ESPERA_CONEXION,
+    DURACION_REQUEST, REQUESTS, PRESUPUESTO_EXCEDIDO, CONSULTAS_FONDO, SQL_FONDO,
+)
+
+
+# ============================================================================
+# REGISTRO DESDE db.py
+# ============================================================================
+
+def _actual():
+    return g.get('_metricas') if has_request_context() else None
+
+
+def registrar_consulta(segundos, filas=0, consultas=1):
+    """Suma una sentencia (o commit/rollback con consultas=1) al request en curso"""
+    actual = _actual()
+    if actual is None:
+        CONSULTAS_FONDO.incrementar(cantidad=consultas)
+        SQL_FONDO.incrementar(cantidad=segundos)
+        return
+    actual['consultas'] += consultas
+    actual['sql_segundos'] += segundos
+    actual['filas'] += filas
+
+
+def registrar_filas(filas):
+    """Filas leídas con fetch* (el tiempo ya se contó en execute)"""
+    actual = _actual()
+    if actual is not None:
+        actual['filas'] += filas
+
+
+def registrar_espera_conexion(segundos):
+    actual = _actual()
+    if actual is not None:
+        actual['espera_conexion'] += segundos
+    ESPERA_CONEXION.observar(segundos, _ruta() if actual is not None else RUTA_FONDO)
+
+
+# ============================================================================
+# HOOKS DEL REQUEST
+# ============================================================================
+
+def _ruta():
+    regla = request.url_rule
+    return regla.rule if regla is not None else 'sin_ruta'
+
+
+def iniciar_request():
+    g._metricas = {
+        'inicio': time.perf_counter(),
+        'consultas': 0,
+        'sql_segundos': 0.0,
+        'filas': 0,
+        'espera_conexion': 0.0,
+        'status': 500,
+    }
+
+
+def guardar_status(respuesta):
+    actual = g.get('_metricas')
+    if actual is not None:
+        actual['status'] = respuesta.status_code
+    return respuesta
+
+
+def finalizar_request(exception=None):
+    actual = g.pop('_metricas', None)
+    if actual is None:
+        return
+
+    ruta = _ruta()
+    duracion = time.perf_counter() - actual['inicio']
+    CONSULTAS_POR_REQUEST.observar(actual['consultas'], ruta)
+    SQL_POR_REQUEST.observar(actual['sql_segundos'], ruta)
+    FILAS_POR_REQUEST.observar(actual['filas'], ruta)
+    DURACION_REQUEST.observar(duracion, ruta)
+    status = 500 if exception else actual['status']
+    REQUESTS.incrementar(ruta, request.method, status)
+
+    for observador in _observadores:
+        try:
+            observador(ruta, request.method, status, duracion, actual)
+        except Exception as e:
+            logger.warning(f"Observador de métricas falló: {e}")
+
+    if actual['consultas'] > METRICAS_CONFIG['presupuesto_consultas']:
+        PRESUPUESTO_EXCEDIDO.incrementar(ruta)
+        logger.warning(
+            f"⚠️  {request.method} {request.path}: {actual['consultas']} consultas SQL "
+            f"(presupuesto {METRICAS_CONFIG['presupuesto_consultas']}), "
+            f"{actual['sql_segundos'] * 1000:.1f} ms SQL, {actual['filas']} filas"
+        )
+    else:
+        logger.debug(
+            f"{request.method} {request.path}: {actual['consultas']} consultas, "
+            f"{actual['sql_segundos'] * 1000:.1f} ms SQL, {duracion * 1000:.1f} ms total"
+        )
+
+
+def observar_requests(funcion):
+    """Registra un observador de requests terminados (consultas, tiempo SQL y filas de cada uno)"""
+    if funcion not in _observadores:
+        _observadores.append(funcion)
+    return funcion
+
+
+# ============================================================================
+# LOGGING
+# ============================================================================
+
+class FiltroMuestreo(logging.Filter):
+    """Deja pasar WARNING+ siempre y una fracción `muestreo` de DEBUG/INFO"""
+
+    def __init__(self, muestreo=1.0):
+        super().__init__()
+        self.muestreo = muestreo
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.muestreo >= 1 or random.random() < self.muestreo
+
+
+def configurar_logging():
+    """Nivel desde LOG_LEVEL y muestreo desde LOG_MUESTREO en los handlers raíz (idempotente)"""
+    raiz = logging.getLogger()
+    if not raiz.handlers:
+        logging.basicConfig(format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    raiz.setLevel(METRICAS_CONFIG['nivel_log'])
+    for handler in raiz.handlers:
+        if not any(isinstance(f, FiltroMuestreo) for f in handler.filters):
+            handler.addFilter(FiltroMuestreo(METRICAS_CONFIG['muestreo_log']))
+
+
+def init_app(app):
+    """Registra los hooks de instrumentación y el logging (idempotente)"""
+    if 'alejandria_metricas' in app.extensions:
+        return
+    app.extensions['alejandria_metricas'] = True
+    configurar_logging()
+    app.before_request(iniciar_request)
+    app.after_request(guardar_status)
+    app.teardown_request(finalizar_request)
+
+
+# ============================================================================
+# EXPOSICIÓN
+# ============================================================================
+
+def gauges(prefijo, valores, ayuda=''):
+    """Exporta un dict plano de números como gauges {prefijo}_{clave}"""
+    lineas = []
+    for clave, valor in sorted(valores.items()):
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+            continue
+        nombre = f"{prefijo}_{clave}"
+        lineas.append(f"# HELP {nombre} {ayuda or clave}")
+        lineas.append(f"# TYPE {nombre} gauge")
+        lineas.append(f"{nombre} {valor}")
+    return lineas
+
+
+def exportar(*extras):
+    """Texto de exposición Prometheus (histogramas, contadores y gauges adicionales)"""
+    lineas = []
+    for metrica in METRICAS:
+        lineas.extend(metrica.exportar())
+    for extra in extras:
+        lineas.extend(extra)
+    return '\n'.join(lineas) + '\n'
@@ -0,0 +1,106 @@
+"""
+Migraciones de esquema
+Las tablas propias de la app, columnas e índices viven en migraciones/NNN_nombre.sql
+y se aplican una sola vez, en orden, como paso de despliegue (`flask reportes migrar`):
+ningún request ni hilo de fondo ejecuta DDL
+"""
+
+import os
+import re
+import logging
+
+import mysql.connector
+
+from db import get_connection
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_MIGRACIONES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migraciones')
+
+PATRON_MIGRACION = re.compile(r'^(\d{3})_[a-z0-9_]+\.sql$')
+
+# Un solo proceso migra a la vez (varios workers o despliegues simultáneos)
+NOMBRE_LOCK = 'alejandria_migraciones'
+ESPERA_LOCK_SEGUNDOS = 60
+
+# Objetos que ya existen: BD donde versiones anteriores los creaban en tiempo de ejecución
+ERRORES_YA_APLICADO = {
+    1050,  # ER_TABLE_EXISTS_ERROR
+    1060,  # ER_DUP_FIELDNAME
+    1061,  # ER_DUP_KEYNAME
+}
+
+SQL_TABLA_MIGRACIONES = """
+    CREATE TABLE IF NOT EXISTS schema_migracion (
+        version VARCHAR(100) NOT NULL PRIMARY KEY,
+        aplicada_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB
+"""
+
+
+def listar(directorio=None):
+    """[(version, ruta), ...] ordenadas por número (version = nombre sin .sql)"""
+    directorio = directorio or DIRECTORIO_MIGRACIONES
+    migraciones = [
+        (nombre[:-4], os.path.join(directorio, nombre))
+        for nombre in os.listdir(directorio)
+        if PATRON_MIGRACION.match(nombre)
+    ]
+    return sorted(migraciones)
+
+
+def sentencias(ruta):
+    """Sentencias de un archivo .sql (sin comentarios de línea, separadas por ';')"""
+    with open(ruta, encoding='utf-8') as archivo:
+        lineas = [linea for linea in archivo if not linea.lstrip().startswith('--')]
+    return [sentencia.strip() for sentencia in ''.join(lineas).split(';') if sentencia.strip()]
+
+
+def pendientes(cursor, directorio=None):
+    cursor.execute("SELECT version FROM schema_migracion")
+    aplicadas = {fila[0] for fila in cursor.fetchall()}
+    return [(version, ruta) for version, ruta in listar(directorio) if version not in aplicadas]
+
+
+def aplicar(directorio=None):
+    """
+    Aplica las migraciones pendientes en orden (cada DDL hace commit implícito)
+
+    Returns:
+        list: versiones aplicadas
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    aplicadas = []
+
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (NOMBRE_LOCK, ESPERA_LOCK_SEGUNDOS))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError("Otro proceso está aplicando migraciones")
+
+        try:
+            cursor.execute(SQL_TABLA_MIGRACIONES)
+            for version, ruta in pendientes(cursor, directorio):
+                for sentencia in sentencias(ruta):
+                    try:
+                        cursor.execute(sentencia)
+                    except mysql.connector.Error as e:
+                        if e.errno not in ERRORES_YA_APLICADO:
+                            raise
+                        logger.warning(f"⚠️  {version}: {e.msg} (ya existía, se continúa)")
+                cursor.execute("INSERT INTO schema_migracion (version) VALUES (%s)", (version,))
+                conn.commit()
+                aplicadas.append(version)
+                logger.info(f"✅ Migración {version} aplicada")
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (NOMBRE_LOCK,))
+            cursor.fetchone()
+
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    return aplicadas
@@ -0,0 +1,31 @@
+-- ============================================================================
+-- Orden del catálogo servido por índice (paginación keyset, catalogo.py)
+-- orden_prioridad / orden_proxima son columnas generadas con la misma
+-- expresión que antes se calculaba en cada consulta; el índice compuesto
+-- (con las direcciones del ORDER BY) evita el filesort de cada página.
+-- created_at pasa a NOT NULL: el desempate del cursor nunca compara con NULL.
+-- ============================================================================
+
+UPDATE reporte
+SET created_at = '1970-01-01 00:00:01'
+WHERE created_at IS NULL;
+
+ALTER TABLE reporte
+    MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP;
+
+ALTER TABLE reporte
+    ADD COLUMN orden_prioridad TINYINT AS (
+        CASE estado_entrega
+            WHEN 'RETRASADO' THEN 1
+            WHEN 'PROXIMO_VENCER' THEN 2
+            WHEN 'EN_TIEMPO' THEN 3
+            WHEN 'ENTREGADO' THEN 4
+            ELSE 5
+        END
+    ) VIRTUAL NOT NULL,
+    ADD COLUMN orden_proxima DATETIME AS (
+        COALESCE(proxima_ejecucion, CAST('1000-01-01 00:00:00' AS DATETIME))
+    ) VIRTUAL NOT NULL;
+
+ALTER TABLE reporte
+    ADD INDEX idx_reporte_catalogo (orden_prioridad, orden_proxima, created_at DESC, id_reporte DESC);
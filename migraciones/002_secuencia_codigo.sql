@@ -0,0 +1,10 @@
+-- ============================================================================
+-- Contador de codigo_interno por prefijo (ReporteService.reservar_numeros)
+-- Si no hay fila para un prefijo, se inicializa con el mayor código existente
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS secuencia_codigo (
+    prefijo VARCHAR(20) NOT NULL PRIMARY KEY,
+    ultimo_numero INT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
@@ -0,0 +1,15 @@
+-- ============================================================================
+-- Contadores del dashboard repartidos en shards (estadisticas.py)
+-- Los valores se derivan de reporte / reporte_schedule: la tabla anterior
+-- (una fila por clave) se descarta y la primera lectura reconcilia
+-- ============================================================================
+
+DROP TABLE IF EXISTS estadistica_resumen;
+
+CREATE TABLE estadistica_resumen (
+    clave VARCHAR(64) NOT NULL,
+    shard TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    valor BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (clave, shard)
+) ENGINE=InnoDB;
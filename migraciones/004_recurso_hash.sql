@@ -0,0 +1,7 @@
+-- ============================================================================
+-- Hash de contenido de los formatos subidos (almacen_archivos.py)
+-- ============================================================================
+
+ALTER TABLE recurso
+    ADD COLUMN hash_sha256 CHAR(64) NULL AFTER size_bytes,
+    ADD INDEX idx_recurso_hash (hash_sha256);
@@ -0,0 +1,8 @@
+-- ============================================================================
+-- Versión de los datos de reportes para la caché HTTP con ETag (cache_http.py)
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS version_datos (
+    clave VARCHAR(32) NOT NULL PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0
+) ENGINE=InnoDB;
@@ -0,0 +1,5 @@
+-- ============================================================================
+-- Filtro del catálogo y transiciones del planificador por estado de entrega
+-- ============================================================================
+
+CREATE INDEX idx_reporte_entrega ON reporte (estado_entrega, proxima_ejecucion);
@@ -0,0 +1,5 @@
+-- ============================================================================
+-- Relectura incremental del planificador (reportes modificados desde una marca)
+-- ============================================================================
+
+CREATE INDEX idx_reporte_updated_at ON reporte (updated_at);
@@ -0,0 +1,189 @@
+"""
+Ocurrencias de reportes para calendarios y pronósticos
+Expande la programación compilada (reglas_programacion.py) de forma perezosa:
+las próximas N ejecuciones o todas las de una ventana, de un reporte, de
+varios (en orden cronológico) o de toda un área como feed iCalendar en streaming
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+import logging
+
+import reglas_programacion
+
+logger = logging.getLogger(__name__)
+
+OCURRENCIAS_CONFIG = {
+    # Ocurrencias devueltas por defecto / máximo por llamada JSON
+    'limite_defecto': int(os.environ.get('OCURRENCIAS_LIMITE', 10)),
+    'limite_max': int(os.environ.get('OCURRENCIAS_LIMITE_MAX', 1000)),
+    # Ventana del feed de calendario (días desde `desde`)
+    'ventana_dias': int(os.environ.get('CALENDARIO_VENTANA_DIAS', 90)),
+    'ventana_max_dias': int(os.environ.get('CALENDARIO_VENTANA_MAX_DIAS', 366)),
+    # Duración de cada evento del feed y eventos por bloque enviado
+    'duracion_minutos': int(os.environ.get('CALENDARIO_DURACION_MINUTOS', 30)),
+    'eventos_bloque': int(os.environ.get('CALENDARIO_EVENTOS_BLOQUE', 500)),
+}
+
+SQL_PROGRAMACION_REPORTES = """
+    SELECT r.id_reporte, r.codigo_interno, r.nombre, r.proxima_ejecucion,
+           s.frecuencia, s.reglas_json
+    FROM reporte r
+    LEFT JOIN reporte_schedule s ON r.id_reporte = s.reporte_id
+    WHERE r.id_reporte IN ({marcadores})
+"""
+
+SQL_PROGRAMACION_AREA = """
+    SELECT r.id_reporte, r.codigo_interno, r.nombre, r.proxima_ejecucion,
+           s.frecuencia, s.reglas_json
+    FROM reporte r
+    JOIN reporte_schedule s ON r.id_reporte = s.reporte_id
+    WHERE r.estado != 'Inactivo'
+    AND ({filtro_area})
+"""
+
+# Rol del área en el reporte → columna
+COLUMNAS_AREA = {
+    'reportante': 'r.area_reportante_id',
+    'ejecutora': 'r.area_ejecutora_id',
+    'receptora': 'r.area_receptora_id',
+}
+
+
+def leer_fecha(valor, fin_de_dia=False):
+    """ISO 'YYYY-MM-DD' o 'YYYY-MM-DDTHH:MM' → datetime (un día solo cubre hasta las 23:59:59 si fin_de_dia)"""
+    if not valor:
+        return None
+    try:
+        fecha = datetime.fromisoformat(valor)
+    except ValueError:
+        raise ValueError(f"Fecha no válida: {valor} (use YYYY-MM-DD o YYYY-MM-DDTHH:MM)")
+    if fin_de_dia and len(valor) == 10:
+        fecha += timedelta(days=1, microseconds=-1)
+    return fecha
+
+
+def leer_ventana(args, hasta_defecto_dias=None, maximo_dias=None):
+    """(desde, hasta) desde ?desde=&hasta= (desde = ahora por defecto)"""
+    desde = leer_fecha(args.get('desde')) or datetime.now()
+    hasta = leer_fecha(args.get('hasta'), fin_de_dia=True)
+    if hasta is None and hasta_defecto_dias:
+        hasta = desde + timedelta(days=hasta_defecto_dias)
+    if hasta is not None and hasta < desde:
+        raise ValueError("'hasta' debe ser posterior a 'desde'")
+    if hasta is not None and maximo_dias and hasta - desde > timedelta(days=maximo_dias):
+        raise ValueError(f"La ventana máxima es de {maximo_dias} días")
+    return desde, hasta
+
+
+def programa_de(fila):
+    """Programa compilado (compartido) de una fila con frecuencia y reglas_json"""
+    return reglas_programacion.compilar(fila['frecuencia'], fila['reglas_json'])
+
+
+def cargar_reportes(cursor, ids):
+    """{id_reporte: fila} con la programación de los reportes pedidos"""
+    if not ids:
+        return {}
+    cursor.execute(
+        SQL_PROGRAMACION_REPORTES.format(marcadores=','.join(['%s'] * len(ids))),
+        list(ids)
+    )
+    return {fila['id_reporte']: fila for fila in cursor.fetchall()}
+
+
+def cargar_area(cursor, id_area, rol=None):
+    """Filas de programación de los reportes activos de un área (rol: reportante/ejecutora/receptora, o cualquiera)"""
+    if rol:
+        columnas = [COLUMNAS_AREA[rol]]
+    else:
+        columnas = list(COLUMNAS_AREA.values())
+    cursor.execute(
+        SQL_PROGRAMACION_AREA.format(filtro_area=' OR '.join(f"{columna} = %s" for columna in columnas)),
+        [id_area] * len(columnas)
+    )
+    return cursor.fetchall()
+
+
+def ocurrencias_reporte(fila, desde, hasta=None, limite=None):
+    """Ocurrencias perezosas de un reporte (la primera es su proxima_ejecucion si cae en la ventana)"""
+    return reglas_programacion.expandir(programa_de(fila), desde, hasta, limite, fila['proxima_ejecucion'])
+
+
+def ocurrencias_reportes(filas, desde, hasta=None, limite=None):
+    """(fecha, id_reporte) de varios reportes en orden cronológico, perezoso"""
+    return reglas_programacion.expandir_varios(
+        ((fila['id_reporte'], programa_de(fila), fila['proxima_ejecucion']) for fila in filas),
+        desde, hasta, limite
+    )
+
+
+# ============================================================================
+# FEED iCALENDAR (RFC 5545)
+# ============================================================================
+
+def escapar_ics(texto):
+    return (
+        str(texto or '')
+        .replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def plegar_ics(linea):
+    """Líneas de máximo 75 octetos; las continuaciones empiezan con un espacio"""
+    if len(linea.encode('utf-8')) <= 75:
+        return linea
+    partes, actual = [], ''
+    for caracter in linea:
+        if len((actual + caracter).encode('utf-8')) > (75 if not partes else 74):
+            partes.append(actual)
+            actual = ''
+        actual += caracter
+    partes.append(actual)
+    return '\r\n '.join(partes)
+
+
+def feed_ics(filas, desde, hasta, nombre_calendario,
+             duracion_minutos=30, eventos_bloque=500, dominio='alejandria'):
+    """
+    Genera el feed iCalendar por bloques de texto (para un Response en streaming)
+
+    Un reporte a la vez y `eventos_bloque` eventos por bloque: la memoria no
+    crece con la ventana ni con el número de ocurrencias
+    """
+    sello = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    duracion = f"PT{duracion_minutos}M"
+
+    yield '\r\n'.join([
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:-//{dominio}//Calendario de reportes//ES',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        plegar_ics(f'X-WR-CALNAME:{escapar_ics(nombre_calendario)}'),
+    ]) + '\r\n'
+
+    bloque, eventos = [], 0
+    for fila in filas:
+        resumen = plegar_ics(f"SUMMARY:{escapar_ics(fila['codigo_interno'])} - {escapar_ics(fila['nombre'])}")
+        for fecha in ocurrencias_reporte(fila, desde, hasta):
+            # isoformat() es varias veces más rápido que strftime en ventanas grandes
+            inicio = fecha.isoformat(timespec='seconds').replace('-', '').replace(':', '')
+            bloque.append(
+                'BEGIN:VEVENT\r\n'
+                f"UID:{fila['id_reporte']}-{inicio}@{dominio}\r\n"
+                f'DTSTAMP:{sello}\r\n'
+                f'DTSTART:{inicio}\r\n'
+                f'DURATION:{duracion}\r\n'
+                f'{resumen}\r\n'
+                'END:VEVENT\r\n'
+            )
+            eventos += 1
+            if len(bloque) >= eventos_bloque:
+                yield ''.join(bloque)
+                bloque = []
+
+    bloque.append('END:VCALENDAR\r\n')
+    yield ''.join(bloque)
+    logger.debug(f"Feed {nombre_calendario}: {eventos} eventos entre {desde} y {hasta}")
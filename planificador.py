@@ -0,0 +1,468 @@
+"""
+Planificador de vencimientos
+Mantiene reporte.estado_entrega al día: EN_TIEMPO / ENTREGADO → PROXIMO_VENCER → RETRASADO
+Un hilo duerme hasta el próximo instante de transición (min-heap) y aplica
+por lotes todas las transiciones que vencieron
+
+Solo un proceso aplica transiciones: el que tiene el candado GET_LOCK
+'alejandria_planificador' (los demás workers esperan para tomarlo si el
+líder cae). Se puede correr aparte con `flask reportes planificador`.
+"""
+
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+import logging
+
+import mysql.connector
+
+from db import DB_CONFIG, get_connection
+from services.reporte_service import ReporteService
+import estadisticas
+import cache_http
+
+logger = logging.getLogger(__name__)
+
+PLANIFICADOR_CONFIG = {
+    'activo': os.environ.get('PLANIFICADOR_ACTIVO', '1') == '1',
+    # Reportes por transacción al aplicar transiciones
+    'tamano_lote': int(os.environ.get('PLANIFICADOR_LOTE', 500)),
+    # Recarga completa periódica (cambios hechos por otros procesos o directo en la BD)
+    'recarga': int(os.environ.get('PLANIFICADOR_RECARGA_SEGUNDOS', 600)),
+    # Segundos entre intentos de tomar el candado de líder
+    'espera_lider': int(os.environ.get('PLANIFICADOR_ESPERA_LIDER_SEGUNDOS', 30)),
+    # Cada cuánto el líder revisa version_datos para releer cambios de otros procesos
+    'sondeo': int(os.environ.get('PLANIFICADOR_SONDEO_SEGUNDOS', 60)),
+    # Margen al releer por updated_at: se fija al ejecutar la sentencia, no al
+    # confirmar, así que una transacción lenta puede quedar antes de la marca
+    'solape': int(os.environ.get('PLANIFICADOR_SOLAPE_SEGUNDOS', 60)),
+}
+
+NOMBRE_LOCK = 'alejandria_planificador'
+
+SQL_PENDIENTES = """
+    SELECT r.id_reporte, r.proxima_ejecucion, r.estado_entrega, s.frecuencia
+    FROM reporte r
+    LEFT JOIN reporte_schedule s ON r.id_reporte = s.reporte_id
+    WHERE r.proxima_ejecucion IS NOT NULL
+"""
+
+# Siempre una fila: versión (NULL si aún no existe) y hora de la BD (marca de updated_at)
+SQL_VERSION = "SELECT (SELECT version FROM version_datos WHERE clave = %s), NOW()"
+
+# Reportes modificados desde una marca (índice de migraciones/007)
+SQL_MODIFICADOS = SQL_PENDIENTES + " AND r.updated_at >= %s"
+
+
+def siguiente_transicion(proxima_ejecucion, frecuencia, estado_actual, ahora=None):
+    """
+    Instante en que el estado almacenado deja de ser correcto
+
+    Returns:
+        datetime | None: ahora mismo si ya está desactualizado, None si no hay más transiciones
+    """
+    if not proxima_ejecucion:
+        return None
+    ahora = ahora or datetime.now()
+
+    if ReporteService.estado_recalculado(proxima_ejecucion, frecuencia, estado_actual) != estado_actual:
+        return ahora
+    if estado_actual == 'RETRASADO':
+        return None
+
+    alerta = proxima_ejecucion - timedelta(hours=ReporteService.umbral_alerta(frecuencia))
+    if estado_actual == 'PROXIMO_VENCER' or alerta <= ahora:
+        # RETRASADO cuando ahora > proxima_ejecucion
+        return proxima_ejecucion + timedelta(microseconds=1)
+    return alerta
+
+
+class Planificador:
+    """
+    Hilo de transiciones de estado_entrega
+
+    heap: [(instante, id_reporte), ...]; las entradas viejas no se limpian,
+    al aplicarlas se relee el reporte y solo cambia lo que corresponde.
+
+    El hilo corre en cada proceso con PLANIFICADOR_ACTIVO=1, pero solo el
+    líder (dueño del candado, en una conexión dedicada) carga el heap y aplica
+    transiciones; los escritores de otros procesos no le avisan directamente:
+    cuando cambia version_datos el líder relee solo los reportes con
+    updated_at posterior a la última lectura (menos `solape` segundos). Las
+    versiones que produjo el propio planificador (_propias) no cuentan como
+    cambio. La recarga completa queda para cada `recarga` segundos.
+    """
+
+    def __init__(self, tamano_lote=500, recarga=600, espera_lider=30, sondeo=60, solape=60, **_):
+        self.tamano_lote = tamano_lote
+        self.recarga = recarga
+        self.espera_lider = espera_lider
+        self.sondeo = sondeo
+        self.solape = solape
+
+        self._heap = []
+        self._cond = threading.Condition()
+        self._detener = False
+        self._hilo = None
+        self._recargado_en = None
+        self._conexion_lider = None
+        self.lider = False
+        self._version = None
+        self._propias = set()
+        self._leido_hasta = None
+        self._sondeado_en = None
+
+        self.contadores = {
+            'liderazgos': 0,
+            'recargas': 0,
+            'sincronizaciones': 0,
+            'lotes': 0,
+            'transiciones': 0,
+            'errores': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # CICLO DE VIDA
+    # ------------------------------------------------------------------
+
+    def iniciar(self):
+        with self._cond:
+            if self._hilo and self._hilo.is_alive():
+                return
+            self._detener = False
+            self._hilo = threading.Thread(target=self._ciclo, name='planificador-vencimientos', daemon=True)
+            self._hilo.start()
+
+    def detener(self, timeout=5):
+        with self._cond:
+            self._detener = True
+            self._cond.notify()
+        if self._hilo:
+            self._hilo.join(timeout)
+
+    def _ciclo(self):
+        try:
+            while True:
+                with self._cond:
+                    if self._detener:
+                        return
+
+                try:
+                    if self.lider or self._tomar_liderazgo():
+                        self._trabajar()
+                except Exception as e:
+                    self.contadores['errores'] += 1
+                    logger.error(f"Planificador: {e}")
+                    # Reintentar después (ej. la BD no está disponible)
+                    if self.lider:
+                        self._recargado_en = time.monotonic() - self.recarga + 30
+
+                with self._cond:
+                    if self._detener:
+                        return
+                    if self.lider and self._recargado_en is None:
+                        continue
+                    espera = self._espera()
+                    if espera > 0:
+                        self._cond.wait(espera)
+        finally:
+            self._soltar_liderazgo()
+
+    def _trabajar(self):
+        """Un paso del líder: recarga si venció, relee lo que escribieron otros procesos y aplica lo vencido"""
+        if not self._sigue_siendo_lider():
+            return
+        recargado_en = self._recargado_en
+        if recargado_en is None or time.monotonic() - recargado_en > self.recarga:
+            self.recargar()
+        else:
+            self.sincronizar()
+        self.aplicar_vencidas()
+
+    def _espera(self):
+        """Segundos hasta lo primero que toque: transición, sondeo, recarga o nuevo intento de liderazgo"""
+        if not self.lider:
+            return self.espera_lider
+        ahora = time.monotonic()
+        espera = min(
+            self.recarga - (ahora - (self._recargado_en or ahora)),
+            self.sondeo - (ahora - (self._sondeado_en or ahora)),
+        )
+        if self._heap:
+            espera = min(espera, (self._heap[0][0] - datetime.now()).total_seconds())
+        return espera
+
+    # ------------------------------------------------------------------
+    # LIDERAZGO (GET_LOCK)
+    # ------------------------------------------------------------------
+
+    def _tomar_liderazgo(self):
+        """
+        GET_LOCK sin espera en una conexión dedicada (fuera del pool)
+        El candado vive lo que viva la sesión: si el proceso líder muere,
+        MySQL lo libera y otro worker lo toma en su próximo intento
+        """
+        conn = mysql.connector.connect(**{**DB_CONFIG, 'autocommit': True})
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT GET_LOCK(%s, 0)", (NOMBRE_LOCK,))
+            obtenido = cursor.fetchone()[0] == 1
+        finally:
+            cursor.close()
+
+        if not obtenido:
+            conn.close()
+            return False
+
+        self._conexion_lider = conn
+        self.lider = True
+        self._recargado_en = None
+        self.contadores['liderazgos'] += 1
+        logger.info("Planificador: este proceso es el líder (aplica las transiciones)")
+        return True
+
+    def _sigue_siendo_lider(self):
+        try:
+            self._conexion_lider.ping(reconnect=False)
+            return True
+        except Exception as e:
+            logger.warning(f"Planificador: se perdió la conexión del candado ({e}), se deja de ser líder")
+            self._soltar_liderazgo()
+            return False
+
+    def _soltar_liderazgo(self):
+        conn, self._conexion_lider = self._conexion_lider, None
+        self.lider = False
+        self._version = None
+        self._propias = set()
+        with self._cond:
+            self._heap = []
+        if conn is not None:
+            try:
+                # Cerrar la sesión libera el candado
+                conn.close()
+            except Exception:
+                pass
+
+    def _cambios_ajenos(self, version):
+        """True si entre la última versión leída y `version` hay incrementos que no hizo este planificador"""
+        if self._version is None or version < self._version:
+            return True
+        nuevas = version - self._version
+        # Más incrementos que versiones propias: al menos uno es de otro
+        if nuevas > len(self._propias):
+            return True
+        return any(v not in self._propias for v in range(self._version + 1, version + 1))
+
+    def sincronizar(self):
+        """
+        Cada `sondeo` segundos: si version_datos cambió por escrituras de otros,
+        reprograma solo los reportes modificados desde la última lectura
+        (las entradas viejas del heap se descartan al aplicarlas)
+        """
+        if self._sondeado_en is not None and time.monotonic() - self._sondeado_en < self.sondeo:
+            return 0
+        conn = get_connection()
+        cursor = conn.cursor()
+        try:
+            version, ahora_bd = self._leer_version(cursor)
+            filas = []
+            if self._cambios_ajenos(version):
+                cursor.execute(SQL_MODIFICADOS, (self._leido_hasta - timedelta(seconds=self.solape),))
+                filas = cursor.fetchall()
+            conn.rollback()
+        finally:
+            cursor.close()
+            conn.close()
+
+        self._version = version
+        self._propias = {v for v in self._propias if v > version}
+        self._leido_hasta = ahora_bd
+        for id_reporte, proxima, estado_actual, frecuencia in filas:
+            self.programar(id_reporte, proxima, frecuencia, estado_actual)
+        if filas:
+            self.contadores['sincronizaciones'] += 1
+        return len(filas)
+
+    def _leer_version(self, cursor):
+        cursor.execute(SQL_VERSION, (cache_http.CLAVE_VERSION,))
+        version, ahora_bd = cursor.fetchone()
+        self._sondeado_en = time.monotonic()
+        return int(version or 0), ahora_bd
+
+    # ------------------------------------------------------------------
+    # HEAP
+    # ------------------------------------------------------------------
+
+    def programar(self, id_reporte, proxima_ejecucion, frecuencia, estado_actual):
+        """Agrega la próxima transición de un reporte y despierta el hilo si es la más cercana"""
+        instante = siguiente_transicion(proxima_ejecucion, frecuencia, estado_actual)
+        if instante is None:
+            return
+        with self._cond:
+            heapq.heappush(self._heap, (instante, id_reporte))
+            if self._heap[0] == (instante, id_reporte):
+                self._cond.notify()
+
+    def invalidar(self):
+        """Fuerza una recarga completa ya (después de cargas o recálculos masivos)"""
+        with self._cond:
+            self._recargado_en = None
+            self._cond.notify()
+
+    def recargar(self):
+        """Reconstruye el heap desde la BD (versión y marca se leen antes: un cambio posterior se ve en el sondeo)"""
+        conn = get_connection()
+        cursor = conn.cursor()
+        try:
+            self._version, self._leido_hasta = self._leer_version(cursor)
+            self._propias = set()
+            cursor.execute(SQL_PENDIENTES)
+            filas = cursor.fetchall()
+            conn.rollback()
+        finally:
+            cursor.close()
+            conn.close()
+
+        ahora = datetime.now()
+        heap = []
+        for id_reporte, proxima, estado_actual, frecuencia in filas:
+            instante = siguiente_transicion(proxima, frecuencia, estado_actual, ahora)
+            if instante is not None:
+                heap.append((instante, id_reporte))
+        heapq.heapify(heap)
+
+        with self._cond:
+            self._heap = heap
+        self._recargado_en = time.monotonic()
+        self.contadores['recargas'] += 1
+        logger.info(f"Planificador: {len(heap)} transiciones pendientes")
+
+    def _tomar_vencidas(self):
+        """Saca del heap hasta tamano_lote entradas vencidas (muchas comparten instante, ej. 08:00)"""
+        limite = datetime.now()
+        ids = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= limite and len(ids) < self.tamano_lote:
+                ids.append(heapq.heappop(self._heap)[1])
+        return list(dict.fromkeys(ids))
+
+    # ------------------------------------------------------------------
+    # APLICACIÓN
+    # ------------------------------------------------------------------
+
+    def aplicar_vencidas(self):
+        """Aplica todos los lotes vencidos; retorna la cantidad de reportes que cambiaron"""
+        total = 0
+        while True:
+            ids = self._tomar_vencidas()
+            if not ids:
+                return total
+            total += self.aplicar_lote(ids)
+
+    def aplicar_lote(self, ids):
+        """
+        Relee los reportes con bloqueo, recalcula el estado y actualiza los que cambiaron
+        (un UPDATE con CASE + ajuste de contadores, en una transacción)
+        """
+        conn = get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(SQL_PENDIENTES + f"""
+                AND r.id_reporte IN ({','.join(['%s'] * len(ids))})
+                FOR UPDATE
+            """, ids)
+            filas = cursor.fetchall()
+
+            cambios, deltas, siguientes = [], {}, []
+            vistos = set()
+            for id_reporte, proxima, estado_actual, frecuencia in filas:
+                if id_reporte in vistos:
+                    continue
+                vistos.add(id_reporte)
+                nuevo = ReporteService.estado_recalculado(proxima, frecuencia, estado_actual)
+                if nuevo != estado_actual:
+                    cambios.append((id_reporte, nuevo))
+                    if estado_actual:
+                        deltas[f'estado_entrega:{estado_actual}'] = deltas.get(f'estado_entrega:{estado_actual}', 0) - 1
+                    deltas[f'estado_entrega:{nuevo}'] = deltas.get(f'estado_entrega:{nuevo}', 0) + 1
+                siguientes.append((id_reporte, proxima, frecuencia, nuevo))
+
+            if cambios:
+                casos = ' '.join(['WHEN %s THEN %s'] * len(cambios))
+                params = [valor for cambio in cambios for valor in cambio]
+                params.extend(id_reporte for id_reporte, _ in cambios)
+                cursor.execute(f"""
+                    UPDATE reporte
+                    SET estado_entrega = CASE id_reporte {casos} END
+                    WHERE id_reporte IN ({','.join(['%s'] * len(cambios))})
+                """, params)
+                estadisticas.ajustar(cursor, deltas)
+
+            conn.commit()
+
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+        for id_reporte, proxima, frecuencia, estado in siguientes:
+            self.programar(id_reporte, proxima, frecuencia, estado)
+
+        self.contadores['lotes'] += 1
+        self.contadores['transiciones'] += len(cambios)
+        if cambios:
+            # La versión que produce este incremento no es un cambio para el próximo sondeo
+            version = cache_http.marcar_cambio()
+            if version is not None:
+                self._propias.add(version)
+            logger.info(f"Planificador: {len(cambios)} reportes cambiaron de estado de entrega")
+        return len(cambios)
+
+    def estadisticas(self):
+        with self._cond:
+            pendientes = len(self._heap)
+            proxima = self._heap[0][0].isoformat() if self._heap else None
+        return {
+            **self.contadores,
+            'activo': bool(self._hilo and self._hilo.is_alive()),
+            'lider': self.lider,
+            'pendientes': pendientes,
+            'proxima_transicion': proxima,
+        }
+
+
+planificador = Planificador(**PLANIFICADOR_CONFIG)
+
+
+def iniciar():
+    """Arranca el hilo si PLANIFICADOR_ACTIVO=1 (idempotente; lo llama cada request)"""
+    hilo = planificador._hilo
+    if PLANIFICADOR_CONFIG['activo'] and not (hilo and hilo.is_alive()):
+        planificador.iniciar()
+
+
+def ejecutar():
+    """Proceso dedicado: corre el planificador en primer plano hasta Ctrl+C"""
+    planificador.iniciar()
+    try:
+        while planificador._hilo.is_alive():
+            planificador._hilo.join(1)
+    except KeyboardInterrupt:
+        planificador.detener()
+
+
+def notificar_programacion(id_reporte, proxima_ejecucion, frecuencia, estado_entrega):
+    """Informa una próxima ejecución nueva (creación, entrega) si este proceso es el líder"""
+    if planificador.lider:
+        planificador.programar(id_reporte, proxima_ejecucion, frecuencia, estado_entrega)
+
+
+def invalidar_planificador():
+    """Recarga completa del heap (después de importaciones o recálculos masivos; otros procesos lo ven por version_datos)"""
+    if planificador.lider:
+        planificador.invalidar()
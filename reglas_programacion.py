@@ -0,0 +1,324 @@
+"""
+Reglas de programación compiladas
+Convierte reglas_json (reglas dinámicas diaria/semanal/mensual del formulario
+y ciclos fijos por hitos) en objetos inmutables, cacheados por contenido, y
+evalúa todas las reglas juntas: la próxima ejecución es la más temprana
+"""
+
+import calendar
+import hashlib
+import heapq
+import json
+import os
+import threading
+from collections import namedtuple, OrderedDict
+from itertools import chain, islice
+from datetime import datetime, timedelta, time as hora_del_dia
+import logging
+
+from calendario import es_dia_laboral, siguiente_dia_laboral, laborales_desde
+
+logger = logging.getLogger(__name__)
+
+# Programas compilados distintos que se conservan en memoria
+REGLAS_CACHE_MAX = int(os.environ.get('REGLAS_CACHE_MAX', 4096))
+
+# Días que se buscan hacia adelante antes de declarar una regla sin ocurrencias
+# (ej. semanal solo sábados/domingos: nunca cae en día laboral)
+HORIZONTE_DIAS = 400
+
+HORA_DEFECTO = (8, 0)
+
+
+def leer_hora(texto):
+    """'HH:MM' → (hora, minuto); 08:00 si falta o no es válida"""
+    try:
+        hora, minuto = map(int, str(texto).split(':')[:2])
+        hora_del_dia(hora, minuto)
+        return hora, minuto
+    except (TypeError, ValueError):
+        return HORA_DEFECTO
+
+
+def dia_en_mes(anio, mes, dia):
+    """El día pedido o el último del mes si no existe (31 en abril → 30)"""
+    return min(dia, calendar.monthrange(anio, mes)[1])
+
+
+def sumar_meses(fecha, meses):
+    indice = fecha.month - 1 + meses
+    anio, mes = fecha.year + indice // 12, indice % 12 + 1
+    return fecha.replace(year=anio, month=mes, day=dia_en_mes(anio, mes, fecha.day))
+
+
+# ============================================================================
+# REGLAS (inmutables; siguiente(desde) = primera ocurrencia > desde o None)
+# ============================================================================
+
+class Regla:
+    """Base de las reglas: sucesivas(desde) = siguiente() encadenado, perezoso"""
+    __slots__ = ()
+
+    def sucesivas(self, desde):
+        actual = self.siguiente(desde)
+        while actual:
+            yield actual
+            siguiente = self.siguiente(actual)
+            if siguiente is None or siguiente <= actual:
+                return
+            actual = siguiente
+
+
+class ReglaDiaria(namedtuple('ReglaDiaria', 'hora minuto'), Regla):
+    """Todos los días a la hora indicada; si no es laboral, el siguiente laboral"""
+    __slots__ = ()
+
+    def siguiente(self, desde):
+        proxima = desde.replace(hour=self.hora, minute=self.minuto, second=0, microsecond=0)
+        if proxima <= desde:
+            proxima += timedelta(days=1)
+        return siguiente_dia_laboral(proxima)
+
+    def sucesivas(self, desde):
+        # Recorre directamente los días laborales precalculados del calendario
+        hora = hora_del_dia(self.hora, self.minuto)
+        for dia in laborales_desde(self.siguiente(desde).date()):
+            yield datetime.combine(dia, hora)
+
+
+class ReglaSemanal(namedtuple('ReglaSemanal', 'hora minuto dias'), Regla):
+    """
+    Días de la semana (0=Lunes … 6=Domingo, como date.weekday()) a la hora indicada
+    Un día festivo se omite: la ocurrencia pasa al siguiente día marcado
+    """
+    __slots__ = ()
+
+    def siguiente(self, desde):
+        fecha = desde.date()
+        for _ in range(HORIZONTE_DIAS):
+            if fecha.weekday() in self.dias and es_dia_laboral(fecha):
+                proxima = datetime(fecha.year, fecha.month, fecha.day, self.hora, self.minuto)
+                if proxima > desde:
+                    return proxima
+            fecha += timedelta(days=1)
+        return None
+
+
+class ReglaMensual(namedtuple('ReglaMensual', 'hora minuto dias'), Regla):
+    """Días del mes (1-31; los que no existen caen en el último) → siguiente laboral"""
+    __slots__ = ()
+
+    def siguiente(self, desde):
+        anio, mes = desde.year, desde.month
+        for _ in range(13):
+            for dia in self.dias:
+                proxima = datetime(anio, mes, dia_en_mes(anio, mes, dia), self.hora, self.minuto)
+                if proxima > desde:
+                    return siguiente_dia_laboral(proxima)
+            anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+        return None
+
+
+class ReglaCicloFijo(namedtuple('ReglaCicloFijo', 'hora minuto mes dia'), Regla):
+    """Hito anual (mes 1-12, día) → siguiente laboral"""
+    __slots__ = ()
+
+    def siguiente(self, desde):
+        for anio in (desde.year, desde.year + 1):
+            proxima = datetime(anio, self.mes, dia_en_mes(anio, self.mes, self.dia), self.hora, self.minuto)
+            if proxima > desde:
+                return siguiente_dia_laboral(proxima)
+        return None
+
+
+class ReglaFrecuencia(namedtuple('ReglaFrecuencia', 'frecuencia'), Regla):
+    """Respaldo sin reglas (o sin ocurrencias): un periodo de la frecuencia a las 08:00"""
+    __slots__ = ()
+
+    def siguiente(self, desde):
+        base = desde.replace(hour=HORA_DEFECTO[0], minute=HORA_DEFECTO[1], second=0, microsecond=0)
+        if self.frecuencia == 'DIARIA':
+            proxima = base + timedelta(days=1)
+        elif self.frecuencia == 'SEMANAL':
+            proxima = base + timedelta(weeks=1)
+        elif self.frecuencia == 'MENSUAL':
+            proxima = sumar_meses(base, 1)
+        elif self.frecuencia == 'TRIMESTRAL':
+            proxima = base + timedelta(days=90)
+        elif self.frecuencia == 'SEMESTRAL':
+            proxima = base + timedelta(days=180)
+        elif self.frecuencia == 'ANUAL':
+            proxima = sumar_meses(base, 12)
+        else:
+            return None
+        return siguiente_dia_laboral(proxima)
+
+
+class Programa(namedtuple('Programa', 'reglas respaldo')):
+    """Reglas compiladas de un reporte: la próxima ejecución es la más temprana de todas"""
+    __slots__ = ()
+
+    def siguiente(self, desde):
+        if len(self.reglas) == 1:
+            proxima = self.reglas[0].siguiente(desde)
+        else:
+            proxima = min(filter(None, (regla.siguiente(desde) for regla in self.reglas)), default=None)
+        return proxima or self.respaldo.siguiente(desde)
+
+    def ocurrencias(self, desde, hasta=None, primera=None):
+        """
+        Generador de ocurrencias posteriores a `desde` (hasta `hasta` inclusive, o sin fin)
+        primera: próxima ejecución ya fijada (reporte.proxima_ejecucion); si cae
+        en la ventana se usa como primera ocurrencia y se continúa desde ella
+
+        Cada regla avanza por su cuenta y se mezclan en orden (heapq.merge):
+        una ocurrencia cuesta un paso de una sola regla
+        """
+        if primera and primera >= desde:
+            if hasta is not None and primera > hasta:
+                return
+            yield primera
+            desde = primera
+
+        flujos = [regla.sucesivas(desde) for regla in self.reglas]
+        fechas = heapq.merge(*flujos) if len(flujos) > 1 else iter(flujos[0] if flujos else ())
+        inicial = next(fechas, None)
+        if inicial is None:
+            fechas = self.respaldo.sucesivas(desde)
+            inicial = next(fechas, None)
+
+        anterior = None
+        for fecha in chain((inicial,) if inicial else (), fechas):
+            if hasta is not None and fecha > hasta:
+                return
+            if fecha != anterior:
+                yield fecha
+                anterior = fecha
+
+
+# ============================================================================
+# COMPILACIÓN
+# ============================================================================
+
+def compilar_regla(regla):
+    """Una regla de reglas_json → objeto inmutable (None si no es válida)"""
+    if not isinstance(regla, dict):
+        return None
+    hora, minuto = leer_hora(regla.get('time') or regla.get('hora') or '08:00')
+
+    try:
+        if regla.get('type') == 'dynamic':
+            freq = regla.get('freq')
+            if freq == 'diaria':
+                return ReglaDiaria(hora, minuto)
+            if freq == 'semanal':
+                # El formulario numera como JS Date.getDay(): 0=Domingo … 6=Sábado.
+                # Sábados y domingos nunca son laborales: se descartan al compilar
+                dias = frozenset((int(dia) + 6) % 7 for dia in regla.get('weeks') or []) - {5, 6}
+                return ReglaSemanal(hora, minuto, dias) if dias else None
+            if freq == 'mensual':
+                dias = tuple(sorted({int(dia) for dia in regla.get('days') or [] if 1 <= int(dia) <= 31}))
+                return ReglaMensual(hora, minuto, dias) if dias else None
+
+        elif regla.get('type') == 'fixed-cycle':
+            mes = int(regla.get('mes', 0)) + 1  # JS usa 0-11
+            dia = int(regla.get('dia', 1))
+            if 1 <= mes <= 12 and 1 <= dia <= 31:
+                return ReglaCicloFijo(hora, minuto, mes, dia)
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+class CompiladorReglas:
+    """
+    Cache LRU de programas compilados por (frecuencia, sha1 de reglas_json)
+
+    Miles de reportes comparten las mismas reglas: se parsean una sola vez
+    por proceso y todos los llamadores (creación, entrega, recálculo masivo,
+    pronósticos) reutilizan el mismo objeto.
+    """
+
+    def __init__(self, maximo=4096):
+        self.maximo = maximo
+        self._programas = OrderedDict()
+        self._lock = threading.Lock()
+        self.contadores = {'aciertos': 0, 'compilaciones': 0, 'reglas_invalidas': 0}
+
+    @staticmethod
+    def huella(reglas_json):
+        return hashlib.sha1((reglas_json or '').encode('utf-8')).hexdigest()
+
+    def compilar(self, frecuencia, reglas_json):
+        clave = (frecuencia, self.huella(reglas_json))
+        with self._lock:
+            programa = self._programas.get(clave)
+            if programa is not None:
+                self._programas.move_to_end(clave)
+                self.contadores['aciertos'] += 1
+                return programa
+
+        try:
+            reglas = json.loads(reglas_json) if reglas_json else []
+        except (TypeError, ValueError):
+            logger.warning(f"⚠️  reglas_json no es JSON válido: {str(reglas_json)[:80]}")
+            reglas = []
+        if isinstance(reglas, dict):
+            reglas = [reglas]
+        elif not isinstance(reglas, list):
+            reglas = []
+
+        compiladas = [compilar_regla(regla) for regla in reglas]
+        programa = Programa(
+            reglas=tuple(dict.fromkeys(regla for regla in compiladas if regla is not None)),
+            respaldo=ReglaFrecuencia(frecuencia),
+        )
+
+        with self._lock:
+            self._programas[clave] = programa
+            self._programas.move_to_end(clave)
+            while len(self._programas) > self.maximo:
+                self._programas.popitem(last=False)
+            self.contadores['compilaciones'] += 1
+            self.contadores['reglas_invalidas'] += compiladas.count(None)
+        return programa
+
+    def estadisticas(self):
+        with self._lock:
+            return {**self.contadores, 'programas': len(self._programas)}
+
+
+compilador = CompiladorReglas(REGLAS_CACHE_MAX)
+
+
+def compilar(frecuencia, reglas_json):
+    """Programa compilado (compartido) para una frecuencia y su reglas_json"""
+    return compilador.compilar(frecuencia, reglas_json)
+
+
+def proxima_ejecucion(frecuencia, reglas_json, desde=None):
+    """Primera ocurrencia posterior a `desde` (ahora por defecto); None para ADHOC sin reglas"""
+    return compilar(frecuencia, reglas_json).siguiente(desde or datetime.now())
+
+
+def expandir(programa, desde, hasta=None, limite=None, primera=None):
+    """Ocurrencias perezosas de un programa (sin `hasta` ni `limite` el generador no termina)"""
+    return islice(programa.ocurrencias(desde, hasta, primera), limite)
+
+
+def expandir_varios(programas, desde, hasta=None, limite=None):
+    """
+    Ocurrencias de varios reportes en orden cronológico: (fecha, clave)
+    programas: iterable de (clave, programa, primera)
+    Mezcla perezosa (heapq.merge): en memoria solo la siguiente ocurrencia de cada reporte
+    """
+    flujos = [
+        _etiquetar(clave, programa.ocurrencias(desde, hasta, primera))
+        for clave, programa, primera in programas
+    ]
+    return islice(heapq.merge(*flujos), limite)
+
+
+def _etiquetar(clave, fechas):
+    for fecha in fechas:
+        yield fecha, clave
@@ -4,36 +4,151 @@ Manejo completo de CRUD con dependencias preliminares simplificadas
 SOLO relación DEPENDE_DE (el reporte nuevo siempre es el HIJO)
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, Response
+import click
+import logging
 import json, os
+import threading
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from db import get_connection
+from db import get_request_connection, get_pool, init_app
 from services.reporte_service import ReporteService
+import grafo_dependencias
+import almacen_archivos
+import importacion
+import planificador
+import demoras
+import reglas_programacion
+import ocurrencias
+import cache_http
+import metricas
+import migraciones
+import busqueda
+import datos_referencia
+import estadisticas
+from bitacora import escritor_bitacora
+
+logger = logging.getLogger(__name__)
 
 reportes_bp = Blueprint('reportes', __name__)
+reportes_bp.record_once(lambda state: init_app(state.app))
 
-UPLOAD_FOLDER = "uploads/reportes"
+
+@reportes_bp.before_app_request
+def iniciar_planificador():
+    """El hilo arranca con el primer request de cada worker (después del fork, nunca en comandos CLI)"""
+    planificador.iniciar()
+
+
+# Viajes al servidor por cada reporte creado (ver ConexionPool.round_trips)
+METRICAS_CREACION = {
+    'creaciones': 0,
+    'round_trips_total': 0,
+    'round_trips_max': 0,
+    'round_trips_ultimo': 0,
+}
+_metricas_lock = threading.Lock()
+
+
+def registrar_round_trips(round_trips):
+    with _metricas_lock:
+        METRICAS_CREACION['creaciones'] += 1
+        METRICAS_CREACION['round_trips_total'] += round_trips
+        METRICAS_CREACION['round_trips_max'] = max(METRICAS_CREACION['round_trips_max'], round_trips)
+        METRICAS_CREACION['round_trips_ultimo'] = round_trips
+
+
+def preparar_dependencias(dependencias_json):
+    """
+    Normaliza las dependencias preliminares del formulario
+    Descarta entradas sin id numérico y repetidas (queda la primera de cada padre)
+    """
+    try:
+        dependencias = json.loads(dependencias_json or "[]")
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(dependencias, list):
+        return []
+
+    vistas = {}
+    for dep in dependencias:
+        if not isinstance(dep, dict):
+            continue
+        try:
+            id_padre = int(dep.get('id_reporte'))
+        except (TypeError, ValueError):
+            logger.warning(f"⚠️  Dependencia ignorada (id inválido): {dep}")
+            continue
+        vistas.setdefault(id_padre, (
+            id_padre,
+            dep.get('tipo_dependencia') or 'DATOS',
+            dep.get('criticidad') or 'MEDIA',
+            dep.get('observaciones'),
+        ))
+    return list(vistas.values())
+
+
+def insertar_dependencias_preliminares(cursor, reporte_id, dependencias, creado_por):
+    """
+    Inserta todas las dependencias DEPENDE_DE del reporte nuevo en una sola sentencia
+
+    INSERT ... SELECT contra reporte: los padres que no existen se omiten
+    en el mismo viaje, sin un SELECT previo de validación.
+    El reporte nuevo todavía no tiene hijos, así que sus dependencias no
+    pueden cerrar un ciclo (notificar_reporte las ubica en el orden topológico).
+
+    Returns:
+        int: Dependencias creadas
+    """
+    dependencias = [dep for dep in dependencias if dep[0] != reporte_id]
+    if not dependencias:
+        return 0
+
+    valores = " UNION ALL ".join(
+        ["SELECT %s AS id_padre, %s AS tipo_dependencia, %s AS criticidad, %s AS observaciones"]
+        * len(dependencias)
+    )
+    params = [valor for dep in dependencias for valor in dep]
+
+    cursor.execute(f"""
+        INSERT INTO reporte_dependencia (
+            reporte_origen_id,
+            reporte_dependiente_id,
+            tipo_dependencia,
+            criticidad,
+            observaciones,
+            validada,
+            creado_por
+        )
+        SELECT r.id_reporte, %s, d.tipo_dependencia, d.criticidad, d.observaciones, FALSE, %s
+        FROM ({valores}) d
+        JOIN reporte r ON r.id_reporte = d.id_padre
+    """, [reporte_id, creado_por] + params)
+
+    creadas = cursor.rowcount
+    if creadas < len(dependencias):
+        logger.warning(f"⚠️  {len(dependencias) - creadas} dependencia(s) ignoradas: el reporte padre no existe")
+    return creadas
 
 @reportes_bp.route('/crear_reporte', methods=['GET', 'POST'])
 def crear_reporte():
     """Crear un nuevo reporte con código auto-generado"""
     
     if request.method == 'POST':
-        print("="*50)
-        print("📝 CREANDO NUEVO REPORTE CON DEPENDENCIAS")
-        print("="*50)
+        logger.debug("📝 Creando nuevo reporte con dependencias")
         
         conn = None
         codigo_generado = None
         
         try:
-            conn = get_connection()
+            conn = get_request_connection()
+            round_trips_inicio = conn.round_trips
             cursor = conn.cursor(dictionary=True)
 
             # ============================================
             # 1. OBTENER Y VALIDAR DATOS DEL FORMULARIO
+            # (todo lo que no toca la BD va antes de abrir la transacción)
             # ============================================
             nombre = request.form.get("nombre")
             descripcion = request.form.get("descripcion")
@@ -44,18 +159,6 @@ def crear_reporte():
             if not nombre or not tipo_id:
                 raise ValueError("El nombre y tipo de reporte son obligatorios")
 
-            # ============================================
-            # 2. GENERAR CÓDIGO INTERNO AUTOMÁTICO
-            # ============================================
-            try:
-                codigo_generado = ReporteService.generar_codigo_interno(int(tipo_id))
-                print(f"✓ Código generado: {codigo_generado}")
-            except Exception as e:
-                raise ValueError(f"Error al generar código: {str(e)}")
-
-            # ============================================
-            # 3. RECOPILAR RESTO DE DATOS
-            # ============================================
             categoria_id = request.form.get("categoria_id") or None
             area_reportante = request.form.get("area_reportante_id")
             area_ejecutora = request.form.get("area_ejecutora_id")
@@ -72,13 +175,47 @@ def crear_reporte():
             ruta_entrega = request.form.get("ruta_entrega")
             creado_por = session.get("user_id", 1)
 
-            print(f"📋 Datos del reporte:")
-            print(f"   Código: {codigo_generado}")
-            print(f"   Nombre: {nombre}")
-            print(f"   Consideraciones: {'Sí' if consideraciones else 'No'}")
+            # Dependencias preliminares (JSON): SIMPLIFICADO, solo DEPENDE_DE (el nuevo siempre es HIJO)
+            dependencias = preparar_dependencias(request.form.get("dependencias", "[]"))
+            logger.debug(f"📊 Dependencias a crear: {len(dependencias)}")
+
+            # ============================================
+            # 2. SCHEDULE Y PRÓXIMA EJECUCIÓN (en memoria)
+            # ============================================
+            frecuencia_form = request.form.get("frecuencia")
+            reglas_json = request.form.get("reglas_json")
+
+            frecuencia = ReporteService.MAPA_FRECUENCIA.get(frecuencia_form, "ADHOC")
+
+            proxima_ejecucion = None
+            estado_entrega = None
+            try:
+                proxima_ejecucion = ReporteService.calcular_proxima_ejecucion(
+                    frecuencia, reglas_json
+                )
+                if proxima_ejecucion:
+                    estado_entrega = ReporteService.calcular_estado_entrega(
+                        proxima_ejecucion, frecuencia
+                    )
+                    logger.debug(f"✓ Próxima ejecución: {proxima_ejecucion}")
+            except Exception as e:
+                logger.warning(f"⚠️  Advertencia al calcular ejecución: {e}")
 
             # ============================================
-            # 4. INSERTAR REPORTE EN BASE DE DATOS
+            # 3. GENERAR CÓDIGO INTERNO AUTOMÁTICO
+            # (misma conexión y transacción que el INSERT del reporte)
+            # ============================================
+            try:
+                codigo_generado = ReporteService.generar_codigo_interno(int(tipo_id))
+                logger.debug(f"✓ Código generado: {codigo_generado}")
+            except Exception as e:
+                raise ValueError(f"Error al generar código: {str(e)}")
+
+            logger.debug(f"📋 Datos del reporte: código {codigo_generado}, nombre {nombre}, "
+                         f"consideraciones: {'Sí' if consideraciones else 'No'}")
+
+            # ============================================
+            # 4. INSERTAR REPORTE (con próxima ejecución y estado de entrega)
             # ============================================
             cursor.execute("""
                 INSERT INTO reporte (
@@ -87,150 +224,76 @@ def crear_reporte():
                     area_reportante_id, area_ejecutora_id, area_receptora_id,
                     audiencia, receptor_externo,
                     criticidad, formato_entrega, formato_reporte,
-                    ruta_entrega, creado_por, estado
-                ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+                    ruta_entrega, creado_por, estado,
+                    proxima_ejecucion, estado_entrega
+                ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
             """, (
                 codigo_generado, nombre, proposito, descripcion, consideraciones,
                 tipo_id, categoria_id,
                 area_reportante, area_ejecutora, area_receptora,
                 audiencia, receptor_externo,
                 criticidad, formato_entrega, formato_reporte,
-                ruta_entrega, creado_por, 'Por Validar'
+                ruta_entrega, creado_por, 'Por Validar',
+                proxima_ejecucion, estado_entrega
             ))
 
             reporte_id = cursor.lastrowid
-            print(f"✓ Reporte insertado con ID: {reporte_id}")
+            logger.debug(f"✓ Reporte insertado con ID: {reporte_id}")
 
             # ============================================
-            # 4.5 CREAR DEPENDENCIAS PRELIMINARES (NO VALIDADAS)
-            # SIMPLIFICADO: Solo DEPENDE_DE (el nuevo siempre es HIJO)
+            # 5. DEPENDENCIAS PRELIMINARES (NO VALIDADAS)
             # ============================================
-            dependencias_creadas = 0
-            
-            # Obtener dependencias del formulario (JSON)
-            dependencias_json = request.form.get("dependencias", "[]")
-            
-            try:
-                dependencias = json.loads(dependencias_json)
-            except:
-                dependencias = []
-            
-            print(f"📊 Dependencias a crear: {len(dependencias)}")
-            
-            # Crear dependencias donde el nuevo reporte es DEPENDIENTE
-            for dep in dependencias:
-                try:
-                    cursor.execute("""
-                        INSERT INTO reporte_dependencia (
-                            reporte_origen_id,
-                            reporte_dependiente_id,
-                            tipo_dependencia,
-                            criticidad,
-                            observaciones,
-                            validada,
-                            creado_por
-                        ) VALUES (%s, %s, %s, %s, %s, FALSE, %s)
-                    """, (
-                        dep.get('id_reporte'),           # El seleccionado es ORIGEN
-                        reporte_id,                       # El nuevo es DEPENDIENTE (hijo)
-                        dep.get('tipo_dependencia', 'DATOS'),
-                        dep.get('criticidad', 'MEDIA'),
-                        dep.get('observaciones'),
-                        creado_por
-                    ))
-                    dependencias_creadas += 1
-                    print(f"   ✓ Dependencia creada: {dep.get('codigo')} → {codigo_generado}")
-                except Exception as e:
-                    print(f"   ⚠️  Error al crear dependencia: {e}")
-            
-            print(f"✓ Total dependencias preliminares creadas: {dependencias_creadas}")
-
-            # ============================================
-            # 5. CONFIGURAR SCHEDULE Y CALCULAR PRÓXIMA EJECUCIÓN
-            # ============================================
-            frecuencia_form = request.form.get("frecuencia")
-            reglas_json = request.form.get("reglas_json")
+            dependencias_creadas = insertar_dependencias_preliminares(
+                cursor, reporte_id, dependencias, creado_por
+            )
+            logger.debug(f"✓ Total dependencias preliminares creadas: {dependencias_creadas}")
 
-            map_frecuencia = {
-                "diaria": "DIARIA",
-                "semanal": "SEMANAL",
-                "mensual": "MENSUAL",
-                "anual": "ANUAL",
-                "semestral": "SEMESTRAL",
-                "cuatrimestral": "TRIMESTRAL",
-                "trimestral": "TRIMESTRAL"
-            }
-
-            frecuencia = map_frecuencia.get(frecuencia_form, "ADHOC")
-            
             cursor.execute("""
                 INSERT INTO reporte_schedule (
                     reporte_id, frecuencia, reglas_json
                 ) VALUES ( %s, %s, %s)
             """, (reporte_id, frecuencia, reglas_json))
             
-            print(f"✓ Schedule configurado: {frecuencia}")
-
-            # Calcular próxima ejecución
-            try:
-                proxima_ejecucion = ReporteService.calcular_proxima_ejecucion(
-                    frecuencia, reglas_json
-                )
-                
-                if proxima_ejecucion:
-                    estado_entrega = ReporteService.calcular_estado_entrega(
-                        proxima_ejecucion, frecuencia
-                    )
-                    
-                    cursor.execute("""
-                        UPDATE reporte 
-                        SET proxima_ejecucion = %s,
-                            estado_entrega = %s
-                        WHERE id_reporte = %s
-                    """, (proxima_ejecucion, estado_entrega, reporte_id))
-                    
-                    print(f"✓ Próxima ejecución: {proxima_ejecucion}")
-            except Exception as e:
-                print(f"⚠️  Advertencia al calcular ejecución: {e}")
+            logger.debug(f"✓ Schedule configurado: {frecuencia}")
 
             # ============================================
             # 6. PROCESAR RECURSOS (GITLAB Y PDF)
             # ============================================
+            recursos = []
             gitlab_url = request.form.get("gitlab_url")
             if gitlab_url:
                 cursor.execute("""
                     INSERT INTO recurso (tipo, nombre, url, creado_por)
                     VALUES ('GITLAB', %s, %s, %s)
                 """, ("Repositorio GitLab", gitlab_url, creado_por))
-                recurso_id = cursor.lastrowid
-                
-                cursor.execute("""
-                    INSERT INTO reporte_recurso (reporte_id, recurso_id)
-                    VALUES (%s, %s)
-                """, (reporte_id, recurso_id))
-                print(f"✓ GitLab vinculado")
+                recursos.append(cursor.lastrowid)
+                logger.debug(f"✓ GitLab vinculado")
 
-            # Subir PDF
-            os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+            # Subir PDF al almacén por contenido (streaming: hash y tamaño en la misma pasada)
             archivo_pdf = request.files.get("pdf_formato")
             
             if archivo_pdf and archivo_pdf.filename:
                 filename = archivo_pdf.filename
-                ruta_archivo = os.path.join(UPLOAD_FOLDER, filename)
-                archivo_pdf.save(ruta_archivo)
-                size_bytes = os.path.getsize(ruta_archivo)
-                
-                cursor.execute("""
-                    INSERT INTO recurso (tipo, nombre, ruta_servidor, size_bytes, creado_por)
-                    VALUES ('PDF', %s, %s, %s, %s)
-                """, (filename, ruta_archivo, size_bytes, creado_por))
-                recurso_id = cursor.lastrowid
+                almacenado = almacen_archivos.guardar_stream(archivo_pdf.stream, filename)
                 
                 cursor.execute("""
+                    INSERT INTO recurso (tipo, nombre, ruta_servidor, size_bytes, hash_sha256, creado_por)
+                    VALUES ('PDF', %s, %s, %s, %s, %s)
+                """, (filename, almacenado['ruta'], almacenado['size_bytes'], almacenado['sha256'], creado_por))
+                recursos.append(cursor.lastrowid)
+                logger.debug(f"✓ PDF guardado ({'nuevo' if almacenado['nuevo'] else 'ya existía, reutilizado'})")
+
+            # Vínculos reporte ↔ recurso en un solo INSERT multi-fila
+            if recursos:
+                cursor.executemany("""
                     INSERT INTO reporte_recurso (reporte_id, recurso_id)
                     VALUES (%s, %s)
-                """, (reporte_id, recurso_id))
-                print(f"✓ PDF guardado")
+                """, [(reporte_id, recurso_id) for recurso_id in recursos])
+
+            # Contadores del dashboard (misma transacción)
+            estadisticas.ajustar(cursor, estadisticas.deltas_reporte(
+                criticidad, frecuencia, 'Por Validar', estado_entrega
+            ))
 
             # ============================================
             # 7. REGISTRAR EN BITÁCORA
@@ -244,17 +307,23 @@ def crear_reporte():
                     'tipo_id': tipo_id,
                     'frecuencia': frecuencia,
                     'dependencias_preliminares': dependencias_creadas
-                }
+                },
+                en_transaccion=True
             )
 
             # ============================================
-            # 8. COMMIT Y MENSAJE DE ÉXITO
+            # 8. COMMIT (única transacción) Y MENSAJE DE ÉXITO
             # ============================================
             conn.commit()
-            print("="*50)
-            print(f"✅ REPORTE {codigo_generado} CREADO EXITOSAMENTE")
-            print(f"✅ Dependencias preliminares: {dependencias_creadas}")
-            print("="*50)
+            registrar_round_trips(conn.round_trips - round_trips_inicio)
+
+            grafo_dependencias.notificar_reporte(conn, reporte_id)
+            busqueda.notificar_reporte(conn, reporte_id)
+            planificador.notificar_programacion(reporte_id, proxima_ejecucion, frecuencia, estado_entrega)
+            demoras.notificar_programacion(reporte_id, proxima_ejecucion)
+            # Después de las estructuras en memoria: la nueva versión ya las ve actualizadas
+            cache_http.marcar_cambio()
+            logger.info(f"✅ Reporte {codigo_generado} creado con {dependencias_creadas} dependencias preliminares")
             
             cursor.close()
             conn.close()
@@ -267,7 +336,7 @@ def crear_reporte():
             return redirect('/catalogos')
             
         except ValueError as ve:
-            print(f"❌ Error de validación: {str(ve)}")
+            logger.warning(f"⚠️  Error de validación: {str(ve)}")
             if conn:
                 try:
                     conn.rollback()
@@ -277,9 +346,7 @@ def crear_reporte():
             return redirect('/crear_reporte')
             
         except Exception as e:
-            print(f"❌ ERROR CRÍTICO: {type(e).__name__}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"❌ ERROR CRÍTICO: {type(e).__name__}: {str(e)}")
             
             if conn:
                 try:
@@ -293,52 +360,27 @@ def crear_reporte():
     # ============================================
     # GET - CARGAR FORMULARIO CON CATÁLOGOS
     # ============================================
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    cursor.execute("SELECT id_tipo, nombre FROM tipo_reporte ORDER BY nombre")
-    tipos = cursor.fetchall()
-
-    cursor.execute("SELECT id_categoria, nombre FROM categoria_reporte ORDER BY nombre")
-    categorias = cursor.fetchall()
-
-    cursor.execute("SELECT id_area, nombre FROM area ORDER BY nombre")
-    areas = cursor.fetchall()
-
-    # Obtener reportes APROBADOS para dependencias
-    cursor.execute("""
-        SELECT id_reporte, codigo_interno, nombre 
-        FROM reporte 
-        WHERE estado = 'Aprobado'
-        ORDER BY codigo_interno
-    """)
-    reportes_activos = cursor.fetchall()
-
-    # Obtener ENUMs
-    cursor.execute("SHOW COLUMNS FROM reporte LIKE 'criticidad'")
-    criticidad_raw = cursor.fetchone()
-    criticidad_e = []
-    if criticidad_raw:
-        enum_str = criticidad_raw["Type"]
-        criticidad_e = enum_str.replace("enum(", "").replace(")", "").replace("'", "").split(",")
-
-    cursor.execute("SHOW COLUMNS FROM reporte LIKE 'formato_entrega'")
-    formato_raw = cursor.fetchone()
-    formato_e = []
-    if formato_raw:
-        enum_str = formato_raw["Type"]
-        formato_e = enum_str.replace("enum(", "").replace(")", "").replace("'", "").split(",")
-
-    cursor.execute("SHOW COLUMNS FROM reporte LIKE 'formato_reporte'")
-    formato_raw = cursor.fetchone()
-    formato_er = []
-    if formato_raw:
-        enum_str = formato_raw["Type"]
-        formato_er = enum_str.replace("enum(", "").replace(")", "").replace("'", "").split(",")
-
+    # Catálogos y ENUMs desde la caché de referencia (sin consultas de esquema)
+    tipos = datos_referencia.tipos_reporte()
+    categorias = datos_referencia.categorias()
+    areas = datos_referencia.areas()
+
+    criticidad_e = datos_referencia.valores_enum('reporte', 'criticidad')
+    formato_e = datos_referencia.valores_enum('reporte', 'formato_entrega')
+    formato_er = datos_referencia.valores_enum('reporte', 'formato_reporte')
+
+    # Reportes APROBADOS para dependencias (desde el índice en memoria)
+    conn = get_request_connection()
+    cursor = conn.cursor()
+    indice = busqueda.obtener_indice(cursor)
     cursor.close()
     conn.close()
 
+    reportes_activos = [
+        {'id_reporte': r['id'], 'codigo_interno': r['codigo_interno'], 'nombre': r['nombre']}
+        for r in indice.reportes(estado='Aprobado')
+    ]
+
     return render_template(
         'crear_reporte.html',
         tipos=tipos,
@@ -369,28 +411,379 @@ def marcar_entregado(reporte_id):
             }), 500
             
     except Exception as e:
-        print(f"❌ ERROR al marcar entregado: {str(e)}")
+        logger.error(f"❌ ERROR al marcar entregado: {str(e)}")
         return jsonify({
             'success': False,
             'message': f'Error: {str(e)}'
         }), 500
 
 
+@reportes_bp.route('/api/reportes/marcar_entregados', methods=['POST'])
+def marcar_entregados():
+    """
+    Marca varios reportes como entregados en una sola transacción
+    
+    Body JSON:
+    {
+        "reporte_ids": [int, ...]
+    }
+    """
+    data = request.get_json(silent=True) or {}
+    reporte_ids = data.get('reporte_ids')
+    
+    if not isinstance(reporte_ids, list) or not reporte_ids:
+        return jsonify({'success': False, 'message': 'reporte_ids debe ser una lista no vacía'}), 400
+    try:
+        reporte_ids = [int(reporte_id) for reporte_id in reporte_ids]
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'reporte_ids solo admite enteros'}), 400
+    
+    try:
+        usuario_id = session.get("user_id", 1)
+        resultados = ReporteService.marcar_entregados(reporte_ids, usuario_id)
+        entregados = sum(1 for r in resultados.values() if r['success'])
+        logger.info(f"📦 Entrega masiva: {entregados}/{len(resultados)} reportes")
+        
+        return jsonify({
+            'success': entregados == len(resultados),
+            'entregados': entregados,
+            'resultados': [{'id_reporte': reporte_id, **resultado} for reporte_id, resultado in resultados.items()]
+        })
+        
+    except Exception as e:
+        logger.error(f"❌ ERROR en entrega masiva: {str(e)}")
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
+
+
+@reportes_bp.route('/api/reportes/recalcular', methods=['POST'])
+def recalcular_programacion():
+    """
+    Recalcula en lote la próxima ejecución y el estado de entrega de todos los reportes
+    
+    Body JSON (opcional):
+    {
+        "tamano_lote": int,
+        "recalcular_proxima": bool
+    }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        resumen = ReporteService.recalcular_programacion(
+            tamano_lote=int(data.get('tamano_lote', 2000)),
+            recalcular_proxima=bool(data.get('recalcular_proxima', False))
+        )
+        return jsonify({"success": True, **resumen})
+        
+    except Exception as e:
+        logger.error(f"❌ Error al recalcular programación: {str(e)}")
+        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+
+
+@reportes_bp.cli.command('migrar')
+def migrar_cli():
+    """Aplica las migraciones de esquema pendientes (paso de despliegue, antes de levantar workers)"""
+    aplicadas = migraciones.aplicar()
+    click.echo(f"Migraciones aplicadas: {', '.join(aplicadas) if aplicadas else 'ninguna (esquema al día)'}")
+
+
+@reportes_bp.cli.command('planificador')
+def planificador_cli():
+    """Corre el planificador de vencimientos como proceso dedicado (en los workers web: PLANIFICADOR_ACTIVO=0)"""
+    planificador.ejecutar()
+
+
+@reportes_bp.cli.command('recalcular-programacion')
+@click.option('--tamano-lote', default=2000, show_default=True, help='Filas por lote')
+@click.option('--recalcular-proxima', is_flag=True, help='Recalcular también próximas ejecuciones futuras')
+def recalcular_programacion_cli(tamano_lote, recalcular_proxima):
+    """Recalcula proxima_ejecucion y estado_entrega de todos los reportes"""
+    resumen = ReporteService.recalcular_programacion(tamano_lote, recalcular_proxima)
+    click.echo(f"Procesados: {resumen['procesados']} | Actualizados: {resumen['actualizados']} | "
+               f"Lotes: {resumen['lotes']} | {resumen['segundos']}s")
+
+
+# ============================================================================
+# OCURRENCIAS Y CALENDARIO
+# ============================================================================
+
+def leer_limite_ocurrencias(valor, hay_ventana):
+    """n pedido (acotado al máximo); sin n: el defecto, o el máximo si hay ventana"""
+    config = ocurrencias.OCURRENCIAS_CONFIG
+    if not valor:
+        return config['limite_max'] if hay_ventana else config['limite_defecto']
+    return max(1, min(int(valor), config['limite_max']))
+
+
+@reportes_bp.route('/api/reportes/<int:id_reporte>/ocurrencias')
+def ocurrencias_reporte(id_reporte):
+    """
+    Próximas ejecuciones de un reporte
+    
+    Parámetros: n (próximas N), desde / hasta (ventana ISO; 'hasta' de solo
+    fecha incluye todo el día). Sin ninguno: las próximas 10 desde ahora.
+    """
+    try:
+        desde, hasta = ocurrencias.leer_ventana(request.args)
+        limite = leer_limite_ocurrencias(request.args.get('n'), hasta is not None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        conn = get_request_connection()
+        cursor = conn.cursor(dictionary=True)
+        fila = ocurrencias.cargar_reportes(cursor, [id_reporte]).get(id_reporte)
+        cursor.close()
+        conn.close()
+        
+        if not fila:
+            return jsonify({"error": "Reporte no encontrado"}), 404
+        
+        # Una de más para saber si la lista quedó recortada
+        fechas = list(ocurrencias.ocurrencias_reporte(fila, desde, hasta, limite + 1))
+        
+        return jsonify({
+            "id_reporte": id_reporte,
+            "codigo_interno": fila['codigo_interno'],
+            "frecuencia": fila['frecuencia'],
+            "desde": desde.isoformat(),
+            "hasta": hasta.isoformat() if hasta else None,
+            "ocurrencias": [fecha.isoformat() for fecha in fechas[:limite]],
+            "truncado": len(fechas) > limite
+        })
+        
+    except Exception as e:
+        logger.error(f"❌ Error al expandir ocurrencias de {id_reporte}: {str(e)}")
+        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+
+
+@reportes_bp.route('/api/reportes/ocurrencias')
+def ocurrencias_varios_reportes():
+    """
+    Ocurrencias de varios reportes en orden cronológico (?ids=1,2,3)
+    Mismos parámetros que /api/reportes/<id>/ocurrencias; n es el total combinado
+    """
+    try:
+        ids = list(dict.fromkeys(
+            int(valor) for param in request.args.getlist('ids') for valor in param.split(',') if valor.strip()
+        ))
+        if not ids:
+            raise ValueError("Indique al menos un reporte (ids)")
+        if len(ids) > ocurrencias.OCURRENCIAS_CONFIG['limite_max']:
+            raise ValueError(f"Máximo {ocurrencias.OCURRENCIAS_CONFIG['limite_max']} reportes por llamada")
+        desde, hasta = ocurrencias.leer_ventana(request.args)
+        limite = leer_limite_ocurrencias(request.args.get('n'), hasta is not None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        conn = get_request_connection()
+        cursor = conn.cursor(dictionary=True)
+        filas = ocurrencias.cargar_reportes(cursor, ids)
+        cursor.close()
+        conn.close()
+        
+        combinadas = list(ocurrencias.ocurrencias_reportes(filas.values(), desde, hasta, limite + 1))
+        
+        return jsonify({
+            "desde": desde.isoformat(),
+            "hasta": hasta.isoformat() if hasta else None,
+            "no_encontrados": [id_reporte for id_reporte in ids if id_reporte not in filas],
+            "ocurrencias": [
+                {
+                    'fecha': fecha.isoformat(),
+                    'id_reporte': id_reporte,
+                    'codigo_interno': filas[id_reporte]['codigo_interno']
+                }
+                for fecha, id_reporte in combinadas[:limite]
+            ],
+            "truncado": len(combinadas) > limite
+        })
+        
+    except Exception as e:
+        logger.error(f"❌ Error al expandir ocurrencias: {str(e)}")
+        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+
+
+@reportes_bp.route('/api/areas/<int:id_area>/calendario.ics')
+def calendario_area(id_area):
+    """
+    Feed iCalendar con las ejecuciones de los reportes activos de un área
+    
+    Parámetros: desde / hasta (por defecto los próximos 90 días, máximo 366),
+    rol=reportante|ejecutora|receptora (por defecto cualquiera).
+    Se genera en streaming: un año de reportes DIARIA de todo un área no se
+    arma en memoria.
+    """
+    config = ocurrencias.OCURRENCIAS_CONFIG
+    rol = request.args.get('rol') or None
+    if rol and rol not in ocurrencias.COLUMNAS_AREA:
+        return jsonify({"error": f"rol debe ser uno de {', '.join(ocurrencias.COLUMNAS_AREA)}"}), 400
+    try:
+        desde, hasta = ocurrencias.leer_ventana(request.args, config['ventana_dias'], config['ventana_max_dias'])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    area = next((a for a in datos_referencia.areas() if a['id_area'] == id_area), None)
+    if not area:
+        return jsonify({"error": "Área no encontrada"}), 404
+    
+    try:
+        conn = get_request_connection()
+        cursor = conn.cursor(dictionary=True)
+        filas = ocurrencias.cargar_area(cursor, id_area, rol)
+        cursor.close()
+        conn.close()
+    except Exception as e:
+        logger.error(f"❌ Error al cargar calendario del área {id_area}: {str(e)}")
+        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+    
+    logger.info(f"📅 Calendario {area['nombre']}: {len(filas)} reportes entre {desde:%Y-%m-%d} y {hasta:%Y-%m-%d}")
+    feed = ocurrencias.feed_ics(
+        filas, desde, hasta, f"ALEJANDRIA - {area['nombre']}",
+        duracion_minutos=config['duracion_minutos'],
+        eventos_bloque=config['eventos_bloque']
+    )
+    return Response(feed, mimetype='text/calendar', headers={
+        'Content-Disposition': f'inline; filename="area-{id_area}.ics"'
+    })
+
+
+@reportes_bp.route('/api/reportes/importar', methods=['POST'])
+def importar_reportes():
+    """
+    Importación masiva desde CSV o NDJSON (multipart, campo "archivo")
+    
+    Form (opcional):
+        formato: csv | ndjson (por defecto, según la extensión)
+        tamano_lote: filas por transacción
+        validar_solo: "1" para validar sin escribir
+    """
+    archivo = request.files.get("archivo")
+    if not archivo or not archivo.filename:
+        return jsonify({"error": "Debe adjuntar un archivo CSV o NDJSON en el campo 'archivo'"}), 400
+    
+    try:
+        formato = importacion.detectar_formato(archivo.filename, request.form.get("formato"))
+        resultado = importacion.importar_reportes(
+            archivo.stream, formato,
+            creado_por=session.get("user_id", 1),
+            tamano_lote=request.form.get("tamano_lote", type=int),
+            validar_solo=request.form.get("validar_solo") in ("1", "true", "on")
+        )
+        logger.info(f"📥 Importación: {resultado['creadas']} creados, {len(resultado['errores'])} filas con error")
+        return jsonify({"success": not resultado['errores'], **resultado})
+    
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        logger.error(f"❌ Error en importación: {str(e)}")
+        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+
+
+@reportes_bp.cli.command('importar-reportes')
+@click.argument('archivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--formato', type=click.Choice(['csv', 'ndjson']), help='Por defecto, según la extensión')
+@click.option('--tamano-lote', default=importacion.IMPORTACION_LOTE, show_default=True, help='Filas por transacción')
+@click.option('--usuario', default=1, show_default=True, help='id de usuario creador')
+@click.option('--validar-solo', is_flag=True, help='Validar sin escribir')
+def importar_reportes_cli(archivo, formato, tamano_lote, usuario, validar_solo):
+    """Importa reportes desde un archivo CSV o NDJSON"""
+    formato = importacion.detectar_formato(archivo, formato)
+    with open(archivo, 'rb') as stream:
+        resultado = importacion.importar_reportes(stream, formato, usuario, tamano_lote, validar_solo)
+    
+    for error in resultado['errores']:
+        click.echo(f"Línea {error['fila']}: {'; '.join(error['errores'])}", err=True)
+    click.echo(f"Procesadas: {resultado['procesadas']} | Válidas: {resultado['validas']} | "
+               f"Creadas: {resultado['creadas']} | Dependencias: {resultado['dependencias']} | "
+               f"Errores: {len(resultado['errores'])} | {resultado['segundos']}s")
+
+
+@reportes_bp.route('/api/bitacora/estadisticas')
+def estadisticas_bitacora():
+    """Contadores del escritor asíncrono de bitácora (encolados, escritos, descartados, reintentos...)"""
+    return jsonify(escritor_bitacora.estadisticas())
+
+
+@reportes_bp.route('/api/reportes/metricas_creacion')
+def metricas_creacion():
+    """Viajes al servidor por creación de reporte (total, máximo, último y promedio)"""
+    with _metricas_lock:
+        resumen = dict(METRICAS_CREACION)
+    resumen['round_trips_promedio'] = (
+        resumen['round_trips_total'] / resumen['creaciones'] if resumen['creaciones'] else 0.0
+    )
+    return jsonify(resumen)
+
+
+@reportes_bp.route('/metrics')
+def exponer_metricas():
+    """Métricas en formato de exposición Prometheus (por ruta + pool, bitácora, caché, planificador, alcance)"""
+    with _metricas_lock:
+        creacion = dict(METRICAS_CREACION)
+    texto = metricas.exportar(
+        metricas.gauges('alejandria_pool', get_pool().estadisticas()),
+        metricas.gauges('alejandria_bitacora', escritor_bitacora.estadisticas()),
+        metricas.gauges('alejandria_cache_http', cache_http.cache_respuestas.estadisticas()),
+        metricas.gauges('alejandria_planificador', planificador.planificador.estadisticas()),
+        metricas.gauges('alejandria_creacion', creacion),
+        metricas.gauges('alejandria_alcance', grafo_dependencias.estadisticas_alcance()),
+        metricas.gauges('alejandria_demoras', demoras.motor_demoras.estadisticas()),
+        metricas.gauges('alejandria_reglas', reglas_programacion.compilador.estadisticas()),
+    )
+    return texto, 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
+@reportes_bp.route('/api/planificador/estado')
+def estado_planificador():
+    """Transiciones pendientes, próxima transición y contadores del planificador de vencimientos"""
+    return jsonify(planificador.planificador.estadisticas())
+
+
+@reportes_bp.route('/api/cache/estadisticas')
+def estadisticas_cache_http():
+    """Aciertos, 304, fallos y tamaño del caché de respuestas HTTP"""
+    return jsonify(cache_http.cache_respuestas.estadisticas())
+
+
+@reportes_bp.route('/api/referencias/invalidar', methods=['POST'])
+def invalidar_referencias():
+    """Invalida la caché de datos de referencia (tipos, categorías, áreas, ENUMs)"""
+    clave = (request.get_json(silent=True) or {}).get('clave')
+    datos_referencia.invalidar_referencias(clave)
+    return jsonify({"success": True, "invalidado": clave or "todo"})
+
+
+@reportes_bp.route('/api/estadisticas/reconciliar', methods=['POST'])
+def reconciliar_estadisticas():
+    """Recalcula los contadores del dashboard con un conteo completo"""
+    try:
+        contadores = estadisticas.reconciliar()
+        return jsonify({"success": True, "contadores": contadores})
+    except Exception as e:
+        logger.error(f"❌ Error al reconciliar estadísticas: {str(e)}")
+        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+
+
 @reportes_bp.route('/api/reportes/<int:id_reporte>/aprobar', methods=['POST'])
 def aprobar_reporte(id_reporte):
     """Aprueba un reporte y valida sus dependencias automáticamente vía trigger"""
     try:
-        conn = get_connection()
+        conn = get_request_connection()
         cursor = conn.cursor(dictionary=True)
         
+        # FOR UPDATE: dos aprobaciones simultáneas no pueden mover ambas los contadores
+        # (la segunda espera el commit de la primera y ya lee 'Aprobado')
         cursor.execute("""
             SELECT codigo_interno, estado 
             FROM reporte 
             WHERE id_reporte = %s
+            FOR UPDATE
         """, (id_reporte,))
         
         result = cursor.fetchone()
         if not result:
+            conn.rollback()
             cursor.close()
             conn.close()
             return jsonify({"error": "Reporte no encontrado"}), 404
@@ -399,6 +792,7 @@ def aprobar_reporte(id_reporte):
         estado_actual = result['estado']
         
         if estado_actual == 'Aprobado':
+            conn.rollback()
             cursor.close()
             conn.close()
             return jsonify({"error": "El reporte ya está aprobado"}), 400
@@ -422,11 +816,16 @@ def aprobar_reporte(id_reporte):
             WHERE id_reporte = %s
         """, (usuario, id_reporte))
         
+        estadisticas.cambio_estado(cursor, 'estado', estado_actual, 'Aprobado')
+        
         conn.commit()
+        grafo_dependencias.notificar_reporte(conn, id_reporte)
+        busqueda.notificar_reporte(conn, id_reporte)
+        cache_http.marcar_cambio()
         cursor.close()
         conn.close()
         
-        print(f"✓ Reporte {codigo} aprobado. {dependencias_pendientes} dependencias validadas")
+        logger.info(f"✅ Reporte {codigo} aprobado. {dependencias_pendientes} dependencias validadas")
         
         return jsonify({
             "success": True,
@@ -435,7 +834,7 @@ def aprobar_reporte(id_reporte):
         }), 200
         
     except Exception as e:
-        print(f"❌ Error al aprobar reporte: {str(e)}")
+        logger.error(f"❌ Error al aprobar reporte: {str(e)}")
         
         if conn:
             conn.rollback()
@@ -0,0 +1,244 @@
+"""
+Pruebas de la suite de benchmarks: generadores deterministas de la siembra,
+medición por escenario y comparación de líneas base
+"""
+
+import random
+import re
+from datetime import datetime
+
+import click
+import pytest
+from flask import Flask
+
+import metricas
+from benchmarks import ejecutar
+from datos_referencia import parsear_enum
+
+
+AHORA = datetime(2026, 6, 15, 12, 0)
+
+
+@pytest.fixture
+def datos():
+    return pytest.importorskip('benchmarks.datos')
+
+
+def columnas_enum(datos, tabla):
+    """{columna: [valores]} de los ENUM de `tabla` en benchmarks/esquema.sql"""
+    with open(datos.RUTA_ESQUEMA, encoding='utf-8') as archivo:
+        esquema = archivo.read()
+    cuerpo = re.search(rf"CREATE TABLE {tabla} \((.*?)\) ENGINE", esquema, re.S).group(1)
+    return {
+        columna: parsear_enum(tipo)
+        for columna, tipo in re.findall(r"^\s*(\w+) (ENUM\([^)]*\))", cuerpo, re.M)
+    }
+
+
+# ============================================================================
+# SIEMBRA
+# ============================================================================
+
+def test_generar_reportes_es_determinista(datos):
+    primera = list(datos.generar_reportes(random.Random(7), 300, 2, AHORA))
+    segunda = list(datos.generar_reportes(random.Random(7), 300, 2, AHORA))
+    otra = list(datos.generar_reportes(random.Random(8), 300, 2, AHORA))
+
+    assert primera == segunda
+    assert primera != otra
+
+
+def test_generar_reportes_filas_validas_para_el_esquema(datos):
+    filas = [fila for fila, _, _ in datos.generar_reportes(random.Random(1), 500, 2, AHORA)]
+    enums = columnas_enum(datos, 'reporte')
+    columnas = re.search(r"INSERT INTO reporte \((.*?)\) VALUES", datos.SQL_REPORTE, re.S).group(1)
+    columnas = [columna.strip() for columna in columnas.split(',')]
+
+    assert len(columnas) == datos.SQL_REPORTE.count('%s')
+    assert [fila[0] for fila in filas] == list(range(1, 501))
+    for fila in filas:
+        assert len(fila) == len(columnas)
+        for columna, valor in zip(columnas, fila):
+            if columna in enums and valor is not None:
+                assert valor in enums[columna], (columna, valor)
+
+    # códigos consecutivos por prefijo, sin repetidos
+    por_prefijo = {}
+    for fila in filas:
+        prefijo, numero = fila[1].split('-')
+        por_prefijo.setdefault(prefijo, []).append(int(numero))
+    assert all(numeros == list(range(1, len(numeros) + 1)) for numeros in por_prefijo.values())
+
+
+def test_generar_dependencias_es_un_dag_con_focos(datos):
+    aristas, focos = datos.generar_dependencias(
+        random.Random(3), 2000, cadenas=4, profundidad=10, hubs=2, ancho=50, densidad=1.5, ventana=100
+    )
+
+    assert aristas == datos.generar_dependencias(
+        random.Random(3), 2000, cadenas=4, profundidad=10, hubs=2, ancho=50, densidad=1.5, ventana=100
+    )[0]
+    assert all(padre < hijo for padre, hijo in aristas)
+    assert all(tipo in datos.TIPOS_DEPENDENCIA and criticidad in datos.CRITICIDADES_DEPENDENCIA
+               for tipo, criticidad in aristas.values())
+    assert len(focos['profundo']) == 4 and len(focos['aleatorio']) == 50
+    for hub in focos['hub_descendente']:
+        assert sum(padre == hub for padre, _ in aristas) >= 50
+    for hub in focos['hub_ascendente']:
+        assert sum(hijo == hub for _, hijo in aristas) >= 50
+
+
+def test_generar_historial_por_frecuencia(datos):
+    creado_en = datetime(2024, 1, 1)
+    info = [
+        (1, 'MENSUAL', datetime(2026, 7, 1, 9, 0), creado_en),
+        (2, 'DIARIA', datetime(2026, 6, 16, 9, 0), creado_en),
+        (3, 'ADHOC', None, creado_en),
+    ]
+
+    filas = list(datos.generar_historial(random.Random(5), info, anios=1, max_entregas=20, ahora=AHORA))
+
+    mensual = [fila for fila in filas if fila[0] == 1]
+    diaria = [fila for fila in filas if fila[0] == 2]
+    assert len(mensual) == 12 and len(diaria) == 20
+    assert [fila[1] for fila in mensual] == sorted(fila[1] for fila in mensual)
+    assert all(fila[1] < datetime(2026, 7, 1, 9, 0) for fila in mensual)
+    assert len([fila for fila in filas if fila[0] == 3]) <= 5
+    for _, programada, real, estado, minutos, _, creada in filas:
+        assert creada == real
+        assert (estado, minutos > 0, real > programada) in (('ENTREGADO', False, False), ('RETRASADO', True, True))
+
+
+class ConexionLotes:
+    def __init__(self):
+        self.lotes = []
+        self.commits = 0
+
+    def executemany(self, sql, filas):
+        self.lotes.append(list(filas))
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_insertar_por_lotes(datos):
+    conn = ConexionLotes()
+
+    assert datos.insertar_por_lotes(conn, conn, datos.SQL_SCHEDULE, ((i,) for i in range(7)), 3) == 7
+    assert [len(lote) for lote in conn.lotes] == [3, 3, 1]
+    assert conn.commits == 3
+    assert datos.insertar_por_lotes(conn, conn, datos.SQL_SCHEDULE, [], 3) == 0
+
+
+def test_aplicar_esquema_omite_comentarios(datos):
+    class Cursor:
+        def __init__(self):
+            self.sentencias = []
+
+        def execute(self, sql):
+            self.sentencias.append(sql.strip())
+
+    cursor = Cursor()
+    datos.aplicar_esquema(cursor)
+
+    assert cursor.sentencias[0] == 'DROP TABLE IF EXISTS schema_migracion'
+    assert not any(sentencia.startswith('--') for sentencia in cursor.sentencias)
+    # re-sembrar borra antes cada tabla que crea (y las que crean las migraciones)
+    creadas = {s.split()[2] for s in cursor.sentencias if s.startswith('CREATE TABLE')}
+    borradas = {s.split()[-1] for s in cursor.sentencias if s.startswith('DROP TABLE')}
+    assert creadas and creadas <= borradas
+
+
+def test_validar_bd_exige_una_bd_de_benchmarks(datos, monkeypatch):
+    monkeypatch.setitem(datos.DB_CONFIG, 'database', 'alejandria')
+    with pytest.raises(click.UsageError, match='bench'):
+        datos.validar_bd()
+    datos.validar_bd(forzar=True)
+
+    monkeypatch.setitem(datos.DB_CONFIG, 'database', 'alejandria_BENCH')
+    datos.validar_bd()
+
+
+# ============================================================================
+# MEDICIÓN Y COMPARACIÓN
+# ============================================================================
+
+def test_percentil_interpola():
+    assert ejecutar.percentil([], 50) is None
+    assert ejecutar.percentil([10.0], 99) == 10.0
+    assert ejecutar.percentil([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert ejecutar.percentil([1.0, 2.0, 3.0, 4.0], 100) == 4.0
+
+
+def test_resumir():
+    muestras = [{'ms': ms, 'consultas': c, 'sql_ms': 1.0, 'filas': 10} for ms, c in ((4.0, 3), (2.0, 5))]
+
+    resultado = ejecutar.resumir(muestras, primera_ms=50.0, errores=1)
+
+    assert (resultado['iteraciones'], resultado['errores'], resultado['primera_ms']) == (2, 1, 50.0)
+    assert (resultado['media_ms'], resultado['max_ms'], resultado['p50_ms']) == (3.0, 4.0, 3.0)
+    assert (resultado['consultas_media'], resultado['consultas_max'], resultado['filas_media']) == (4.0, 5, 10.0)
+    assert ejecutar.resumir([], 0.0, 0)['p95_ms'] is None
+
+
+def test_comparar_marca_regresiones():
+    base = {'escenarios': {
+        'catalogo': {'p50_ms': 10.0, 'p95_ms': 20.0, 'consultas_media': 3, 'filas_media': 0},
+        'solo_en_base': {'p50_ms': 1.0},
+    }}
+    actual = {'escenarios': {
+        'catalogo': {'p50_ms': 11.5, 'p95_ms': 20.5, 'consultas_media': 4, 'filas_media': 0},
+        'nuevo': {'p50_ms': 5.0},
+    }}
+
+    filas, regresiones = ejecutar.comparar(base, actual, tolerancia=10)
+
+    por_metrica = {metrica: regresion for _, metrica, _, _, _, regresion in filas}
+    # p50 sube 15% y 1.5 ms; p95 sube 2.5% (dentro de la tolerancia); una consulta más siempre cuenta
+    assert por_metrica == {'p50_ms': True, 'p95_ms': False, 'consultas_media': True, 'filas_media': False}
+    assert regresiones == 2
+    assert {nombre for nombre, *_ in filas} == {'catalogo'}
+
+
+def test_comparar_ignora_ruido_por_debajo_del_minimo():
+    base = {'escenarios': {'busqueda': {'p50_ms': 0.2}}}
+    actual = {'escenarios': {'busqueda': {'p50_ms': 0.6}}}
+
+    (fila,), regresiones = ejecutar.comparar(base, actual, tolerancia=10)
+
+    assert fila[4] == pytest.approx(200.0) and not fila[5]
+    assert regresiones == 0
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    """App con la instrumentación de métricas y el observador del runner"""
+    monkeypatch.setattr(metricas, '_observadores', [])
+    monkeypatch.setattr(metricas, 'configurar_logging', lambda: None)
+    app = Flask(__name__)
+    metricas.init_app(app)
+    metricas.observar_requests(ejecutar._observar)
+
+    @app.route('/eco/<int:consultas>', methods=['GET', 'POST'])
+    def eco(consultas):
+        for _ in range(consultas):
+            metricas.registrar_consulta(0.001, filas=2)
+        return 'ok' if consultas else ('vacío', 404)
+
+    return app.test_client()
+
+
+def test_medir_descarta_calentamiento_y_lee_consultas_del_observador(cliente):
+    escenario = {
+        'nombre': 'eco',
+        'request': lambda i: ('GET', f'/eco/{i}', None),
+        'exito': ejecutar._status(200),
+    }
+
+    resultado = ejecutar.medir(cliente, escenario, iteraciones=3, calentamiento=2)
+
+    # i=0 (calentamiento) responde 404: cuenta como error pero no como muestra
+    assert (resultado['iteraciones'], resultado['errores']) == (3, 1)
+    assert resultado['consultas_media'] == 3.0 and resultado['consultas_max'] == 4
+    assert resultado['filas_media'] == 6.0
+    assert resultado['primera_ms'] > 0
@@ -0,0 +1,104 @@
+"""
+Pruebas del escritor asíncrono de la bitácora
+"""
+
+import pytest
+
+import bitacora
+from bitacora import EscritorBitacora
+
+
+class BaseBitacora:
+    """bitacora_evento de mentira: guarda cada INSERT multi-fila; las primeras `fallas` veces falla"""
+
+    def __init__(self):
+        self.lotes = []
+        self.fallas = 0
+
+    def cursor(self):
+        return self
+
+    def executemany(self, sql, filas):
+        if self.fallas:
+            self.fallas -= 1
+            raise RuntimeError('Deadlock found when trying to get lock')
+        assert sql == bitacora.SQL_INSERT_BITACORA
+        self.lotes.append(list(filas))
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def base(monkeypatch):
+    base = BaseBitacora()
+    monkeypatch.setattr(bitacora, 'get_connection', lambda: base)
+    monkeypatch.setattr(bitacora.time, 'sleep', lambda segundos: None)
+    return base
+
+
+def evento(numero):
+    return ('REPORTE', numero, 'CREAR', f'Reporte {numero}', 1, None)
+
+
+def sin_hilo(escritor, monkeypatch):
+    monkeypatch.setattr(escritor, 'iniciar', lambda: None)
+    return escritor
+
+
+def test_vaciar_escribe_por_lotes_multi_fila(base, monkeypatch):
+    escritor = sin_hilo(EscritorBitacora(tamano_lote=2), monkeypatch)
+    for numero in range(5):
+        escritor.registrar(evento(numero))
+
+    escritor.vaciar()
+
+    assert [len(lote) for lote in base.lotes] == [2, 2, 1]
+    assert [fila[1] for lote in base.lotes for fila in lote] == [0, 1, 2, 3, 4]
+    assert escritor.estadisticas() == {
+        'encolados': 5, 'escritos': 5, 'descartados': 0, 'reintentos': 0, 'lotes': 3, 'lotes_fallidos': 0, 'en_cola': 0,
+    }
+
+
+def test_cola_llena_descarta_sin_bloquear(base, monkeypatch):
+    escritor = sin_hilo(EscritorBitacora(capacidad=1, espera_encolar=0.01), monkeypatch)
+
+    assert escritor.registrar(evento(1))
+    assert not escritor.registrar(evento(2))
+    assert escritor.estadisticas()['descartados'] == 1
+
+
+def test_reintenta_el_lote_fallido(base, monkeypatch):
+    escritor = sin_hilo(EscritorBitacora(reintentos=3), monkeypatch)
+    base.fallas = 2
+
+    assert escritor._escribir([evento(1)])
+    assert base.lotes == [[evento(1)]]
+    assert escritor.estadisticas()['reintentos'] == 2
+
+
+def test_agotados_los_reintentos_se_descarta(base, monkeypatch):
+    escritor = sin_hilo(EscritorBitacora(reintentos=1), monkeypatch)
+    base.fallas = 2
+
+    assert not escritor._escribir([evento(1), evento(2)])
+    estadisticas = escritor.estadisticas()
+    assert (estadisticas['lotes_fallidos'], estadisticas['descartados'], estadisticas['escritos']) == (1, 2, 0)
+
+
+def test_hilo_escribe_y_detener_vacia_lo_pendiente(base):
+    escritor = EscritorBitacora(tamano_lote=50, intervalo=0.05)
+    for numero in range(120):
+        escritor.registrar(evento(numero))
+
+    escritor.detener()
+
+    assert not escritor._hilo.is_alive()
+    assert sorted(fila[1] for lote in base.lotes for fila in lote) == list(range(120))
+    assert all(len(lote) <= 50 for lote in base.lotes)
@@ -0,0 +1,95 @@
+"""
+Pruebas del índice de búsqueda por trigramas
+"""
+
+import pytest
+
+from busqueda import IndiceBusqueda, normalizar, trigramas, trigramas_consulta
+
+
+FILAS = [
+    (1, 'RS-0001', 'Liquidez diaria', 'Posición de caja', 'INTERNA', 'Aprobado', 'Riesgos'),
+    (2, 'FIN-0002', 'Balance de cartera', None, 'EXTERNA', 'Aprobado', 'Financiero'),
+    (3, 'FIN-0003', 'Cartera vencida', 'Informe a la Superintendencia', 'INTERNA', 'Por Validar', 'Financiero'),
+    (4, 'OPE-0104', 'Conciliación bancaria', None, 'INTERNA', 'Aprobado', 'Operativo'),
+]
+
+
+class CursorTuplas:
+    def __init__(self, filas):
+        self.filas = filas
+
+    def execute(self, sql, params=None):
+        self._filas = self.filas if params is None else [f for f in self.filas if f[0] == params[0]]
+
+    def fetchall(self):
+        return self._filas
+
+    def fetchone(self):
+        return self._filas[0] if self._filas else None
+
+
+@pytest.fixture
+def indice():
+    indice = IndiceBusqueda()
+    indice.cargar(CursorTuplas(FILAS))
+    return indice
+
+
+def ids(resultados):
+    return [doc['id'] for _, doc in resultados]
+
+
+def test_normalizar_quita_tildes_y_mayusculas():
+    assert normalizar('Conciliación BANCARIA') == 'conciliacion bancaria'
+    assert normalizar(None) == ''
+
+
+def test_trigramas_marcan_inicio_de_palabra():
+    assert ' ca' in trigramas('cartera')
+    assert trigramas_consulta('ab') == set()
+    assert trigramas_consulta('cart') == {'car', 'art'}
+
+
+def test_subcadena_en_medio_de_palabra(indice):
+    assert ids(indice.buscar('rtera')) == [2, 3]
+
+
+def test_termino_de_dos_caracteres_en_cualquier_posicion(indice):
+    # "01" está dentro del código, no al inicio de una palabra
+    assert 1 in ids(indice.buscar('01'))
+    assert 4 in ids(indice.buscar('01'))
+
+
+def test_termino_de_un_caracter(indice):
+    assert ids(indice.buscar('z', campos=('nombre',))) == [1]
+
+
+def test_orden_por_puntaje(indice):
+    # Código exacto antes que coincidencias por nombre
+    assert ids(indice.buscar('fin-0003'))[0] == 3
+    assert ids(indice.buscar('cartera', campos=('nombre',))) == [3, 2]
+
+
+def test_filtros_de_estado_campos_y_limite(indice):
+    assert ids(indice.buscar('cartera', estado='Aprobado')) == [2]
+    assert ids(indice.buscar('superintendencia', campos=('nombre',))) == []
+    assert ids(indice.buscar('superintendencia')) == [3]
+    assert len(indice.buscar('0', limite=2)) == 2
+    assert indice.buscar('   ') == []
+
+
+def test_recargar_reporte_reindexa(indice):
+    indice.recargar_reporte(CursorTuplas([(2, 'FIN-0002', 'Balance general', None, 'EXTERNA', 'Aprobado', 'Financiero')]), 2)
+    assert ids(indice.buscar('cartera')) == [3]
+    assert ids(indice.buscar('general')) == [2]
+    assert 'car' in indice.postings and 2 not in indice.postings['car']
+
+
+def test_version_cambia_con_cada_carga_y_recarga(indice):
+    carga, version = indice.carga, indice.version
+    indice.recargar_reporte(CursorTuplas(FILAS), 2)
+    assert (indice.carga, indice.version) == (carga, version + 1)
+
+    indice.cargar(CursorTuplas(FILAS))
+    assert indice.version == version + 2 and indice.carga is not None
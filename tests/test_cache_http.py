@@ -0,0 +1,101 @@
+"""
+Pruebas de la versión de datos y el LRU de la caché HTTP
+"""
+
+import cache_http
+from cache_http import CacheRespuestas
+
+
+class ConexionFalsa:
+    def __init__(self, falla=False):
+        self.falla = falla
+        self.sentencias = []
+        self.eventos = []
+        self.lastrowid = 8
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        if self.falla:
+            raise RuntimeError('Lock wait timeout exceeded')
+        self.sentencias.append(' '.join(sql.split()))
+
+    def commit(self):
+        self.eventos.append('commit')
+
+    def close(self):
+        self.eventos.append('close')
+
+
+def test_marcar_cambio_en_transaccion_propia(monkeypatch):
+    conn = ConexionFalsa()
+    monkeypatch.setattr(cache_http, 'get_connection', lambda: conn)
+    cache_http.version_datos._leida_en = 1e12
+
+    assert cache_http.marcar_cambio() == 8
+
+    assert conn.sentencias[0].startswith('INSERT INTO version_datos')
+    assert conn.eventos[0] == 'commit'
+    assert cache_http.version_datos._leida_en == 0.0
+
+
+def test_marcar_cambio_fallido_no_interrumpe(monkeypatch):
+    conn = ConexionFalsa(falla=True)
+    monkeypatch.setattr(cache_http, 'get_connection', lambda: conn)
+    cache_http.version_datos._leida_en = 1e12
+
+    assert cache_http.marcar_cambio() is None
+
+    assert 'commit' not in conn.eventos
+    assert cache_http.version_datos._leida_en == 0.0
+
+
+def test_lru_por_version_y_bytes():
+    cache = CacheRespuestas(max_entradas=2, max_bytes=10)
+    cache.guardar('a', (1, 'e1', b'1234', 'text/html'))
+    cache.guardar('b', (1, 'e2', b'1234', 'text/html'))
+
+    assert cache.obtener('a', 1)[2] == b'1234'
+    assert cache.obtener('a', 2) is None
+
+    # 'b' es la menos usada: sale para hacer lugar
+    cache.guardar('c', (1, 'e3', b'1234', 'text/html'))
+    assert cache.obtener('b', 1) is None
+    assert cache.estadisticas()['desalojos'] == 1
+
+    cache.guardar('grande', (1, 'e4', b'x' * 11, 'text/html'))
+    assert cache.obtener('grande', 1) is None
+
+
+def test_cachear_incluye_la_generacion_de_la_estructura(monkeypatch):
+    from flask import Flask
+
+    monkeypatch.setitem(cache_http.CACHE_HTTP_CONFIG, 'activo', True)
+    monkeypatch.setattr(cache_http, 'cache_respuestas', CacheRespuestas())
+    monkeypatch.setattr(cache_http.version_datos, '_version', 7)
+    monkeypatch.setattr(cache_http.version_datos, '_leida_en', 1e12)
+
+    estado = {'generacion': 'a.1', 'llamadas': 0}
+
+    app = Flask(__name__)
+    app.secret_key = 'pruebas'
+
+    @app.route('/grafo')
+    @cache_http.cachear(generacion=lambda: estado['generacion'])
+    def grafo():
+        estado['llamadas'] += 1
+        return f"grafo {estado['generacion']}"
+
+    cliente = app.test_client()
+    etag = cliente.get('/grafo').headers['ETag']
+    assert cliente.get('/grafo').headers['ETag'] == etag
+    assert estado['llamadas'] == 1
+
+    # Misma version_datos, estructura recargada: ni el LRU ni el ETag anterior sirven
+    estado['generacion'] = 'a.2'
+    respuesta = cliente.get('/grafo', headers={'If-None-Match': etag})
+    assert respuesta.status_code == 200
+    assert respuesta.get_data(as_text=True) == 'grafo a.2'
+    assert respuesta.headers['ETag'] != etag
+    assert estado['llamadas'] == 2
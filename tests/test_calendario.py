@@ -0,0 +1,82 @@
+"""
+Pruebas del calendario laboral de Colombia
+"""
+
+from datetime import date, datetime
+from itertools import islice
+
+import pytest
+
+from calendario import CalendarioLaboral, domingo_pascua, festivos_colombia, trasladar_a_lunes
+
+
+@pytest.mark.parametrize('anio, pascua', [
+    (2000, date(2000, 4, 23)),
+    (2019, date(2019, 4, 21)),
+    (2024, date(2024, 3, 31)),
+    (2025, date(2025, 4, 20)),
+    (2026, date(2026, 4, 5)),
+])
+def test_domingo_pascua(anio, pascua):
+    assert domingo_pascua(anio) == pascua
+
+
+def test_trasladar_a_lunes():
+    assert trasladar_a_lunes(date(2025, 3, 19)) == date(2025, 3, 24)   # miércoles
+    assert trasladar_a_lunes(date(2025, 6, 29)) == date(2025, 6, 30)   # domingo
+    assert trasladar_a_lunes(date(2025, 1, 6)) == date(2025, 1, 6)     # ya es lunes
+
+
+def test_festivos_2025():
+    assert list(festivos_colombia(2025)) == [
+        date(2025, 1, 1), date(2025, 1, 6), date(2025, 3, 24), date(2025, 4, 17), date(2025, 4, 18),
+        date(2025, 5, 1), date(2025, 6, 2), date(2025, 6, 23), date(2025, 6, 30), date(2025, 7, 20),
+        date(2025, 8, 7), date(2025, 8, 18), date(2025, 10, 13), date(2025, 11, 3), date(2025, 11, 17),
+        date(2025, 12, 8), date(2025, 12, 25),
+    ]
+
+
+def test_festivos_del_mismo_lunes_se_combinan():
+    assert festivos_colombia(2025)[date(2025, 6, 30)] == 'San Pedro y San Pablo / Sagrado Corazón'
+
+
+def test_festivos_2024_basados_en_pascua():
+    festivos = festivos_colombia(2024)
+    assert festivos[date(2024, 3, 28)] == 'Jueves Santo'
+    assert festivos[date(2024, 3, 29)] == 'Viernes Santo'
+    assert festivos[date(2024, 5, 13)] == 'Ascensión'
+    assert festivos[date(2024, 6, 3)] == 'Corpus Christi'
+    assert festivos[date(2024, 6, 10)] == 'Sagrado Corazón'
+    assert all(fecha.weekday() == 0 for fecha, nombre in festivos.items() if nombre == 'Ascensión')
+
+
+@pytest.fixture
+def calendario():
+    return CalendarioLaboral(2025, 2025)
+
+
+def test_es_dia_laboral(calendario):
+    assert calendario.es_dia_laboral(date(2025, 3, 21))        # viernes
+    assert not calendario.es_dia_laboral(date(2025, 3, 22))    # sábado
+    assert not calendario.es_dia_laboral(date(2025, 3, 24))    # San José
+    assert calendario.es_festivo(datetime(2025, 3, 24, 10, 0))
+    assert not calendario.es_festivo(date(2025, 3, 25))
+
+
+def test_siguiente_dia_laboral_conserva_la_hora(calendario):
+    assert calendario.siguiente_dia_laboral(datetime(2025, 3, 22, 14, 30)) == datetime(2025, 3, 25, 14, 30)
+    assert calendario.siguiente_dia_laboral(date(2025, 3, 25)) == date(2025, 3, 25)
+    # Semana Santa: jueves y viernes festivos
+    assert calendario.siguiente_dia_laboral(date(2025, 4, 17)) == date(2025, 4, 21)
+
+
+def test_amplia_el_rango_fuera_de_los_anios_construidos(calendario):
+    # 31/12/2025 es miércoles; 1/1/2026 festivo → viernes 2
+    assert calendario.siguiente_dia_laboral(date(2025, 12, 31)) == date(2025, 12, 31)
+    assert calendario.siguiente_dia_laboral(date(2026, 1, 1)) == date(2026, 1, 2)
+    assert not calendario.es_dia_laboral(date(2023, 12, 25))
+
+
+def test_laborales_desde_cruza_el_fin_del_rango(calendario):
+    dias = list(islice(calendario.laborales_desde(date(2025, 12, 29)), 5))
+    assert dias == [date(2025, 12, 29), date(2025, 12, 30), date(2025, 12, 31), date(2026, 1, 2), date(2026, 1, 5)]
@@ -0,0 +1,173 @@
+"""
+Pruebas de la paginación keyset del catálogo
+"""
+
+from datetime import datetime
+
+import busqueda
+import catalogo
+
+
+def test_cursor_ida_y_vuelta():
+    reporte = {
+        'orden_prioridad': 2,
+        'orden_proxima': datetime(2026, 3, 2, 8, 0),
+        'created_at': datetime(2025, 1, 15, 10, 30),
+        'id_reporte': 41,
+    }
+    posicion = catalogo.decodificar_cursor(catalogo.codificar_cursor(reporte, 1200))
+    assert posicion == {
+        'prioridad': 2,
+        'proxima': datetime(2026, 3, 2, 8, 0),
+        'creado': datetime(2025, 1, 15, 10, 30),
+        'id_reporte': 41,
+        'total_estimado': 1200,
+    }
+
+
+def test_cursor_sin_creado_usa_el_minimo():
+    """Un cursor viejo con created_at NULL no compara contra NULL (no se pierden filas)"""
+    reporte = {'orden_prioridad': 5, 'orden_proxima': None, 'created_at': None, 'id_reporte': 7}
+    posicion = catalogo.decodificar_cursor(catalogo.codificar_cursor(reporte, None))
+    assert posicion['proxima'] == catalogo.FECHA_MINIMA
+    assert posicion['creado'] == catalogo.CREADO_MINIMO
+
+
+def test_cursor_invalido():
+    assert catalogo.decodificar_cursor('no-es-un-cursor') is None
+    assert catalogo.decodificar_cursor('') is None
+
+
+# ============================================================================
+# BÚSQUEDA POR LA RUTA REAL DE LA PÁGINA (cursor dictionary=True)
+# ============================================================================
+
+REPORTES = [
+    {'id_reporte': 1, 'codigo_interno': 'RS-0001', 'nombre': 'Liquidez diaria', 'descripcion': None,
+     'audiencia': 'INTERNA', 'estado': 'Aprobado', 'tipo': 'Riesgos'},
+    {'id_reporte': 2, 'codigo_interno': 'FIN-0002', 'nombre': 'Balance de cartera', 'descripcion': 'Cierre',
+     'audiencia': 'EXTERNA', 'estado': 'Aprobado', 'tipo': 'Financiero'},
+    {'id_reporte': 3, 'codigo_interno': 'FIN-0003', 'nombre': 'Cartera vencida', 'descripcion': None,
+     'audiencia': 'INTERNA', 'estado': 'Por Validar', 'tipo': 'Financiero'},
+]
+
+
+class CursorDiccionario:
+    """Cursor de mentira con filas dict (como conn.cursor(dictionary=True)) que registra las consultas"""
+
+    def __init__(self, reportes):
+        self.reportes = reportes
+        self.consultas = []
+        self._filas = []
+
+    def execute(self, sql, params=None):
+        params = list(params or [])
+        self.consultas.append((sql, params))
+        if sql == busqueda.SQL_REPORTES_BUSQUEDA:
+            self._filas = [dict(fila) for fila in self.reportes]
+        elif 'FROM reporte_recurso' in sql:
+            self._filas = []
+        elif 'ORDER BY' in sql:
+            # Página: los ids del IN en el orden del catálogo (sin cursor: todos caben)
+            ids = set(params[:-1]) if 'r.id_reporte IN' in sql else {f['id_reporte'] for f in self.reportes}
+            self._filas = [
+                {'id_reporte': f['id_reporte'], 'codigo_interno': f['codigo_interno']}
+                for f in self.reportes if f['id_reporte'] in ids
+            ]
+        else:
+            raise AssertionError(f"Consulta inesperada: {sql}")
+
+    def fetchall(self):
+        return self._filas
+
+    def fetchone(self):
+        return self._filas[0] if self._filas else None
+
+
+def consulta_pagina(cursor):
+    return next((sql, params) for sql, params in cursor.consultas if 'ORDER BY' in sql)
+
+
+def test_busqueda_en_pagina_con_cursor_diccionario():
+    busqueda.invalidar_indice()
+    cursor = CursorDiccionario(REPORTES)
+
+    pagina = catalogo.cargar_pagina_catalogo(cursor, {'q': 'cartera'})
+
+    assert [r['id_reporte'] for r in pagina['reportes']] == [2, 3]
+    assert pagina['filtro_busqueda'] == 'cartera'
+    sql, params = consulta_pagina(cursor)
+    assert 'r.id_reporte IN (%s,%s)' in sql
+    assert sorted(params[:-1]) == [2, 3]
+
+
+def test_busqueda_recarga_el_indice_al_vencer():
+    busqueda.invalidar_indice()
+    catalogo.cargar_pagina_catalogo(CursorDiccionario(REPORTES), {'q': 'liquidez'})
+
+    # Vencido el TTL la recarga usa el mismo cursor dict del request
+    busqueda.invalidar_indice()
+    nuevos = REPORTES + [dict(REPORTES[0], id_reporte=4, codigo_interno='RS-0004', nombre='Liquidez mensual')]
+    cursor = CursorDiccionario(nuevos)
+    pagina = catalogo.cargar_pagina_catalogo(cursor, {'q': 'liquidez'})
+
+    assert [r['id_reporte'] for r in pagina['reportes']] == [1, 4]
+
+
+def test_busqueda_con_demasiadas_coincidencias_usa_like(monkeypatch):
+    busqueda.invalidar_indice()
+    monkeypatch.setattr(catalogo, 'CATALOGO_BUSQUEDA_MAX_IDS', 1)
+    cursor = CursorDiccionario(REPORTES)
+
+    catalogo.cargar_pagina_catalogo(cursor, {'q': '00'})
+
+    sql, params = consulta_pagina(cursor)
+    assert 'r.id_reporte IN' not in sql
+    assert 'r.nombre LIKE %s' in sql
+    assert params[:3] == ['%00%'] * 3
+
+
+def test_escapar_like():
+    assert catalogo.escapar_like('10%_a') == '10\\%\\_a'
+
+
+# ============================================================================
+# RECURSOS DE LA PÁGINA (una consulta para todo el conjunto)
+# ============================================================================
+
+class CursorRecursos:
+    def __init__(self, filas):
+        self.filas = filas
+        self.consultas = []
+
+    def execute(self, sql, params=None):
+        self.consultas.append((' '.join(sql.split()), params))
+
+    def fetchall(self):
+        return [fila for fila in self.filas if fila['reporte_id'] in self.consultas[-1][1]]
+
+
+def test_adjuntar_recursos_en_una_consulta():
+    reportes = [{'id_reporte': 1}, {'id_reporte': 2}, {'id_reporte': 3}]
+    cursor = CursorRecursos([
+        {'reporte_id': 1, 'tipo': 'GITLAB', 'url': 'https://gitlab/a'},
+        {'reporte_id': 1, 'tipo': 'GITLAB', 'url': 'https://gitlab/b'},
+        {'reporte_id': 1, 'tipo': 'PDF', 'url': None},
+        {'reporte_id': 3, 'tipo': 'PDF', 'url': None},
+    ])
+
+    catalogo.adjuntar_recursos(cursor, reportes)
+
+    (sql, params), = cursor.consultas
+    assert 'rr.reporte_id IN (%s,%s,%s)' in sql and params == [1, 2, 3]
+    assert [(r['tiene_gitlab'], r['tiene_pdf'], r['gitlab_url']) for r in reportes] == [
+        (True, True, 'https://gitlab/a'),
+        (False, False, None),
+        (False, True, None),
+    ]
+
+
+def test_adjuntar_recursos_sin_reportes_no_consulta():
+    cursor = CursorRecursos([])
+    assert catalogo.adjuntar_recursos(cursor, []) == []
+    assert cursor.consultas == []
@@ -0,0 +1,81 @@
+"""
+Pruebas de la caché de datos de referencia y los dominios ENUM
+"""
+
+import pytest
+
+import datos_referencia
+from datos_referencia import CacheReferencia, parsear_enum
+
+
+class Consultas(list):
+    """Consultas hechas; `tablas` son las filas que responde cada tabla"""
+
+
+@pytest.fixture
+def consultas(monkeypatch):
+    """Reemplaza _consultar: responde por tabla y registra cada consulta"""
+    consultas = Consultas()
+    tablas = {
+        'tipo_reporte': [{'id_tipo': 1, 'nombre': 'Regulatorio', 'prefijo_codigo': 'REG'}],
+        'information_schema.COLUMNS': [
+            {'columna': 'audiencia', 'tipo': "enum('INTERNA','EXTERNA')"},
+            {'columna': 'estado', 'tipo': "enum('Por Validar','Aprobado')"},
+        ],
+    }
+
+    def consultar(query, params=()):
+        consultas.append(query)
+        return next((list(filas) for tabla, filas in tablas.items() if f'FROM {tabla}' in query), [])
+
+    monkeypatch.setattr(datos_referencia, '_consultar', consultar)
+    monkeypatch.setattr(datos_referencia, 'cache_referencia', CacheReferencia(ttl=600))
+    consultas.tablas = tablas
+    return consultas
+
+
+def test_parsear_enum():
+    assert parsear_enum("enum('A','B','C')") == ['A', 'B', 'C']
+    assert parsear_enum("enum('Por Validar','l''Aprobado')") == ['Por Validar', "l'Aprobado"]
+    assert parsear_enum(None) == []
+
+
+def test_cache_sirve_desde_memoria_hasta_vencer(monkeypatch):
+    cache = CacheReferencia(ttl=10)
+    reloj = [100.0]
+    monkeypatch.setattr(datos_referencia.time, 'monotonic', lambda: reloj[0])
+
+    assert cache.obtener('tipos', lambda: 'v1') == 'v1'
+    assert cache.obtener('tipos', lambda: 'otra') == 'v1'
+    reloj[0] += 11
+    assert cache.obtener('tipos', lambda: 'v2') == 'v2'
+    assert (cache.aciertos, cache.fallos) == (1, 2)
+
+
+def test_dominios_enum_una_consulta_por_tabla(consultas):
+    assert datos_referencia.valores_enum('reporte', 'audiencia') == ['INTERNA', 'EXTERNA']
+    assert datos_referencia.valores_enum('reporte', 'estado') == ['Por Validar', 'Aprobado']
+    assert datos_referencia.valores_enum('reporte', 'no_es_enum') == []
+    assert len(consultas) == 1
+
+
+def test_estados_reporte_del_enum_ordenados(consultas):
+    assert datos_referencia.estados_reporte() == ['Aprobado', 'Por Validar']
+
+
+def test_prefijo_tipo_refresca_una_vez_ante_un_tipo_nuevo(consultas):
+    assert datos_referencia.prefijo_tipo(1) == 'REG'
+    consultas.tablas['tipo_reporte'].append({'id_tipo': 2, 'nombre': 'Financiero', 'prefijo_codigo': 'FIN'})
+
+    assert datos_referencia.prefijo_tipo(2) == 'FIN'
+    with pytest.raises(ValueError, match='no encontrado'):
+        datos_referencia.prefijo_tipo(9)
+    assert sum('FROM tipo_reporte' in query for query in consultas) == 3
+
+
+def test_invalidar_referencias(consultas):
+    datos_referencia.tipos_reporte()
+    datos_referencia.tipos_reporte()
+    datos_referencia.invalidar_referencias('tipos')
+    datos_referencia.tipos_reporte()
+    assert len(consultas) == 2
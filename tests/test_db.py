@@ -0,0 +1,132 @@
+"""
+Pruebas del pool de conexiones y de la conexión compartida por request
+"""
+
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+import db
+from db import PoolAgotadoError, PoolConexiones
+
+
+class RawFalsa:
+    """Conexión MySQL de mentira"""
+
+    def __init__(self, numero):
+        self.numero = numero
+        self.in_transaction = False
+        self.cerrada = False
+        self.caida = False
+        self.rollbacks = 0
+
+    def ping(self, reconnect=False):
+        if self.caida:
+            raise ConnectionError('MySQL server has gone away')
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.cerrada = True
+
+
+@pytest.fixture
+def creadas(monkeypatch):
+    creadas = []
+
+    def conectar(**config):
+        creadas.append(RawFalsa(len(creadas) + 1))
+        return creadas[-1]
+
+    monkeypatch.setattr(db.mysql.connector, 'connect', conectar)
+    return creadas
+
+
+def test_reutiliza_la_conexion_devuelta(creadas):
+    pool = PoolConexiones({}, pool_size=2)
+
+    conn = pool.obtener()
+    conn.close()
+    conn.close()    # dos close() no la devuelven dos veces
+    otra = pool.obtener()
+
+    assert otra._raw is creadas[0] and len(creadas) == 1
+    estadisticas = pool.estadisticas()
+    assert (estadisticas['checkouts'], estadisticas['creadas'], estadisticas['en_uso']) == (2, 1, 1)
+
+
+def test_devolver_deshace_la_transaccion_abierta(creadas):
+    pool = PoolConexiones({})
+    conn = pool.obtener()
+    creadas[0].in_transaction = True
+
+    conn.close()
+
+    assert creadas[0].rollbacks == 1
+    assert pool.estadisticas()['libres'] == 1
+
+
+def test_pool_agotado_espera_y_falla(creadas):
+    pool = PoolConexiones({}, pool_size=1, timeout=0.05)
+    pool.obtener()
+
+    inicio = time.monotonic()
+    with pytest.raises(PoolAgotadoError):
+        pool.obtener()
+
+    assert time.monotonic() - inicio >= 0.05
+    assert pool.estadisticas()['timeouts'] == 1
+    assert len(creadas) == 1
+
+
+def test_pool_agotado_recibe_la_conexion_liberada(creadas):
+    pool = PoolConexiones({}, pool_size=1, timeout=2)
+    conn = pool.obtener()
+    threading.Timer(0.05, conn.close).start()
+
+    assert pool.obtener()._raw is creadas[0]
+    assert len(creadas) == 1
+
+
+def test_recicla_conexiones_viejas(creadas):
+    pool = PoolConexiones({}, recycle=60)
+    conn = pool.obtener()
+    conn.close()
+    raw, creada_en, devuelta_en = pool._libres.get_nowait()
+    pool._libres.put((raw, creada_en - 61, devuelta_en))
+
+    nueva = pool.obtener()
+
+    assert nueva._raw is creadas[1] and creadas[0].cerrada
+    estadisticas = pool.estadisticas()
+    assert (estadisticas['recicladas'], estadisticas['descartadas'], estadisticas['abiertas']) == (1, 1, 1)
+
+
+def test_descarta_inactivas_que_no_responden_al_ping(creadas):
+    pool = PoolConexiones({}, ping_after=30)
+    pool.obtener().close()
+    raw, creada_en, devuelta_en = pool._libres.get_nowait()
+    raw.caida = True
+    pool._libres.put((raw, creada_en, devuelta_en - 31))
+
+    assert pool.obtener()._raw is creadas[1]
+    assert creadas[0].cerrada
+
+
+def test_conexion_compartida_por_request(creadas, monkeypatch):
+    monkeypatch.setattr(db, '_pool', PoolConexiones({}))
+    app = Flask(__name__)
+    app.teardown_appcontext(db.liberar_conexion_request)
+
+    with app.app_context():
+        conn = db.get_request_connection()
+        conn.close()    # no la devuelve: sigue siendo la del request
+        assert db.get_request_connection() is conn
+        assert db._pool.estadisticas()['en_uso'] == 1
+
+    assert db._pool.estadisticas()['en_uso'] == 0
+    assert len(creadas) == 1
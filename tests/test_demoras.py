@@ -0,0 +1,136 @@
+"""
+Pruebas de la propagación de demoras sobre el grafo de dependencias
+"""
+
+from datetime import datetime, timedelta
+
+import grafo_dependencias
+from demoras import MotorDemoras
+from grafo_dependencias import GrafoDependencias
+
+AHORA = datetime(2025, 3, 3, 9, 0)
+
+
+class CursorGrafo:
+    def __init__(self, aristas, ids):
+        self.aristas = aristas
+        self.ids = ids
+        self._resultado = []
+
+    def execute(self, sql, params=None):
+        if sql == grafo_dependencias.SQL_REPORTES:
+            self._resultado = [
+                (id_reporte, f'REP-{id_reporte:04d}', None, None, None, 'Aprobado', None, None, None)
+                for id_reporte in self.ids
+            ]
+        else:
+            self._resultado = [
+                (id_dependencia, origen, dependiente, 'DATOS', 'ALTA')
+                for id_dependencia, (origen, dependiente) in enumerate(self.aristas, 1)
+            ]
+
+    def fetchall(self):
+        return self._resultado
+
+
+def grafo_de(*aristas):
+    ids = sorted({nodo for arista in aristas for nodo in arista})
+    grafo = GrafoDependencias()
+    grafo.cargar(CursorGrafo(list(aristas), ids))
+    return grafo
+
+
+def motor_con(proximas, previsto=None, **config):
+    motor = MotorDemoras(**config)
+    motor.proximas = dict(proximas)
+    motor.previsto = dict(previsto or {})
+    return motor
+
+
+def test_listo_propio_suma_el_retraso_previsto():
+    motor = motor_con({1: AHORA + timedelta(hours=2)}, {1: 30})
+    assert motor.listo_propio(1, AHORA) == AHORA + timedelta(hours=2, minutes=30)
+    assert motor.listo_propio(2, AHORA) is None
+
+
+def test_listo_propio_vencido_no_es_antes_de_ahora():
+    motor = motor_con({1: AHORA - timedelta(hours=1)}, {1: 10})
+    assert motor.listo_propio(1, AHORA) == AHORA
+
+
+def test_calcular_hereda_la_demora_del_padre():
+    grafo = grafo_de((1, 2), (2, 3))
+    motor = motor_con(
+        {1: AHORA + timedelta(hours=1), 2: AHORA + timedelta(hours=2), 3: AHORA + timedelta(hours=3)},
+        {1: 240},
+    )
+    proyeccion = motor.calcular(grafo, AHORA)
+
+    listo_1 = AHORA + timedelta(hours=5)
+    assert proyeccion[1] == (listo_1, None, 1)
+    assert proyeccion[2] == (listo_1, 1, 1)
+    assert proyeccion[3] == (listo_1, 2, 1)
+    assert motor.ruta_critica(3) == [1, 2, 3]
+    assert motor.retraso_minutos(3) == 120
+    assert motor.incumple(3)
+
+
+def test_calcular_suma_minutos_de_proceso():
+    grafo = grafo_de((1, 2))
+    motor = motor_con(
+        {1: AHORA + timedelta(hours=1), 2: AHORA + timedelta(hours=1)},
+        minutos_proceso=20,
+    )
+    motor.calcular(grafo, AHORA)
+    assert motor.proyeccion[2] == (AHORA + timedelta(hours=1, minutes=20), 1, 1)
+    assert motor.retraso_minutos(2) == 20
+
+
+def test_calcular_ignora_padre_que_corre_despues():
+    # El padre corre después que el hijo: el hijo usa la entrega anterior del padre
+    grafo = grafo_de((1, 2))
+    motor = motor_con({1: AHORA + timedelta(days=1), 2: AHORA + timedelta(hours=1)}, {1: 600})
+    motor.calcular(grafo, AHORA)
+
+    assert motor.proyeccion[2] == (AHORA + timedelta(hours=1), None, 2)
+    assert motor.ruta_critica(2) == [2]
+    assert not motor.incumple(2)
+
+
+def test_calcular_toma_el_padre_mas_tardio():
+    grafo = grafo_de((1, 3), (2, 3))
+    motor = motor_con(
+        {1: AHORA + timedelta(hours=1), 2: AHORA + timedelta(hours=1), 3: AHORA + timedelta(hours=2)},
+        {1: 90, 2: 150},
+    )
+    motor.calcular(grafo, AHORA)
+    assert motor.proyeccion[3][1:] == (2, 2)
+    assert motor.retraso_minutos(3) == 90
+
+
+def test_calcular_salta_aristas_ciclicas():
+    grafo = grafo_de((1, 2), (2, 1))
+    motor = motor_con({1: AHORA + timedelta(hours=2), 2: AHORA + timedelta(hours=3)}, {2: 600})
+    motor.calcular(grafo, AHORA)
+    assert motor.proyeccion[1] == (AHORA + timedelta(hours=2), None, 1)
+
+
+def test_en_riesgo_ordena_por_retraso_y_excluye_propias():
+    grafo = grafo_de((1, 2), (1, 3))
+    motor = motor_con(
+        {1: AHORA + timedelta(hours=1), 2: AHORA + timedelta(hours=2), 3: AHORA + timedelta(hours=3)},
+        {1: 300},
+        tolerancia_minutos=15,
+    )
+    motor.calcular(grafo, AHORA)
+
+    assert motor.en_riesgo(grafo) == [2, 3]
+    assert motor.en_riesgo(grafo, incluir_propias=True) == [1, 2, 3]
+
+
+def test_registrar_entrega_promedio_exponencial():
+    motor = motor_con({}, {1: 100.0}, alfa=0.5)
+    motor.registrar_entrega(1, 20, AHORA)
+    motor.registrar_entrega(2, 40, AHORA)
+    assert motor.previsto == {1: 60.0, 2: 40.0}
+    assert motor.proximas[1] == AHORA
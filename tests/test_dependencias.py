@@ -0,0 +1,167 @@
+"""
+Pruebas de los motores de recorrido del árbol de dependencias (memoria, BFS y WITH RECURSIVE)
+
+Las consultas corren sobre SQLite en memoria: el SQL de ambos motores es
+estándar salvo el parámetro (%s → ?) y UNION DISTINCT (UNION en SQLite).
+"""
+
+import sqlite3
+
+import pytest
+
+import dependencias
+from grafo_dependencias import GrafoDependencias
+
+
+class CursorSqlite:
+    def __init__(self, conn):
+        self._cursor = conn.cursor()
+
+    def execute(self, sql, params=()):
+        sql = sql.replace('%s', '?').replace('UNION DISTINCT', 'UNION')
+        self._cursor.execute(sql, list(params))
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+
+def base(reportes, aristas):
+    """reportes: {id: estado}; aristas: [(origen, dependiente, tipo, criticidad)]"""
+    conn = sqlite3.connect(':memory:')
+    conn.executescript("""
+        CREATE TABLE tipo_reporte (id_tipo INTEGER PRIMARY KEY, nombre TEXT);
+        CREATE TABLE reporte (
+            id_reporte INTEGER PRIMARY KEY, codigo_interno TEXT, nombre TEXT, descripcion TEXT,
+            audiencia TEXT, estado TEXT, tipo_id INTEGER, receptor_externo TEXT
+        );
+        CREATE TABLE reporte_schedule (reporte_id INTEGER PRIMARY KEY, frecuencia TEXT);
+        CREATE TABLE reporte_dependencia (
+            id_dependencia INTEGER PRIMARY KEY, reporte_origen_id INTEGER, reporte_dependiente_id INTEGER,
+            tipo_dependencia TEXT, criticidad TEXT
+        );
+        INSERT INTO tipo_reporte VALUES (1, 'Regulatorio');
+    """)
+    conn.executemany(
+        "INSERT INTO reporte VALUES (?, ?, ?, NULL, 'INTERNA', ?, 1, NULL)",
+        [(id_reporte, f'REP-{id_reporte:04d}', f'Reporte {id_reporte}', estado) for id_reporte, estado in reportes.items()],
+    )
+    conn.executemany(
+        "INSERT INTO reporte_dependencia (reporte_origen_id, reporte_dependiente_id, tipo_dependencia, criticidad) "
+        "VALUES (?, ?, ?, ?)",
+        aristas,
+    )
+    conn.executemany("INSERT INTO reporte_schedule VALUES (?, 'MENSUAL')", [(id_reporte,) for id_reporte in reportes])
+    return CursorSqlite(conn)
+
+
+def normalizados(niveles):
+    """Cada nivel como lista ordenada: el orden entre filas empatadas en criticidad y código no está definido"""
+    return [sorted(tuple(sorted(fila.items())) for fila in nivel) for nivel in niveles]
+
+
+# 1 → 2 → 4 → 6, 1 → 3 → 4 (diamante), 4 → 1 (ciclo), 3 → 5 (no aprobado), 5 → 7,
+# 2 → 4 con dos tipos de dependencia
+REPORTES = {1: 'Aprobado', 2: 'Aprobado', 3: 'Aprobado', 4: 'Aprobado', 5: 'Borrador', 6: 'Aprobado', 7: 'Aprobado'}
+ARISTAS = [
+    (1, 2, 'DATOS', 'ALTA'),
+    (1, 3, 'DATOS', 'MEDIA'),
+    (2, 4, 'CALCULO', 'ALTA'),
+    (2, 4, 'VALIDACION', 'BAJA'),
+    (3, 4, 'DATOS', 'ALTA'),
+    (4, 6, 'DATOS', 'ALTA'),
+    (4, 1, 'DATOS', 'BAJA'),
+    (3, 5, 'DATOS', 'ALTA'),
+    (5, 7, 'DATOS', 'ALTA'),
+]
+
+
+@pytest.mark.parametrize('id_reporte', [1, 2, 4, 6, 7])
+@pytest.mark.parametrize('max_niveles', [1, 2, 10])
+def test_cte_igual_a_bfs(id_reporte, max_niveles):
+    cursor = base(REPORTES, ARISTAS)
+
+    bfs_abajo = dependencias.construir_niveles_downstream(cursor, id_reporte, max_niveles)
+    cte_abajo = dependencias.construir_niveles_cte(cursor, id_reporte, 'downstream', max_niveles)
+    bfs_arriba = dependencias.construir_niveles_upstream(cursor, id_reporte, max_niveles)
+    cte_arriba = dependencias.construir_niveles_cte(cursor, id_reporte, 'upstream', max_niveles)
+
+    assert normalizados(cte_abajo) == normalizados(bfs_abajo)
+    assert normalizados(cte_arriba) == normalizados(bfs_arriba)
+
+
+def test_cte_nivel_por_distancia_minima():
+    cursor = base(REPORTES, ARISTAS)
+    niveles = dependencias.construir_niveles_cte(cursor, 1, 'downstream')
+
+    # 4 una vez por tipo de arista desde el nivel anterior; la arista 4 → 1 no lo reubica
+    assert [sorted(fila['id'] for fila in nivel) for nivel in niveles] == [[2, 3], [4, 4, 4], [6]]
+    # El reporte no aprobado corta la rama: 7 no se alcanza
+    assert 5 not in {fila['id'] for nivel in niveles for fila in nivel}
+
+
+def test_cte_grafo_denso_sin_explosion_de_rutas():
+    # 8 capas completas de 6 reportes: 6^8 rutas, 48 reportes
+    capas = [list(range(capa * 6 + 1, capa * 6 + 7)) for capa in range(8)]
+    reportes = {id_reporte: 'Aprobado' for capa in capas for id_reporte in capa}
+    reportes[0] = 'Aprobado'
+    aristas = [(0, hijo, 'DATOS', 'ALTA') for hijo in capas[0]]
+    aristas += [
+        (padre, hijo, 'DATOS', 'ALTA')
+        for superior, inferior in zip(capas, capas[1:]) for padre in superior for hijo in inferior
+    ]
+    cursor = base(reportes, aristas)
+
+    cte = dependencias.construir_niveles_cte(cursor, 0, 'downstream')
+    assert normalizados(cte) == normalizados(dependencias.construir_niveles_downstream(cursor, 0))
+    assert [len({fila['id'] for fila in nivel}) for nivel in cte] == [6] * 8
+
+
+# ============================================================================
+# MOTOR EN MEMORIA
+# ============================================================================
+
+def grafo_de(cursor):
+    grafo = GrafoDependencias()
+    grafo.cargar(cursor)
+    return grafo
+
+
+@pytest.mark.parametrize('id_reporte', [1, 2, 4, 6, 7])
+@pytest.mark.parametrize('max_niveles', [1, 2, 10])
+def test_memoria_igual_a_bfs(id_reporte, max_niveles):
+    cursor = base(REPORTES, ARISTAS)
+    grafo = grafo_de(cursor)
+
+    assert normalizados(grafo.niveles_downstream(id_reporte, max_niveles)) == \
+        normalizados(dependencias.construir_niveles_downstream(cursor, id_reporte, max_niveles))
+    assert normalizados(grafo.niveles_upstream(id_reporte, max_niveles)) == \
+        normalizados(dependencias.construir_niveles_upstream(cursor, id_reporte, max_niveles))
+
+
+@pytest.mark.parametrize('id_reporte', [1, 4, 5, 99])
+def test_memoria_info_reporte_igual_a_la_bd(id_reporte):
+    cursor = base(REPORTES, ARISTAS)
+    assert grafo_de(cursor).info_reporte(id_reporte) == dependencias.obtener_info_reporte(cursor, id_reporte)
+
+
+def test_memoria_ordena_por_criticidad_del_enum():
+    grafo = grafo_de(base(REPORTES, ARISTAS))
+    # ALTA > MEDIA > BAJA (orden del ENUM), no alfabético
+    nivel = grafo.niveles_downstream(2, 1)[0]
+    assert [(fila['tipo_dependencia'], fila['criticidad']) for fila in nivel] == [('CALCULO', 'ALTA'), ('VALIDACION', 'BAJA')]
+    assert [fila['criticidad'] for fila in grafo.niveles_downstream(1, 1)[0]] == ['ALTA', 'MEDIA']
+
+
+def test_memoria_recargar_reporte_refleja_el_cambio_de_estado():
+    cursor = base(REPORTES, ARISTAS)
+    grafo = grafo_de(cursor)
+    alcanzados = lambda: {fila['id'] for nivel in grafo.niveles_downstream(3) for fila in nivel}
+    assert alcanzados() == {1, 2, 4, 6}
+
+    cursor.execute("UPDATE reporte SET estado = 'Aprobado' WHERE id_reporte = 5")
+    grafo.recargar_reporte(cursor, 5)
+
+    assert alcanzados() == {1, 2, 4, 5, 6, 7}
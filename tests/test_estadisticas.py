@@ -0,0 +1,114 @@
+"""
+Pruebas de los contadores materializados del dashboard
+"""
+
+import pytest
+
+import estadisticas
+
+
+class CursorGrabador:
+    """Cursor de mentira: registra las sentencias y responde las lecturas en orden"""
+
+    def __init__(self, respuestas=()):
+        self.respuestas = list(respuestas)
+        self.sentencias = []
+
+    def execute(self, sql, params=None):
+        self.sentencias.append((' '.join(sql.split()), params))
+
+    def executemany(self, sql, filas):
+        self.sentencias.append((' '.join(sql.split()), list(filas)))
+
+    def fetchall(self):
+        return self.respuestas.pop(0)
+
+    def close(self):
+        pass
+
+
+class ConexionGrabadora:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.eventos = []
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.eventos.append('commit')
+
+    def rollback(self):
+        self.eventos.append('rollback')
+
+    def close(self):
+        pass
+
+
+def test_deltas_reporte():
+    assert estadisticas.deltas_reporte('ALTA', 'DIARIA', 'Aprobado', None, signo=-1) == {
+        'total': -1, 'criticidad:ALTA': -1, 'frecuencia:DIARIA': -1, 'estado:Aprobado': -1,
+    }
+
+
+def test_ajustar_usa_un_shard_y_orden_de_clave():
+    cursor = CursorGrabador()
+    estadisticas.ajustar(cursor, {'total': 1, 'criticidad:ALTA': 1, 'estado:Aprobado': 0})
+
+    (sql, filas), = cursor.sentencias
+    assert 'ON DUPLICATE KEY UPDATE valor = valor + VALUES(valor)' in sql
+    assert [clave for clave, _, _ in filas] == ['criticidad:ALTA', 'total']
+    assert len({shard for _, shard, _ in filas}) == 1
+    assert 0 <= filas[0][1] < estadisticas.ESTADISTICAS_SHARDS
+
+
+def test_ajustar_sin_cambios_no_escribe():
+    cursor = CursorGrabador()
+    estadisticas.cambio_estado(cursor, 'estado', 'Aprobado', 'Aprobado')
+    estadisticas.ajustar(cursor, {'total': 0})
+    assert cursor.sentencias == []
+
+
+def test_reconciliar_bloquea_cuenta_y_fija_sin_borrar(monkeypatch):
+    cursor = CursorGrabador([
+        [('total',), ('total',), ('estado_entrega:RETRASADO',)],
+        [('ALTA', 'Aprobado', 'EN_TIEMPO', 3), ('BAJA', 'Por Validar', None, 2)],
+        [('DIARIA', 4), (None, 1)],
+    ])
+    conn = ConexionGrabadora(cursor)
+    monkeypatch.setattr(estadisticas, 'get_connection', lambda: conn)
+    monkeypatch.setattr(estadisticas, 'ESTADISTICAS_SHARDS', 4)
+
+    contadores = estadisticas.reconciliar()
+
+    sentencias = [sql for sql, _ in cursor.sentencias]
+    assert sentencias[0] == 'SELECT clave FROM estadistica_resumen FOR UPDATE'
+    assert not any(sql.startswith('DELETE') for sql in sentencias)
+    assert conn.eventos == ['commit']
+
+    assert contadores['total'] == 5
+    assert contadores['estado_entrega:EN_TIEMPO'] == 3
+    # Una clave que ya no tiene reportes queda en 0 (no desaparece)
+    assert contadores['estado_entrega:RETRASADO'] == 0
+    assert contadores['frecuencia:DIARIA'] == 4
+
+    filas = cursor.sentencias[-1][1]
+    assert ('total', 0, 5) in filas
+    assert [(s, v) for c, s, v in filas if c == 'total'] == [(0, 5), (1, 0), (2, 0), (3, 0)]
+    assert [s for c, s, _ in filas if c == estadisticas.CLAVE_RECONCILIADO] == [0]
+
+
+def test_reconciliar_deshace_si_falla(monkeypatch):
+    class CursorRoto(CursorGrabador):
+        def executemany(self, sql, filas):
+            raise RuntimeError('deadlock')
+
+    conn = ConexionGrabadora(CursorRoto([[], [], []]))
+    monkeypatch.setattr(estadisticas, 'get_connection', lambda: conn)
+    with pytest.raises(RuntimeError):
+        estadisticas.reconciliar()
+    assert conn.eventos == ['rollback']
+
+
+def test_agrupados():
+    assert estadisticas.agrupados({'frecuencia:DIARIA': 3, 'total': 9}, 'frecuencia') == {'DIARIA': 3}
@@ -0,0 +1,284 @@
+"""
+Pruebas del grafo de dependencias en memoria (orden incremental y ciclos)
+"""
+
+import pytest
+
+import grafo_dependencias
+from grafo_dependencias import GrafoDependencias
+
+
+class CursorGrafo:
+    """Cursor de mentira: responde reportes, aristas y candado desde listas en memoria"""
+
+    def __init__(self, aristas=(), ids=(), candado=1):
+        self.aristas = list(aristas)
+        self.ids = list(ids)
+        self.candado = candado
+        self.sentencias = []
+        self._resultado = []
+
+    def execute(self, sql, params=None):
+        self.sentencias.append((' '.join(sql.split()), params))
+        if sql.startswith(grafo_dependencias.SQL_DEPENDENCIAS) and params:
+            # WHERE id_dependencia > %s [OR id_dependencia IN (huecos)]
+            desde, huecos = params[0], set(params[1:])
+            self._resultado = [fila for fila in self.aristas if fila[0] > desde or fila[0] in huecos]
+        elif sql == grafo_dependencias.SQL_REPORTES:
+            self._resultado = [
+                (id_reporte, f'REP-{id_reporte:04d}', f'Reporte {id_reporte}', None, None,
+                 'Aprobado', None, 'MENSUAL', None)
+                for id_reporte in self.ids
+            ]
+        elif sql == grafo_dependencias.SQL_DEPENDENCIAS:
+            self._resultado = list(self.aristas)
+        elif 'GET_LOCK' in sql:
+            self._resultado = [(self.candado,)]
+        else:
+            self._resultado = [(1,)]
+
+    def fetchall(self):
+        return self._resultado
+
+    def fetchone(self):
+        return self._resultado[0] if self._resultado else None
+
+
+def arista(id_dependencia, origen, dependiente):
+    return (id_dependencia, origen, dependiente, 'DATOS', 'ALTA')
+
+
+def cargado(*pares, ids=()):
+    """Grafo cargado con las aristas padre → hijo (id_dependencia = posición, desde 1)"""
+    grafo = GrafoDependencias()
+    nodos = set(ids) | {nodo for par in pares for nodo in par}
+    grafo.cargar(CursorGrafo([arista(i, *par) for i, par in enumerate(pares, 1)], sorted(nodos)))
+    return grafo
+
+
+def respeta_orden(grafo):
+    return all(
+        grafo.orden[id_padre] < grafo.orden[id_hijo]
+        for id_hijo, por_padre in grafo.padres.items()
+        for id_padre in por_padre
+        if (id_padre, id_hijo) not in grafo.aristas_ciclicas
+    )
+
+
+def test_carga_ordena_padres_antes_que_hijos():
+    grafo = cargado((1, 2), (2, 3), (1, 3))
+    assert grafo.orden_topologico() == [1, 2, 3]
+    assert not grafo.aristas_ciclicas
+
+
+def test_reordenar_mueve_solo_la_region_afectada():
+    # 1 → 2 y 3 → 4 independientes; 4 → 1 obliga a subir 3 y 4 antes que 1 y 2
+    grafo = cargado((1, 2), (3, 4))
+    assert grafo.orden_topologico() == [1, 3, 2, 4]
+
+    assert grafo.agregar_dependencia(4, 1, 'DATOS', 'ALTA') is None
+    assert respeta_orden(grafo)
+    assert grafo.orden_topologico().index(4) < grafo.orden_topologico().index(1)
+    assert sorted(grafo.orden.values()) == [0, 1, 2, 3]
+
+
+def test_reordenar_no_toca_nada_si_el_orden_ya_sirve():
+    grafo = cargado((1, 2), ids=(3,))
+    antes = dict(grafo.orden)
+    assert grafo.agregar_dependencia(1, 3, 'DATOS', 'ALTA') is None
+    assert grafo.orden == antes
+
+
+def test_reordenar_ubica_reportes_nuevos_al_final():
+    grafo = cargado((1, 2))
+    assert grafo.agregar_dependencia(2, 9, 'CALCULO', 'MEDIA') is None
+    assert grafo.orden_topologico() == [1, 2, 9]
+
+
+def test_arista_que_cierra_ciclo_queda_aparte():
+    grafo = cargado((1, 2), (2, 3))
+    assert grafo.agregar_dependencia(3, 1, 'DATOS', 'ALTA') == [3, 1, 2, 3]
+    assert grafo.aristas_ciclicas == {(3, 1)}
+    assert respeta_orden(grafo)
+
+
+def test_camino_ciclo_antes_del_insert():
+    grafo = cargado((1, 2), (2, 3))
+    version = grafo.version
+
+    assert grafo.camino_ciclo(3, 1) == [3, 1, 2, 3]
+    assert grafo.camino_ciclo(1, 3) is None
+    assert grafo.camino_ciclo(2, 2) == [2, 2]
+    # Solo valida: ni el orden ni la versión cambian
+    assert grafo.version == version
+
+
+def test_carga_con_ciclo_en_la_bd_lo_rompe_en_el_menor_id():
+    grafo = cargado((1, 2), (2, 1))
+    assert grafo.aristas_ciclicas == {(2, 1)}
+    assert grafo.orden_topologico() == [1, 2]
+
+
+def test_sincronizar_aplica_aristas_de_otros_procesos():
+    grafo = cargado((1, 2), ids=(3,))
+    cursor = CursorGrafo([arista(1, 1, 2), arista(2, 2, 3)], [1, 2, 3])
+
+    assert grafo.sincronizar_aristas(cursor) == 1
+    assert 2 in grafo.padres[3]
+    assert grafo.camino_ciclo(3, 1) == [3, 1, 2, 3]
+    assert grafo.ultima_dependencia == 2
+
+
+def test_sincronizar_solo_lee_por_encima_de_la_marca_de_agua():
+    grafo = cargado((1, 2), (2, 3))
+    cursor = CursorGrafo([arista(1, 1, 2), arista(2, 2, 3)], [1, 2, 3])
+
+    assert grafo.sincronizar_aristas(cursor) == 0
+    (sql, params), = cursor.sentencias
+    assert sql.endswith('FROM reporte_dependencia WHERE id_dependencia > %s')
+    assert params == [2]
+
+
+def test_sincronizar_no_reaplica_aristas_ya_notificadas():
+    grafo = cargado((1, 2), ids=(3,))
+    grafo.agregar_dependencia(2, 3, 'DATOS', 'ALTA')
+    version = grafo.version
+
+    assert grafo.sincronizar_aristas(CursorGrafo([arista(1, 1, 2), arista(2, 2, 3)])) == 0
+    assert grafo.version == version
+    assert grafo.ultima_dependencia == 2
+
+
+def test_sincronizar_relee_huecos_de_transacciones_lentas():
+    # El id 2 se asignó antes que el 3 pero se confirmó después
+    grafo = cargado((1, 2), ids=(3, 4))
+    bd = [arista(1, 1, 2), arista(3, 3, 4)]
+    assert grafo.sincronizar_aristas(CursorGrafo(bd)) == 1
+    assert set(grafo._huecos) == {2}
+
+    cursor = CursorGrafo(bd + [arista(2, 2, 3)])
+    assert grafo.sincronizar_aristas(cursor) == 1
+    assert cursor.sentencias[0][1] == [3, 2]
+    assert 2 in grafo.padres[3]
+    assert grafo._huecos == {}
+
+
+def test_huecos_vencidos_se_descartan(monkeypatch):
+    grafo = cargado((1, 2), ids=(3, 4))
+    grafo.sincronizar_aristas(CursorGrafo([arista(1, 1, 2), arista(3, 3, 4)]))
+    assert set(grafo._huecos) == {2}
+
+    # Un rollback nunca llena el hueco: deja de releerse al vencer
+    for id_dependencia in grafo._huecos:
+        grafo._huecos[id_dependencia] -= grafo_dependencias.GRAFO_HUECOS_SEGUNDOS + 1
+    cursor = CursorGrafo([arista(1, 1, 2), arista(3, 3, 4)])
+    grafo.sincronizar_aristas(cursor)
+    grafo.sincronizar_aristas(cursor)
+    assert grafo._huecos == {}
+    assert cursor.sentencias[-1][1] == [3]
+
+
+def test_validar_dependencia_ve_aristas_confirmadas_por_otro_proceso(monkeypatch):
+    # El grafo del proceso no tiene 2 → 3 (la creó otro worker después de la carga)
+    grafo = cargado((1, 2), ids=(3,))
+    monkeypatch.setattr(grafo_dependencias, '_grafo', grafo)
+    cursor = CursorGrafo([arista(1, 1, 2), arista(2, 2, 3)], [1, 2, 3])
+
+    ciclo = grafo_dependencias.validar_dependencia(cursor, 3, 1)
+    assert [paso['codigo_interno'] for paso in ciclo] == ['REP-0003', 'REP-0001', 'REP-0002', 'REP-0003']
+    assert grafo_dependencias.validar_dependencia(cursor, 1, 3) is None
+
+
+@pytest.mark.parametrize('respuesta, obtenido', [(1, True), (0, False), (None, False)])
+def test_bloquear_dependencias(respuesta, obtenido):
+    cursor = CursorGrafo(candado=respuesta)
+    assert grafo_dependencias.bloquear_dependencias(cursor) is obtenido
+    sql, params = cursor.sentencias[0]
+    assert sql == 'SELECT GET_LOCK(%s, %s)'
+    assert params[0] == grafo_dependencias.NOMBRE_LOCK_DEPENDENCIAS
+
+    grafo_dependencias.liberar_dependencias(cursor)
+    assert cursor.sentencias[-1] == ('SELECT RELEASE_LOCK(%s)', (grafo_dependencias.NOMBRE_LOCK_DEPENDENCIAS,))
+
+
+# ----------------------------------------------------------------------
+# Índice de alcance (bitsets)
+# ----------------------------------------------------------------------
+
+def con_alcance(*pares, ids=()):
+    grafo = cargado(*pares, ids=ids)
+    grafo.alcance.construir(grafo)
+    return grafo
+
+
+def test_alcance_cierre_transitivo():
+    grafo = con_alcance((1, 2), (2, 3), (1, 4), ids=(5,))
+    alcance = grafo.alcance
+
+    assert alcance.construido
+    assert alcance.alcanza(1, 3) and alcance.alcanza(1, 4)
+    assert not alcance.alcanza(2, 4)
+    assert not alcance.alcanza(3, 1)
+    assert not alcance.alcanza(5, 1)
+    assert sorted(alcance.alcanzables([1])) == [2, 3, 4]
+    assert sorted(alcance.alcanzables([2, 5])) == [3]
+
+
+def test_alcance_ignora_aristas_ciclicas():
+    grafo = con_alcance((1, 2), (2, 1))
+    assert grafo.alcance.alcanza(1, 2)
+    assert not grafo.alcance.alcanza(2, 1)
+
+
+def test_alcance_agregar_propaga_a_los_ancestros():
+    grafo = con_alcance((1, 2), (3, 4))
+    assert grafo.agregar_dependencia(2, 3, 'DATOS', 'ALTA') is None
+
+    alcance = grafo.alcance
+    assert alcance.contadores['actualizaciones'] == 1
+    assert alcance.alcanza(1, 4) and alcance.alcanza(2, 3)
+    assert sorted(alcance.alcanzables([1])) == [2, 3, 4]
+    # Igual que reconstruir desde cero
+    incremental = {nodo: sorted(alcance.alcanzables([nodo])) for nodo in grafo.orden}
+    alcance.construir(grafo)
+    assert incremental == {nodo: sorted(alcance.alcanzables([nodo])) for nodo in grafo.orden}
+
+
+def test_alcance_agregar_reporte_nuevo():
+    grafo = con_alcance((1, 2))
+    grafo.agregar_dependencia(2, 7, 'DATOS', 'BAJA')
+    assert grafo.alcance.alcanza(1, 7)
+    assert grafo.alcance.alcanzables([7]) == []
+
+
+def test_alcance_sin_construir_no_responde():
+    grafo = cargado((1, 2))
+    grafo.agregar_dependencia(2, 3, 'DATOS', 'ALTA')
+    assert grafo.alcance.alcanzables([1]) is None
+    assert not grafo.alcance.alcanza(1, 2)
+
+
+def test_alcance_invalidar():
+    grafo = con_alcance((1, 2))
+    grafo.alcance.invalidar()
+
+    assert not grafo.alcance.construido
+    assert grafo.alcance.alcanzables([1]) is None
+    assert grafo.alcance.contadores['invalidaciones'] == 1
+
+
+def test_alcance_desborda_y_solo_reintenta_en_recarga():
+    grafo = cargado((1, 2), (2, 3))
+    grafo.alcance.max_bytes = 0
+    grafo.alcance.construir(grafo)
+    assert grafo.alcance.desbordado and not grafo.alcance.construido
+
+    grafo.alcance.invalidar()
+    assert grafo.alcance.desbordado
+    grafo.alcance.invalidar(reintentar=True)
+    assert not grafo.alcance.desbordado
+
+
+def test_bits_encendidos():
+    assert list(grafo_dependencias.bits_encendidos(0b101001)) == [0, 3, 5]
+    assert list(grafo_dependencias.bits_encendidos(0)) == []
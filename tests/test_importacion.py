@@ -0,0 +1,120 @@
+"""
+Pruebas de la validación por fila y la resolución de dependencias de la importación masiva
+"""
+
+import io
+
+import pytest
+
+pytest.importorskip('services.reporte_service')
+
+import datos_referencia
+import importacion
+
+
+@pytest.fixture
+def refs(monkeypatch):
+    monkeypatch.setattr(datos_referencia, 'tipos_reporte', lambda: [
+        {'id_tipo': 1, 'nombre': 'Regulatorio', 'prefijo_codigo': 'REG'},
+    ])
+    monkeypatch.setattr(datos_referencia, 'categorias', lambda: [])
+    monkeypatch.setattr(datos_referencia, 'areas', lambda: [
+        {'id_area': 3, 'nombre': 'Riesgos'},
+    ])
+    monkeypatch.setattr(datos_referencia, 'valores_enum', lambda tabla, columna: [])
+    return importacion.Referencias()
+
+
+def fila(**valores):
+    return {'nombre': 'Cartera', 'tipo': 'Regulatorio', 'area_reportante': 'Riesgos', 'area_ejecutora': 'riesgos', **valores}
+
+
+def test_parsear_dependencias_csv_y_objetos():
+    assert [dep['referencia'] for dep in importacion.parsear_dependencias('REG-0001; 7,REG-0002')] == ['REG-0001', '7', 'REG-0002']
+
+    dep, = importacion.parsear_dependencias([{'codigo': 'REG-0001', 'tipo_dependencia': 'calculo', 'criticidad': ' alta '}])
+    assert (dep['tipo_dependencia'], dep['criticidad']) == ('CALCULO', 'ALTA')
+
+
+def test_validar_fila_normaliza(refs):
+    datos, errores = importacion.validar_fila(fila(frecuencia='semanal', dependencias='REG-0001'), refs)
+
+    assert errores is None
+    assert (datos['tipo_id'], datos['prefijo'], datos['area_ejecutora_id']) == (1, 'REG', 3)
+    assert datos['frecuencia'] == 'SEMANAL'
+    assert datos['dependencias'][0]['tipo_dependencia'] == 'DATOS'
+
+
+def test_validar_fila_rechaza_tipo_y_criticidad_de_dependencia(refs):
+    datos, errores = importacion.validar_fila(fila(dependencias=[
+        {'codigo': 'REG-0001', 'tipo_dependencia': 'ENTRADA'},
+        {'codigo': 'REG-0002', 'criticidad': 'CRITICA'},
+    ]), refs)
+
+    assert datos is None
+    assert errores == [
+        "tipo_dependencia 'ENTRADA' de REG-0001 no es válido (DATOS, CALCULO, CONSOLIDACION, VALIDACION)",
+        "criticidad 'CRITICA' de REG-0002 no es válida (BAJA, MEDIA, ALTA)",
+    ]
+
+
+def test_validar_fila_obligatorios(refs):
+    datos, errores = importacion.validar_fila({'tipo': 'Otro'}, refs)
+    assert datos is None
+    assert "nombre es obligatorio" in errores
+    assert "tipo 'Otro' no existe" in errores
+    assert "area_reportante es obligatorio" in errores
+
+
+class CursorReportes:
+    def __init__(self, filas):
+        self.filas = filas
+
+    def execute(self, sql, params=None):
+        self.params = params
+
+    def fetchall(self):
+        return [(id_reporte, codigo) for id_reporte, codigo in self.filas if id_reporte in self.params or codigo in self.params]
+
+
+def lote_con(*referencias):
+    return [
+        (numero, {'dependencias': importacion.parsear_dependencias(referencia)})
+        for numero, referencia in enumerate(referencias, start=2)
+    ]
+
+
+def test_resolver_dependencias_existentes():
+    lote = lote_con('REG-0001', '8')
+    validas = importacion.resolver_dependencias(CursorReportes([(5, 'REG-0001'), (8, 'REG-0002')]), lote, [])
+
+    assert [datos['dependencias'][0]['id_padre'] for _, datos in validas] == [5, 8]
+
+
+def test_resolver_dependencias_rechaza_inexistentes_y_de_la_misma_importacion():
+    errores = []
+    lote = lote_con('REG-0001', 'REG-0009', 'REG-0002')
+    validas = importacion.resolver_dependencias(
+        CursorReportes([(5, 'REG-0001'), (8, 'REG-0002')]), lote, errores, creados={8}
+    )
+
+    assert [numero for numero, _ in validas] == [2]
+    assert errores == [
+        {'fila': 3, 'errores': ["Dependencia inexistente: REG-0009"]},
+        {'fila': 4, 'errores': ["Dependencia creada en esta misma importación: REG-0002 (regístrela después de importar)"]},
+    ]
+
+
+def test_importar_solo_validar_reporta_por_fila(refs, monkeypatch):
+    monkeypatch.setattr(importacion, 'Referencias', lambda: refs)
+    archivo = io.BytesIO(
+        "nombre,tipo,area_reportante,area_ejecutora,dependencias\n"
+        "Cartera,Regulatorio,Riesgos,Riesgos,REG-0001\n"
+        "Liquidez,Regulatorio,Riesgos,Riesgos,\n"
+        ",Regulatorio,Riesgos,Riesgos,\n".encode('utf-8-sig')
+    )
+
+    resultado = importacion.importar_reportes(archivo, 'csv', validar_solo=True)
+
+    assert (resultado['procesadas'], resultado['validas'], resultado['creadas']) == (3, 2, 0)
+    assert resultado['errores'] == [{'fila': 4, 'errores': ["nombre es obligatorio"]}]
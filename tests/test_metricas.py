@@ -0,0 +1,188 @@
+"""
+Pruebas de la instrumentación SQL por request y de la exposición Prometheus
+"""
+
+import logging
+
+import pytest
+from flask import Flask
+
+import db
+import metricas
+from metricas import Contador, FiltroMuestreo, Histograma
+
+
+@pytest.fixture(autouse=True)
+def metricas_limpias(monkeypatch):
+    """Histogramas y contadores nuevos en cada prueba (los del módulo son globales)"""
+    nuevas = []
+    for nombre in ('CONSULTAS_POR_REQUEST', 'SQL_POR_REQUEST', 'FILAS_POR_REQUEST', 'ESPERA_CONEXION',
+                   'DURACION_REQUEST', 'REQUESTS', 'PRESUPUESTO_EXCEDIDO', 'CONSULTAS_FONDO', 'SQL_FONDO'):
+        original = getattr(metricas, nombre)
+        if isinstance(original, Histograma):
+            nueva = Histograma(original.nombre, original.ayuda, original.buckets, original.etiquetas)
+        else:
+            nueva = Contador(original.nombre, original.ayuda, original.etiquetas)
+        monkeypatch.setattr(metricas, nombre, nueva)
+        nuevas.append(nueva)
+    monkeypatch.setattr(metricas, 'METRICAS', tuple(nuevas))
+    monkeypatch.setattr(metricas, '_observadores', [])
+    monkeypatch.setattr(metricas, 'configurar_logging', lambda: None)
+
+
+class CursorCrudo:
+    """Cursor MySQL de mentira: devuelve `filas` en cada fetch"""
+
+    def __init__(self, filas=()):
+        self.filas = list(filas)
+        self.sentencias = []
+
+    def execute(self, operation, params=None):
+        self.sentencias.append(operation)
+
+    def executemany(self, operation, seq_params):
+        self.sentencias.extend(operation for _ in seq_params)
+
+    def fetchone(self):
+        return self.filas[0] if self.filas else None
+
+    def fetchall(self):
+        return list(self.filas)
+
+
+class ConexionContada:
+    round_trips = 0
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    metricas.init_app(app)
+    metricas.init_app(app)      # idempotente: un solo juego de hooks
+
+    @app.route('/reportes/<int:id_reporte>')
+    def ver(id_reporte):
+        cursor = db.CursorInstrumentado(CursorCrudo([(1,), (2,), (3,)]), ConexionContada())
+        for _ in range(id_reporte):
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        return 'ok'
+
+    @app.route('/falla')
+    def falla():
+        return 'no', 404
+
+    return app
+
+
+def lineas(metrica):
+    return [linea for linea in metrica.exportar() if not linea.startswith('#')]
+
+
+def test_histograma_acumula_buckets_en_formato_prometheus():
+    histograma = Histograma('consultas', 'Consultas por request', (1, 5))
+    for valor in (1, 3, 8):
+        histograma.observar(valor, '/reportes')
+
+    assert histograma.exportar() == [
+        '# HELP consultas Consultas por request',
+        '# TYPE consultas histogram',
+        'consultas_bucket{ruta="/reportes",le="1"} 1',
+        'consultas_bucket{ruta="/reportes",le="5"} 2',
+        'consultas_bucket{ruta="/reportes",le="+Inf"} 3',
+        'consultas_sum{ruta="/reportes"} 12.0',
+        'consultas_count{ruta="/reportes"} 3',
+    ]
+
+
+def test_contador_escapa_etiquetas_y_sin_etiquetas():
+    contador = Contador('requests', 'Requests', ('ruta', 'metodo'))
+    contador.incrementar('/a"b\\c', 'GET')
+    contador.incrementar('/a"b\\c', 'GET', cantidad=2)
+    assert lineas(contador) == ['requests{ruta="/a\\"b\\\\c",metodo="GET"} 3']
+
+    fondo = Contador('fondo', 'Fuera de request', ())
+    fondo.incrementar(cantidad=4)
+    assert lineas(fondo) == ['fondo 4']
+
+
+def test_cursor_instrumentado_cuenta_viajes():
+    conexion = ConexionContada()
+    cursor = db.CursorInstrumentado(CursorCrudo(), conexion)
+
+    cursor.executemany("INSERT INTO t (a) VALUES (%s)", [(1,), (2,), (3,)])
+    cursor.executemany("  insert INTO t (a) VALUES (%s)", [])
+    cursor.executemany("UPDATE t SET a = %s", [(1,), (2,)])
+    cursor.execute("SELECT 1")
+
+    assert conexion.round_trips == 1 + 0 + 2 + 1
+    assert lineas(metricas.CONSULTAS_FONDO) == ['alejandria_sql_consultas_fondo_total 4']
+
+
+def test_request_registra_consultas_filas_y_status(app):
+    cliente = app.test_client()
+    assert cliente.get('/reportes/2').status_code == 200
+    assert cliente.get('/falla').status_code == 404
+
+    assert 'alejandria_request_consultas_sql_count{ruta="/reportes/<int:id_reporte>"} 1' in lineas(metricas.CONSULTAS_POR_REQUEST)
+    assert 'alejandria_request_consultas_sql_sum{ruta="/reportes/<int:id_reporte>"} 2.0' in lineas(metricas.CONSULTAS_POR_REQUEST)
+    assert 'alejandria_request_filas_leidas_sum{ruta="/reportes/<int:id_reporte>"} 6.0' in lineas(metricas.FILAS_POR_REQUEST)
+    assert lineas(metricas.REQUESTS) == [
+        'alejandria_requests_total{ruta="/falla",metodo="GET",status="404"} 1',
+        'alejandria_requests_total{ruta="/reportes/<int:id_reporte>",metodo="GET",status="200"} 1',
+    ]
+    # lo hecho dentro del request no cuenta como trabajo de fondo
+    assert lineas(metricas.CONSULTAS_FONDO) == []
+
+
+def test_presupuesto_excedido_advierte(app, monkeypatch, caplog):
+    monkeypatch.setitem(metricas.METRICAS_CONFIG, 'presupuesto_consultas', 3)
+    cliente = app.test_client()
+
+    with caplog.at_level(logging.WARNING, logger='metricas'):
+        cliente.get('/reportes/3')
+        cliente.get('/reportes/4')
+
+    assert lineas(metricas.PRESUPUESTO_EXCEDIDO) == [
+        'alejandria_request_presupuesto_excedido_total{ruta="/reportes/<int:id_reporte>"} 1',
+    ]
+    assert len(caplog.records) == 1
+    assert '4 consultas SQL (presupuesto 3)' in caplog.records[0].getMessage()
+
+
+def test_observadores_reciben_el_resumen_y_sus_errores_no_rompen(app):
+    vistos = []
+    metricas.observar_requests(lambda *args: 1 / 0)
+    metricas.observar_requests(lambda ruta, metodo, status, duracion, resumen: vistos.append(
+        (ruta, status, resumen['consultas'], resumen['filas'])))
+
+    assert app.test_client().get('/reportes/1').status_code == 200
+    assert vistos == [('/reportes/<int:id_reporte>', 200, 1, 3)]
+
+
+def test_espera_de_conexion_por_ruta_o_fondo(app):
+    metricas.registrar_espera_conexion(0.002)
+    with app.test_request_context('/reportes/1'):
+        app.preprocess_request()
+        metricas.registrar_espera_conexion(0.02)
+
+    assert 'alejandria_conexion_espera_segundos_count{ruta="(fondo)"} 1' in lineas(metricas.ESPERA_CONEXION)
+    assert 'alejandria_conexion_espera_segundos_count{ruta="/reportes/<int:id_reporte>"} 1' in lineas(metricas.ESPERA_CONEXION)
+
+
+def test_exportar_con_gauges():
+    texto = metricas.exportar(metricas.gauges('alejandria_pool', {'en_uso': 2, 'activo': True, 'nombre': 'x'}))
+
+    assert texto.endswith('alejandria_pool_en_uso 2\n')
+    assert '# TYPE alejandria_pool_en_uso gauge' in texto
+    assert 'alejandria_pool_activo' not in texto and 'alejandria_pool_nombre' not in texto
+    assert '# TYPE alejandria_request_consultas_sql histogram' in texto
+
+
+def test_filtro_muestreo():
+    filtro = FiltroMuestreo(muestreo=0.0)
+    registro = lambda nivel: logging.LogRecord('x', nivel, __file__, 1, 'mensaje', None, None)
+
+    assert filtro.filter(registro(logging.WARNING))
+    assert not filtro.filter(registro(logging.INFO))
+    assert FiltroMuestreo(muestreo=1.0).filter(registro(logging.DEBUG))
@@ -0,0 +1,106 @@
+"""
+Pruebas de la expansión de ocurrencias y del feed iCalendar
+"""
+
+import json
+import re
+from datetime import datetime
+
+import pytest
+
+import ocurrencias
+
+VIERNES = datetime(2025, 3, 21, 9, 0)
+
+
+def fila(id_reporte, reglas, frecuencia='DIARIA', proxima=None, codigo='REP-0001', nombre='Cartera'):
+    return {
+        'id_reporte': id_reporte, 'codigo_interno': codigo, 'nombre': nombre,
+        'frecuencia': frecuencia, 'reglas_json': json.dumps(reglas), 'proxima_ejecucion': proxima,
+    }
+
+
+DIARIA = {'type': 'dynamic', 'freq': 'diaria'}
+LUNES = {'type': 'dynamic', 'freq': 'semanal', 'weeks': [1], 'time': '09:00'}
+
+
+@pytest.mark.parametrize('linea', [
+    'SUMMARY:corta',
+    'X' * 75,
+    'SUMMARY:' + 'a' * 200,
+    'SUMMARY:' + 'ñ' * 100,
+    'SUMMARY:' + '€' * 60 + 'fin',
+])
+def test_plegar_ics_respeta_75_octetos(linea):
+    plegada = ocurrencias.plegar_ics(linea)
+    partes = plegada.split('\r\n')
+
+    assert all(len(parte.encode('utf-8')) <= 75 for parte in partes)
+    assert all(parte.startswith(' ') for parte in partes[1:])
+    # Desplegar (quitar CRLF + espacio) devuelve la línea original
+    assert plegada.replace('\r\n ', '') == linea
+
+
+def test_plegar_ics_corta_entre_caracteres_multibyte():
+    # 'é' ocupa 2 octetos: 8 + 33×2 = 74 (otra no cabe en 75), luego 37×2 = 74 por continuación
+    partes = ocurrencias.plegar_ics('SUMMARY:' + 'é' * 80).split('\r\n ')
+    assert [len(parte) for parte in partes] == [41, 37, 10]
+
+
+def test_escapar_ics():
+    assert ocurrencias.escapar_ics('a,b;c\\d\r\ne\nf') == 'a\\,b\\;c\\\\d\\ne\\nf'
+    assert ocurrencias.escapar_ics(None) == ''
+
+
+def test_leer_fecha():
+    assert ocurrencias.leer_fecha('2025-03-21') == datetime(2025, 3, 21)
+    assert ocurrencias.leer_fecha('2025-03-21', fin_de_dia=True) == datetime(2025, 3, 21, 23, 59, 59, 999999)
+    assert ocurrencias.leer_fecha('2025-03-21T14:30', fin_de_dia=True) == datetime(2025, 3, 21, 14, 30)
+    assert ocurrencias.leer_fecha('') is None
+    with pytest.raises(ValueError, match='Fecha no válida'):
+        ocurrencias.leer_fecha('21/03/2025')
+
+
+def test_leer_ventana():
+    desde, hasta = ocurrencias.leer_ventana({'desde': '2025-03-01', 'hasta': '2025-03-31'})
+    assert (desde, hasta) == (datetime(2025, 3, 1), datetime(2025, 3, 31, 23, 59, 59, 999999))
+
+    assert ocurrencias.leer_ventana({'desde': '2025-03-01'}, 10)[1] == datetime(2025, 3, 11)
+    assert ocurrencias.leer_ventana({'desde': '2025-03-01'})[1] is None
+
+    with pytest.raises(ValueError, match='posterior'):
+        ocurrencias.leer_ventana({'desde': '2025-03-10', 'hasta': '2025-03-01'})
+    with pytest.raises(ValueError, match='30 días'):
+        ocurrencias.leer_ventana({'desde': '2025-01-01', 'hasta': '2025-03-01'}, maximo_dias=30)
+
+
+def test_ocurrencias_reporte_empieza_en_la_proxima_fijada():
+    proxima = datetime(2025, 3, 21, 16, 0)
+    fechas = list(ocurrencias.ocurrencias_reporte(fila(1, [DIARIA], proxima=proxima), VIERNES, limite=3))
+    assert fechas == [proxima, datetime(2025, 3, 25, 8, 0), datetime(2025, 3, 26, 8, 0)]
+
+
+def test_ocurrencias_reportes_en_orden_cronologico():
+    filas = [fila(1, [LUNES]), fila(2, [DIARIA])]
+    combinadas = list(ocurrencias.ocurrencias_reportes(filas, VIERNES, datetime(2025, 3, 31, 12, 0)))
+
+    assert [fecha for fecha, _ in combinadas] == sorted(fecha for fecha, _ in combinadas)
+    assert (datetime(2025, 3, 31, 9, 0), 1) in combinadas
+    assert [id_reporte for _, id_reporte in combinadas].count(2) == 5
+
+
+def test_feed_ics_por_bloques():
+    filas = [fila(7, [DIARIA], codigo='REG-0007', nombre='Cartera, vencida')]
+    bloques = list(ocurrencias.feed_ics(
+        filas, VIERNES, datetime(2025, 3, 28, 23, 59), 'Área; Finanzas', eventos_bloque=2
+    ))
+    feed = ''.join(bloques)
+
+    assert feed.startswith('BEGIN:VCALENDAR\r\n') and feed.endswith('END:VCALENDAR\r\n')
+    assert 'X-WR-CALNAME:Área\\; Finanzas\r\n' in feed
+    assert feed.count('BEGIN:VEVENT') == 4
+    assert 'UID:7-20250325T080000@alejandria\r\n' in feed
+    assert 'SUMMARY:REG-0007 - Cartera\\, vencida\r\n' in feed
+    assert re.search(r'\r\nDTSTAMP:\d{8}T\d{6}Z\r\n', feed)
+    # Cabecera + 2 bloques de 2 eventos + cierre
+    assert len(bloques) == 4
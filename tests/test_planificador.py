@@ -0,0 +1,218 @@
+"""
+Pruebas del planificador de vencimientos (transiciones y liderazgo con GET_LOCK)
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip('services.reporte_service')
+
+import datos_referencia
+import planificador as modulo
+from planificador import Planificador, siguiente_transicion
+
+
+@pytest.fixture(autouse=True)
+def umbrales_por_defecto(monkeypatch):
+    # Sin BD: umbral_alerta usa ALERTAS_CONFIG (SEMANAL = 72 h)
+    monkeypatch.setattr(datos_referencia, 'horas_alerta', lambda: {})
+
+
+def test_sin_proxima_no_hay_transicion():
+    assert siguiente_transicion(None, 'SEMANAL', 'EN_TIEMPO') is None
+
+
+def test_en_tiempo_cambia_al_entrar_en_la_alerta():
+    proxima = datetime.now() + timedelta(days=10)
+    assert siguiente_transicion(proxima, 'SEMANAL', 'EN_TIEMPO') == proxima - timedelta(hours=72)
+
+
+def test_entregado_tambien_pasa_a_proximo_vencer():
+    proxima = datetime.now() + timedelta(days=10)
+    assert siguiente_transicion(proxima, 'SEMANAL', 'ENTREGADO') == proxima - timedelta(hours=72)
+
+
+def test_estado_desactualizado_es_inmediato():
+    ahora = datetime.now()
+    proxima = ahora + timedelta(days=1)
+    assert siguiente_transicion(proxima, 'SEMANAL', 'EN_TIEMPO', ahora) == ahora
+
+
+def test_proximo_vencer_pasa_a_retrasado_al_vencer():
+    proxima = datetime.now() + timedelta(days=1)
+    assert siguiente_transicion(proxima, 'SEMANAL', 'PROXIMO_VENCER') == proxima + timedelta(microseconds=1)
+
+
+def test_retrasado_no_tiene_mas_transiciones():
+    assert siguiente_transicion(datetime.now() - timedelta(hours=5), 'SEMANAL', 'RETRASADO') is None
+
+
+# ============================================================================
+# LIDERAZGO
+# ============================================================================
+
+class CursorCandado:
+    def __init__(self, obtenido):
+        self.obtenido = obtenido
+
+    def execute(self, sql, params=None):
+        assert sql == "SELECT GET_LOCK(%s, 0)" and params == (modulo.NOMBRE_LOCK,)
+
+    def fetchone(self):
+        return (1 if self.obtenido else 0,)
+
+    def close(self):
+        pass
+
+
+class ConexionCandado:
+    """Conexión dedicada de mentira: GET_LOCK devuelve `obtenido`"""
+
+    def __init__(self, obtenido):
+        self.obtenido = obtenido
+        self.cerrada = False
+        self.caida = False
+
+    def cursor(self):
+        return CursorCandado(self.obtenido)
+
+    def ping(self, reconnect=False):
+        if self.caida:
+            raise ConnectionError('Lost connection to MySQL server')
+
+    def close(self):
+        self.cerrada = True
+
+
+def conectar_con(monkeypatch, conexion):
+    monkeypatch.setattr(modulo.mysql.connector, 'connect', lambda **config: conexion)
+
+
+def test_toma_el_candado(monkeypatch):
+    conexion = ConexionCandado(obtenido=True)
+    conectar_con(monkeypatch, conexion)
+    p = Planificador()
+
+    assert p._tomar_liderazgo()
+    assert p.lider and not conexion.cerrada
+    assert p._sigue_siendo_lider()
+    assert p.estadisticas()['lider'] is True
+
+
+def test_otro_proceso_tiene_el_candado(monkeypatch):
+    conexion = ConexionCandado(obtenido=False)
+    conectar_con(monkeypatch, conexion)
+    p = Planificador(espera_lider=30)
+
+    assert not p._tomar_liderazgo()
+    assert not p.lider and conexion.cerrada
+    assert p._espera() == 30
+
+
+def test_pierde_el_liderazgo_si_cae_la_conexion(monkeypatch):
+    conexion = ConexionCandado(obtenido=True)
+    conectar_con(monkeypatch, conexion)
+    p = Planificador()
+    p._tomar_liderazgo()
+    p._heap = [(datetime.now(), 1)]
+
+    conexion.caida = True
+    assert not p._sigue_siendo_lider()
+    assert not p.lider and p._heap == [] and conexion.cerrada
+
+
+def test_solo_el_lider_recibe_notificaciones(monkeypatch):
+    p = Planificador()
+    monkeypatch.setattr(modulo, 'planificador', p)
+    proxima = datetime.now() + timedelta(days=10)
+
+    modulo.notificar_programacion(1, proxima, 'SEMANAL', 'EN_TIEMPO')
+    assert p._heap == []
+
+    p.lider = True
+    modulo.notificar_programacion(1, proxima, 'SEMANAL', 'EN_TIEMPO')
+    assert p._heap == [(proxima - timedelta(hours=72), 1)]
+
+
+# ============================================================================
+# SONDEO DE CAMBIOS
+# ============================================================================
+
+MARCA = datetime(2025, 3, 3, 9, 0)
+
+
+class ConexionSondeo:
+    """version_datos y reportes modificados de mentira para sincronizar()"""
+
+    def __init__(self, version, modificados=()):
+        self.version = version
+        self.modificados = list(modificados)
+        self.sentencias = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        self.sentencias.append((sql, params))
+        if sql == modulo.SQL_VERSION:
+            self._resultado = [(self.version, MARCA)]
+        else:
+            self._resultado = self.modificados
+
+    def fetchone(self):
+        return self._resultado[0]
+
+    def fetchall(self):
+        return self._resultado
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def lider_sincronizado(monkeypatch, conexion, version=10):
+    monkeypatch.setattr(modulo, 'get_connection', lambda: conexion)
+    p = Planificador(sondeo=60, solape=60)
+    p.lider = True
+    p._version = version
+    p._leido_hasta = MARCA - timedelta(minutes=1)
+    return p
+
+
+def test_sincronizar_ignora_las_versiones_propias(monkeypatch):
+    conexion = ConexionSondeo(version=12)
+    p = lider_sincronizado(monkeypatch, conexion)
+    p._propias = {11, 12}
+
+    assert p.sincronizar() == 0
+    assert [sql for sql, _ in conexion.sentencias] == [modulo.SQL_VERSION]
+    assert p._version == 12 and p._propias == set()
+
+
+def test_sincronizar_relee_solo_lo_modificado(monkeypatch):
+    proxima = datetime.now() + timedelta(days=10)
+    conexion = ConexionSondeo(version=13, modificados=[(7, proxima, 'EN_TIEMPO', 'SEMANAL')])
+    p = lider_sincronizado(monkeypatch, conexion)
+    p._propias = {11, 12}
+
+    assert p.sincronizar() == 1
+    sql, params = conexion.sentencias[1]
+    assert sql == modulo.SQL_MODIFICADOS
+    # Desde la marca anterior menos el solape
+    assert params == (MARCA - timedelta(minutes=2),)
+    assert p._heap == [(proxima - timedelta(hours=72), 7)]
+    assert p._leido_hasta == MARCA
+    assert p.contadores['recargas'] == 0
+
+
+def test_sincronizar_respeta_el_intervalo_de_sondeo(monkeypatch):
+    conexion = ConexionSondeo(version=20)
+    p = lider_sincronizado(monkeypatch, conexion)
+    p.sincronizar()
+    conexion.sentencias.clear()
+
+    assert p.sincronizar() == 0
+    assert conexion.sentencias == []
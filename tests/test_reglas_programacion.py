@@ -0,0 +1,135 @@
+"""
+Pruebas de la compilación y evaluación de reglas de programación
+"""
+
+import json
+from datetime import datetime
+
+import pytest
+
+import reglas_programacion
+from reglas_programacion import (
+    CompiladorReglas, ReglaCicloFijo, ReglaDiaria, ReglaMensual, ReglaSemanal, compilar_regla,
+)
+
+# Marzo 2025: el lunes 24 es festivo (San José trasladado)
+VIERNES = datetime(2025, 3, 21, 9, 0)
+
+
+@pytest.mark.parametrize('weeks, dias', [
+    ([1, 3], {0, 2}),          # JS lunes y miércoles → weekday() 0 y 2
+    (['5'], {4}),              # viernes, como texto
+    ([0, 1, 6], {0}),          # domingo y sábado se descartan
+])
+def test_semanal_traduce_dias_de_js(weeks, dias):
+    regla = compilar_regla({'type': 'dynamic', 'freq': 'semanal', 'weeks': weeks, 'time': '07:30'})
+    assert regla == ReglaSemanal(7, 30, frozenset(dias))
+
+
+def test_semanal_solo_fin_de_semana_no_es_valida():
+    assert compilar_regla({'type': 'dynamic', 'freq': 'semanal', 'weeks': [0, 6]}) is None
+
+
+def test_mensual_filtra_y_ordena_dias():
+    regla = compilar_regla({'type': 'dynamic', 'freq': 'mensual', 'days': [31, 0, 15, '15', 40]})
+    assert regla == ReglaMensual(8, 0, (15, 31))
+
+
+def test_ciclo_fijo_usa_meses_de_js():
+    assert compilar_regla({'type': 'fixed-cycle', 'mes': 0, 'dia': 15, 'hora': '10:00'}) == ReglaCicloFijo(10, 0, 1, 15)
+    assert compilar_regla({'type': 'fixed-cycle', 'mes': 11, 'dia': 31}) == ReglaCicloFijo(8, 0, 12, 31)
+
+
+@pytest.mark.parametrize('regla', [
+    None,
+    'diaria',
+    {'type': 'dynamic', 'freq': 'quincenal'},
+    {'type': 'dynamic', 'freq': 'mensual', 'days': ['x']},
+    {'type': 'dynamic', 'freq': 'semanal', 'weeks': None},
+    {'type': 'fixed-cycle', 'mes': 12, 'dia': 1},
+    {'type': 'fixed-cycle', 'mes': 0, 'dia': 'primero'},
+    {'type': 'otro'},
+])
+def test_reglas_invalidas(regla):
+    assert compilar_regla(regla) is None
+
+
+def test_hora_invalida_usa_la_defecto():
+    assert compilar_regla({'type': 'dynamic', 'freq': 'diaria', 'time': '25:00'}) == ReglaDiaria(8, 0)
+
+
+def test_diaria_salta_fin_de_semana_y_festivo():
+    assert ReglaDiaria(8, 0).siguiente(VIERNES) == datetime(2025, 3, 25, 8, 0)
+    assert ReglaDiaria(10, 0).siguiente(VIERNES) == datetime(2025, 3, 21, 10, 0)
+
+
+def test_semanal_omite_el_festivo():
+    # Solo lunes: el 24 es festivo, pasa al lunes siguiente
+    assert ReglaSemanal(8, 0, frozenset({0})).siguiente(VIERNES) == datetime(2025, 3, 31, 8, 0)
+
+
+def test_mensual_dia_inexistente_cae_en_el_ultimo():
+    assert ReglaMensual(8, 0, (31,)).siguiente(datetime(2025, 4, 1)) == datetime(2025, 4, 30, 8, 0)
+
+
+def test_ciclo_fijo_pasa_al_siguiente_laboral():
+    # 1 de enero de 2026 es festivo (jueves) → viernes 2
+    assert ReglaCicloFijo(8, 0, 1, 1).siguiente(datetime(2025, 6, 1)) == datetime(2026, 1, 2, 8, 0)
+
+
+def test_programa_toma_la_regla_mas_temprana():
+    reglas = json.dumps([
+        {'type': 'dynamic', 'freq': 'mensual', 'days': [28]},
+        {'type': 'dynamic', 'freq': 'semanal', 'weeks': [3]},
+    ])
+    programa = CompiladorReglas().compilar('MENSUAL', reglas)
+    assert programa.siguiente(VIERNES) == datetime(2025, 3, 26, 8, 0)
+
+
+def test_programa_sin_reglas_usa_la_frecuencia():
+    programa = CompiladorReglas().compilar('MENSUAL', None)
+    assert programa.reglas == ()
+    assert programa.siguiente(VIERNES) == datetime(2025, 4, 21, 8, 0)
+    assert CompiladorReglas().compilar('ADHOC', '').siguiente(VIERNES) is None
+
+
+def test_ocurrencias_mezcla_sin_duplicados():
+    reglas = json.dumps([
+        {'type': 'dynamic', 'freq': 'diaria'},
+        {'type': 'dynamic', 'freq': 'semanal', 'weeks': [2]},
+    ])
+    programa = CompiladorReglas().compilar('DIARIA', reglas)
+    fechas = list(programa.ocurrencias(VIERNES, datetime(2025, 3, 28, 23, 59)))
+    assert [fecha.day for fecha in fechas] == [25, 26, 27, 28]
+
+
+def test_ocurrencias_empieza_en_la_proxima_fijada():
+    programa = CompiladorReglas().compilar('DIARIA', json.dumps({'type': 'dynamic', 'freq': 'diaria'}))
+    primera = datetime(2025, 3, 21, 15, 0)
+    fechas = list(reglas_programacion.expandir(programa, VIERNES, limite=3, primera=primera))
+    assert fechas == [primera, datetime(2025, 3, 25, 8, 0), datetime(2025, 3, 26, 8, 0)]
+
+    # Fuera de la ventana no se incluye
+    assert list(programa.ocurrencias(VIERNES, datetime(2025, 3, 21, 12, 0), primera)) == []
+
+
+def test_compilador_cachea_por_contenido():
+    compilador = CompiladorReglas(maximo=2)
+    reglas = json.dumps([{'type': 'dynamic', 'freq': 'diaria'}, {'type': 'otro'}])
+
+    programa = compilador.compilar('DIARIA', reglas)
+    assert compilador.compilar('DIARIA', reglas) is programa
+    assert compilador.compilar('SEMANAL', reglas) is not programa
+    assert compilador.estadisticas() == {
+        'aciertos': 1, 'compilaciones': 2, 'reglas_invalidas': 2, 'programas': 2,
+    }
+
+    compilador.compilar('MENSUAL', reglas)
+    assert compilador.estadisticas()['programas'] == 2
+    assert compilador.compilar('DIARIA', reglas) is not programa
+
+
+def test_compilador_json_invalido_usa_respaldo():
+    programa = CompiladorReglas().compilar('SEMANAL', '{no es json')
+    assert programa.reglas == ()
+    assert programa.siguiente(VIERNES) == datetime(2025, 3, 28, 8, 0)
@@ -0,0 +1,314 @@
+"""
+Pruebas de ReporteService contra una conexión de mentira
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+reporte_service = pytest.importorskip('services.reporte_service')
+
+import cache_http
+import datos_referencia
+import demoras
+import estadisticas
+import planificador
+from services.reporte_service import ReporteService
+
+
+class Cursor:
+    """Cursor de mentira: `responder(sql, params)` da las filas de cada sentencia"""
+
+    def __init__(self, responder=None):
+        self.responder = responder or (lambda sql, params: [])
+        self.sentencias = []
+        self.lotes = []
+        self.rowcount = 1
+        self.lastrowid = 0
+        self._filas = []
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.sentencias.append((sql, params))
+        self._filas = list(self.responder(sql, params))
+
+    def executemany(self, sql, filas):
+        self.lotes.append((' '.join(sql.split()), list(filas)))
+
+    def fetchone(self):
+        return self._filas.pop(0) if self._filas else None
+
+    def fetchall(self):
+        filas, self._filas = self._filas, []
+        return filas
+
+    def close(self):
+        pass
+
+
+class Conexion:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.eventos = []
+
+    def cursor(self, dictionary=False):
+        return self._cursor
+
+    def commit(self):
+        self.eventos.append('commit')
+
+    def rollback(self):
+        self.eventos.append('rollback')
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def sin_efectos(monkeypatch):
+    monkeypatch.setattr(datos_referencia, 'horas_alerta', lambda: {})
+    monkeypatch.setattr(cache_http, 'marcar_cambio', lambda: None)
+    monkeypatch.setattr(estadisticas, 'reconciliar', lambda: None)
+    monkeypatch.setattr(planificador, 'invalidar_planificador', lambda: None)
+    monkeypatch.setattr(demoras, 'invalidar_demoras', lambda: None)
+
+
+def conectar(monkeypatch, cursor):
+    conn = Conexion(cursor)
+    monkeypatch.setattr(reporte_service, 'get_request_connection', lambda: conn)
+    monkeypatch.setattr(reporte_service, 'get_connection', lambda: conn)
+    return conn
+
+
+# ============================================================================
+# RECÁLCULO MASIVO DE PROGRAMACIÓN
+# ============================================================================
+
+def filas_keyset(filas):
+    """Responde la consulta por lotes: id_reporte > %s ORDER BY id_reporte LIMIT %s"""
+    def responder(sql, params):
+        ultimo_id, limite = params
+        return [dict(fila) for fila in filas if fila['id_reporte'] > ultimo_id][:limite]
+    return responder
+
+
+def test_recalcular_por_lotes_escribe_solo_lo_que_cambio(monkeypatch):
+    futura = datetime.now() + timedelta(days=30)
+    vencida = datetime.now() - timedelta(days=2)
+    filas = [
+        {'id_reporte': 1, 'proxima_ejecucion': None, 'estado_entrega': None, 'frecuencia': 'MENSUAL', 'reglas_json': None},
+        {'id_reporte': 2, 'proxima_ejecucion': futura, 'estado_entrega': 'EN_TIEMPO', 'frecuencia': 'MENSUAL', 'reglas_json': None},
+        {'id_reporte': 3, 'proxima_ejecucion': vencida, 'estado_entrega': 'EN_TIEMPO', 'frecuencia': 'MENSUAL', 'reglas_json': None},
+        {'id_reporte': 4, 'proxima_ejecucion': None, 'estado_entrega': None, 'frecuencia': 'MENSUAL', 'reglas_json': None},
+    ]
+    cursor = Cursor(filas_keyset(filas))
+    conn = conectar(monkeypatch, cursor)
+    calculadas = []
+
+    def calcular(frecuencia, reglas_json, desde=None):
+        calculadas.append((frecuencia, reglas_json))
+        return futura
+
+    monkeypatch.setattr(ReporteService, 'calcular_proxima_ejecucion', staticmethod(calcular))
+
+    resumen = ReporteService.recalcular_programacion(tamano_lote=2)
+
+    assert (resumen['procesados'], resumen['actualizados'], resumen['lotes']) == (4, 3, 2)
+    # Keyset: cada lote continúa desde el último id leído
+    assert [params for _, params in cursor.sentencias] == [(0, 2), (2, 2), (4, 2)]
+    # Mismas reglas: una sola vez por corrida
+    assert calculadas == [('MENSUAL', None)]
+    # El plazo vencido no se mueve, solo cambia su estado
+    escritas = [fila for _, lote in cursor.lotes for fila in lote]
+    assert escritas == [(futura, 'EN_TIEMPO', 1), (vencida, 'RETRASADO', 3), (futura, 'EN_TIEMPO', 4)]
+    assert conn.eventos == ['commit', 'commit']
+
+
+def test_recalcular_proxima_solo_mueve_fechas_futuras(monkeypatch):
+    futura = datetime.now() + timedelta(days=30)
+    nueva = datetime.now() + timedelta(days=40)
+    vencida = datetime.now() - timedelta(days=2)
+    filas = [
+        {'id_reporte': 1, 'proxima_ejecucion': futura, 'estado_entrega': 'EN_TIEMPO', 'frecuencia': 'MENSUAL', 'reglas_json': None},
+        {'id_reporte': 2, 'proxima_ejecucion': vencida, 'estado_entrega': 'RETRASADO', 'frecuencia': 'MENSUAL', 'reglas_json': None},
+    ]
+    cursor = Cursor(filas_keyset(filas))
+    conectar(monkeypatch, cursor)
+    monkeypatch.setattr(ReporteService, 'calcular_proxima_ejecucion', staticmethod(lambda *args, **kwargs: nueva))
+
+    resumen = ReporteService.recalcular_programacion(recalcular_proxima=True)
+
+    assert resumen['actualizados'] == 1
+    (_, escritas), = cursor.lotes
+    assert escritas == [(nueva, 'EN_TIEMPO', 1)]
+
+
+def test_recalcular_fallido_deshace(monkeypatch):
+    def responder(sql, params):
+        raise RuntimeError('Lost connection')
+
+    conn = conectar(monkeypatch, Cursor(responder))
+    with pytest.raises(RuntimeError):
+        ReporteService.recalcular_programacion()
+    assert conn.eventos == ['rollback']
+
+
+# ============================================================================
+# CÓDIGOS INTERNOS (contador por prefijo)
+# ============================================================================
+
+class Secuencia:
+    """Tabla secuencia_codigo de mentira: responde UPDATE ... LAST_INSERT_ID(...) e INSERT IGNORE"""
+
+    def __init__(self, contadores=None, maximo_en_reporte=0):
+        self.contadores = dict(contadores or {})
+        self.maximo_en_reporte = maximo_en_reporte
+
+    def cursor(self):
+        cursor = Cursor()
+
+        def responder(sql, params):
+            if sql.startswith('UPDATE secuencia_codigo'):
+                cantidad, prefijo = params
+                cursor.rowcount = int(prefijo in self.contadores)
+                if cursor.rowcount:
+                    self.contadores[prefijo] += cantidad
+                    cursor.lastrowid = self.contadores[prefijo]
+            elif sql.startswith('INSERT IGNORE INTO secuencia_codigo'):
+                self.contadores.setdefault(params[0], self.maximo_en_reporte)
+            return []
+
+        cursor.responder = responder
+        return cursor
+
+
+def test_reservar_numeros_un_viaje_con_contador_existente():
+    cursor = Secuencia({'REG': 41}).cursor()
+    assert ReporteService.reservar_numeros(cursor, 'REG', 3) == 44
+    assert len(cursor.sentencias) == 1
+
+
+def test_reservar_numeros_inicializa_desde_el_maximo_existente():
+    cursor = Secuencia(maximo_en_reporte=120).cursor()
+    assert ReporteService.reservar_numeros(cursor, 'REG') == 121
+    assert [sql.split(' ')[0] for sql, _ in cursor.sentencias] == ['UPDATE', 'INSERT', 'UPDATE']
+    assert cursor.sentencias[1][1] == ('REG', 'REG-%')
+
+
+def test_generar_codigo_interno_en_la_transaccion_del_request(monkeypatch):
+    secuencia = Secuencia({'REG': 9})
+    monkeypatch.setattr(datos_referencia, 'prefijo_tipo', lambda tipo_id: 'REG')
+    monkeypatch.setattr(reporte_service, 'CODIGO_BLOQUE', 1)
+    conn = conectar(monkeypatch, secuencia.cursor())
+
+    assert ReporteService.generar_codigo_interno(1) == 'REG-0010'
+    assert ReporteService.generar_codigo_interno(1) == 'REG-0011'
+    # El commit es del que crea el reporte
+    assert conn.eventos == []
+
+
+def test_generar_codigo_interno_por_bloques_sin_repetir(monkeypatch):
+    secuencia = Secuencia({'REG': 0})
+    reservas = []
+    monkeypatch.setattr(datos_referencia, 'prefijo_tipo', lambda tipo_id: 'REG')
+    monkeypatch.setattr(reporte_service, 'CODIGO_BLOQUE', 5)
+    monkeypatch.setattr(ReporteService, '_bloques', {})
+    monkeypatch.setattr(reporte_service, 'get_request_connection', lambda: Conexion(Cursor()))
+
+    def nueva_conexion():
+        reservas.append(1)
+        return Conexion(secuencia.cursor())
+
+    monkeypatch.setattr(reporte_service, 'get_connection', nueva_conexion)
+
+    codigos = []
+    hilos = [
+        threading.Thread(target=lambda: codigos.extend(ReporteService.generar_codigo_interno(1) for _ in range(6)))
+        for _ in range(4)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert sorted(codigos) == [f'REG-{numero:04d}' for numero in range(1, 25)]
+    # 24 códigos en bloques de 5: 5 reservas
+    assert len(reservas) == 5 and secuencia.contadores['REG'] == 25
+
+
+def test_generar_codigo_interno_tipo_sin_prefijo(monkeypatch):
+    monkeypatch.setattr(datos_referencia, 'prefijo_tipo', lambda tipo_id: None)
+    conn = conectar(monkeypatch, Cursor())
+    with pytest.raises(ValueError, match='prefijo'):
+        ReporteService.generar_codigo_interno(7)
+    assert conn.eventos == ['rollback']
+
+
+# ============================================================================
+# ENTREGA MASIVA
+# ============================================================================
+
+def reportes_programados(filas):
+    """Responde el SELECT ... FOR UPDATE de la entrega con las filas cuyo id está en el IN"""
+    def responder(sql, params):
+        if sql.startswith('SELECT'):
+            return [dict(fila) for fila in filas if fila['id_reporte'] in params]
+        return []
+    return responder
+
+
+def test_marcar_entregados_sql_por_bloques(monkeypatch):
+    ahora = datetime.now()
+    proxima = ahora + timedelta(days=30)
+    filas = [
+        {'id_reporte': 1, 'codigo_interno': 'REG-0001', 'proxima_ejecucion': ahora + timedelta(days=1),
+         'estado_entrega': 'PROXIMO_VENCER', 'frecuencia': 'MENSUAL', 'reglas_json': None},
+        {'id_reporte': 2, 'codigo_interno': 'REG-0002', 'proxima_ejecucion': ahora - timedelta(hours=2),
+         'estado_entrega': 'RETRASADO', 'frecuencia': 'MENSUAL', 'reglas_json': None},
+        {'id_reporte': 3, 'codigo_interno': 'REG-0003', 'proxima_ejecucion': ahora + timedelta(days=10),
+         'estado_entrega': 'ENTREGADO', 'frecuencia': 'MENSUAL', 'reglas_json': None},
+    ]
+    cursor = Cursor(reportes_programados(filas))
+    conn = conectar(monkeypatch, cursor)
+    calculadas = []
+    monkeypatch.setattr(reporte_service, 'ENTREGAS_LOTE', 2)
+    monkeypatch.setattr(ReporteService, 'calcular_proxima_ejecucion',
+                        staticmethod(lambda *clave: calculadas.append(clave) or proxima))
+    monkeypatch.setattr(planificador, 'notificar_programacion', lambda *args: None)
+    monkeypatch.setattr(demoras, 'notificar_entregas', lambda entregas: None)
+
+    resultados = ReporteService.marcar_entregados([3, 1, 2, 1, 9], usuario_id=7)
+
+    # Ids sin repetir, en el orden recibido; el inexistente con su error
+    assert list(resultados) == [3, 1, 2, 9]
+    assert [resultados[i]['success'] for i in (3, 1, 2, 9)] == [True, True, True, False]
+    assert resultados[2]['estado'] == 'RETRASADO' and resultados[2]['minutos_retraso'] >= 119
+    assert resultados[1]['estado'] == 'ENTREGADO'
+    assert calculadas == [('MENSUAL', None)]
+
+    selects = [(sql, params) for sql, params in cursor.sentencias if sql.startswith('SELECT')]
+    updates = [(sql, params) for sql, params in cursor.sentencias if sql.startswith('UPDATE reporte')]
+    # ENTREGAS_LOTE = 2: lectura con bloqueo y UPDATE con CASE por bloque
+    assert [params for _, params in selects] == [[3, 1], [2, 9]]
+    assert all(sql.endswith('FOR UPDATE') for sql, _ in selects)
+    assert [sql.count('WHEN %s THEN %s') for sql, _ in updates] == [2, 1]
+    assert updates[0][1][1:] == [3, proxima, 1, proxima, 3, 1]
+
+    historial, contadores, bitacora_lote = cursor.lotes
+    assert historial[0].startswith('INSERT INTO historial_entregas') and len(historial[1]) == 3
+    assert sorted((clave, delta) for clave, _, delta in contadores[1]) == [
+        ('estado_entrega:ENTREGADO', 2), ('estado_entrega:PROXIMO_VENCER', -1), ('estado_entrega:RETRASADO', -1),
+    ]
+    assert bitacora_lote[0].startswith('INSERT INTO bitacora_evento') and len(bitacora_lote[1]) == 3
+    assert conn.eventos == ['commit']
+
+
+def test_marcar_entregados_sin_reportes_no_escribe(monkeypatch):
+    cursor = Cursor(reportes_programados([]))
+    conn = conectar(monkeypatch, cursor)
+
+    resultados = ReporteService.marcar_entregados([4], usuario_id=1)
+
+    assert resultados == {4: {'success': False, 'error': 'Reporte no encontrado o sin programación'}}
+    assert cursor.lotes == [] and conn.eventos == []
@@ -0,0 +1,228 @@
+"""
+Pruebas de las rutas de reportes contra una conexión de mentira
+"""
+
+import pytest
+
+reporte_service = pytest.importorskip('services.reporte_service')
+
+from flask import Flask
+
+import busqueda
+import cache_http
+import datos_referencia
+import demoras
+import grafo_dependencias
+import planificador
+import reports
+
+
+class CursorGuion:
+    """Cursor de mentira: responde con las filas del primer fragmento contenido en la sentencia"""
+
+    def __init__(self, respuestas):
+        self.respuestas = respuestas
+        self.sentencias = []
+        self.lotes = []
+        self.rowcount = 1
+        self.lastrowid = 1
+        self._filas = []
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.sentencias.append((sql, params))
+        self._filas = next((list(filas) for fragmento, filas in self.respuestas if fragmento in sql), [])
+
+    def executemany(self, sql, filas):
+        self.lotes.append((' '.join(sql.split()), list(filas)))
+
+    def fetchone(self):
+        return self._filas.pop(0) if self._filas else None
+
+    def fetchall(self):
+        filas, self._filas = self._filas, []
+        return filas
+
+    def close(self):
+        pass
+
+
+class ConexionGuion:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.eventos = []
+        self.round_trips = 0
+
+    def cursor(self, dictionary=False):
+        return self._cursor
+
+    def commit(self):
+        self.eventos.append('commit')
+
+    def rollback(self):
+        self.eventos.append('rollback')
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    monkeypatch.setattr(planificador, 'iniciar', lambda: None)
+    monkeypatch.setattr(cache_http, 'marcar_cambio', lambda: None)
+    monkeypatch.setattr(grafo_dependencias, 'notificar_reporte', lambda conn, id_reporte: None)
+    monkeypatch.setattr(busqueda, 'notificar_reporte', lambda conn, id_reporte: None)
+
+    app = Flask(__name__)
+    app.secret_key = 'pruebas'
+    app.register_blueprint(reports.reportes_bp)
+    return app.test_client()
+
+
+def conectar(monkeypatch, respuestas):
+    cursor = CursorGuion(respuestas)
+    conn = ConexionGuion(cursor)
+    monkeypatch.setattr(reports, 'get_request_connection', lambda: conn)
+    return conn, cursor
+
+
+def test_aprobar_bloquea_el_reporte_y_ajusta_contadores_una_vez(cliente, monkeypatch):
+    conn, cursor = conectar(monkeypatch, [
+        ('FROM reporte WHERE id_reporte', [{'codigo_interno': 'REG-0001', 'estado': 'Pendiente'}]),
+        ('COUNT(*)', [{'total': 2}]),
+    ])
+
+    respuesta = cliente.post('/api/reportes/5/aprobar')
+
+    assert respuesta.status_code == 200
+    assert cursor.sentencias[0][0].endswith('FOR UPDATE')
+    (sql, filas), = cursor.lotes
+    assert 'estadistica_resumen' in sql
+    assert sorted((clave, delta) for clave, _, delta in filas) == [('estado:Aprobado', 1), ('estado:Pendiente', -1)]
+    assert conn.eventos == ['commit']
+
+
+def test_aprobar_ya_aprobado_no_toca_contadores(cliente, monkeypatch):
+    # La segunda aprobación concurrente espera el candado y lee el estado ya confirmado
+    conn, cursor = conectar(monkeypatch, [
+        ('FROM reporte WHERE id_reporte', [{'codigo_interno': 'REG-0001', 'estado': 'Aprobado'}]),
+    ])
+
+    respuesta = cliente.post('/api/reportes/5/aprobar')
+
+    assert respuesta.status_code == 400
+    assert cursor.lotes == []
+    assert conn.eventos == ['rollback']
+
+
+def test_aprobar_reporte_inexistente(cliente, monkeypatch):
+    conn, cursor = conectar(monkeypatch, [])
+    assert cliente.post('/api/reportes/99/aprobar').status_code == 404
+    assert conn.eventos == ['rollback']
+
+
+def test_aprobar_marca_el_cambio_despues_de_notificar(cliente, monkeypatch):
+    orden = []
+    monkeypatch.setattr(grafo_dependencias, 'notificar_reporte', lambda conn, id_reporte: orden.append('grafo'))
+    monkeypatch.setattr(busqueda, 'notificar_reporte', lambda conn, id_reporte: orden.append('busqueda'))
+    monkeypatch.setattr(cache_http, 'marcar_cambio', lambda: orden.append('version'))
+    conectar(monkeypatch, [
+        ('FROM reporte WHERE id_reporte', [{'codigo_interno': 'REG-0001', 'estado': 'Pendiente'}]),
+        ('COUNT(*)', [{'total': 2}]),
+    ])
+
+    assert cliente.post('/api/reportes/5/aprobar').status_code == 200
+    assert orden == ['grafo', 'busqueda', 'version']
+
+
+# ============================================================================
+# CREAR REPORTE (una transacción, escrituras agrupadas)
+# ============================================================================
+
+def test_preparar_dependencias_descarta_invalidas_y_repetidas():
+    dependencias = reports.preparar_dependencias(
+        '[{"id_reporte": 5, "criticidad": "ALTA"}, {"id_reporte": "5"}, {"id_reporte": "x"}, 7, {"id_reporte": 8}]'
+    )
+    assert dependencias == [(5, 'DATOS', 'ALTA', None), (8, 'DATOS', 'MEDIA', None)]
+    assert reports.preparar_dependencias('{no es json') == []
+    assert reports.preparar_dependencias('{"id_reporte": 5}') == []
+
+
+def test_dependencias_preliminares_en_un_insert_select():
+    cursor = CursorGuion([])
+    cursor.rowcount = 1
+
+    creadas = reports.insertar_dependencias_preliminares(
+        cursor, 10, [(5, 'DATOS', 'ALTA', None), (10, 'DATOS', 'MEDIA', None), (99, 'CALCULO', 'BAJA', 'x')], 1
+    )
+
+    (sql, params), = cursor.sentencias
+    assert sql.startswith('INSERT INTO reporte_dependencia') and 'JOIN reporte r ON r.id_reporte = d.id_padre' in sql
+    assert sql.count('UNION ALL') == 1
+    # Sin la auto-dependencia; el padre inexistente (99) lo descarta el JOIN
+    assert params == [10, 1, 5, 'DATOS', 'ALTA', None, 99, 'CALCULO', 'BAJA', 'x']
+    assert creadas == 1
+
+
+def test_crear_reporte_en_una_sola_transaccion(cliente, monkeypatch):
+    conn, cursor = conectar(monkeypatch, [
+        ('UPDATE secuencia_codigo', []),
+    ])
+    cursor.lastrowid = 40
+    monkeypatch.setattr(reporte_service, 'get_request_connection', lambda: conn)
+    monkeypatch.setattr(datos_referencia, 'prefijo_tipo', lambda tipo_id: 'REG')
+    monkeypatch.setattr(datos_referencia, 'horas_alerta', lambda: {})
+    monkeypatch.setattr(planificador, 'notificar_programacion', lambda *args: None)
+    monkeypatch.setattr(demoras, 'notificar_programacion', lambda *args: None)
+
+    respuesta = cliente.post('/crear_reporte', data={
+        'nombre': 'Cartera vencida', 'tipo_id': '1', 'area_reportante_id': '2', 'area_ejecutora_id': '3',
+        'frecuencia': 'mensual', 'gitlab_url': 'https://gitlab/cartera',
+        'dependencias': '[{"id_reporte": 5}, {"id_reporte": 5}]',
+    })
+
+    assert respuesta.status_code == 302 and respuesta.headers['Location'].endswith('/catalogos')
+    assert conn.eventos == ['commit']
+    assert [' '.join(sql.split()[:3]) for sql, _ in cursor.sentencias] == [
+        'UPDATE secuencia_codigo SET',
+        'INSERT INTO reporte',
+        'INSERT INTO reporte_dependencia',
+        'INSERT INTO reporte_schedule',
+        'INSERT INTO recurso',
+        'INSERT INTO bitacora_evento',
+    ]
+    assert cursor.sentencias[1][1][0] == 'REG-0040'
+    # Vínculos con recursos y contadores: un INSERT multi-fila cada uno
+    assert [' '.join(sql.split()[:3]) for sql, _ in cursor.lotes] == ['INSERT INTO reporte_recurso', 'INSERT INTO estadistica_resumen']
+
+
+@pytest.mark.parametrize('cuerpo', [{}, {'reporte_ids': []}, {'reporte_ids': 5}, {'reporte_ids': [1, 'x']}])
+def test_marcar_entregados_valida_el_cuerpo(cliente, cuerpo):
+    respuesta = cliente.post('/api/reportes/marcar_entregados', json=cuerpo)
+    assert respuesta.status_code == 400 and respuesta.get_json()['success'] is False
+
+
+def test_marcar_entregados_resume_por_reporte(cliente, monkeypatch):
+    monkeypatch.setattr(reports.ReporteService, 'marcar_entregados', staticmethod(lambda ids, usuario_id: {
+        1: {'success': True, 'estado': 'ENTREGADO'},
+        2: {'success': False, 'error': 'Reporte no encontrado o sin programación'},
+    }))
+
+    datos = cliente.post('/api/reportes/marcar_entregados', json={'reporte_ids': [1, '2']}).get_json()
+
+    assert (datos['success'], datos['entregados']) == (False, 1)
+    assert [r['id_reporte'] for r in datos['resultados']] == [1, 2]
+
+
+def test_metrics_expone_formato_prometheus(cliente):
+    assert cliente.get('/api/reportes/metricas_creacion').status_code == 200
+
+    respuesta = cliente.get('/metrics')
+
+    assert respuesta.status_code == 200
+    assert respuesta.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+    texto = respuesta.get_data(as_text=True)
+    assert 'alejandria_requests_total{ruta="/api/reportes/metricas_creacion",metodo="GET",status="200"}' in texto
+    assert '# TYPE alejandria_request_consultas_sql histogram' in texto
+    for prefijo in ('alejandria_pool_', 'alejandria_bitacora_', 'alejandria_planificador_', 'alejandria_creacion_'):
+        assert f'# TYPE {prefijo}' in texto